@@ -0,0 +1,80 @@
+"""
+Benchmark: 監控路徑讀值 DataFrame（iloc / Series）vs Candles（struct-of-arrays）
+
+模擬持倉監控 cycle 的讀取模式：最新 / 前一根 bar、swing point 結構分析、
+信號偵測（已算好指標的 100 根 1H K 線）。
+
+手動執行：
+    python benchmarks/bench_candles.py
+"""
+
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from trader.indicators.technical import TechnicalAnalysis
+from trader.infrastructure.candles import Candles, bar
+from trader.signals import detect_2b_with_pivots, detect_volume_breakout
+from trader.structure import StructureAnalysis
+from trader.tests.test_ohlcv_resample import H, T0, TickExchange, _native
+
+
+def _frame_reads(df):
+    curr = df.iloc[-1]
+    prev = df.iloc[-2]
+    return curr['close'] - prev['close'], curr['high'], curr['low'], curr.get('atr', 0)
+
+
+def _bar_reads(data):
+    curr = bar(data, -1)
+    prev = bar(data, -2)
+    return curr['close'] - prev['close'], curr['high'], curr['low'], curr.get('atr', 0)
+
+
+def _signals(data):
+    detect_2b_with_pivots(data, accept_weak_signals=True)
+    detect_volume_breakout(data)
+
+
+def _best_of(fn, repeat: int = 5, loops: int = 2000) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        best = min(best, (time.perf_counter() - t0) / loops)
+    return best
+
+
+def _peak_kib(fn, loops: int = 200) -> float:
+    tracemalloc.start()
+    for _ in range(loops):
+        fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1024
+
+
+def main():
+    df = TechnicalAnalysis.calculate_indicators(_native(TickExchange(T0 + 300 * H), '1h', 100))
+    candles = Candles.from_frame(df)
+    swing = StructureAnalysis._compute_swing_points
+
+    cases = [
+        ('last-bar reads', lambda: _frame_reads(df), lambda: _bar_reads(candles)),
+        ('swing points', lambda: swing(df, 5, 2), lambda: swing(candles, 5, 2)),
+        ('signals', lambda: _signals(df), lambda: _signals(candles)),
+        ('slice for consumer', lambda: df.iloc[-50:], lambda: candles[-50:]),
+    ]
+    print(f"{'case':>18} | {'DataFrame (us)':>15} | {'Candles (us)':>13} | {'speedup':>8} | {'peak KiB df/c':>14}")
+    for name, frame_fn, candle_fn in cases:
+        t_df = _best_of(frame_fn)
+        t_c = _best_of(candle_fn)
+        mem = f"{_peak_kib(frame_fn):.0f}/{_peak_kib(candle_fn):.0f}"
+        print(f"{name:>18} | {t_df * 1e6:>15.1f} | {t_c * 1e6:>13.1f} | {t_df / t_c:>7.1f}x | {mem:>14}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""
+Benchmark: NumPy 指標 kernel vs pandas 實作（pandas_ta 同語意的 ewm / rolling 寫法）
+
+手動執行：
+    python benchmarks/bench_indicator_kernels.py
+"""
+
+import sys
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from trader.indicators import kernels
+from trader.tests.fixtures.reference import make_ohlcv, ref_adx, ref_atr, ref_ema, ref_rsi
+
+
+def _best_of(fn, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    print(f"{'indicator':>10} | {'bars':>8} | {'pandas (ms)':>12} | {'numpy (ms)':>11} | {'speedup':>8}")
+    for n in (250, 1_000, 100_000):
+        df = make_ohlcv(n)
+        h, l, c = df['high'], df['low'], df['close']
+        ha, la, ca, va = h.to_numpy(), l.to_numpy(), c.to_numpy(), df['volume'].to_numpy()
+        cases = [
+            ('ema200', lambda: ref_ema(c, 200), lambda: kernels.ema(ca, 200)),
+            ('sma20', lambda: df['volume'].rolling(20).mean(), lambda: kernels.sma(va, 20)),
+            ('atr14', lambda: ref_atr(h, l, c, 14), lambda: kernels.atr(ha, la, ca, 14)),
+            ('adx14', lambda: ref_adx(h, l, c, 14), lambda: kernels.adx(ha, la, ca, 14)),
+            ('rsi14', lambda: ref_rsi(c, 14), lambda: kernels.rsi(ca, 14)),
+        ]
+        repeat = 5 if n >= 100_000 else 50
+        for name, ref_fn, kernel_fn in cases:
+            t_ref = _best_of(ref_fn, repeat)
+            t_np = _best_of(kernel_fn, repeat)
+            print(f"{name:>10} | {n:>8} | {t_ref * 1e3:>12.3f} | {t_np * 1e3:>11.3f} | {t_ref / t_np:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+"""
+Benchmark: find_swing_points 向量化 vs 逐根迴圈
+
+手動執行：
+    python benchmarks/bench_swing_points.py
+"""
+
+import sys
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from trader.structure import StructureAnalysis
+from trader.tests.fixtures.reference import make_ohlcv, ref_swing_points
+
+
+def _best_of(fn, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    left, right = 7, 3
+    print(f"{'bars':>8} | {'loop (ms)':>12} | {'vectorized (ms)':>16} | {'speedup':>8}")
+    for n in (100, 1_000, 100_000):
+        df = make_ohlcv(n)
+        repeat = 3 if n >= 100_000 else 20
+        t_loop = _best_of(lambda: ref_swing_points(df, left, right), 1 if n >= 100_000 else repeat)
+        t_vec = _best_of(lambda: StructureAnalysis.find_swing_points(df, left, right), repeat)
+        print(f"{n:>8} | {t_loop * 1e3:>12.2f} | {t_vec * 1e3:>16.3f} | {t_loop / t_vec:>7.0f}x")
+
+
+if __name__ == '__main__':
+    main()
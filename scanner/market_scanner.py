@@ -21,17 +21,12 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 import ccxt
 import pandas as pd
-try:
-    import pandas_ta as ta
-except ImportError:
-    ta = None
 import numpy as np
 import json
 import sqlite3
 import logging
 from logging.handlers import RotatingFileHandler
 import time
-import requests
 import os
 from datetime import datetime, timezone, timedelta
 from typing import Dict, List, Tuple, Optional
@@ -41,10 +36,30 @@ from enum import Enum
 # Import shared StructureAnalysis from v6
 from trader.structure import StructureAnalysis
 from trader.infrastructure.data_provider import MarketDataProvider
+from trader.infrastructure.candle_store import CandleStore
+from trader.infrastructure import http_pool
+from trader.infrastructure.replay import DataArchive, RecordingDataProvider, ReplayDataProvider
+from trader.indicators.incremental import set_clock as set_indicator_clock
+from trader.indicators.registry import compute_columns, declare_lazy, ensure_indicators, lazy_stats
 
 # 標記模組可用
 SCANNER_AVAILABLE = True
 
+# Scanner 指標欄位：{欄位名: (kind, source, length)}，由 trader.indicators.registry 解析
+SCANNER_INDICATORS = {
+    'ema_20': ('ema', 'close', 20),
+    'ema_50': ('ema', 'close', 50),
+    'ema_200': ('ema', 'close', 200),
+    'rsi': ('rsi', 'close', 14),
+    'atr': ('atr', None, 14),
+    'vol_ma': ('sma', 'volume', 20),
+    'adx': ('adx', None, 14),
+    'atr_percent': ('atr_percent', None, 14),
+}
+
+# Layer 2 每個標的都會讀取的欄位（atr / vol_ma 另供 Layer 3 的 2B 偵測）
+L2_INDICATORS = ('adx', 'rsi', 'vol_ma', 'atr', 'atr_percent', 'ema_50')
+
 # ==================== 配置 ====================
 class ScannerConfig:
     """Scanner 配置"""
@@ -87,11 +102,17 @@ class ScannerConfig:
     OUTPUT_TOP_N = 10
     OUTPUT_JSON_PATH = str(Path(__file__).resolve().parent.parent / 'hot_symbols.json')
     OUTPUT_DB_PATH = str(Path(__file__).resolve().parent.parent / 'scanner_results.db')
+    # 本地 K 線倉庫（與 Bot 分開目錄：每個目錄只由單一程序寫入）
+    CANDLE_STORE_ENABLED = True
+    CANDLE_STORE_DIR = str(Path(__file__).resolve().parent.parent / '.log' / 'scanner_candles')
+    CANDLE_STORE_MAX_BARS = 5000
     
     # API 優化
-    API_BATCH_SIZE = 50
-    API_DELAY_BETWEEN_BATCHES = 1.0
+    API_BATCH_SIZE = 50              # 每批並行抓取的標的數
+    API_DELAY_BETWEEN_BATCHES = 1.0  # 重試基礎間隔（速率改由 weight 限流器控制，批次間不再 sleep）
     API_MAX_RETRIES = 3
+    API_MAX_WORKERS = 8              # K 線並行抓取執行緒數
+    API_COALESCE_SECONDS = 10        # 相同 K 線請求完成後共用結果的秒數
     
     # Telegram 通知（可選）
     TELEGRAM_ENABLED = False
@@ -290,22 +311,46 @@ def get_sector(symbol: str) -> str:
 class MarketScanner:
     """市場掃描器主類"""
     
-    def __init__(self, data_provider: MarketDataProvider = None):
+    def __init__(self, data_provider: MarketDataProvider = None, archive: Optional[DataArchive] = None):
+        """
+        Args:
+            data_provider: 依賴注入；None 時自動建立（Scanner 永遠使用正式網，sandbox=False）
+            archive: 錄製檔（mode='w' 錄製交易所回應；mode='r' 離線重播，不建立 ccxt 連線）
+        """
         # 確保配置已載入（防止 GUI 直接建構時未調用 load_from_json）
         ScannerConfig.load_from_json()
-        self.exchange = self._init_exchange()
-        # 依賴注入：若未傳入 data_provider 則自動建立（Scanner 永遠使用正式網，sandbox=False）
-        self._data_provider = data_provider or MarketDataProvider(
-            self.exchange,
+        replaying = archive is not None and archive.mode == 'r'
+        self.exchange = None if replaying else self._init_exchange()
+        if replaying:
+            # 重播：增量指標以錄製時間判斷 bar 是否已收盤
+            set_indicator_clock(lambda: archive.now_ms() / 1000)
+        if data_provider is None:
+            data_provider = self._make_data_provider(archive)
+            self.exchange = data_provider.exchange
+        self._data_provider = data_provider
+        self.results: List[ScanResult] = []
+        self.excluded: List[Dict] = []
+        self.btc_data: pd.DataFrame = None # type: ignore
+        self.market_summary: MarketSummary = None # type: ignore
+
+    def _make_data_provider(self, archive: Optional[DataArchive]) -> MarketDataProvider:
+        kwargs = dict(
             max_retry=ScannerConfig.API_MAX_RETRIES,
             retry_delay=ScannerConfig.API_DELAY_BETWEEN_BATCHES,
             sandbox_mode=False,
             trading_mode=ScannerConfig.MARKET_TYPE,
+            max_workers=ScannerConfig.API_MAX_WORKERS,
+            coalesce_seconds=ScannerConfig.API_COALESCE_SECONDS,
+            candle_store=(
+                CandleStore(ScannerConfig.CANDLE_STORE_DIR, max_records=ScannerConfig.CANDLE_STORE_MAX_BARS)
+                if ScannerConfig.CANDLE_STORE_ENABLED else None
+            ),
         )
-        self.results: List[ScanResult] = []
-        self.excluded: List[Dict] = []
-        self.btc_data: pd.DataFrame = None # type: ignore
-        self.market_summary: MarketSummary = None # type: ignore
+        if archive is None:
+            return MarketDataProvider(self.exchange, **kwargs)
+        if archive.mode == 'r':
+            return ReplayDataProvider(archive, **kwargs)
+        return RecordingDataProvider(self.exchange, archive, **kwargs)
 
     @staticmethod
     def _normalize_symbol(symbol: str) -> str:
@@ -351,63 +396,28 @@ class MarketScanner:
     def fetch_ohlcv(self, symbol: str, timeframe: str, limit: int = 100) -> pd.DataFrame:
         """獲取 K 線數據（委託 MarketDataProvider 統一處理重試邏輯）"""
         return self._data_provider.fetch_ohlcv(symbol, timeframe, limit)
+
+    def fetch_ohlcv_many(self, symbols: List[str], timeframe: str, limit: int = 100) -> Dict[str, pd.DataFrame]:
+        """並行獲取多個標的同一時間框架的 K 線，回傳 {symbol: df}"""
+        frames = self._data_provider.fetch_ohlcv_many([(s, timeframe, limit) for s in symbols])
+        return {s: frames.get((s, timeframe), pd.DataFrame()) for s in symbols}
     
-    # TECH_DEBT: 此函數與 trading_bot_main.py 的 TechnicalAnalysis.calculate_indicators 有重疊邏輯
-    # （EMA、ATR、ADX、vol_ma），但計算的指標集不同，暫不合併。
-    # 若未來需修改共用指標，請兩邊同步更新。
-    def calculate_indicators(self, df: pd.DataFrame) -> pd.DataFrame:
-        """計算技術指標"""
+    def calculate_indicators(self, df: pd.DataFrame, lazy: bool = False,
+                             columns: Optional[Tuple[str, ...]] = None) -> pd.DataFrame:
+        """
+        計算技術指標（與 trader 共用 indicator registry，欄位集見 SCANNER_INDICATORS）
+
+        Args:
+            lazy: True 時只登記欄位，讀取前以 ensure_indicators 按需計算
+            columns: 只計算這些欄位（呼叫端確定會讀取的欄位集；預設全部）
+        """
         if df.empty or len(df) < 50:
             return df
-        
-        if ta is not None:
-            # 使用 pandas_ta
-            df['ema_20'] = ta.ema(df['close'], length=20)
-            df['ema_50'] = ta.ema(df['close'], length=50)
-            df['ema_200'] = ta.ema(df['close'], length=200)
-            df['rsi'] = ta.rsi(df['close'], length=14)
-            df['atr'] = ta.atr(df['high'], df['low'], df['close'], length=14)
-            df['vol_ma'] = ta.sma(df['volume'], length=20)
-            adx_data = ta.adx(df['high'], df['low'], df['close'], length=14)
-            if adx_data is not None and not adx_data.empty:
-                if isinstance(adx_data, pd.DataFrame):
-                    adx_cols = [col for col in adx_data.columns if col.startswith('ADX')]
-                    if adx_cols:
-                        df['adx'] = adx_data[adx_cols[0]]
-        else:
-            # 純 pandas 備用計算
-            df['ema_20'] = df['close'].ewm(span=20, adjust=False).mean()
-            df['ema_50'] = df['close'].ewm(span=50, adjust=False).mean()
-            df['ema_200'] = df['close'].ewm(span=200, adjust=False).mean()
-            df['vol_ma'] = df['volume'].rolling(window=20).mean()
-            # RSI
-            delta = df['close'].diff()
-            gain = delta.where(delta > 0, 0.0).rolling(window=14).mean()
-            loss = (-delta.where(delta < 0, 0.0)).rolling(window=14).mean()
-            rs = gain / loss.replace(0, np.nan)
-            df['rsi'] = 100 - (100 / (1 + rs))
-            # ATR
-            tr = pd.concat([
-                df['high'] - df['low'],
-                (df['high'] - df['close'].shift()).abs(),
-                (df['low'] - df['close'].shift()).abs()
-            ], axis=1).max(axis=1)
-            df['atr'] = tr.rolling(window=14).mean()
-            # ADX
-            plus_dm = df['high'].diff()
-            minus_dm = -df['low'].diff()
-            plus_dm = plus_dm.where((plus_dm > minus_dm) & (plus_dm > 0), 0.0)
-            minus_dm = minus_dm.where((minus_dm > plus_dm) & (minus_dm > 0), 0.0)
-            atr14 = tr.rolling(window=14).mean()
-            plus_di = 100 * (plus_dm.rolling(window=14).mean() / atr14.replace(0, np.nan))
-            minus_di = 100 * (minus_dm.rolling(window=14).mean() / atr14.replace(0, np.nan))
-            dx = (plus_di - minus_di).abs() / (plus_di + minus_di).replace(0, np.nan) * 100
-            df['adx'] = dx.rolling(window=14).mean()
-        
-        # ATR 百分比
-        df['atr_percent'] = (df['atr'] / df['close']) * 100
-        
-        return df
+        specs = SCANNER_INDICATORS if columns is None else {name: SCANNER_INDICATORS[name] for name in columns}
+        # Scanner 為獨立程序，不使用 bot 的增量指標引擎狀態
+        if lazy:
+            return declare_lazy(df, specs, use_engine=False)
+        return compute_columns(df, specs, use_engine=False)
     
     # ==================== Layer 1: 流動性過濾 ====================
     def layer1_liquidity_filter(self) -> List[str]:
@@ -466,19 +476,14 @@ class MarketScanner:
             if min_candles > 0 and passed:
                 logger.debug(f"   檢查日K歷史深度（需要 >= {min_candles} 根）...")
                 history_passed = []
-                for i, symbol in enumerate(passed):
-                    try:
-                        df_daily = self.fetch_ohlcv(symbol, '1d', limit=min_candles)
-                        if not df_daily.empty and len(df_daily) >= min_candles:
-                            history_passed.append(symbol)
-                        else:
-                            candle_count = len(df_daily) if not df_daily.empty else 0
-                            logger.debug(f"   {symbol}: 日K不足 ({candle_count}/{min_candles})，排除")
-                    except Exception:
-                        logger.debug(f"   {symbol}: 日K獲取失敗，排除")
-                    # 每 20 個 symbol 暫停一下避免 rate limit
-                    if (i + 1) % 20 == 0:
-                        time.sleep(ScannerConfig.API_DELAY_BETWEEN_BATCHES)
+                daily_frames = self.fetch_ohlcv_many(passed, '1d', limit=min_candles)
+                for symbol in passed:
+                    df_daily = daily_frames[symbol]
+                    if not df_daily.empty and len(df_daily) >= min_candles:
+                        history_passed.append(symbol)
+                    else:
+                        candle_count = len(df_daily) if not df_daily.empty else 0
+                        logger.debug(f"   {symbol}: 日K不足 ({candle_count}/{min_candles})，排除")
 
                 removed = len(passed) - len(history_passed)
                 if removed > 0:
@@ -504,7 +509,7 @@ class MarketScanner:
         # 先獲取 BTC 數據作為基準
         self.btc_data = self.fetch_ohlcv('BTC/USDT', ScannerConfig.TIMEFRAME_SCAN, limit=100)
         if not self.btc_data.empty:
-            self.btc_data = self.calculate_indicators(self.btc_data)
+            self.btc_data = self.calculate_indicators(self.btc_data, lazy=True)
         
         passed = []
         total = len(symbols)
@@ -512,14 +517,15 @@ class MarketScanner:
         for i in range(0, total, ScannerConfig.API_BATCH_SIZE):
             batch = symbols[i:i + ScannerConfig.API_BATCH_SIZE]
             logger.debug(f"   處理批次 {i//ScannerConfig.API_BATCH_SIZE + 1}/{(total-1)//ScannerConfig.API_BATCH_SIZE + 1}")
-            
+            frames = self.fetch_ohlcv_many(batch, ScannerConfig.TIMEFRAME_SCAN, limit=100)
+
             for symbol in batch:
                 try:
-                    df = self.fetch_ohlcv(symbol, ScannerConfig.TIMEFRAME_SCAN, limit=100)
+                    df = frames[symbol]
                     if df.empty or len(df) < 50:
                         continue
                     
-                    df = self.calculate_indicators(df)
+                    df = self.calculate_indicators(df, columns=L2_INDICATORS)
                     latest = df.iloc[-1]
                     
                     conditions_met = 0
@@ -569,10 +575,7 @@ class MarketScanner:
                 except Exception as e:
                     logger.debug(f"處理 {symbol} 時出錯: {e}")
                     continue
-            
-            if i + ScannerConfig.API_BATCH_SIZE < total:
-                time.sleep(ScannerConfig.API_DELAY_BETWEEN_BATCHES)
-        
+
         logger.info(f"✅ Layer 2 通過: {len(passed)} / {total} 個標的")
         return passed
     
@@ -807,7 +810,7 @@ class MarketScanner:
             if df_4h.empty or len(df_4h) < 30:
                 return False
             
-            df_4h = self.calculate_indicators(df_4h)
+            df_4h = self.calculate_indicators(df_4h, columns=('ema_20', 'ema_50'))
             latest = df_4h.iloc[-1]
             
             ema_20 = latest.get('ema_20', 0)
@@ -934,6 +937,7 @@ class MarketScanner:
         
         self.results = []
         self.excluded = []
+        lazy_stats(reset=True)
         
         l1_symbols = self.layer1_liquidity_filter()
         l2_candidates = self.layer2_momentum_filter(l1_symbols)
@@ -956,6 +960,11 @@ class MarketScanner:
         
         scan_duration = (datetime.now(timezone.utc) - scan_start).total_seconds()
         logger.info(f"\n✅ 掃描完成，耗時 {scan_duration:.1f} 秒")
+        indicator_stats = lazy_stats(reset=True)
+        logger.debug(
+            f"   指標欄位: 計算 {indicator_stats['computed']} / 登記 {indicator_stats['declared']}"
+            f"（省下 {indicator_stats['avoided']}）"
+        )
         
         return self.results, self.market_summary
     
@@ -985,7 +994,7 @@ class MarketScanner:
         
         btc_trend = 'UNKNOWN'
         if self.btc_data is not None and not self.btc_data.empty:
-            latest = self.btc_data.iloc[-1]
+            latest = ensure_indicators(self.btc_data, 'ema_50').iloc[-1]
             ema_50 = latest.get('ema_50', 0)
             if pd.notna(ema_50) and ema_50 > 0:
                 btc_trend = 'BULLISH' if latest['close'] > ema_50 else 'BEARISH'
@@ -1167,7 +1176,7 @@ class MarketScanner:
             msg += f"⏰ 下次掃描: {ScannerConfig.SCAN_INTERVAL_MINUTES} 分鐘後"
             
             url = f"https://api.telegram.org/bot{ScannerConfig.TELEGRAM_BOT_TOKEN}/sendMessage"
-            requests.post(url, data={
+            http_pool.post(url, data={
                 'chat_id': ScannerConfig.TELEGRAM_CHAT_ID,
                 'text': msg,
                 'parse_mode': 'HTML'
@@ -1185,26 +1194,51 @@ def main():
     parser = argparse.ArgumentParser(description='Crypto Market Scanner v1.0')
     parser.add_argument('--once', action='store_true', help='只執行一次掃描')
     parser.add_argument('--config', type=str, help='配置文件路徑')
+    parser.add_argument('--record', metavar='PATH', help='錄製所有交易所回應到 PATH（gzip JSONL）')
+    parser.add_argument('--replay', metavar='PATH', help='離線重播 PATH 的錄製回應（不連網、不發 Telegram、不覆寫輸出）')
     args = parser.parse_args()
     
     ScannerConfig.load_from_json(args.config)
-    
-    scanner = MarketScanner()
+
+    archive = None
+    if args.replay:
+        archive = DataArchive(args.replay, mode='r')
+    elif args.record:
+        archive = DataArchive(args.record, mode='w')
+
+    scanner = MarketScanner(archive=archive)
+    if args.replay:
+        # 建構時會重新載入設定檔，覆寫需在之後
+        ScannerConfig.TELEGRAM_ENABLED = False
+        ScannerConfig.OUTPUT_JSON_PATH = f"{args.replay}.hot_symbols.json"
+        ScannerConfig.OUTPUT_DB_PATH = f"{args.replay}.scanner_results.db"
     
     if args.once:
         scanner.scan()
+        if archive is not None:
+            archive.close()
     else:
         logger.info(f"🚀 Scanner 啟動，掃描間隔: {ScannerConfig.SCAN_INTERVAL_MINUTES} 分鐘")
         
         while True:
             try:
                 scanner.scan()
+
+                if archive is not None:
+                    if args.replay:
+                        if archive.exhausted:
+                            logger.info(f"錄製檔重播完畢: {archive.stats}")
+                            break
+                        continue        # 重播不等待
+                    archive.flush()
                 
                 logger.info(f"😴 等待 {ScannerConfig.SCAN_INTERVAL_MINUTES} 分鐘...")
                 time.sleep(ScannerConfig.SCAN_INTERVAL_MINUTES * 60)
                 
             except KeyboardInterrupt:
                 logger.info("\n⏹ 用戶中斷，停止掃描")
+                if archive is not None:
+                    archive.close()
                 break
             except Exception as e:
                 logger.error(f"❌ 掃描錯誤: {e}")
@@ -12,12 +12,15 @@ import sys
 import os
 import time
 import json
+import random
 import signal
 import logging
+import threading
 import logging.handlers
 from pathlib import Path
 from datetime import datetime, timezone
-from typing import Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
 
 # 確保從專案根目錄 import v6 package
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -26,10 +29,20 @@ import ccxt
 import pandas as pd
 
 # 基礎設施層
+from trader.infrastructure import http_pool, retry
 from trader.infrastructure.api_client import BinanceFuturesClient
+from trader.infrastructure.capabilities import CapabilityRegistry
 from trader.infrastructure.notifier import TelegramNotifier
 from trader.infrastructure.telegram_handler import TelegramCommandHandler
-from trader.infrastructure.data_provider import MarketDataProvider
+from trader.infrastructure.data_provider import DEMO_FAPI_URL, MarketDataProvider
+from trader.infrastructure.candle_store import CandleStore
+from trader.infrastructure.candles import Candles, Frame
+from trader.infrastructure.market_stream import MarketStream
+from trader.infrastructure.rate_limiter import WeightRateLimiter
+from trader.infrastructure.replay import DataArchive, RecordingDataProvider, ReplayDataProvider
+from trader.infrastructure.scheduler import Scheduler
+from trader.infrastructure.server_clock import ServerClock
+from trader.infrastructure.user_stream import UserDataStream
 from trader.infrastructure.performance_db import PerformanceDB
 # 技術指標層
 from trader.indicators.technical import (
@@ -39,6 +52,7 @@ from trader.indicators.technical import (
     MarketFilter,
 )
 # 風險管理層
+from trader.risk.account import AccountState
 from trader.risk.manager import PrecisionHandler, RiskManager, SignalTierSystem
 # 訂單執行層
 from trader.execution.order_engine import OrderExecutionEngine
@@ -46,6 +60,9 @@ from trader.config import ConfigV6 as Config
 from trader.positions import PositionManager
 from trader.persistence import PositionPersistence
 from trader.signals import detect_2b_with_pivots, detect_ema_pullback, detect_volume_breakout
+from trader.structure import StructureAnalysis
+from trader.indicators.incremental import get_engine as get_indicator_engine, set_clock as set_indicator_clock
+from trader.indicators.registry import ensure_indicators, lazy_stats as lazy_indicator_stats
 from trader.strategies.base import Action
 
 logger = logging.getLogger(__name__)
@@ -57,20 +74,82 @@ def _trade_log(fields: dict):
     logger.info(f"[TRADE] {parts}")
 
 
+def replay_state_dir(replay_path: str) -> Path:
+    """重播專用狀態目錄（錄製檔旁的 <錄製檔>.state/）"""
+    state_dir = Path(f"{os.path.expanduser(replay_path)}.state")
+    state_dir.mkdir(parents=True, exist_ok=True)
+    return state_dir
+
+
 class TradingBotV6:
     """V6.0 終極滾倉版交易機器人"""
 
     def __init__(self):
-        self.exchange = self._init_exchange()
-        self.data_provider = MarketDataProvider(
-            self.exchange,
+        # 錄製 / 重播模式：重播時不建立 ccxt 連線，交易所由錄製檔替身取代
+        self.archive: Optional[DataArchive] = None
+        if Config.DATA_REPLAY_PATH:
+            self.archive = DataArchive(Config.DATA_REPLAY_PATH, mode='r')
+            logger.info(f"重播模式：{Config.DATA_REPLAY_PATH}（{self.archive.stats['records']} 筆回應）")
+        elif Config.DATA_RECORD_PATH:
+            self.archive = DataArchive(Config.DATA_RECORD_PATH, mode='w')
+            logger.info(f"錄製模式：{Config.DATA_RECORD_PATH}")
+        self.exchange = None if Config.DATA_REPLAY_PATH else self._init_exchange()
+        # K 線與簽章請求共用同一 IP 的 weight 額度
+        self.rate_limiter = WeightRateLimiter(capacity=Config.API_WEIGHT_LIMIT)
+        # 端點能力登錄：provider（K 線 / 報價）與 bot（ticker / 止損單查詢）共用
+        self.capabilities = CapabilityRegistry(ttl_seconds=Config.CAPABILITY_TTL_SECONDS)
+        provider_kwargs = dict(
             max_retry=Config.MAX_RETRY,
             retry_delay=Config.RETRY_DELAY,
             sandbox_mode=Config.SANDBOX_MODE,
             trading_mode=Config.TRADING_MODE,
+            cache_enabled=Config.OHLCV_CACHE_ENABLED,
+            cache_max_entries=Config.OHLCV_CACHE_MAX_ENTRIES,
+            cache_max_bars=Config.OHLCV_CACHE_MAX_BARS,
+            rate_limiter=self.rate_limiter,
+            max_workers=Config.OHLCV_FETCH_WORKERS,
+            resample_base=Config.OHLCV_RESAMPLE_BASE,
+            coalesce_seconds=Config.OHLCV_COALESCE_SECONDS,
+            capabilities=self.capabilities,
+            breaker_threshold=Config.CIRCUIT_BREAKER_THRESHOLD,
+            breaker_reset_seconds=Config.CIRCUIT_BREAKER_RESET_SECONDS,
+            candle_store=(
+                CandleStore(Config.CANDLE_STORE_DIR, max_records=Config.CANDLE_STORE_MAX_BARS)
+                if Config.CANDLE_STORE_ENABLED else None
+            ),
         )
+        if Config.DATA_REPLAY_PATH:
+            self.data_provider = ReplayDataProvider(self.archive, **provider_kwargs)
+        elif Config.DATA_RECORD_PATH:
+            self.data_provider = RecordingDataProvider(self.exchange, self.archive, **provider_kwargs)
+        else:
+            self.data_provider = MarketDataProvider(self.exchange, **provider_kwargs)
+        # 錄製 / 重播時下游一律經 provider 的 exchange（錄製代理 / 重播替身）
+        self.exchange = self.data_provider.exchange
+        # 交易所時間：收盤對齊掃描與 signal memo 依此判斷 bar 是否已收盤（重播不校正）
+        self.server_clock = ServerClock(
+            None if Config.DATA_REPLAY_PATH else self._fetch_server_time,
+            resync_seconds=Config.SERVER_TIME_RESYNC_SECONDS,
+            local_ms=self.archive.now_ms if Config.DATA_REPLAY_PATH else None,
+        )
+        # 增量指標的收盤判定用同一時鐘（重播時為錄製時間，形成中 bar 不會被當成已收盤）
+        server_clock = self.server_clock
+        set_indicator_clock(lambda: server_clock.now_ms() / 1000)
+        # 即時行情串流（可選）：訂閱標的於每 cycle 開頭同步
+        self.market_stream: Optional[MarketStream] = None
+        if Config.MARKET_STREAM_ENABLED and not Config.DATA_REPLAY_PATH:
+            self.market_stream = MarketStream(
+                url=Config.MARKET_STREAM_URL,
+                timeframes=[Config.TIMEFRAME_SIGNAL],
+                stale_seconds=Config.MARKET_STREAM_STALE_SECONDS,
+            )
+            self.data_provider.attach_stream(self.market_stream)
         self.precision_handler = PrecisionHandler(self.exchange)
-        self.futures_client = BinanceFuturesClient(Config.API_KEY, Config.API_SECRET, Config.SANDBOX_MODE)
+        self.futures_client = BinanceFuturesClient(
+            Config.API_KEY, Config.API_SECRET, Config.SANDBOX_MODE, rate_limiter=self.rate_limiter
+        )
+        if self.archive is not None:
+            self.data_provider.attach_client(self.futures_client)
         self.risk_manager = RiskManager(self.exchange, self.precision_handler)
         # RiskManager 內部用 V5.3 Config 建的 futures_client 拿不到新 key，覆蓋掉
         self.risk_manager.futures_client = self.futures_client
@@ -78,23 +157,65 @@ class TradingBotV6:
         self.execution_engine = OrderExecutionEngine(
             self.exchange, self.futures_client, self.precision_handler
         )
+        # 帳戶快照：餘額 / 持倉 / 止損單 TTL 內共用，下單 / 改止損後由 execution_engine 失效
+        self.account = AccountState(
+            self.risk_manager.fetch_account,
+            self._query_exchange_stop_map,
+            ttl_seconds=Config.ACCOUNT_STATE_TTL_SECONDS,
+        )
+        self.risk_manager.account = self.account
+        self.execution_engine.account = self.account
+        # 帳戶串流：事件即時改寫帳戶快照，持倉變動立即觸發同步（run() 啟動）
+        self.user_stream: Optional[UserDataStream] = None
+        if Config.USER_STREAM_ENABLED and not Config.DATA_REPLAY_PATH:
+            self.user_stream = UserDataStream(
+                self._user_stream_key,
+                url=Config.USER_STREAM_URL,
+                keepalive_seconds=Config.USER_STREAM_KEEPALIVE_SECONDS,
+            )
+            self.account.attach_stream(self.user_stream, reconcile_seconds=Config.USER_STREAM_RECONCILE_SECONDS)
+            self.user_stream.add_listener(self._on_user_event)
 
         # V6.0: PositionManager 取代 TradeManager
         self.active_trades: Dict[str, PositionManager] = {}
+        # active_trades 與冷卻表（recently_exited / order_failed_symbols / early_exit_cooldown）的鎖：
+        # 只在讀取快照、增刪持倉、讀寫冷卻時持有，不包住任何網路請求
+        self._trades_lock = threading.RLock()
+        # 並行監控：每個 symbol 一把鎖（狀態變更 / 下單），存檔另有一把鎖（快照 + 寫檔不交錯）
+        self._symbol_locks: Dict[str, threading.RLock] = {}
+        self._symbol_locks_guard = threading.Lock()
+        self._save_lock = threading.Lock()
+        # 最近一次監控週期各持倉的端到端延遲（秒，週期開始 → 決策完成）
+        self._monitor_latency: Dict[str, float] = {}
 
         # 冷卻和黑名單
         self.recently_exited: Dict[str, datetime] = {}
         self.order_failed_symbols: Dict[str, datetime] = {}
         self.early_exit_cooldown: Dict[str, datetime] = {}  # 快速止損/超時退出 12h 冷卻
 
+        # 信號評估 memo：symbol → 已評估且無信號的最後收盤信號 bar 時間（ms）
+        # 同一根已收盤 bar 的偵測結果不會改變，下一根收盤前直接跳過
+        self._signal_memo: Dict[str, int] = {}
+        # 上一輪掃描有標的 K 線抓取失敗 → 不等下一根收盤，CHECK_INTERVAL 後補掃
+        self._scan_retry = False
+
+        # 監控週期報價快照：symbol → last price（每 cycle 一次全市場請求，週期結束清空）
+        self._price_snapshot: Dict[str, float] = {}
+
         # 帳戶初始餘額（用於 net_pnl_pct 計算）
         self.initial_balance: float = 0.0
 
         # V6.0: 持久化層（路徑在 Config，指向專案根目錄）
-        pos_path = os.path.expanduser(Config.POSITIONS_JSON_PATH)
-        if not os.path.isabs(pos_path):
-            pos_path = str(Path(__file__).parent.parent / pos_path)
+        if Config.DATA_REPLAY_PATH:
+            # 重播只讀寫錄製檔旁的狀態目錄，絕不覆蓋 / 刪除正式的 positions.json
+            pos_path = str(replay_state_dir(Config.DATA_REPLAY_PATH) / 'positions.json')
+        else:
+            pos_path = os.path.expanduser(Config.POSITIONS_JSON_PATH)
+            if not os.path.isabs(pos_path):
+                pos_path = str(Path(__file__).parent.parent / pos_path)
         Path(pos_path).parent.mkdir(parents=True, exist_ok=True)
+        if self.archive is not None:
+            self._archive_positions_file(pos_path)
         self.persistence = PositionPersistence(pos_path)
 
         # 啟動時恢復 positions
@@ -102,6 +223,8 @@ class TradingBotV6:
 
         # Phase 0: 績效 DB
         db_path = getattr(Config, 'DB_PATH', 'performance.db')
+        if Config.DATA_REPLAY_PATH:
+            db_path = str(replay_state_dir(Config.DATA_REPLAY_PATH) / 'performance.db')
         self.perf_db = PerformanceDB(db_path=db_path)
 
         self._log_startup()
@@ -110,6 +233,21 @@ class TradingBotV6:
         self.telegram_handler = TelegramCommandHandler(self)
         self._start_time = datetime.now(timezone.utc)
 
+        # 多節奏排程：監控 / 同步 / 掃描各自週期，監控不排在掃描後面
+        self.scheduler = self._build_scheduler()
+
+    def _archive_positions_file(self, pos_path: str):
+        """錄製時存下啟動當下的 positions.json；重播時以它還原到重播狀態目錄（重播的起始倉位與錄製一致）"""
+        if self.archive.mode == 'w':
+            content = Path(pos_path).read_text(encoding='utf-8') if os.path.exists(pos_path) else None
+            self.archive.write('state', 'positions_json', content)
+            return
+        content = self.archive.next('state', 'positions_json')
+        if content is not None:
+            Path(pos_path).write_text(content, encoding='utf-8')
+        elif os.path.exists(pos_path):
+            os.remove(pos_path)
+
     def _init_exchange(self):
         """初始化交易所（沿用 V5.3）"""
         try:
@@ -200,11 +338,25 @@ class TradingBotV6:
                 logger.error(f"恢復 {symbol} 失敗: {e}")
 
     def _save_positions(self):
-        """儲存所有 positions 到 JSON"""
-        data = {}
-        for symbol, pm in self.active_trades.items():
-            data[symbol] = pm.to_dict()
-        self.persistence.save_positions(data)
+        """儲存所有 positions 到 JSON（監控 worker 可能同時呼叫，序列化避免舊快照覆蓋新檔）"""
+        with self._save_lock:
+            data = {}
+            for symbol, pm in self._trades_snapshot():
+                data[symbol] = pm.to_dict()
+            self.persistence.save_positions(data)
+
+    def _trades_snapshot(self) -> List[Tuple[str, PositionManager]]:
+        """active_trades 的 (symbol, pm) 快照（掃描 / 監控 / 同步在不同執行緒增刪持倉）"""
+        with self._trades_lock:
+            return list(self.active_trades.items())
+
+    def _symbol_lock(self, symbol: str) -> threading.RLock:
+        """取得 symbol 專屬鎖（首次使用時建立）"""
+        with self._symbol_locks_guard:
+            lock = self._symbol_locks.get(symbol)
+            if lock is None:
+                lock = self._symbol_locks[symbol] = threading.RLock()
+            return lock
 
     # ==================== 數據獲取 ====================
 
@@ -212,28 +364,71 @@ class TradingBotV6:
         """獲取 OHLCV 數據（委託 MarketDataProvider 統一處理重試與沙盒 fallback）"""
         return self.data_provider.fetch_ohlcv(symbol, timeframe, limit)
 
+    def fetch_candles_many(self, requests) -> Dict[tuple, Candles]:
+        """並行獲取多組 K 線（Candles，監控熱路徑用）"""
+        return self.data_provider.fetch_candles_many(requests)
+
+    def fetch_ohlcv_many(self, requests) -> Dict[tuple, pd.DataFrame]:
+        """並行獲取多組 OHLCV（委託 MarketDataProvider，受 weight 限流器控制）"""
+        return self.data_provider.fetch_ohlcv_many(requests)
+
     def fetch_ticker(self, symbol: str) -> dict:
-        """獲取 ticker（含 Demo Trading fallback）"""
-        try:
-            return self.exchange.fetch_ticker(symbol)
-        except Exception:
-            if Config.TRADING_MODE == 'future' and Config.SANDBOX_MODE:
-                import requests as req
-                symbol_id = symbol.replace('/', '')
-                base_url = 'https://demo-fapi.binance.com'
-                resp = req.get(
-                    f'{base_url}/fapi/v1/ticker/price',
-                    params={'symbol': symbol_id},
-                    timeout=30
-                )
-                if resp.status_code == 200:
-                    data = resp.json()
-                    price = float(data['price'])
-                    return {'symbol': symbol, 'last': price, 'bid': price, 'ask': price}
-            raise
+        """獲取 ticker（含 Demo Trading fallback；可用路徑由 capabilities 記住）"""
+        def via_demo_fapi():
+            resp = http_pool.get(
+                f'{DEMO_FAPI_URL}/fapi/v1/ticker/price',
+                params={'symbol': symbol.split(':')[0].replace('/', '')},
+                timeout=30
+            )
+            if resp.status_code != 200:
+                return None
+            price = float(resp.json()['price'])
+            return {'symbol': symbol, 'last': price, 'bid': price, 'ask': price}
+
+        attempts = [('ccxt', lambda: self.exchange.fetch_ticker(symbol))]
+        offline = getattr(self.exchange, 'offline', False) is True
+        if Config.TRADING_MODE == 'future' and Config.SANDBOX_MODE and not offline:
+            attempts.append(('demo-fapi', via_demo_fapi))
+        ticker = self.capabilities.route('ticker', attempts, env=self._api_env, ok=lambda t: t is not None)
+        if ticker is None:
+            raise ccxt.ExchangeError(f"{symbol} ticker 無法取得")
+        return ticker
+
+    def _fetch_server_time(self) -> int:
+        """交易所伺服器時間（ms；Demo Trading fallback 同 fetch_ticker）"""
+        def via_demo_fapi():
+            resp = http_pool.get(f'{DEMO_FAPI_URL}/fapi/v1/time', timeout=10)
+            if resp.status_code != 200:
+                return None
+            return int(resp.json()['serverTime'])
+
+        attempts = [('ccxt', self.exchange.fetch_time)]
+        if Config.TRADING_MODE == 'future' and Config.SANDBOX_MODE:
+            attempts.append(('demo-fapi', via_demo_fapi))
+        return self.capabilities.route('time', attempts, env=self._api_env, ok=lambda t: t is not None)
+
+    @property
+    def _api_env(self) -> str:
+        return 'demo' if Config.SANDBOX_MODE else 'live'
+
+    def _current_price(self, symbol: str) -> float:
+        """最新價：優先讀本週期報價快照，快照缺該 symbol 時才單獨 fetch_ticker"""
+        price = self._price_snapshot.get(symbol)
+        if price:
+            return price
+        return self.fetch_ticker(symbol)['last']
 
     def load_scanner_results(self) -> List[str]:
-        """從 Scanner 載入動態標的（沿用 V5.3）"""
+        """從 Scanner 載入動態標的（錄製 / 重播模式下標的清單一併錄製，重播不讀磁碟）"""
+        if self.archive is not None and self.archive.mode == 'r':
+            return self.archive.next('state', 'scanner_symbols') or Config.SYMBOLS
+        symbols = self._read_scanner_results()
+        if self.archive is not None:
+            self.archive.write('state', 'scanner_symbols', list(symbols))
+        return symbols
+
+    def _read_scanner_results(self) -> List[str]:
+        """讀取 Scanner 輸出的 hot_symbols（沿用 V5.3）"""
         try:
             scanner_path = os.path.expanduser(Config.SCANNER_JSON_PATH)
             # 相對路徑 → 基於專案根目錄
@@ -326,71 +521,48 @@ class TradingBotV6:
         symbols = self.load_scanner_results() if Config.USE_SCANNER_SYMBOLS else Config.SYMBOLS
         logger.debug(f"開始掃描 {len(symbols)} 個標的...")  # 降噪
 
+        # 先排除冷卻 / 持倉中的標的，再並行抓取剩餘標的的 K 線
+        candidates = []
         for symbol in symbols:
             try:
-                # 跳過已有持倉
-                if symbol in self.active_trades:
-                    t = self.active_trades[symbol]
-                    logger.debug(f"{symbol}: 跳過（已有持倉 {t.side}/階段{t.stage}）")
-                    continue
-
-                # 冷卻檢查
-                if symbol in self.recently_exited:
-                    hours = (datetime.now(timezone.utc) - self.recently_exited[symbol]).total_seconds() / 3600
-                    if hours < 2:
-                        logger.debug(f"{symbol}: 跳過（冷卻中 {hours:.1f}h）")
-                        continue
-                    else:
-                        del self.recently_exited[symbol]
-
-                # 下單失敗黑名單
-                if symbol in self.order_failed_symbols:
-                    hours = (datetime.now(timezone.utc) - self.order_failed_symbols[symbol]).total_seconds() / 3600
-                    if hours < 1:
-                        logger.debug(f"{symbol}: 跳過（下單失敗黑名單）")
-                        continue
-                    else:
-                        del self.order_failed_symbols[symbol]
+                if not self._should_skip_scan(symbol):
+                    candidates.append(symbol)
+            except Exception as e:
+                logger.error(f"{symbol} 掃描錯誤: {e}")
 
-                # 12h 冷卻（快速止損/超時退出）
-                if symbol in self.early_exit_cooldown:
-                    hours = (datetime.now(timezone.utc) - self.early_exit_cooldown[symbol]).total_seconds() / 3600
-                    if hours < Config.EARLY_EXIT_COOLDOWN_HOURS:
-                        logger.debug(f"{symbol}: 跳過（早期退出冷卻中 {hours:.1f}h/{Config.EARLY_EXIT_COOLDOWN_HOURS}h）")
-                        continue
-                    else:
-                        del self.early_exit_cooldown[symbol]
-
-                # === Risk Guard: 同幣虧損冷卻（persistent，基於 perf_db）===
-                if Config.SYMBOL_LOSS_COOLDOWN_HOURS > 0:
-                    last_loss_exit = self.perf_db.get_last_loss_exit_time(symbol)
-                    if last_loss_exit:
-                        try:
-                            exit_dt = datetime.fromisoformat(last_loss_exit)
-                            if exit_dt.tzinfo is None:
-                                exit_dt = exit_dt.replace(tzinfo=timezone.utc)
-                            hours_since = (datetime.now(timezone.utc) - exit_dt).total_seconds() / 3600
-                            if hours_since < Config.SYMBOL_LOSS_COOLDOWN_HOURS:
-                                logger.info(
-                                    f"{symbol}: 跳過（上次虧損 {hours_since:.1f}h 前，"
-                                    f"冷卻 {Config.SYMBOL_LOSS_COOLDOWN_HOURS}h）"
-                                )
-                                continue
-                        except (ValueError, TypeError):
-                            pass  # 解析失敗不阻塞
+        # 已收盤信號 bar 未變、上次評估無信號 → 跳過（不抓數據、不重算）
+        memo_skipped = 0
+        if Config.SIGNAL_MEMO_ENABLED and candidates:
+            closed_ts = self._last_closed_bar_ms(Config.TIMEFRAME_SIGNAL)
+            fresh = [s for s in candidates if self._signal_memo.get(s) != closed_ts]
+            memo_skipped = len(candidates) - len(fresh)
+            candidates = fresh
+
+        frames = {}
+        risk_ok = self._check_total_risk([pm for _, pm in self._trades_snapshot()])
+        if candidates and risk_ok:
+            frames = self.fetch_ohlcv_many(self._scan_ohlcv_requests(candidates))
+        # 有標的 K 線抓取失敗（本輪跳過）→ 下次掃描不等下一根收盤
+        self._scan_retry = bool(frames) and any(
+            frames.get((symbol, timeframe), pd.DataFrame()).empty
+            for symbol in candidates
+            for timeframe in (Config.TIMEFRAME_TREND, Config.TIMEFRAME_SIGNAL)
+        )
 
+        for symbol in candidates:
+            try:
                 # 總風險檢查
-                active_list = list(self.active_trades.values())
+                active_list = [pm for _, pm in self._trades_snapshot()]
                 if not self._check_total_risk(active_list):
                     logger.debug("總風險已達上限，停止掃描")  # 降噪
                     break
 
-                # 獲取數據
-                df_trend = self.fetch_ohlcv(symbol, Config.TIMEFRAME_TREND, limit=250)
-                df_signal = self.fetch_ohlcv(symbol, Config.TIMEFRAME_SIGNAL, limit=100)
+                # 獲取數據（已於迴圈前並行預抓）
+                df_trend = frames.get((symbol, Config.TIMEFRAME_TREND), pd.DataFrame())
+                df_signal = frames.get((symbol, Config.TIMEFRAME_SIGNAL), pd.DataFrame())
                 df_mtf = pd.DataFrame()
                 if Config.ENABLE_MTF_CONFIRMATION:
-                    df_mtf = self.fetch_ohlcv(symbol, Config.TIMEFRAME_MTF, limit=100)
+                    df_mtf = frames.get((symbol, Config.TIMEFRAME_MTF), pd.DataFrame())
 
                 if df_trend.empty or len(df_trend) < 100:
                     logger.debug(f"{symbol}: 跳過（趨勢數據不足: {len(df_trend) if not df_trend.empty else 0}根）")
@@ -399,10 +571,11 @@ class TradingBotV6:
                     logger.debug(f"{symbol}: 跳過（信號數據不足: {len(df_signal) if not df_signal.empty else 0}根）")
                     continue
 
-                df_trend = TechnicalAnalysis.calculate_indicators(df_trend)
-                df_signal = TechnicalAnalysis.calculate_indicators(df_signal)
+                lazy = Config.LAZY_INDICATORS_ENABLED
+                df_trend = TechnicalAnalysis.calculate_indicators(df_trend, lazy=lazy)
+                df_signal = TechnicalAnalysis.calculate_indicators(df_signal, lazy=lazy)
                 if not df_mtf.empty:
-                    df_mtf = TechnicalAnalysis.calculate_indicators(df_mtf)
+                    df_mtf = TechnicalAnalysis.calculate_indicators(df_mtf, lazy=lazy)
 
                 # 移除當前未關閉 K 線，確保信號偵測基於已確認數據
                 # Binance API 回傳的最後一根 K 線是正在形成中的，用中間值做判斷會產生假信號
@@ -456,6 +629,7 @@ class TradingBotV6:
 
                 if not signals_found:
                     logger.debug(f"{symbol}: 無信號（市場OK: {market_reason}）")
+                    self._remember_no_signal(symbol, df_signal)
                     continue
 
                 # 優先級排序：2B > VOLUME_BREAKOUT > EMA_PULLBACK
@@ -500,6 +674,8 @@ class TradingBotV6:
                 )
                 signal_details['signal_tier'] = signal_tier
                 signal_details['market_regime'] = 'STRONG' if is_strong_market else 'TRENDING'
+                ensure_indicators(df_signal, 'adx')
+                ensure_indicators(df_trend, 'adx')
                 signal_details['entry_adx'] = (
                     round(float(df_signal['adx'].iloc[-1]), 2)
                     if 'adx' in df_signal.columns and not pd.isna(df_signal['adx'].iloc[-1])
@@ -563,15 +739,17 @@ class TradingBotV6:
                     f"市場={market_reason} 趨勢={trend_desc} MTF={'通過' if mtf_aligned else '未通過'}"
                 )
 
-                # 執行開倉
-                self._execute_trade(symbol, signal_details, best_type, tier_multiplier, df_signal)
+                # 執行開倉（持 symbol 鎖下單；加入 active_trades 時才取 _trades_lock）
+                with self._symbol_lock(symbol):
+                    self._execute_trade(symbol, signal_details, best_type, tier_multiplier, df_signal)
 
             except Exception as e:
                 logger.error(f"{symbol} 掃描錯誤: {e}")
 
+        active = self._trades_snapshot()
         active_str = ', '.join(
             f'{s}({t.side}/階段{t.stage}/${t.total_size * t.avg_entry:.0f})'
-            for s, t in self.active_trades.items()
+            for s, t in active
         ) or "無"
         logger.debug(f"掃描完成 | 活躍持倉: {active_str}")  # 降噪
 
@@ -581,13 +759,111 @@ class TradingBotV6:
             'ts': datetime.now(timezone.utc).isoformat(),
             'bot': 'v7.0',
             'cycle': getattr(self, 'cycle_count', 0),
-            'active': len(self.active_trades),
+            'active': len(active),
             'closed': 0,
             'symbols': active_str.replace(' ', ''),
+            'memo_skipped': memo_skipped,
         })
 
     # ==================== Private Helpers ====================
 
+    def _should_skip_scan(self, symbol: str) -> bool:
+        """掃描前置檢查：持倉中 / 各類冷卻 / 黑名單 → 跳過（不需抓 K 線）"""
+        with self._trades_lock:     # 監控同時在移除持倉並寫入冷卻
+            if self._in_trade_or_cooldown(symbol):
+                return True
+
+        # === Risk Guard: 同幣虧損冷卻（persistent，基於 perf_db）===
+        if Config.SYMBOL_LOSS_COOLDOWN_HOURS > 0:
+            last_loss_exit = self.perf_db.get_last_loss_exit_time(symbol)
+            if last_loss_exit:
+                try:
+                    exit_dt = datetime.fromisoformat(last_loss_exit)
+                    if exit_dt.tzinfo is None:
+                        exit_dt = exit_dt.replace(tzinfo=timezone.utc)
+                    hours_since = (datetime.now(timezone.utc) - exit_dt).total_seconds() / 3600
+                    if hours_since < Config.SYMBOL_LOSS_COOLDOWN_HOURS:
+                        logger.info(
+                            f"{symbol}: 跳過（上次虧損 {hours_since:.1f}h 前，"
+                            f"冷卻 {Config.SYMBOL_LOSS_COOLDOWN_HOURS}h）"
+                        )
+                        return True
+                except (ValueError, TypeError):
+                    pass  # 解析失敗不阻塞
+
+        return False
+
+    def _in_trade_or_cooldown(self, symbol: str) -> bool:
+        """已有持倉 / 記憶體冷卻 / 下單失敗黑名單（呼叫方持 _trades_lock；過期的冷卻順便清除）"""
+        # 跳過已有持倉
+        if symbol in self.active_trades:
+            t = self.active_trades[symbol]
+            logger.debug(f"{symbol}: 跳過（已有持倉 {t.side}/階段{t.stage}）")
+            return True
+
+        # 冷卻檢查
+        if symbol in self.recently_exited:
+            hours = (datetime.now(timezone.utc) - self.recently_exited[symbol]).total_seconds() / 3600
+            if hours < 2:
+                logger.debug(f"{symbol}: 跳過（冷卻中 {hours:.1f}h）")
+                return True
+            else:
+                del self.recently_exited[symbol]
+
+        # 下單失敗黑名單
+        if symbol in self.order_failed_symbols:
+            hours = (datetime.now(timezone.utc) - self.order_failed_symbols[symbol]).total_seconds() / 3600
+            if hours < 1:
+                logger.debug(f"{symbol}: 跳過（下單失敗黑名單）")
+                return True
+            else:
+                del self.order_failed_symbols[symbol]
+
+        # 12h 冷卻（快速止損/超時退出）
+        if symbol in self.early_exit_cooldown:
+            hours = (datetime.now(timezone.utc) - self.early_exit_cooldown[symbol]).total_seconds() / 3600
+            if hours < Config.EARLY_EXIT_COOLDOWN_HOURS:
+                logger.debug(f"{symbol}: 跳過（早期退出冷卻中 {hours:.1f}h/{Config.EARLY_EXIT_COOLDOWN_HOURS}h）")
+                return True
+            else:
+                del self.early_exit_cooldown[symbol]
+        return False
+
+    def _monitor_ohlcv_requests(self) -> List[tuple]:
+        """持倉監控所需 K 線請求：1H 全部持倉，4H 僅 V6 / V7 策略"""
+        requests = []
+        for symbol, pm in self._trades_snapshot():
+            if pm.is_closed:
+                continue
+            requests.append((symbol, Config.TIMEFRAME_SIGNAL, 50))
+            if pm.strategy_name in ("v6_pyramid", "v7_structure"):
+                requests.append((symbol, '4h', 50))
+        return requests
+
+    def _last_closed_bar_ms(self, timeframe: str) -> int:
+        """依交易所時間推算最後一根已收盤 bar 的開盤時間（ms，UTC 對齊）"""
+        return self.server_clock.last_closed_bar_ms(timeframe)
+
+    def _remember_no_signal(self, symbol: str, df_signal: pd.DataFrame):
+        """記錄此 symbol 在最後一根收盤 bar 上無信號（df_signal 已移除形成中 bar）"""
+        if 'timestamp' not in df_signal.columns or df_signal.empty:
+            return
+        try:
+            self._signal_memo[symbol] = int(pd.Timestamp(df_signal['timestamp'].iloc[-1]).value // 1_000_000)
+        except (TypeError, ValueError):
+            pass
+
+    def _scan_ohlcv_requests(self, symbols: List[str]) -> List[tuple]:
+        """掃描所需 K 線請求：(symbol, timeframe, limit)"""
+        requests = []
+        for symbol in symbols:
+            requests.append((symbol, Config.TIMEFRAME_TREND, 250))
+            requests.append((symbol, Config.TIMEFRAME_SIGNAL, 100))
+            if Config.ENABLE_MTF_CONFIRMATION:
+                requests.append((symbol, Config.TIMEFRAME_MTF, 100))
+        return requests
+
+
     def _check_btc_trend(self) -> Optional[str]:
         """Fetch BTC 1D EMA20/50 trend. Returns 'LONG', 'SHORT', 'RANGING', or None on failure."""
         try:
@@ -616,7 +892,7 @@ class TradingBotV6:
         if balance <= 0:
             return 0.0
         total_risk = 0.0
-        for p in self.active_trades.values():
+        for _, p in self._trades_snapshot():
             if p.is_closed:
                 continue
             sl_dist_pct = abs(p.avg_entry - p.current_sl) / p.avg_entry if p.avg_entry > 0 else 0
@@ -686,10 +962,11 @@ class TradingBotV6:
 
     def _execute_trade(self, symbol: str, signal_details: Dict, signal_type: str,
                        tier_multiplier: float, df_signal: pd.DataFrame):
-        """執行開倉"""
+        """執行開倉（呼叫方持 symbol 鎖；active_trades 只在檢查與加入時持 _trades_lock）"""
         try:
-            if symbol in self.active_trades:
-                return
+            with self._trades_lock:
+                if symbol in self.active_trades:
+                    return
 
             if Config.V6_DRY_RUN:
                 balance = 10000.0  # Dry run: mock balance
@@ -870,7 +1147,8 @@ class TradingBotV6:
             # 設置硬止損
             pm.stop_order_id = self._place_hard_stop_loss(symbol, side, position_size, stop_loss)
 
-            self.active_trades[symbol] = pm
+            with self._trades_lock:
+                self.active_trades[symbol] = pm
 
             # 持久化
             self._save_positions()
@@ -886,162 +1164,96 @@ class TradingBotV6:
 
         except Exception as e:
             logger.error(f"{symbol} 開倉失敗: {e}")
-            self.order_failed_symbols[symbol] = datetime.now(timezone.utc)
+            with self._trades_lock:
+                self.order_failed_symbols[symbol] = datetime.now(timezone.utc)
 
     # ==================== 持倉監控 ====================
 
     def monitor_positions(self):
-        """監控持倉"""
+        """監控持倉（整個週期共用一份報價快照，ticker 請求數不隨持倉數增加）"""
         if not self.active_trades:
             return
 
-        logger.debug(f"監控 {len(self.active_trades)} 個持倉中...")
-
-        closed_symbols = []
-        state_changed = False
+        started = time.monotonic()
+        self._price_snapshot = self.data_provider.fetch_prices([symbol for symbol, _ in self._trades_snapshot()])
+        try:
+            self._monitor_positions_cycle(started)
+        finally:
+            self._price_snapshot = {}
 
-        for symbol, pm in self.active_trades.items():
-            try:
-                if pm.is_closed:
-                    closed_symbols.append(symbol)
-                    continue
+    def _monitor_positions_cycle(self, started: Optional[float] = None):
+        """
+        各持倉並行評估（MONITOR_WORKERS 條執行緒，每個持倉持自己的 symbol 鎖），
+        全部完成後才清理已平倉持倉、存檔並寫 CYCLE_SUMMARY
+        """
+        started = time.monotonic() if started is None else started
+        logger.debug(f"監控 {len(self.active_trades)} 個持倉中...")
 
-                # 取得 ticker
-                ticker = self.fetch_ticker(symbol)
-                current_price = ticker['last']
-
-                # 取得 1H 數據
-                df_1h = self.fetch_ohlcv(symbol, Config.TIMEFRAME_SIGNAL, limit=50)
-                if not df_1h.empty:
-                    df_1h = TechnicalAnalysis.calculate_indicators(df_1h)
-
-                # V6 / V7: 額外取得 4H 數據
-                df_4h = None
-                if pm.strategy_name in ("v6_pyramid", "v7_structure"):
-                    df_4h = self.fetch_ohlcv(symbol, '4h', limit=50)
-                    if df_4h is not None and not df_4h.empty:
-                        df_4h = TechnicalAnalysis.calculate_indicators(df_4h)
-
-                # Monitor（V7 P2 起回傳 Dict）
-                decision = pm.monitor(current_price, df_1h, df_4h)
-                action = decision.get('action', Action.HOLD)
-                new_sl = decision.get('new_sl')
-
-                # SL 變化 → 更新硬止損
-                if new_sl is not None:
-                    old_sl = pm.current_sl
-                    self._update_hard_stop_loss(pm, new_sl)
-                    state_changed = True
-                    # 只通知顯著移損（變化 > 1%），避免 trailing 微調洗版
-                    if old_sl > 0 and abs(new_sl - old_sl) / old_sl > 0.01:
-                        TelegramNotifier.notify_action(
-                            symbol, '1.5R移損',
-                            current_price,
-                            f"SL ${old_sl:.2f} → ${new_sl:.2f}"
-                        )
+        # 所有持倉的 1H / 4H K 線一次並行抓取（MONITOR_CANDLES_ENABLED 時為 Candles）
+        if Config.MONITOR_CANDLES_ENABLED:
+            frames = self.fetch_candles_many(self._monitor_ohlcv_requests())
+        else:
+            frames = self.fetch_ohlcv_many(self._monitor_ohlcv_requests())
 
-                # 通用 action dispatch
-                if action == Action.CLOSE:
-                    if self._handle_close(pm, current_price):
-                        closed_symbols.append(symbol)
-                        state_changed = True
-                    # 失敗時不加入 closed_symbols，保留持倉待下一週期重試
-
-                elif action == Action.ADD:
-                    stage = decision.get('add_stage', 2)
-                    if stage == 2:
-                        self._handle_stage2(pm, current_price, df_1h, decision=decision)
-                    else:
-                        self._handle_stage3(pm, current_price, df_1h, decision=decision)
-                    state_changed = True
-
-                elif action == Action.PARTIAL_CLOSE:
-                    close_pct = decision.get('close_pct', 0.3)
-                    pct_int = round(close_pct * 100)
-                    reason = decision.get('reason', 'PARTIAL_CLOSE')
-                    label = "2.5R" if "25R" in reason else "1.5R"
-                    self._handle_v53_reduce(pm, pct_int, label, current_price)
-                    state_changed = True
-
-                # 記錄狀態
-                if pm.side == 'LONG':
-                    profit_pct = (current_price - pm.avg_entry) / pm.avg_entry * 100
-                else:
-                    profit_pct = (pm.avg_entry - current_price) / pm.avg_entry * 100
+        positions = self._trades_snapshot()
+        budget = retry.current_budget()
+        self._monitor_latency = {}
 
-                if pm.strategy_name == "v7_structure":
-                    mode = f"V7/S{pm.stage}"
-                elif pm.strategy_name == "v6_pyramid":
-                    mode = f"V6/S{pm.stage}"
-                else:
-                    mode = "V53"
-                logger.debug(
-                    f"{symbol} [{mode}]: ${current_price:.2f} | "
-                    f"PnL={profit_pct:+.2f}% | SL=${pm.current_sl:.2f}"
-                )
+        def evaluate(item):
+            symbol, pm = item
+            with retry.use_budget(budget), self._symbol_lock(symbol):
+                return self._monitor_position(symbol, pm, frames, started)
 
-                # Structured position update
-                _trade_log({
-                    **self._build_log_base('POSITION_UPDATE', pm.trade_id, symbol, pm.side),
-                    'price': f'{current_price:.2f}',
-                    'pnl_pct': f'{profit_pct:+.2f}',
-                    'sl': f'{pm.current_sl:.2f}',
-                    'stage': pm.stage,
-                    'mode': mode,
-                })
+        workers = max(1, min(Config.MONITOR_WORKERS, len(positions)))
+        if workers == 1:
+            results = [evaluate(item) for item in positions]
+        else:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='monitor') as pool:
+                results = list(pool.map(evaluate, positions))
 
-            except Exception as e:
-                logger.error(f"{symbol} 監控錯誤: {e}")
+        closed_symbols = [symbol for (symbol, _), (closed, _) in zip(positions, results) if closed]
+        state_changed = any(changed for _, changed in results)
 
-            # 背景清理待取消止損單
-            if pm.pending_stop_cancels:
-                order_id = pm.pending_stop_cancels[0]
+        # 清理已關閉的（撤殘留止損為網路請求，不持 _trades_lock）
+        for symbol, pm in positions:
+            if symbol not in closed_symbols:
+                continue
+            # 在刪除前清理殘留止損單（防止舊 algo order 影響未來倉位）
+            for order_id in pm.pending_stop_cancels:
                 try:
-                    success = self.execution_engine.cancel_stop_loss_order(pm.symbol, order_id)
-                    if success:
-                        pm.pending_stop_cancels.pop(0)
-                        logger.info(f"[{pm.symbol}] pending stop cancel cleared: {order_id}")
+                    self.execution_engine.cancel_stop_loss_order(pm.symbol, order_id)
+                    logger.info(f"[{pm.symbol}] 平倉清理殘留止損: {order_id}")
                 except Exception as e:
-                    logger.warning(f"[{pm.symbol}] pending stop cancel retry failed: {e}")
-                    # 保留在清單，下次迴圈繼續重試
-
-        # 清理已關閉的
-        for symbol in closed_symbols:
-            pm = self.active_trades.get(symbol)
-            if pm:
-                # 在刪除前清理殘留止損單（防止舊 algo order 影響未來倉位）
-                for order_id in pm.pending_stop_cancels:
-                    try:
-                        self.execution_engine.cancel_stop_loss_order(pm.symbol, order_id)
-                        logger.info(f"[{pm.symbol}] 平倉清理殘留止損: {order_id}")
-                    except Exception as e:
-                        logger.warning(f"[{pm.symbol}] 清理殘留止損失敗（可能已觸發）: {order_id} — {e}")
+                    logger.warning(f"[{pm.symbol}] 清理殘留止損失敗（可能已觸發）: {order_id} — {e}")
 
+            # 移除持倉與寫入冷卻同在一次持鎖內（掃描不會看到「已移除、未冷卻」的空檔）
+            now = datetime.now(timezone.utc)
+            with self._trades_lock:
+                if self.active_trades.get(symbol) is not pm:
+                    continue
                 if pm.exit_reason in ('early_stop_r', 'stage1_timeout'):
-                    self.early_exit_cooldown[symbol] = datetime.now(timezone.utc)
-
-            if symbol in self.active_trades:
+                    self.early_exit_cooldown[symbol] = now
                 del self.active_trades[symbol]
-                self.recently_exited[symbol] = datetime.now(timezone.utc)
+                self.recently_exited[symbol] = now
 
         # 狀態有變化就儲存
         if state_changed or closed_symbols:
             self._save_positions()
 
-        logger.debug(f"監控完成 | 剩餘持倉: {len(self.active_trades)}")  # 降噪
-
         # Structured cycle summary
+        active = self._trades_snapshot()
+        logger.debug(f"監控完成 | 剩餘持倉: {len(active)}")  # 降噪
         active_summary = ','.join(
             f'{s}({t.side}/S{t.stage}/${t.total_size * t.avg_entry:.0f})'
-            for s, t in self.active_trades.items()
+            for s, t in active
         ) or "none"
 
         # === [新增] 帳戶餘額與未實現 PnL ===
         cycle_balance = self.risk_manager.get_balance() if not Config.V6_DRY_RUN else 10000.0
         cycle_unrealized_pnl = 0.0
-        for pos in self.active_trades.values():
+        for _, pos in active:
             try:
-                current_price = self.fetch_ticker(pos.symbol)['last']
+                current_price = self._current_price(pos.symbol)
                 if current_price and pos.avg_entry and pos.total_size:
                     if pos.side == 'LONG':
                         pnl = (current_price - pos.avg_entry) * pos.total_size
@@ -1060,61 +1272,344 @@ class TradingBotV6:
             'ts': datetime.now(timezone.utc).isoformat(),
             'bot': 'v7.0',
             'cycle': getattr(self, 'cycle_count', 0),
-            'active': len(self.active_trades),
-            'active_trades_count': len(self.active_trades),
+            'active': len(active),
+            'active_trades_count': len(active),
             'closed': len(closed_symbols),
             'symbols': active_summary,
             'balance': f'{cycle_balance:.2f}',
             'unrealized_pnl': f'{cycle_unrealized_pnl:.2f}',
             'net_pnl_pct': f'{net_pnl_pct:+.2f}',
+            'monitor_ms': round(max(self._monitor_latency.values(), default=0.0) * 1000),
         })
+        if self._monitor_latency:
+            logger.debug(
+                "[MONITOR] " + ' '.join(
+                    f"{symbol}={latency * 1000:.0f}ms" for symbol, latency in self._monitor_latency.items()
+                )
+            )
 
-    def _fetch_exchange_stop_map(self) -> Dict[str, float]:
+    def _monitor_position(self, symbol: str, pm: PositionManager, frames: Dict[tuple, Frame],
+                          started: float) -> Tuple[bool, bool]:
         """
-        從交易所取得開放中的止損單。
+        評估單一持倉並執行決策（在監控 worker 內、持 symbol 鎖執行）
 
-        先嘗試 algo orders（正式網），若不支援（Demo Trading 回 404）
-        再 fallback 到普通 openOrders 中的 STOP_MARKET 訂單。
+        Returns:
+            (closed, changed)：是否已平倉待清理、持倉狀態是否有變化（需存檔）
+        """
+        closed = changed = False
+        try:
+            if pm.is_closed:
+                return True, False
+
+            # 取得最新價（報價快照）
+            current_price = self._current_price(symbol)
+
+            # 取得 1H 數據
+            df_1h = frames.get((symbol, Config.TIMEFRAME_SIGNAL), Candles.blank())
+            if not df_1h.empty:
+                df_1h = TechnicalAnalysis.calculate_indicators(df_1h, lazy=Config.LAZY_INDICATORS_ENABLED)
+
+            # V6 / V7: 額外取得 4H 數據
+            df_4h = None
+            if pm.strategy_name in ("v6_pyramid", "v7_structure"):
+                df_4h = frames.get((symbol, '4h'), Candles.blank())
+                if df_4h is not None and not df_4h.empty:
+                    df_4h = TechnicalAnalysis.calculate_indicators(df_4h, lazy=Config.LAZY_INDICATORS_ENABLED)
+
+            # Monitor（V7 P2 起回傳 Dict）
+            decision = pm.monitor(current_price, df_1h, df_4h)
+            action = decision.get('action', Action.HOLD)
+            new_sl = decision.get('new_sl')
+
+            # SL 變化 → 更新硬止損
+            if new_sl is not None:
+                old_sl = pm.current_sl
+                self._update_hard_stop_loss(pm, new_sl)
+                changed = True
+                # 只通知顯著移損（變化 > 1%），避免 trailing 微調洗版
+                if old_sl > 0 and abs(new_sl - old_sl) / old_sl > 0.01:
+                    TelegramNotifier.notify_action(
+                        symbol, '1.5R移損',
+                        current_price,
+                        f"SL ${old_sl:.2f} → ${new_sl:.2f}"
+                    )
+
+            # 通用 action dispatch
+            if action == Action.CLOSE:
+                if self._handle_close(pm, current_price):
+                    closed = changed = True
+                # 失敗時不標記 closed，保留持倉待下一週期重試
+
+            elif action == Action.ADD:
+                stage = decision.get('add_stage', 2)
+                if stage == 2:
+                    self._handle_stage2(pm, current_price, df_1h, decision=decision)
+                else:
+                    self._handle_stage3(pm, current_price, df_1h, decision=decision)
+                changed = True
+
+            elif action == Action.PARTIAL_CLOSE:
+                close_pct = decision.get('close_pct', 0.3)
+                pct_int = round(close_pct * 100)
+                reason = decision.get('reason', 'PARTIAL_CLOSE')
+                label = "2.5R" if "25R" in reason else "1.5R"
+                self._handle_v53_reduce(pm, pct_int, label, current_price)
+                changed = True
+
+            # 記錄狀態
+            if pm.side == 'LONG':
+                profit_pct = (current_price - pm.avg_entry) / pm.avg_entry * 100
+            else:
+                profit_pct = (pm.avg_entry - current_price) / pm.avg_entry * 100
+
+            if pm.strategy_name == "v7_structure":
+                mode = f"V7/S{pm.stage}"
+            elif pm.strategy_name == "v6_pyramid":
+                mode = f"V6/S{pm.stage}"
+            else:
+                mode = "V53"
+            logger.debug(
+                f"{symbol} [{mode}]: ${current_price:.2f} | "
+                f"PnL={profit_pct:+.2f}% | SL=${pm.current_sl:.2f}"
+            )
+
+            # Structured position update（latency_ms：週期開始 → 此持倉決策完成）
+            latency = time.monotonic() - started
+            self._monitor_latency[symbol] = latency
+            _trade_log({
+                **self._build_log_base('POSITION_UPDATE', pm.trade_id, symbol, pm.side),
+                'price': f'{current_price:.2f}',
+                'pnl_pct': f'{profit_pct:+.2f}',
+                'sl': f'{pm.current_sl:.2f}',
+                'stage': pm.stage,
+                'mode': mode,
+                'latency_ms': round(latency * 1000),
+            })
+
+        except Exception as e:
+            logger.error(f"{symbol} 監控錯誤: {e}")
+
+        # 背景清理待取消止損單
+        if pm.pending_stop_cancels:
+            order_id = pm.pending_stop_cancels[0]
+            try:
+                success = self.execution_engine.cancel_stop_loss_order(pm.symbol, order_id)
+                if success:
+                    pm.pending_stop_cancels.pop(0)
+                    logger.info(f"[{pm.symbol}] pending stop cancel cleared: {order_id}")
+            except Exception as e:
+                logger.warning(f"[{pm.symbol}] pending stop cancel retry failed: {e}")
+                # 保留在清單，下次迴圈繼續重試
+
+        return closed, changed
+
+    # ==================== 排程任務 ====================
+
+    def _build_scheduler(self) -> Scheduler:
+        """
+        登錄主循環任務（登錄順序 = 重播時的同步執行順序，與原本單一循環相同）
+
+        priority：監控 0 > 同步 1 > Telegram 2 > 掃描 3 > 統計 / 存檔 4。
+        掃描在背景執行緒，其餘在主執行緒；監控只可能等到掃描中的單筆開倉。
+        """
+        scheduler = Scheduler()
+        scheduler.add(
+            'scan', self._scan_task, Config.CHECK_INTERVAL, priority=3, background=True,
+            align=self._next_scan_delay if Config.SCAN_ON_CANDLE_CLOSE else None,
+        )
+        scheduler.add('sync', self._sync_task, Config.SYNC_INTERVAL, priority=1)
+        scheduler.add('monitor', self._monitor_task, Config.MONITOR_INTERVAL, priority=0)
+        scheduler.add('telegram', self._telegram_task, Config.TELEGRAM_POLL_INTERVAL, priority=2)
+        scheduler.add('housekeeping', self._housekeeping_task, Config.CHECK_INTERVAL, priority=4)
+        return scheduler
+
+    def _next_scan_delay(self) -> float:
+        """
+        距下次掃描秒數：TIMEFRAME_SIGNAL 下一根 bar 收盤（交易所時間）後
+        SCAN_CLOSE_DELAY_SECONDS，再加 0~SCAN_JITTER_SECONDS 隨機錯開整點請求尖峰；
+        上一輪有 K 線抓取失敗時最多等 CHECK_INTERVAL 補掃
+        """
+        self.server_clock.sync()
+        delay = self.server_clock.seconds_until_close(
+            Config.TIMEFRAME_SIGNAL, after=Config.SCAN_CLOSE_DELAY_SECONDS
+        ) + random.uniform(0, Config.SCAN_JITTER_SECONDS)
+        if self._scan_retry:
+            delay = min(delay, Config.CHECK_INTERVAL)
+        return delay
+
+    def _retry_budget(self, task: str):
+        """
+        任務的重試預算：請求失敗不在任務內 sleep，改由排程器 delay 秒後重跑該任務
+        （等待期間該任務的下一輪、同 symbol 的其他操作都會被擋住）
+        """
+        scheduler = self.scheduler
+        return retry.cycle_budget(
+            Config.RETRY_BUDGET_SECONDS,
+            defer=lambda delay: scheduler.defer(task, delay),
+        )
+
+    def _scan_task(self):
+        # 重試受每個任務自己的預算限制（出場監控不被掃描的失敗吃光）
+        with self._retry_budget('scan'):
+            self.scan_for_signals()
+
+    def _sync_task(self):
+        self._sync_market_stream()
+        with self._retry_budget('sync'):
+            self._sync_exchange_positions()  # active_trades 為空時也偵測幽靈倉位
+
+    def _monitor_task(self):
+        with self._retry_budget('monitor'):
+            self.monitor_positions()
+
+    def _telegram_task(self):
+        self.telegram_handler.poll()
+
+    def _housekeeping_task(self):
+        self._log_cycle_cache_stats()
+        self._save_indicator_state()
+        if self.archive is not None and self.archive.mode == 'w':
+            self.archive.flush()
+
+    def _sync_market_stream(self):
+        """串流訂閱 = 掃描標的 + 持倉（首次呼叫時啟動串流）"""
+        if self.market_stream is None:
+            return
+        symbols = self.load_scanner_results() if Config.USE_SCANNER_SYMBOLS else Config.SYMBOLS
+        self.market_stream.set_symbols(set(symbols) | {symbol for symbol, _ in self._trades_snapshot()})
+        self.market_stream.start()
+
+    def _user_stream_key(self, method: str) -> Optional[str]:
+        """listenKey 申請（POST）/ 延長（PUT）/ 關閉（DELETE）；成功回傳 listenKey（PUT / DELETE 可能為空字串），失敗回 None"""
+        try:
+            response = self.futures_client.api_key_request(method, '/fapi/v1/listenKey')
+        except Exception as e:
+            logger.warning(f"listenKey {method} 失敗: {e}")
+            return None
+        if response.status_code != 200:
+            logger.warning(f"listenKey {method} HTTP {response.status_code}: {response.text}")
+            return None
+        try:
+            return response.json().get('listenKey', '')
+        except ValueError:
+            return ''
+
+    def _on_user_event(self, event: dict):
+        """帳戶串流事件（串流執行緒）：持倉變動 → 立即排入同步，硬止損不必等下一個同步週期"""
+        if event.get('e') == 'ACCOUNT_UPDATE' and event.get('a', {}).get('P'):
+            self.scheduler.trigger('sync')
+
+    def _log_cycle_cache_stats(self):
+        """每 cycle 記錄 K 線 / 結構快取命中、延遲指標省下的計算數、HTTP 連線重用、端點路徑、帳戶快照命中、重試耗時與排程延遲（計數類讀取後歸零）"""
+        swing = StructureAnalysis.swing_cache_stats(reset=True)
+        ohlcv = self.data_provider.cache_stats()
+        lazy = lazy_indicator_stats(reset=True)
+        http = http_pool.stats()
+        logger.debug(
+            f"[CACHE] swing hit={swing['hits']} miss={swing['misses']} entries={swing['entries']} | "
+            f"ohlcv full={ohlcv.get('full')} incremental={ohlcv.get('incremental')} stream={ohlcv.get('stream')} "
+            f"entries={ohlcv.get('entries')} | "
+            f"indicators computed={lazy['computed']} avoided={lazy['avoided']} | "
+            "http " + ' '.join(f"{host} req={h['requests']} conn={h['connections']}" for host, h in http.items())
+            + f" | capability skipped={self.capabilities.stats['skipped']} {self.capabilities.snapshot()}"
+        )
+        lost = retry.stats(reset=True)
+        if lost:
+            logger.info(
+                "[RETRY] " + ' '.join(
+                    f"{endpoint} retries={v['retries']:.0f} waited={v['waited']:.1f}s "
+                    f"exhausted={v['exhausted']:.0f} rejected={v['rejected']:.0f} deferred={v['deferred']:.0f}"
+                    for endpoint, v in lost.items()
+                )
+            )
+        account = self.account.stats(reset=True)
+        logger.debug(
+            f"[ACCOUNT] hit={account['hits']} refresh={account['refreshes']} "
+            f"fail={account['failures']} invalidated={account['invalidations']} events={account['events']}"
+            + (f" | user_stream {self.user_stream.stats} healthy={self.user_stream.is_healthy()}"
+               if self.user_stream is not None else '')
+        )
+        scheduler = getattr(self, 'scheduler', None)
+        if scheduler is not None:
+            logger.debug(
+                "[SCHED] " + ' | '.join(
+                    f"{name} runs={v['runs']} late avg={v['late_avg']:.2f}s max={v['late_max']:.2f}s "
+                    f"took={v['duration_avg']:.2f}s overruns={v['overruns']} errors={v['errors']}"
+                    for name, v in scheduler.stats(reset=True).items()
+                )
+            )
+
+    def _save_indicator_state(self):
+        """增量指標狀態有更新時存檔（重啟後沿用暖機）"""
+        if Config.INDICATOR_ENGINE_ENABLED:
+            get_indicator_engine().save()
+
+    def _fetch_exchange_stop_map(self) -> Dict[str, float]:
+        """
+        開放中的止損單（帳戶快照快取，TTL 內不重複查詢）
 
         Returns:
             {symbol_id: trigger_price}，例如 {'BTCUSDT': 87500.0}
             查不到或 API 失敗回傳 {}
         """
+        return self.account.stop_map() or {}
+
+    def _query_exchange_stop_map(self) -> Optional[Dict[str, float]]:
+        """
+        從交易所取得開放中的止損單（AccountState 的資料來源）。
+
+        先嘗試 algo orders（正式網），若不支援（Demo Trading 回 404）
+        再 fallback 到普通 openOrders 中的 STOP_MARKET 訂單；
+        不支援的路徑由 capabilities 記住，TTL 內直接查普通訂單。
+
+        Returns:
+            {symbol_id: trigger_price}；API 失敗回傳 None（不快取）
+        """
         if not BinanceFuturesClient.is_enabled():
             return {}
-        stop_map: Dict[str, float] = {}
-        try:
-            # 嘗試 algo orders（正式網支援）
-            response = self.risk_manager.futures_client.signed_request(
-                'GET', '/fapi/v1/algoOrder/openOrders'
-            )
-            if response.status_code == 200:
-                for o in response.json().get('orders', []):
+        client = self.risk_manager.futures_client
+
+        def algo_orders():
+            # algo orders（正式網支援；Demo Trading 回 404）
+            response = client.signed_request('GET', '/fapi/v1/algoOrder/openOrders')
+            if response.status_code == 404:
+                logger.debug("[ADOPT] algo openOrders 不支援(404)，改查普通止損單")
+                return None
+            if response.status_code != 200:
+                raise RuntimeError(f"algo openOrders HTTP {response.status_code}")
+            stop_map: Dict[str, float] = {}
+            for o in response.json().get('orders', []):
+                sym = o.get('symbol', '')
+                trigger = o.get('triggerPrice') or o.get('stopPrice')
+                if sym and trigger:
+                    stop_map[sym] = float(trigger)
+            return stop_map
+
+        def plain_stop_orders():
+            # 普通 openOrders 裡的 STOP_MARKET
+            response = client.signed_request('GET', '/fapi/v1/openOrders')
+            if response.status_code != 200:
+                return None
+            stop_map: Dict[str, float] = {}
+            for o in response.json():
+                if o.get('type') in ('STOP_MARKET', 'STOP'):
                     sym = o.get('symbol', '')
-                    trigger = o.get('triggerPrice') or o.get('stopPrice')
+                    trigger = o.get('stopPrice') or o.get('triggerPrice')
                     if sym and trigger:
                         stop_map[sym] = float(trigger)
-                return stop_map
-            # algo endpoint 不支援（Demo Trading 回 404）→ fallback 到普通訂單
-            logger.debug(f"[ADOPT] algo openOrders 不支援({response.status_code})，改查普通止損單")
-        except Exception as e:
-            logger.warning(f"[ADOPT] 查 algo 止損單異常: {e}")
+            return stop_map
 
         try:
-            # Fallback：普通 openOrders 裡的 STOP_MARKET
-            response = self.risk_manager.futures_client.signed_request(
-                'GET', '/fapi/v1/openOrders'
+            stop_map = self.capabilities.route(
+                'stop_orders',
+                [('algoOrder', algo_orders), ('openOrders', plain_stop_orders)],
+                env=self._api_env,
+                ok=lambda result: result is not None,
+                demote_on_error=False,      # 暫時性錯誤不可把正式網的 algo 止損單查詢降級
             )
-            if response.status_code == 200:
-                for o in response.json():
-                    if o.get('type') in ('STOP_MARKET', 'STOP'):
-                        sym = o.get('symbol', '')
-                        trigger = o.get('stopPrice') or o.get('triggerPrice')
-                        if sym and trigger:
-                            stop_map[sym] = float(trigger)
         except Exception as e:
-            logger.warning(f"[ADOPT] 查普通止損單異常: {e}")
-
+            logger.warning(f"[ADOPT] 查止損單異常: {e}")
+            return None
         return stop_map
 
     def _adopt_ghost_positions(self):
@@ -1148,8 +1643,9 @@ class TradingBotV6:
             ccxt_sym = sym_id[:-4] + '/' + sym_id[-4:] if sym_id.endswith('USDT') else sym_id
 
             # 已追蹤 → 跳過
-            if ccxt_sym in self.active_trades:
-                continue
+            with self._trades_lock:
+                if ccxt_sym in self.active_trades:
+                    continue
 
             # 解析 side / size / entry
             raw_amt = float(pos.get('positionAmt', 0))
@@ -1200,7 +1696,8 @@ class TradingBotV6:
                 except Exception as e:
                     logger.warning(f"[ADOPT] {ccxt_sym} 補設止損失敗: {e}")
 
-            self.active_trades[ccxt_sym] = pm
+            with self._trades_lock:
+                self.active_trades[ccxt_sym] = pm
             adopted += 1
             logger.warning(
                 f"[GHOST_ADOPTED] {ccxt_sym}: {side} size={position_size} "
@@ -1214,7 +1711,9 @@ class TradingBotV6:
 
     def _sync_exchange_positions(self):
         """
-        交易所倉位 reconciliation（每次 monitor_positions 都執行）。
+        交易所倉位 reconciliation（排程每 SYNC_INTERVAL 秒執行；帳戶串流的持倉事件立即觸發）。
+
+        持倉來自帳戶快照：串流健康時由事件即時改寫，不另打 REST。
 
         四重防護：
         1. API 錯誤防護：get_positions 回 None 時跳過（不誤殺）
@@ -1245,7 +1744,8 @@ class TradingBotV6:
             hard_stop_detected = False
 
             # === 防護 2：正向檢查 — bot 有、exchange 無 → hard_stop_hit ===
-            for symbol, pm in list(self.active_trades.items()):
+            trades = self._trades_snapshot()
+            for symbol, pm in trades:
                 symbol_id = symbol.replace('/', '')
                 ex_amt = exchange_map.get(symbol_id, exchange_map.get(symbol))
 
@@ -1253,8 +1753,9 @@ class TradingBotV6:
                     logger.warning(
                         f"[SYNC] {symbol} 交易所已無此持倉，推測硬止損已觸發（HARD_STOP_HIT）"
                     )
-                    pm.exit_reason = 'hard_stop_hit'
-                    pm.is_closed = True
+                    with self._symbol_lock(symbol):     # 監控 worker 可能正在評估此持倉
+                        pm.exit_reason = 'hard_stop_hit'
+                        pm.is_closed = True
                     hard_stop_detected = True
                     TelegramNotifier.notify_action(
                         symbol, '硬止損觸發',
@@ -1272,7 +1773,7 @@ class TradingBotV6:
                         )
 
             # === 防護 4：反向檢查 — exchange 有、bot 沒有 → 幽靈倉位 ===
-            bot_symbol_ids = {s.replace('/', '') for s in self.active_trades}
+            bot_symbol_ids = {s.replace('/', '') for s, _ in trades}
             for sym, ex_amt in exchange_map.items():
                 if sym not in bot_symbol_ids and ex_amt > 0:
                     ccxt_sym = sym[:-4] + '/' + sym[-4:] if sym.endswith('USDT') else sym
@@ -1283,6 +1784,7 @@ class TradingBotV6:
 
             if hard_stop_detected:
                 self._save_positions()
+                self.scheduler.trigger('monitor')   # 立即清理已平倉持倉
 
         except Exception as e:
             logger.warning(f"[SYNC] 交易所同步異常，跳過: {e}")
@@ -1299,8 +1801,7 @@ class TradingBotV6:
             # 如果沒有傳入 current_price（exchange_sync），嘗試取得
             if current_price <= 0:
                 try:
-                    ticker = self.fetch_ticker(pm.symbol)
-                    current_price = ticker['last']
+                    current_price = self._current_price(pm.symbol)
                 except Exception:
                     current_price = pm.avg_entry  # fallback
 
@@ -1761,28 +2262,42 @@ class TradingBotV6:
 
         # 接管交易所有但 positions.json 未記錄的倉位（幽靈倉位恢復）
         self._adopt_ghost_positions()
+        if self.user_stream is not None:
+            self.user_stream.start()
 
+        replay = self.archive is not None and self.archive.mode == 'r'
         cycle = 0
         while True:
             try:
-                cycle += 1
-                logger.debug(f"[循環 #{cycle}]")
-
-                self.scan_for_signals()
-                self._sync_exchange_positions()  # 每 cycle 都執行，active_trades 為空時也偵測幽靈倉位
-                self.monitor_positions()
-                self.telegram_handler.poll()
+                if replay:
+                    # 重播：不開背景執行緒、不等待，依登錄順序逐輪執行到錄製檔用完
+                    cycle += 1
+                    logger.debug(f"[循環 #{cycle}]")
+                    self.scheduler.run_all()
+                    if self.archive.exhausted:
+                        logger.info(f"錄製檔重播完畢（{cycle} cycles）: {self.archive.stats}")
+                        break
+                    continue
 
-                logger.debug(f"休息 {Config.CHECK_INTERVAL} 秒...\n")
-                time.sleep(Config.CHECK_INTERVAL)
+                self.scheduler.run_pending()
+                self.scheduler.sleep(self.scheduler.idle_seconds())
 
             except KeyboardInterrupt:
                 logger.info("使用者中斷，停止運行")
+                self.scheduler.join(timeout=Config.CHECK_INTERVAL)
                 self._save_positions()
+                self._save_indicator_state()
+                if self.market_stream is not None:
+                    self.market_stream.stop()
+                if self.user_stream is not None:
+                    self.user_stream.stop()
+                if self.archive is not None:
+                    self.archive.close()
+                http_pool.close()
                 break
             except Exception as e:
-                logger.error(f"循環 #{cycle} 錯誤: {e}")
-                time.sleep(Config.CHECK_INTERVAL)
+                logger.error(f"主循環錯誤: {e}")
+                time.sleep(Config.MONITOR_INTERVAL)
 
 
 # ==================== 入口 ====================
@@ -1795,6 +2310,8 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Trading Bot V6.0')
     parser.add_argument('--dry-run', action='store_true', help='Dry run mode')
     parser.add_argument('--debug', action='store_true', help='Debug mode')
+    parser.add_argument('--record', metavar='PATH', help='錄製所有交易所回應到 PATH（gzip JSONL）')
+    parser.add_argument('--replay', metavar='PATH', help='離線重播 PATH 的錄製回應（不連網、不發 Telegram）')
     args = parser.parse_args()
 
     # Runtime 目錄（.log/ 子目錄）
@@ -1871,6 +2388,16 @@ if __name__ == "__main__":
         Config.load_from_json(config_path)
         if args.dry_run:
             Config.V6_DRY_RUN = True  # type: ignore[assignment]
+        if args.record:
+            Config.DATA_RECORD_PATH = args.record  # type: ignore[assignment]
+        if args.replay:
+            # 重播的狀態檔（倉位 / 績效 DB / 指標狀態）寫到錄製檔旁，不動正式狀態
+            state_dir = replay_state_dir(args.replay)
+            Config.DATA_REPLAY_PATH = args.replay  # type: ignore[assignment]
+            Config.TELEGRAM_ENABLED = False  # type: ignore[assignment]
+            Config.POSITIONS_JSON_PATH = str(state_dir / 'positions.json')  # type: ignore[assignment]
+            Config.DB_PATH = str(state_dir / 'performance.db')  # type: ignore[assignment]
+            Config.INDICATOR_STATE_PATH = str(state_dir / 'indicator_state.json')  # type: ignore[assignment]
 
         bot = TradingBotV6()
         bot.run()
@@ -111,10 +111,74 @@ class Config:
     # 其他
     ENABLE_STRUCTURE_BREAK_EXIT = True
     CHECK_INTERVAL = 60
+    # 多節奏排程：出場監控 / 倉位同步 / Telegram 指令各自的週期（秒）；信號掃描在背景執行緒以 CHECK_INTERVAL 執行
+    MONITOR_INTERVAL = 5
+    SYNC_INTERVAL = 30
+    TELEGRAM_POLL_INTERVAL = 5
+    # 掃描對齊 K 線收盤：TIMEFRAME_SIGNAL 每根 bar 收盤（交易所時間）後 SCAN_CLOSE_DELAY_SECONDS 秒觸發，
+    # 再加 0~SCAN_JITTER_SECONDS 秒隨機錯開整點請求尖峰；收盤之間只跑監控。False 時每 CHECK_INTERVAL 秒掃描
+    SCAN_ON_CANDLE_CLOSE = True
+    SCAN_CLOSE_DELAY_SECONDS = 3
+    SCAN_JITTER_SECONDS = 5
+    # 交易所時間校正間隔（秒）
+    SERVER_TIME_RESYNC_SECONDS = 3600
     MAX_RETRY = 3
     RETRY_DELAY = 5
+    # 重試不阻塞主循環：每個 cycle 階段（掃描 / 監控）重試等待總秒數上限，用完即跳過該 symbol 到下一輪
+    RETRY_BUDGET_SECONDS = 10
+    # 斷路器：同一端點（K 線 / 餘額）連續失敗此次數後，冷卻秒數內直接略過
+    CIRCUIT_BREAKER_THRESHOLD = 5
+    CIRCUIT_BREAKER_RESET_SECONDS = 60
+    # 帳戶快照（餘額 / 持倉 / 止損單）快取秒數；下單、平倉、改止損後立即失效
+    ACCOUNT_STATE_TTL_SECONDS = 10
     TREND_CACHE_HOURS = 4
 
+    # OHLCV 增量快取（MarketDataProvider）：只抓最後快取 bar 之後的新 K 線
+    OHLCV_CACHE_ENABLED = True
+    OHLCV_CACHE_MAX_ENTRIES = 200   # (symbol, timeframe) 條目上限，LRU 淘汰
+    OHLCV_CACHE_MAX_BARS = 1000     # 單一條目保留 bar 數上限
+    # 高週期重採樣：4h / 1d 在快取的 1h 歷史足夠時由本地聚合（None 停用）
+    OHLCV_RESAMPLE_BASE = '1h'
+    # 請求合併：相同 (symbol, timeframe) 的並行請求共用一次 HTTP，完成後此秒數內直接共用結果
+    OHLCV_COALESCE_SECONDS = 10
+    # 本地 K 線倉庫：已收盤 bar 追加到磁碟，重啟後由磁碟暖機、只補最新 bar
+    CANDLE_STORE_ENABLED = True
+    CANDLE_STORE_MAX_BARS = 20000   # 單一 (symbol, timeframe) 檔案保留筆數，超過自動壓縮
+    # 即時行情串流（WebSocket kline / markPrice）：健康時 K 線與最新價由串流供應，不健康自動回落 REST
+    MARKET_STREAM_ENABLED = False
+    MARKET_STREAM_URL = 'wss://fstream.binance.com'   # Demo Trading: wss://fstream.binancefuture.com
+    MARKET_STREAM_STALE_SECONDS = 30
+    # 帳戶串流（listenKey user-data stream）：持倉 / 止損單變動即時套用到帳戶快照，
+    # 持倉變動立即觸發同步（硬止損次秒級偵測）；串流健康時 REST 對帳降為每 USER_STREAM_RECONCILE_SECONDS 一次
+    USER_STREAM_ENABLED = False
+    USER_STREAM_URL = 'wss://fstream.binance.com'     # Demo Trading: wss://fstream.binancefuture.com
+    USER_STREAM_KEEPALIVE_SECONDS = 1800              # listenKey 60 分鐘失效，每 30 分鐘延長
+    USER_STREAM_RECONCILE_SECONDS = 120
+    # 行情錄製 / 重播（gzip JSONL）：錄製時照常連線並寫檔；重播時不連網，由錄製檔供應所有回應
+    DATA_RECORD_PATH = None
+    DATA_REPLAY_PATH = None
+
+    # API 限流：K 線與簽章請求共用的每分鐘 weight 額度（Binance 上限 2400，保留安全邊際）
+    API_WEIGHT_LIMIT = 2000
+    OHLCV_FETCH_WORKERS = 8         # fetch_ohlcv_many 並行執行緒數
+    MONITOR_WORKERS = 8             # 持倉監控並行執行緒數（1 = 逐一評估）
+    # HTTP 連線池：Binance / Telegram 請求共用 per-host keep-alive Session（省去每次 TCP+TLS 握手）
+    HTTP_POOL_MAXSIZE = 10          # 每個 host 保留的連線數（>= OHLCV_FETCH_WORKERS）
+    HTTP_RETRIES = 2                # 連線錯誤 / GET 502-504 自動重試次數（POST 下單不重送）
+    # 端點能力登錄：Demo 環境 ccxt / algoOrder 等不支援的路徑失敗一次後記住，此秒數內直接走可用路徑
+    CAPABILITY_TTL_SECONDS = 3600
+
+    # 信號評估 memo：已收盤信號 bar 未變且上次無信號 → 本 cycle 跳過該 symbol
+    SIGNAL_MEMO_ENABLED = True
+
+    # 增量指標引擎：每個 (symbol, timeframe) 保存 EMA/SMA/ATR/ADX 遞迴狀態，重啟後沿用暖機
+    INDICATOR_ENGINE_ENABLED = True
+    INDICATOR_HISTORY_BARS = 300    # 每序列保留（及存檔）的已收盤 bar 數
+    # 延遲指標欄位：calculate_indicators 只登記欄位，consumer 讀取前才計算（每 cycle 記錄省下的計算數）
+    LAZY_INDICATORS_ENABLED = True
+    # 持倉監控改用 Candles（struct-of-arrays）：K 線不經 DataFrame，策略以陣列讀最新 bar
+    MONITOR_CANDLES_ENABLED = True
+
     # ==================== V6.0 滾倉系統 ====================
 
     PYRAMID_ENABLED = True
@@ -269,6 +333,8 @@ class Config:
 
     POSITIONS_JSON_PATH = str(Path(__file__).resolve().parent.parent / '.log' / 'positions.json')
     LOG_FILE_PATH = str(Path(__file__).resolve().parent.parent / '.log' / 'bot.log')
+    INDICATOR_STATE_PATH = str(Path(__file__).resolve().parent.parent / '.log' / 'indicator_state.json')
+    CANDLE_STORE_DIR = str(Path(__file__).resolve().parent.parent / '.log' / 'candles')
     AUTO_BACKUP_ON_STAGE_CHANGE = True
     DB_PATH = "performance.db"
 
@@ -42,6 +42,12 @@ class OrderExecutionEngine:
         self.exchange = exchange
         self.futures_client = futures_client
         self.precision_handler = precision_handler
+        # AccountState（bot 建立後掛上）：成交 / 止損單變更後讓帳戶快照失效
+        self.account = None
+
+    def _invalidate_account(self, reason: str):
+        if self.account is not None:
+            self.account.invalidate(reason)
 
     # ==================== 槓桿設置 ====================
 
@@ -65,7 +71,10 @@ class OrderExecutionEngine:
             'type': 'MARKET',
             'quantity': formatted,
         }
-        result = self.futures_client.signed_request_json('POST', '/fapi/v1/order', params)
+        try:
+            result = self.futures_client.signed_request_json('POST', '/fapi/v1/order', params)
+        finally:
+            self._invalidate_account(f"create_order {symbol}")    # 逾時也可能已成交
         if 'error' in result:
             raise Exception(f"Order failed: {result['error']}")
         return result
@@ -100,6 +109,8 @@ class OrderExecutionEngine:
                 f"[OrderEngine] close_position FAILED: {symbol} {side} qty={quantity} — {e}"
             )
             raise  # 向上傳遞，由 _handle_close 的 rollback 機制決定後續處理
+        finally:
+            self._invalidate_account(f"close_position {symbol}")
 
     # ==================== 硬止損單 ====================
 
@@ -140,6 +151,8 @@ class OrderExecutionEngine:
                 return order.get('id')
         except Exception as e:
             logger.error(f"{symbol} 硬止損設定失敗: {e}")
+        finally:
+            self._invalidate_account(f"place_hard_stop_loss {symbol}")
         return None
 
     def cancel_stop_loss_order(self, symbol: str, order_id: Optional[str]) -> bool:
@@ -156,6 +169,8 @@ class OrderExecutionEngine:
         except Exception as e:
             logger.debug(f"取消止損單失敗（可能已觸發）: {e}")
             return False
+        finally:
+            self._invalidate_account(f"cancel_stop_loss_order {symbol}")
 
     def update_hard_stop_loss(self, pm, new_stop: float):
         """更新硬止損單（取消舊的，設置新的，直接更新 pm.stop_order_id）"""
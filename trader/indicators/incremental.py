@@ -0,0 +1,618 @@
+"""
+串流增量指標引擎
+
+TechnicalAnalysis.calculate_indicators 每次都對整個 frame 重算 EMA200 / ATR / ADX，
+且 frame 只有 250 根，EMA200 幾乎沒有暖機。本模組對每個 (symbol, timeframe)
+保存 EMA / SMA / Wilder (RMA) 遞迴狀態，每根新收盤 bar 只做 O(1) 更新，
+結果等同於對「引擎看過的全部歷史」做一次完整重算。
+
+語意（與 pandas_ta 一致）：
+- EMA：前 length 根的 SMA 作為種子，之後 ewm(span=length, adjust=False)
+- SMA：rolling(length, min_periods=length)
+- ATR：true range（首根 NaN）的 RMA = ewm(alpha=1/length, adjust=True, min_periods=length)
+- ADX：DM+/DM- 的 RMA ÷ ATR → DX → DX 的 RMA
+
+收盤判定：bar 開盤時間 + timeframe <= 現在時間（共用引擎用 set_clock 指定的時鐘：
+交易所時間 / 重播的錄製時間）。形成中的 bar 只「試算」（peek），不寫入狀態。
+frame 回溯得比狀態更早（狀態由較短的 frame 建立）時以 frame 的歷史回補重建。frame 必須帶 df.attrs['symbol'] / ['timeframe']（MarketDataProvider 標記）
+與 timestamp 欄位，否則引擎不接手，呼叫端改走整段計算。
+
+狀態可存成 JSON（atomic write），重啟後暖機不中斷。
+"""
+
+import json
+import math
+import os
+import time
+import logging
+import threading
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from trader.config import Config
+from trader.infrastructure.candles import Frame, column, timestamps_ms
+from trader.infrastructure.data_provider import timeframe_to_ms
+
+logger = logging.getLogger(__name__)
+
+STATE_SCHEMA_VERSION = 1
+_EPSILON = np.finfo(float).eps
+
+# 指標規格：(kind, source, length)
+#   ('ema', 'close', 200) / ('sma', 'volume', 20) / ('atr', None, 13) / ('adx', None, 14)
+Spec = Tuple[str, Optional[str], int]
+
+
+def spec_key(spec: Spec) -> str:
+    kind, source, length = spec
+    return f"{kind}:{source or ''}:{length}"
+
+
+def parse_spec_key(key: str) -> Spec:
+    kind, source, length = key.split(':')
+    return kind, (source or None), int(length)
+
+
+# ==================== 遞迴單元 ====================
+
+class _Ewm:
+    """
+    pandas ewm(...).mean() 的逐點版本（ignore_na=False）
+
+    演算法逐行對照 pandas._libs.window.aggregations.ewm，
+    確保與整段計算的浮點結果一致。
+    """
+
+    __slots__ = ('alpha', 'adjust', 'new_wt', 'min_periods', 'weighted', 'old_wt', 'nobs')
+
+    def __init__(self, alpha: float, adjust: bool, min_periods: int):
+        self.alpha = alpha
+        self.adjust = adjust
+        self.new_wt = 1.0 if adjust else alpha
+        self.min_periods = max(min_periods, 1)
+        self.weighted = math.nan
+        self.old_wt = 1.0
+        self.nobs = 0
+
+    def _step(self, x: float):
+        weighted, old_wt, nobs = self.weighted, self.old_wt, self.nobs
+        is_obs = x == x
+        nobs += int(is_obs)
+        if weighted == weighted:
+            old_wt *= 1.0 - self.alpha
+            if is_obs:
+                if weighted != x:
+                    weighted = (old_wt * weighted + self.new_wt * x) / (old_wt + self.new_wt)
+                old_wt = old_wt + self.new_wt if self.adjust else 1.0
+        elif is_obs:
+            weighted = x
+        return weighted, old_wt, nobs
+
+    def update(self, x: float) -> float:
+        self.weighted, self.old_wt, self.nobs = self._step(x)
+        return self.weighted if self.nobs >= self.min_periods else math.nan
+
+    def peek(self, x: float) -> float:
+        weighted, _, nobs = self._step(x)
+        return weighted if nobs >= self.min_periods else math.nan
+
+    def to_dict(self) -> dict:
+        return {'weighted': self.weighted, 'old_wt': self.old_wt, 'nobs': self.nobs}
+
+    def load(self, data: dict):
+        self.weighted = data['weighted']
+        self.old_wt = data['old_wt']
+        self.nobs = data['nobs']
+
+
+class _Rma(_Ewm):
+    """Wilder's RMA：ewm(alpha=1/length, adjust=True, min_periods=length)"""
+
+    __slots__ = ()
+
+    def __init__(self, length: int):
+        super().__init__(1.0 / length, True, length)
+
+
+class _EmaIndicator:
+    """EMA（SMA 種子）：第 length 根輸出前 length 根平均，之後 adjust=False 遞迴"""
+
+    __slots__ = ('length', 'count', 'seed', 'ewm')
+
+    def __init__(self, length: int):
+        self.length = length
+        self.count = 0
+        self.seed: List[float] = []
+        self.ewm = _Ewm(2.0 / (length + 1), False, 1)
+
+    def _seeded_input(self, x: float, count: int, seed: List[float]) -> float:
+        if count < self.length:
+            return math.nan
+        if count == self.length:
+            valid = [v for v in seed if v == v]
+            return math.fsum(valid) / len(valid) if valid else math.nan
+        return x
+
+    def update(self, bar: dict) -> float:
+        x = bar['close']
+        self.count += 1
+        if self.count <= self.length:
+            self.seed.append(x)
+        value = self.ewm.update(self._seeded_input(x, self.count, self.seed))
+        if self.count >= self.length:
+            self.seed = []
+        return value
+
+    def peek(self, bar: dict) -> float:
+        x = bar['close']
+        count = self.count + 1
+        seed = self.seed + [x] if count <= self.length else self.seed
+        return self.ewm.peek(self._seeded_input(x, count, seed))
+
+    def to_dict(self) -> dict:
+        return {'count': self.count, 'seed': self.seed, 'ewm': self.ewm.to_dict()}
+
+    def load(self, data: dict):
+        self.count = data['count']
+        self.seed = list(data['seed'])
+        self.ewm.load(data['ewm'])
+
+
+class _SmaIndicator:
+    """SMA：rolling(length, min_periods=length)，視窗內有 NaN 即輸出 NaN"""
+
+    __slots__ = ('length', 'source', 'window')
+
+    def __init__(self, length: int, source: str):
+        self.length = length
+        self.source = source
+        self.window: deque = deque(maxlen=length)
+
+    def _mean(self, window: Iterable[float]) -> float:
+        values = list(window)
+        if len(values) < self.length or any(v != v for v in values):
+            return math.nan
+        return math.fsum(values) / self.length
+
+    def update(self, bar: dict) -> float:
+        self.window.append(bar[self.source])
+        return self._mean(self.window)
+
+    def peek(self, bar: dict) -> float:
+        window = list(self.window) + [bar[self.source]]
+        return self._mean(window[-self.length:])
+
+    def to_dict(self) -> dict:
+        return {'window': list(self.window)}
+
+    def load(self, data: dict):
+        self.window = deque(data['window'], maxlen=self.length)
+
+
+def _true_range(bar: dict, prev_close: Optional[float]) -> float:
+    if prev_close is None:
+        return math.nan
+    return max(abs(bar['high'] - bar['low']),
+               abs(bar['high'] - prev_close),
+               abs(prev_close - bar['low']))
+
+
+class _AtrIndicator:
+    """ATR = RMA(true range)"""
+
+    __slots__ = ('prev_close', 'rma')
+
+    def __init__(self, length: int):
+        self.prev_close: Optional[float] = None
+        self.rma = _Rma(length)
+
+    def update(self, bar: dict) -> float:
+        value = self.rma.update(_true_range(bar, self.prev_close))
+        self.prev_close = bar['close']
+        return value
+
+    def peek(self, bar: dict) -> float:
+        return self.rma.peek(_true_range(bar, self.prev_close))
+
+    def to_dict(self) -> dict:
+        return {'prev_close': self.prev_close, 'rma': self.rma.to_dict()}
+
+    def load(self, data: dict):
+        self.prev_close = data['prev_close']
+        self.rma.load(data['rma'])
+
+
+class _AdxIndicator:
+    """ADX（pandas_ta 語意）：DM 以 RMA 平滑後除以 ATR，DX 再做 RMA"""
+
+    __slots__ = ('prev_high', 'prev_low', 'atr', 'pos', 'neg', 'adx')
+
+    def __init__(self, length: int):
+        self.prev_high: Optional[float] = None
+        self.prev_low: Optional[float] = None
+        self.atr = _AtrIndicator(length)
+        self.pos = _Rma(length)
+        self.neg = _Rma(length)
+        self.adx = _Rma(length)
+
+    def _dm(self, bar: dict) -> Tuple[float, float]:
+        if self.prev_high is None:
+            return math.nan, math.nan
+        up = bar['high'] - self.prev_high
+        dn = self.prev_low - bar['low']
+        pos = up if (up > dn and up > 0) else 0.0
+        neg = dn if (dn > up and dn > 0) else 0.0
+        pos = 0.0 if -_EPSILON < pos < _EPSILON else pos
+        neg = 0.0 if -_EPSILON < neg < _EPSILON else neg
+        return pos, neg
+
+    @staticmethod
+    def _dx(atr: float, pos: float, neg: float) -> float:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            k = np.float64(100.0) / np.float64(atr)
+            dmp = k * pos
+            dmn = k * neg
+            return float(100.0 * abs(dmp - dmn) / (dmp + dmn))
+
+    def update(self, bar: dict) -> float:
+        pos, neg = self._dm(bar)
+        atr = self.atr.update(bar)
+        dx = self._dx(atr, self.pos.update(pos), self.neg.update(neg))
+        self.prev_high, self.prev_low = bar['high'], bar['low']
+        return self.adx.update(dx)
+
+    def peek(self, bar: dict) -> float:
+        pos, neg = self._dm(bar)
+        dx = self._dx(self.atr.peek(bar), self.pos.peek(pos), self.neg.peek(neg))
+        return self.adx.peek(dx)
+
+    def to_dict(self) -> dict:
+        return {
+            'prev_high': self.prev_high, 'prev_low': self.prev_low,
+            'atr': self.atr.to_dict(), 'pos': self.pos.to_dict(),
+            'neg': self.neg.to_dict(), 'adx': self.adx.to_dict(),
+        }
+
+    def load(self, data: dict):
+        self.prev_high = data['prev_high']
+        self.prev_low = data['prev_low']
+        self.atr.load(data['atr'])
+        self.pos.load(data['pos'])
+        self.neg.load(data['neg'])
+        self.adx.load(data['adx'])
+
+
+def _make_indicator(spec: Spec):
+    kind, source, length = spec
+    if kind == 'ema':
+        return _EmaIndicator(length)
+    if kind == 'sma':
+        return _SmaIndicator(length, source or 'close')
+    if kind == 'atr':
+        return _AtrIndicator(length)
+    if kind == 'adx':
+        return _AdxIndicator(length)
+    raise ValueError(f"Unsupported indicator spec: {spec}")
+
+
+# ==================== 單一序列狀態 ====================
+
+_BAR_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+
+class _SeriesState:
+    """單一 (symbol, timeframe) 的已收盤 bar 歷史與各指標遞迴狀態"""
+
+    def __init__(self, history: int):
+        self.history = history
+        self.last_ts: Optional[int] = None
+        self.ts: deque = deque(maxlen=history)
+        self.bars: deque = deque(maxlen=history)
+        self.indicators: Dict[Spec, object] = {}
+        self.outputs: Dict[Spec, deque] = {}
+
+    def append(self, ts: int, bar: dict):
+        self.ts.append(ts)
+        self.bars.append(bar)
+        self.last_ts = ts
+        for spec, ind in self.indicators.items():
+            self.outputs[spec].append(ind.update(bar))
+
+    def ensure(self, spec: Spec):
+        """新指標：以目前保存的 bar 歷史重播建立狀態"""
+        if spec in self.indicators:
+            return
+        ind = _make_indicator(spec)
+        self.indicators[spec] = ind
+        self.outputs[spec] = deque((ind.update(bar) for bar in self.bars), maxlen=self.history)
+
+    def to_dict(self, persist_bars: int) -> dict:
+        n = min(persist_bars, len(self.ts))
+        return {
+            'last_ts': self.last_ts,
+            'ts': list(self.ts)[-n:] if n else [],
+            'bars': [[b[f] for f in _BAR_FIELDS] for b in list(self.bars)[-n:]] if n else [],
+            'indicators': {
+                spec_key(spec): {
+                    'state': ind.to_dict(),
+                    'outputs': list(self.outputs[spec])[-n:] if n else [],
+                }
+                for spec, ind in self.indicators.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict, history: int) -> '_SeriesState':
+        state = cls(history)
+        state.last_ts = data['last_ts']
+        state.ts.extend(data['ts'])
+        state.bars.extend(dict(zip(_BAR_FIELDS, b)) for b in data['bars'])
+        for key, item in data['indicators'].items():
+            spec = parse_spec_key(key)
+            ind = _make_indicator(spec)
+            ind.load(item['state'])
+            state.indicators[spec] = ind
+            # outputs 與 ts 對齊（截斷時前面補 NaN）
+            outputs = list(item['outputs'])[-len(state.ts):] if state.ts else []
+            outputs = [math.nan] * (len(state.ts) - len(outputs)) + outputs
+            state.outputs[spec] = deque(outputs, maxlen=history)
+        return state
+
+
+# ==================== 引擎 ====================
+
+class IndicatorEngine:
+    """每個 (symbol, timeframe) 一份遞迴狀態的增量指標引擎"""
+
+    def __init__(
+        self,
+        history: int = 300,
+        state_path: Optional[str] = None,
+        persist_bars: int = 300,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        Args:
+            history: 每個序列在記憶體保留的已收盤 bar 數（frame 中更早的列輸出 NaN）
+            state_path: 狀態 JSON 路徑（None = 不持久化）
+            persist_bars: 存檔時保留的 bar 歷史數
+            clock: 現在時間（秒），用於判斷 bar 是否已收盤
+        """
+        self.history = history
+        self.state_path = state_path
+        self.persist_bars = persist_bars
+        self._clock = clock
+        self._series: Dict[Tuple[str, str], _SeriesState] = {}
+        self._lock = threading.RLock()
+        self._dirty = False
+        self.stats = {'updates': 0, 'rebuilds': 0, 'backfills': 0}
+
+    # ---------- 對外 API ----------
+
+    def series(self, df: pd.DataFrame, spec: Spec) -> Optional[pd.Series]:
+        """
+        回傳 df 對應列的指標值（index 與 df 相同）
+
+        Returns:
+            None = frame 未標記 symbol / timeframe 或缺 timestamp，呼叫端應改走整段計算
+        """
+        values = self.values(df, spec)
+        if values is None:
+            return None
+        return pd.Series(values, index=df.index, dtype=float)
+
+    def values(self, df: Frame, spec: Spec) -> Optional[np.ndarray]:
+        """同 series，回傳 ndarray（DataFrame 或 Candles 皆可）"""
+        key = self._series_key(df)
+        if key is None:
+            return None
+        symbol, timeframe = key
+        try:
+            tf_ms = timeframe_to_ms(timeframe)
+        except ValueError:
+            return None
+
+        ts = timestamps_ms(df)
+        bars = {f: np.asarray(column(df, f), dtype=float) for f in _BAR_FIELDS if f in df.columns}
+        if len(bars) != len(_BAR_FIELDS):
+            return None
+
+        now_ms = int(self._clock() * 1000)
+        with self._lock:
+            state = self._sync(key, ts, bars, tf_ms, now_ms)
+            state.ensure(spec)
+            return self._read(state, spec, ts, bars, tf_ms, now_ms)
+
+    def reset(self, symbol: Optional[str] = None):
+        with self._lock:
+            if symbol is None:
+                self._series.clear()
+            else:
+                for key in [k for k in self._series if k[0] == symbol]:
+                    del self._series[key]
+            self._dirty = True
+
+    # ---------- 同步 ----------
+
+    @staticmethod
+    def _series_key(df: Frame) -> Optional[Tuple[str, str]]:
+        symbol = df.attrs.get('symbol')
+        timeframe = df.attrs.get('timeframe')
+        if not symbol or not timeframe or 'timestamp' not in df.columns or df.empty:
+            return None
+        return symbol, timeframe
+
+    def _sync(self, key, ts: np.ndarray, bars: Dict[str, np.ndarray], tf_ms: int, now_ms: int) -> _SeriesState:
+        """把 frame 中新的已收盤 bar 併入狀態；frame 回溯得更早時回補，不連續或資料不一致時重建"""
+        state = self._series.get(key)
+        closed = np.flatnonzero(ts + tf_ms <= now_ms)
+        if state is None:
+            state = self._series[key] = _SeriesState(self.history)
+        if len(closed) == 0:
+            return state
+
+        if state.last_ts is not None:
+            if state.ts and ts[closed[0]] < state.ts[0] and len(state.ts) < self.history:
+                # 狀態由較短的 frame 建立（例如監控的 50 根先到），之後的 frame 回溯得更早：
+                # 以較長的歷史重建，早期列不再是 NaN，暖機與整段重算一致
+                logger.debug(f"IndicatorEngine {key}: frame 回溯早於狀態，回補歷史")
+                self.stats['backfills'] += 1
+                return self._rebuild(key, state, ts, bars, closed, tf_ms)
+            new = closed[ts[closed] > state.last_ts]
+            if len(new) == 0:
+                return state
+            first_new = new[0]
+            connected = ts[first_new] == state.last_ts + tf_ms
+            consistent = True
+            if first_new > 0 and ts[first_new - 1] == state.last_ts and state.bars:
+                consistent = state.bars[-1]['close'] == bars['close'][first_new - 1]
+            if connected and consistent:
+                for i in new:
+                    state.append(int(ts[i]), self._bar(bars, i))
+                self.stats['updates'] += len(new)
+                self._dirty = True
+                return state
+            logger.debug(f"IndicatorEngine {key}: 資料不連續，重建狀態")
+            self.stats['rebuilds'] += 1
+
+        return self._rebuild(key, state, ts, bars, closed, tf_ms)
+
+    def _rebuild(self, key, old: _SeriesState, ts: np.ndarray, bars, closed: np.ndarray, tf_ms: int) -> _SeriesState:
+        """以 frame 的已收盤 bar 重建狀態（沿用既有指標）；舊狀態比 frame 更新且相接的 bar 接在後面"""
+        last = int(ts[closed[-1]])
+        tail = [(t, bar) for t, bar in zip(old.ts, old.bars) if t > last]
+        if tail and tail[0][0] != last + tf_ms:
+            tail = []
+        state = self._series[key] = _SeriesState(self.history)
+        for spec in old.indicators:
+            state.ensure(spec)
+        for i in closed:
+            state.append(int(ts[i]), self._bar(bars, i))
+        for t, bar in tail:
+            state.append(t, bar)
+        self._dirty = True
+        return state
+
+    @staticmethod
+    def _bar(bars: Dict[str, np.ndarray], i: int) -> dict:
+        return {f: float(bars[f][i]) for f in _BAR_FIELDS}
+
+    def _read(self, state: _SeriesState, spec: Spec, ts: np.ndarray, bars, tf_ms: int, now_ms: int) -> np.ndarray:
+        values = np.full(len(ts), np.nan)
+        if not state.ts:
+            return values
+        hist_ts = np.fromiter(state.ts, dtype=np.int64, count=len(state.ts))
+        hist_out = np.fromiter(state.outputs[spec], dtype=float, count=len(state.ts))
+        pos = np.searchsorted(hist_ts, ts)
+        found = (pos < len(hist_ts)) & (hist_ts[np.minimum(pos, len(hist_ts) - 1)] == ts)
+        values[found] = hist_out[pos[found]]
+
+        # 形成中的 bar：緊接在最後收盤 bar 之後才能試算
+        last = len(ts) - 1
+        if ts[last] + tf_ms > now_ms and ts[last] == state.last_ts + tf_ms:
+            values[last] = state.indicators[spec].peek(self._bar(bars, last))
+        return values
+
+    # ---------- 持久化 ----------
+
+    def load(self) -> bool:
+        """從 state_path 載入狀態；檔案不存在或格式不符時回傳 False"""
+        if not self.state_path or not os.path.exists(self.state_path):
+            return False
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('schema_version') != STATE_SCHEMA_VERSION:
+                logger.warning(f"指標狀態版本不符，忽略: {self.state_path}")
+                return False
+            with self._lock:
+                self._series = {
+                    tuple(key.split('|', 1)): _SeriesState.from_dict(item, self.history)
+                    for key, item in data['series'].items()
+                }
+                self._dirty = False
+            logger.info(f"指標狀態已載入: {len(self._series)} 個序列")
+            return True
+        except Exception as e:
+            logger.warning(f"指標狀態載入失敗，將重新暖機: {e}")
+            return False
+
+    def save(self, force: bool = False) -> bool:
+        """狀態有變化時 atomic write 到 state_path"""
+        if not self.state_path or not (self._dirty or force):
+            return False
+        with self._lock:
+            data = {
+                'schema_version': STATE_SCHEMA_VERSION,
+                'series': {
+                    f"{symbol}|{timeframe}": state.to_dict(self.persist_bars)
+                    for (symbol, timeframe), state in self._series.items()
+                },
+            }
+            self._dirty = False
+        tmp_path = f"{self.state_path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.state_path)), exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, separators=(',', ':'))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.state_path)
+            return True
+        except Exception as e:
+            logger.error(f"指標狀態儲存失敗: {e}")
+            self._dirty = True
+            if os.path.exists(tmp_path):
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+            return False
+
+
+# ==================== 全域實例 ====================
+
+_engine: Optional[IndicatorEngine] = None
+_engine_lock = threading.Lock()
+_clock: Callable[[], float] = time.time
+
+
+def set_clock(clock: Callable[[], float]):
+    """共用引擎的收盤判定時鐘（秒）：bot 傳入交易所時間，重播傳入錄製時間"""
+    global _clock
+    with _engine_lock:
+        _clock = clock
+        if _engine is not None:
+            _engine._clock = clock
+
+
+def get_engine() -> IndicatorEngine:
+    """依 Config 建立（並載入狀態）的共用引擎"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = IndicatorEngine(
+                history=Config.INDICATOR_HISTORY_BARS,
+                state_path=Config.INDICATOR_STATE_PATH,
+                persist_bars=Config.INDICATOR_HISTORY_BARS,
+                clock=_clock,
+            )
+            _engine.load()
+        return _engine
+
+
+def engine_series(df: pd.DataFrame, spec: Spec) -> Optional[pd.Series]:
+    """引擎啟用且 frame 可辨識時回傳增量結果，否則 None（呼叫端整段計算）"""
+    if not Config.INDICATOR_ENGINE_ENABLED:
+        return None
+    return get_engine().series(df, spec)
+
+
+def engine_values(df: Frame, spec: Spec) -> Optional[np.ndarray]:
+    """同 engine_series，回傳 ndarray（DataFrame 或 Candles 皆可）"""
+    if not Config.INDICATOR_ENGINE_ENABLED:
+        return None
+    return get_engine().values(df, spec)
@@ -0,0 +1,201 @@
+"""
+NumPy 指標 kernel
+
+輸入 / 輸出皆為 float64 ndarray，不經過 pandas，也不依賴 pandas_ta。
+數值語意與 pandas_ta 一致（誤差在浮點捨入範圍內）：
+- ema：前 length 根的 SMA 作為種子，之後 ewm(span=length, adjust=False)
+- sma：rolling(length)，視窗內有 NaN 即輸出 NaN
+- true_range：首根 NaN
+- rma：Wilder 平滑 = ewm(alpha=1/length, adjust=True, min_periods=length)
+- atr：rma(true_range)
+- adx：DM+/DM- 的 rma ÷ ATR → DX → rma(DX)，回傳 (adx, dmp, dmn)
+- rsi：正負漲跌幅各自 rma 後的比值
+
+ewm 以一階線性遞迴 z[t] = b·z[t-1] + u[t] 的閉式解向量化（分段計算避免 b**-t 溢位）；
+序列中段出現 NaN 時（pandas 的權重衰減規則無法閉式表達）改走逐點迴圈，結果仍與 pandas 相同。
+資料長度不足 length 時回傳全 NaN（pandas_ta 回傳 None）。
+"""
+
+import math
+from typing import Optional
+
+import numpy as np
+
+_EPSILON = np.finfo(float).eps
+
+# 每段長度上限：b**-k 不超過 e**300，遠低於 float64 上限
+_MAX_DECAY_EXP = 300.0
+
+
+def _as_array(x) -> np.ndarray:
+    return np.asarray(x, dtype=np.float64)
+
+
+def _nan_like(x: np.ndarray) -> np.ndarray:
+    return np.full(len(x), np.nan)
+
+
+def _linear_recurrence(u: np.ndarray, b: float) -> np.ndarray:
+    """z[t] = b * z[t-1] + u[t]，z[-1] = 0"""
+    n = len(u)
+    if b <= 0.0:
+        return u.copy()
+    step = n if b >= 1.0 else max(1, min(n, int(_MAX_DECAY_EXP / -math.log(b))))
+    decay = np.exp(np.arange(step) * math.log(b)) if b < 1.0 else np.ones(step)
+    out = np.empty(n)
+    carry = 0.0
+    for start in range(0, n, step):
+        seg = u[start:start + step]
+        d = decay[:len(seg)]
+        z = d * (carry * b + np.cumsum(seg / d))
+        out[start:start + len(seg)] = z
+        carry = z[-1]
+    return out
+
+
+def _ewm_sequential(x: np.ndarray, alpha: float, adjust: bool, min_periods: int) -> np.ndarray:
+    """pandas ewm(...).mean()（ignore_na=False）的逐點版本，供含中段 NaN 的序列使用"""
+    out = np.empty(len(x))
+    new_wt = 1.0 if adjust else alpha
+    weighted, old_wt, nobs = math.nan, 1.0, 0
+    for i, cur in enumerate(x.tolist()):
+        is_obs = cur == cur
+        nobs += is_obs
+        if weighted == weighted:
+            old_wt *= 1.0 - alpha
+            if is_obs:
+                if weighted != cur:
+                    weighted = (old_wt * weighted + new_wt * cur) / (old_wt + new_wt)
+                old_wt = old_wt + new_wt if adjust else 1.0
+        elif is_obs:
+            weighted = cur
+        out[i] = weighted if nobs >= min_periods else math.nan
+    return out
+
+
+def ewm_mean(x, alpha: float, adjust: bool = True, min_periods: int = 0) -> np.ndarray:
+    """等同 pd.Series(x).ewm(alpha=alpha, adjust=adjust, min_periods=min_periods).mean()"""
+    x = _as_array(x)
+    min_periods = max(min_periods, 1)
+    valid = ~np.isnan(x)
+    if not valid.any():
+        return _nan_like(x)
+    start = int(valid.argmax())
+    if not valid[start:].all():
+        return _ewm_sequential(x, alpha, adjust, min_periods)
+
+    xs = x[start:]
+    b = 1.0 - alpha
+    if adjust:
+        # 權重和 Σ b**j 有閉式解 (1 - b**m) / (1 - b)
+        m = np.arange(1, len(xs) + 1)
+        weights = -np.expm1(m * math.log(b)) / alpha if b > 0.0 else np.ones(len(xs))
+        y = _linear_recurrence(xs, b) / weights
+    else:
+        u = alpha * xs
+        u[0] = xs[0]
+        y = _linear_recurrence(u, b)
+
+    out = _nan_like(x)
+    out[start:] = y
+    out[start:start + min_periods - 1] = np.nan
+    return out
+
+
+def rma(x, length: int) -> np.ndarray:
+    """Wilder's RMA"""
+    return ewm_mean(x, 1.0 / length, adjust=True, min_periods=length)
+
+
+def ema(close, length: int) -> np.ndarray:
+    """EMA（SMA 種子）"""
+    close = _as_array(close)
+    if len(close) < length:
+        return _nan_like(close)
+    head = close[:length]
+    head = head[~np.isnan(head)]
+    seeded = close.copy()
+    seeded[:length - 1] = np.nan
+    seeded[length - 1] = head.mean() if len(head) else np.nan
+    return ewm_mean(seeded, 2.0 / (length + 1), adjust=False)
+
+
+def sma(x, length: int) -> np.ndarray:
+    """簡單移動平均"""
+    x = _as_array(x)
+    out = _nan_like(x)
+    if len(x) < length:
+        return out
+    out[length - 1:] = np.lib.stride_tricks.sliding_window_view(x, length).mean(axis=1)
+    return out
+
+
+def true_range(high, low, close) -> np.ndarray:
+    """max(|H-L|, |H-prevC|, |prevC-L|)，首根 NaN"""
+    high, low, close = _as_array(high), _as_array(low), _as_array(close)
+    out = _nan_like(close)
+    if len(close) < 2:
+        return out
+    prev_close = close[:-1]
+    h, l = high[1:], low[1:]
+    # fmax 略過 NaN，與 pandas max(axis=1) 相同
+    out[1:] = np.fmax(np.fmax(np.abs(h - l), np.abs(h - prev_close)), np.abs(prev_close - l))
+    return out
+
+
+def atr(high, low, close, length: int) -> np.ndarray:
+    """Average True Range（Wilder）"""
+    close = _as_array(close)
+    if len(close) < length:
+        return _nan_like(close)
+    return rma(true_range(high, low, close), length)
+
+
+def adx(high, low, close, length: int, tr: Optional[np.ndarray] = None):
+    """
+    ADX / DMP / DMN
+
+    Args:
+        tr: 已算好的 true_range（可與 ATR 共用），None 則自行計算
+
+    Returns:
+        (adx, dmp, dmn) 三個 ndarray
+    """
+    high, low, close = _as_array(high), _as_array(low), _as_array(close)
+    if len(close) < length:
+        return _nan_like(close), _nan_like(close), _nan_like(close)
+
+    up = np.full(len(high), np.nan)
+    dn = np.full(len(low), np.nan)
+    up[1:] = high[1:] - high[:-1]
+    dn[1:] = low[:-1] - low[1:]
+    with np.errstate(invalid='ignore'):
+        pos = np.where((up > dn) & (up > 0), up, 0.0)
+        neg = np.where((dn > up) & (dn > 0), dn, 0.0)
+    pos[0] = neg[0] = np.nan
+    pos[np.abs(pos) < _EPSILON] = 0.0
+    neg[np.abs(neg) < _EPSILON] = 0.0
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if tr is None:
+            tr = true_range(high, low, close)
+        k = 100.0 / rma(tr, length)
+        dmp = k * rma(pos, length)
+        dmn = k * rma(neg, length)
+        dx = 100.0 * np.abs(dmp - dmn) / (dmp + dmn)
+    return rma(dx, length), dmp, dmn
+
+
+def rsi(close, length: int) -> np.ndarray:
+    """Relative Strength Index（Wilder）"""
+    close = _as_array(close)
+    if len(close) < length:
+        return _nan_like(close)
+    diff = np.full(len(close), np.nan)
+    diff[1:] = close[1:] - close[:-1]
+    positive = np.where(diff > 0, diff, np.where(np.isnan(diff), np.nan, 0.0))
+    negative = np.where(diff < 0, diff, np.where(np.isnan(diff), np.nan, 0.0))
+    positive_avg = rma(positive, length)
+    negative_avg = rma(negative, length)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 100.0 * positive_avg / (positive_avg + np.abs(negative_avg))
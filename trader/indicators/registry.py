@@ -0,0 +1,267 @@
+"""
+宣告式指標 registry
+
+每種指標登記為 IndicatorDef：kind → 依賴（原始欄位或其他指標 Spec）+ kernel。
+呼叫端只宣告「欄位名 → Spec」，由 IndicatorResolver 依依賴順序計算：
+- 同一個 frame 內每個 Spec 只算一次（例如 ATR 與 ADX 共用同一條 true range，
+  atr_percent 直接取用已算好的 ATR）
+- 增量引擎可接手的 Spec（ema / sma / atr / adx），frame 帶 symbol/timeframe 標記時
+  改由 IndicatorEngine 提供
+
+TechnicalAnalysis 與 MarketScanner 共用此路徑，各自只宣告需要的欄位集合。
+欄位也可以延遲到 consumer 第一次需要時才計算（declare_lazy / ensure_indicators）。
+frame 可以是 DataFrame 或 Candles（struct-of-arrays），欄位一律以 ndarray 寫入。
+"""
+
+import itertools
+import threading
+import warnings
+import weakref
+from dataclasses import dataclass
+from typing import Callable, Dict, Mapping, NamedTuple, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from trader.indicators import kernels
+from trader.indicators.incremental import Spec, engine_values
+from trader.infrastructure.candles import Frame, column, timestamps_ms
+
+# 依賴：原始欄位名（'close'）或另一個指標 Spec
+Dependency = Union[str, Spec]
+
+
+@dataclass(frozen=True)
+class IndicatorDef:
+    """單一指標種類的定義"""
+    kind: str
+    deps: Callable[[Spec], Tuple[Dependency, ...]]
+    compute: Callable[..., np.ndarray]     # compute(length, *dep_arrays) -> ndarray
+    streamable: bool = False               # IndicatorEngine 是否支援
+
+
+INDICATORS: Dict[str, IndicatorDef] = {}
+
+
+def register(kind: str, deps: Callable[[Spec], Tuple[Dependency, ...]],
+             compute: Callable[..., np.ndarray], streamable: bool = False):
+    INDICATORS[kind] = IndicatorDef(kind, deps, compute, streamable)
+
+
+def _source(spec: Spec) -> Tuple[Dependency, ...]:
+    return (spec[1] or 'close',)
+
+
+TRUE_RANGE: Spec = ('true_range', None, 0)
+
+register('ema', _source, lambda n, x: kernels.ema(x, n), streamable=True)
+register('sma', _source, lambda n, x: kernels.sma(x, n), streamable=True)
+register('rsi', _source, lambda n, x: kernels.rsi(x, n))
+register('true_range', lambda spec: ('high', 'low', 'close'),
+         lambda n, h, l, c: kernels.true_range(h, l, c))
+register('atr', lambda spec: (TRUE_RANGE,), lambda n, tr: kernels.rma(tr, n), streamable=True)
+register('adx', lambda spec: ('high', 'low', 'close', TRUE_RANGE),
+         lambda n, h, l, c, tr: kernels.adx(h, l, c, n, tr=tr)[0], streamable=True)
+register('atr_percent', lambda spec: (('atr', None, spec[2]), 'close'),
+         lambda n, atr, c: atr / c * 100)
+
+
+class IndicatorResolver:
+    """
+    單一 frame 的指標解析器
+
+    依 registry 遞迴解析依賴，結果以 Spec 為 key 快取，同一 resolver 內不重算。
+    """
+
+    def __init__(self, df: Frame, use_engine: bool = True):
+        """
+        Args:
+            df: OHLCV frame（DataFrame 或 Candles）
+            use_engine: 是否允許 IndicatorEngine 接手可串流的指標
+                        （獨立程序如 scanner 不共用 bot 的引擎狀態，傳 False）
+        """
+        self.df = df
+        self.use_engine = use_engine
+        self._cache: Dict[Spec, np.ndarray] = {}
+        self.computed = 0
+
+    def _raw(self, name: str) -> np.ndarray:
+        return np.asarray(column(self.df, name), dtype=np.float64)
+
+    def get(self, spec: Spec) -> np.ndarray:
+        """取得指標數值（ndarray，長度同 frame）"""
+        if spec in self._cache:
+            return self._cache[spec]
+
+        kind = spec[0]
+        definition = INDICATORS.get(kind)
+        if definition is None:
+            raise ValueError(f"Unknown indicator kind: {kind}")
+
+        values = None
+        if self.use_engine and definition.streamable:
+            values = engine_values(self.df, spec)
+        if values is None:
+            inputs = [self._raw(dep) if isinstance(dep, str) else self.get(dep)
+                      for dep in definition.deps(spec)]
+            values = definition.compute(spec[2], *inputs)
+            self.computed += 1
+
+        self._cache[spec] = values
+        return values
+
+    def series(self, spec: Spec) -> pd.Series:
+        return pd.Series(self.get(spec), index=self.df.index)
+
+
+def compute_columns(df: Frame, columns: Mapping[str, Spec], use_engine: bool = True) -> Frame:
+    """依 {欄位名: Spec} 一次算完所有欄位並寫入 df（in-place，回傳同一個 df）"""
+    resolver = IndicatorResolver(df, use_engine=use_engine)
+    for name, spec in columns.items():
+        df[name] = resolver.get(spec)
+    return df
+
+
+def indicator_series(df: pd.DataFrame, spec: Spec, use_engine: bool = True) -> pd.Series:
+    """單一指標的 Series（index 同 df）"""
+    return IndicatorResolver(df, use_engine=use_engine).series(spec)
+
+
+# ==================== 延遲（按需）欄位 ====================
+#
+# calculate_indicators(df, lazy=True) 只登記欄位規格，不計算；consumer 讀取前呼叫
+# ensure_indicators(df, 'atr', 'vol_ma')，第一次需要時才算並寫入 frame（之後即為一般欄位）。
+# pandas 的 row 存取（df.iloc[-1].get(...)）無法攔截，因此「存取」以 ensure_indicators 為界。
+#
+# frame 以 attrs[LAZY_ATTR] 記錄延遲規格，切片 / copy 會一併帶著；切片上要求的欄位
+# 先在原始 frame 上計算再依 index 對齊複製，數值與整段先算再切片完全相同。
+# Candles 沒有 index：其切片與 to_frame() 的結果改依開盤時間對齊（連續區段直接取視圖）。
+# registry 對原始 frame 只持弱參照：frame 被回收即移除登記，
+# 之後切片上要求的欄位改在切片本身計算。
+
+LAZY_ATTR = 'lazy_indicators'
+
+
+class _LazySpec(NamedTuple):
+    """frame.attrs 內的延遲規格（隨切片 / copy 複製）"""
+    token: int
+    pending: Dict[str, Spec]
+    use_engine: bool
+
+
+class _LazyFrame:
+    __slots__ = ('origin', 'lock')
+
+    def __init__(self, origin: Frame):
+        self.origin = weakref.ref(origin)
+        self.lock = threading.Lock()
+
+
+_lazy_frames: Dict[int, _LazyFrame] = {}
+_lazy_lock = threading.Lock()
+_lazy_tokens = itertools.count(1)
+_lazy_stats = {'declared': 0, 'computed': 0}
+
+
+def declare_lazy(df: Frame, columns: Mapping[str, Spec], use_engine: bool = True) -> Frame:
+    """登記 {欄位名: Spec} 為延遲欄位（已存在的欄位略過），回傳同一個 df"""
+    pending = {name: spec for name, spec in columns.items() if name not in df.columns}
+    if not pending:
+        return df
+    token = next(_lazy_tokens)
+    with _lazy_lock:
+        _lazy_frames[token] = _LazyFrame(df)
+        _lazy_stats['declared'] += len(pending)
+    # finalizer 可能在任何執行緒的 GC 中觸發，不取 _lazy_lock（dict.pop 本身不可分割）
+    weakref.finalize(df, _lazy_frames.pop, token, None)
+    df.attrs[LAZY_ATTR] = _LazySpec(token, pending, use_engine)
+    return df
+
+
+def _count_computed(n: int):
+    with _lazy_lock:
+        _lazy_stats['computed'] += n
+
+
+def _compute_local(df: Frame, lazy: _LazySpec, names) -> int:
+    resolver = IndicatorResolver(df, use_engine=lazy.use_engine)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')           # 切片寫入（pandas 2 SettingWithCopyWarning）
+        for name in names:
+            df[name] = resolver.get(lazy.pending[name])
+    return len(names)
+
+
+def _aligned(origin: Frame, df: Frame, name: str) -> np.ndarray:
+    """原始 frame 已算好的欄位對齊到 df 的列；無法對齊時 KeyError"""
+    if isinstance(origin, pd.DataFrame) and isinstance(df, pd.DataFrame):
+        return origin[name].loc[df.index].to_numpy()
+    src, dst = timestamps_ms(origin), timestamps_ms(df)
+    pos = np.searchsorted(src, dst)
+    if len(pos) and (pos.max() >= len(src) or not np.array_equal(src[pos], dst)):
+        raise KeyError(name)
+    values = column(origin, name)
+    if len(pos) and pos[-1] - pos[0] == len(pos) - 1:
+        return values[pos[0]:pos[-1] + 1]
+    return values[pos]
+
+
+def ensure_indicators(df: Frame, *names: str) -> Frame:
+    """
+    確保延遲欄位已計算（非延遲 frame 或欄位已存在時不做事），回傳同一個 df
+
+    Example:
+        ensure_indicators(df, 'atr', 'vol_ma')
+        current = df.iloc[-1]
+    """
+    lazy = df.attrs.get(LAZY_ATTR)
+    if lazy is None:
+        return df
+    wanted = [name for name in names if name not in df.columns and name in lazy.pending]
+    if not wanted:
+        return df
+
+    entry = _lazy_frames.get(lazy.token)
+    origin = entry.origin() if entry is not None else None
+    if origin is None:
+        # 原始 frame 已回收：直接在此 frame 上計算
+        _count_computed(_compute_local(df, lazy, wanted))
+        return df
+
+    with entry.lock:
+        resolver = IndicatorResolver(origin, use_engine=lazy.use_engine)
+        computed = 0
+        for name in wanted:
+            if name not in origin.columns:
+                origin[name] = resolver.get(lazy.pending[name])
+                computed += 1
+        if df is not origin:
+            unaligned = []
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')   # 切片寫入（pandas 2 SettingWithCopyWarning）
+                for name in wanted:
+                    try:
+                        df[name] = _aligned(origin, df, name)
+                    except (KeyError, ValueError):
+                        unaligned.append(name)
+            if unaligned:
+                # index 已與原始 frame 脫鉤（reset_index / concat），改在此 frame 上計算
+                computed += _compute_local(df, lazy, unaligned)
+    _count_computed(computed)
+    return df
+
+
+def lazy_stats(reset: bool = False) -> Dict[str, int]:
+    """
+    延遲欄位統計：declared（登記數）、computed（實際計算數）、avoided（省下的計算數）
+
+    Args:
+        reset: 讀取後歸零（每 cycle 報告用）
+    """
+    with _lazy_lock:
+        stats = dict(_lazy_stats)
+        if reset:
+            _lazy_stats['declared'] = 0
+            _lazy_stats['computed'] = 0
+    stats['avoided'] = max(stats['declared'] - stats['computed'], 0)
+    return stats
@@ -1,7 +1,8 @@
 """
 技術指標層
 
-包含純數學計算函數（_ema, _sma, _atr, _adx）與所有技術分析類別：
+包含純數學計算函數（_ema, _sma, _atr, _adx，底層為 kernels 的 NumPy 實作）與所有技術分析類別：
+（指標欄位經 registry 解析；frame 帶 symbol/timeframe 標記時由 incremental.IndicatorEngine 增量提供）
 - TechnicalAnalysis：指標計算、趨勢判斷、信號偵測
 - DynamicThresholdManager：根據市場狀態動態調整 ADX/ATR 閾值
 - MTFConfirmation：多時間框架確認
@@ -12,67 +13,41 @@
 
 import logging
 import pandas as pd
-import numpy as np
 from typing import Dict, Optional, Tuple
 
-try:
-    import pandas_ta as ta
-except ImportError:
-    ta = None
-
 from trader.config import Config
+from trader.indicators import kernels
+from trader.indicators.incremental import Spec
+from trader.indicators.registry import (
+    compute_columns, declare_lazy, ensure_indicators, indicator_series,
+)
+from trader.infrastructure.candles import Frame
 
 logger = logging.getLogger(__name__)
 
 
-# ==================== pandas_ta 備用實現 ====================
+# ==================== 指標計算（NumPy kernel，Series 進出） ====================
 
 def _ema(series: pd.Series, length: int) -> pd.Series:
-    if ta is not None:
-        return ta.ema(series, length=length)
-    return series.ewm(span=length, adjust=False).mean()
+    return pd.Series(kernels.ema(series.to_numpy(), length), index=series.index)
 
 
 def _sma(series: pd.Series, length: int) -> pd.Series:
-    if ta is not None:
-        return ta.sma(series, length=length)
-    return series.rolling(window=length).mean()
+    return pd.Series(kernels.sma(series.to_numpy(), length), index=series.index)
 
 
 def _atr(high: pd.Series, low: pd.Series, close: pd.Series, length: int) -> pd.Series:
-    if ta is not None:
-        return ta.atr(high, low, close, length=length)
-    tr = pd.concat([
-        high - low,
-        (high - close.shift()).abs(),
-        (low - close.shift()).abs()
-    ], axis=1).max(axis=1)
-    return tr.rolling(window=length).mean()
-
-
-def _adx(high: pd.Series, low: pd.Series, close: pd.Series, length: int):
-    if ta is not None:
-        return ta.adx(high, low, close, length=length)
-    tr = pd.concat([
-        high - low,
-        (high - close.shift()).abs(),
-        (low - close.shift()).abs()
-    ], axis=1).max(axis=1)
-    plus_dm = high.diff()
-    minus_dm = -low.diff()
-    plus_dm = plus_dm.where((plus_dm > minus_dm) & (plus_dm > 0), 0.0)
-    minus_dm = minus_dm.where((minus_dm > plus_dm) & (minus_dm > 0), 0.0)
-    atr_val = tr.rolling(window=length).mean().replace(0, np.nan)
-    plus_di = 100 * (plus_dm.rolling(window=length).mean() / atr_val)
-    minus_di = 100 * (minus_dm.rolling(window=length).mean() / atr_val)
-    dx = (plus_di - minus_di).abs() / (plus_di + minus_di).replace(0, np.nan) * 100
-    adx_val = dx.rolling(window=length).mean()
-    result = pd.DataFrame({
+    values = kernels.atr(high.to_numpy(), low.to_numpy(), close.to_numpy(), length)
+    return pd.Series(values, index=close.index)
+
+
+def _adx(high: pd.Series, low: pd.Series, close: pd.Series, length: int) -> pd.DataFrame:
+    adx_val, dmp, dmn = kernels.adx(high.to_numpy(), low.to_numpy(), close.to_numpy(), length)
+    return pd.DataFrame({
         f'ADX_{length}': adx_val,
-        f'DMP_{length}': plus_di,
-        f'DMN_{length}': minus_di
-    })
-    return result
+        f'DMP_{length}': dmp,
+        f'DMN_{length}': dmn
+    }, index=close.index)
 
 
 # ==================== 技術分析 ====================
@@ -83,17 +58,31 @@ class TechnicalAnalysis:
     @staticmethod
     def extract_adx_series(df: pd.DataFrame, length: int = 14) -> Optional[pd.Series]:
         """安全提取 ADX Series"""
-        adx_data = _adx(df['high'], df['low'], df['close'], length=length)
-        if adx_data is None or adx_data.empty:
+        if df.empty:
             return None
-        if isinstance(adx_data, pd.DataFrame):
-            adx_cols = [c for c in adx_data.columns if c.startswith('ADX')]
-            return adx_data[adx_cols[0]] if adx_cols else None
-        return adx_data
+        return indicator_series(df, ('adx', None, length))
 
     @staticmethod
-    def calculate_indicators(df: pd.DataFrame) -> pd.DataFrame:
-        """計算所有必要的技術指標"""
+    def indicator_columns() -> Dict[str, Spec]:
+        """calculate_indicators 產生的欄位（registry 宣告，參數取自當下 Config）"""
+        return {
+            'ema_trend': ('ema', 'close', getattr(Config, 'EMA_TREND', 200)),
+            'vol_ma': ('sma', 'volume', Config.VOLUME_MA_PERIOD),
+            'atr': ('atr', None, Config.ATR_PERIOD),
+            'ema_fast': ('ema', 'close', Config.EMA_PULLBACK_FAST),
+            'ema_slow': ('ema', 'close', Config.EMA_PULLBACK_SLOW),
+            'adx': ('adx', None, 14),
+        }
+
+    @staticmethod
+    def calculate_indicators(df: Frame, lazy: bool = False) -> Frame:
+        """
+        計算所有必要的技術指標
+
+        Args:
+            df: OHLCV DataFrame 或 Candles（指標欄位以 ndarray 寫入同一個物件）
+            lazy: True 時只登記欄位，由 consumer 以 ensure_indicators 按需計算
+        """
         if df.empty or len(df) < 50:
             return df
 
@@ -103,19 +92,9 @@ class TechnicalAnalysis:
             logger.error(f"DataFrame 缺少必要欄位: {missing}")
             return df
 
-        ema_period = getattr(Config, 'EMA_TREND', 200)
-        df['ema_trend'] = _ema(df['close'], length=ema_period)
-        df['vol_ma'] = _sma(df['volume'], length=Config.VOLUME_MA_PERIOD)
-        df['atr'] = _atr(df['high'], df['low'], df['close'], length=Config.ATR_PERIOD)
-
-        df['ema_fast'] = _ema(df['close'], length=Config.EMA_PULLBACK_FAST)
-        df['ema_slow'] = _ema(df['close'], length=Config.EMA_PULLBACK_SLOW)
-
-        adx_series = TechnicalAnalysis.extract_adx_series(df)
-        if adx_series is not None:
-            df['adx'] = adx_series
-
-        return df
+        if lazy:
+            return declare_lazy(df, TechnicalAnalysis.indicator_columns())
+        return compute_columns(df, TechnicalAnalysis.indicator_columns())
 
     @staticmethod
     def check_trend(df: pd.DataFrame, side: str) -> Tuple[bool, str]:
@@ -125,6 +104,7 @@ class TechnicalAnalysis:
         if len(df) < ema_period:
             return False, "數據不足"
 
+        ensure_indicators(df, 'ema_trend')
         latest = df.iloc[-1]
         if 'ema_trend' not in latest or pd.isna(latest['ema_trend']):
             return False, "EMA 計算失敗"
@@ -190,6 +170,7 @@ class DynamicThresholdManager:
         if not Config.ENABLE_DYNAMIC_THRESHOLDS:
             return Config.ATR_MULTIPLIER
 
+        ensure_indicators(df, 'atr')
         if 'atr' not in df.columns or len(df) < 20:
             return Config.ATR_MULTIPLIER
 
@@ -223,8 +204,8 @@ class MTFConfirmation:
         if len(df_mtf) < Config.MTF_EMA_SLOW:
             return True, "MTF 數據不足"
 
-        ema_fast = _ema(df_mtf['close'], length=Config.MTF_EMA_FAST)
-        ema_slow = _ema(df_mtf['close'], length=Config.MTF_EMA_SLOW)
+        ema_fast = indicator_series(df_mtf, ('ema', 'close', Config.MTF_EMA_FAST))
+        ema_slow = indicator_series(df_mtf, ('ema', 'close', Config.MTF_EMA_SLOW))
 
         if ema_fast is None or ema_slow is None:
             return True, "MTF 指標計算失敗"
@@ -278,6 +259,7 @@ class MarketFilter:
         if current_adx < dynamic_adx_threshold:
             return False, f"趨勢不足 (ADX={current_adx:.1f}, 閾值={dynamic_adx_threshold:.1f})", False
 
+        ensure_indicators(df_trend, 'atr')
         if 'atr' in df_trend.columns:
             current_atr = df_trend['atr'].iloc[-1]
             lookback = min(10, len(df_trend) - 1)
@@ -287,8 +269,8 @@ class MarketFilter:
                 if current_atr > avg_atr * Config.ATR_SPIKE_MULTIPLIER:
                     return False, f"波動過大 (ATR={current_atr/avg_atr:.1f}x)", False
 
-        ema_10 = _ema(df_trend['close'], length=10)
-        ema_20 = _ema(df_trend['close'], length=20)
+        ema_10 = indicator_series(df_trend, ('ema', 'close', 10))
+        ema_20 = indicator_series(df_trend, ('ema', 'close', 20))
 
         if ema_10 is not None and ema_20 is not None and len(ema_10) > 0 and len(ema_20) > 0:
             if pd.notna(ema_10.iloc[-1]) and pd.notna(ema_20.iloc[-1]) and ema_20.iloc[-1] != 0:
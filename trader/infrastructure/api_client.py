@@ -7,9 +7,13 @@ Binance Futures API 客戶端
 
 import time
 import logging
+from typing import Optional
+
 import requests
 
 from trader.config import Config
+from trader.infrastructure import http_pool
+from trader.infrastructure.rate_limiter import WeightRateLimiter
 
 logger = logging.getLogger(__name__)
 
@@ -17,7 +21,13 @@ logger = logging.getLogger(__name__)
 class BinanceFuturesClient:
     """統一的 Binance Futures API 客戶端，消除重複的簽章與請求邏輯"""
 
-    def __init__(self, api_key: str, api_secret: str, sandbox: bool = True):
+    def __init__(self, api_key: str, api_secret: str, sandbox: bool = True,
+                 rate_limiter: Optional[WeightRateLimiter] = None):
+        """
+        Args:
+            rate_limiter: 與 MarketDataProvider 共用的 weight 限流器（同 IP 共用額度）；
+                None 時沿用 header 超限 sleep 1s 的舊行為
+        """
         self.api_key = api_key
         self.api_secret = api_secret
         self.base_url = (
@@ -26,6 +36,7 @@ class BinanceFuturesClient:
         )
         self._current_weight = 0
         self._weight_limit = 2000  # Binance 上限 2400，保留安全邊際
+        self.rate_limiter = rate_limiter
 
     @staticmethod
     def is_enabled() -> bool:
@@ -34,9 +45,12 @@ class BinanceFuturesClient:
                 and Config.TRADING_MODE == 'future'
                 and Config.EXCHANGE == 'binance')
 
-    def signed_request(self, method: str, endpoint: str, params: dict = None) -> requests.Response:
+    def signed_request(self, method: str, endpoint: str, params: dict = None,
+                       weight: int = 1) -> requests.Response:
         """
         HMAC SHA256 簽章 + HTTP 請求，回傳原始 Response。
+
+        weight: 該 endpoint 的 request weight（僅用於限流器記帳）
         """
         import hmac as hmac_mod
         import hashlib
@@ -58,16 +72,18 @@ class BinanceFuturesClient:
         headers = {'X-MBX-APIKEY': self.api_key}
         url = f"{self.base_url}{endpoint}"
 
-        if self._current_weight > self._weight_limit:
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(weight)
+        elif self._current_weight > self._weight_limit:
             logger.warning(f"API weight {self._current_weight} exceeds limit {self._weight_limit}, sleeping 1s")
             time.sleep(1.0)
 
         if method.upper() == 'POST':
-            response = requests.post(url, data=params, headers=headers, timeout=30)
+            response = http_pool.post(url, data=params, headers=headers, timeout=30)
         elif method.upper() == 'DELETE':
-            response = requests.delete(url, params=params, headers=headers, timeout=30)
+            response = http_pool.delete(url, params=params, headers=headers, timeout=30)
         else:
-            response = requests.get(url, params=params, headers=headers, timeout=30)
+            response = http_pool.get(url, params=params, headers=headers, timeout=30)
 
         weight_header = response.headers.get('X-MBX-USED-WEIGHT-1M')
         if weight_header:
@@ -76,6 +92,8 @@ class BinanceFuturesClient:
                 logger.debug(f"API weight: {self._current_weight}/2400")
             except ValueError:
                 pass
+            if self.rate_limiter is not None:
+                self.rate_limiter.update_from_headers(response.headers)
 
         # 偵測 -1021 timestamp 錯誤，方便排查時鐘同步問題
         if response.status_code == 400:
@@ -88,10 +106,20 @@ class BinanceFuturesClient:
 
         return response
 
-    def signed_request_json(self, method: str, endpoint: str, params: dict = None) -> dict:
+    def api_key_request(self, method: str, endpoint: str, weight: int = 1) -> requests.Response:
+        """只帶 API key、不簽章的請求（USER_STREAM 類端點，例如 /fapi/v1/listenKey）"""
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(weight)
+        return http_pool.request(
+            method.upper(), f"{self.base_url}{endpoint}",
+            headers={'X-MBX-APIKEY': self.api_key}, timeout=30,
+        )
+
+    def signed_request_json(self, method: str, endpoint: str, params: dict = None,
+                            weight: int = 1) -> dict:
         """簽章 + 請求 + JSON 解析 + 統一錯誤處理。"""
         try:
-            response = self.signed_request(method, endpoint, params)
+            response = self.signed_request(method, endpoint, params, weight=weight)
             if response.status_code == 200:
                 return response.json()
             else:
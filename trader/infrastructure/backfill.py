@@ -0,0 +1,251 @@
+"""
+歷史 K 線回補 — 多 symbol 並行分頁抓取，寫入本地 K 線倉庫（CandleStore）
+
+fetch_ohlcv 一次只能拿一頁 limit；回補以 startTime / endTime 分頁抓取整段歷史：
+
+    每個 (symbol, timeframe) 先比對倉庫，只抓缺少的區段：
+        檔頭之前（往前補歷史）、中間缺口、檔尾之後（補到最新收盤 bar）
+    每累積 flush_bars 根即寫入倉庫 → 中斷後重跑，從已寫入處接續（resume）
+    多個 (symbol, timeframe) 由 thread pool 並行，速率由共用的 WeightRateLimiter 控制
+
+交易所本身沒有的 bar（尚未上市、停機缺口）抓不到也不會重試到底，
+於回報中以 missing 計數。
+
+使用方式：
+    python -m trader.infrastructure.backfill --symbols BTC/USDT ETH/USDT --timeframes 1h 4h --days 365
+    python -m trader.infrastructure.backfill --top 200 --timeframes 1h --days 365 --workers 8
+
+    backfiller = Backfiller(provider, store, max_workers=8)
+    reports = backfiller.run(['BTC/USDT'], ['1h'], start_ms, end_ms)
+
+注意：bot / scanner 開同一目錄時會以 CANDLE_STORE_MAX_BARS 壓縮過長的檔案，
+長歷史研究資料建議回補到獨立目錄（--store）。
+"""
+
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from trader.infrastructure.candle_store import CandleStore
+from trader.infrastructure.data_provider import MarketDataProvider, timeframe_to_ms
+
+logger = logging.getLogger(__name__)
+
+# Binance klines 單頁上限 1500，但 1000 根以內 weight 為 5（1000 根以上為 10）
+DEFAULT_PAGE_LIMIT = 1000
+DEFAULT_FLUSH_BARS = 20_000
+
+
+class Backfiller:
+    """歷史 K 線回補（多 symbol 並行、分頁、補缺口、可中斷續跑）"""
+
+    def __init__(
+        self,
+        provider: MarketDataProvider,
+        store: CandleStore,
+        max_workers: int = 8,
+        page_limit: int = DEFAULT_PAGE_LIMIT,
+        flush_bars: int = DEFAULT_FLUSH_BARS,
+    ):
+        """
+        Args:
+            provider: 負責實際請求（重試 / weight 限流 / 沙盒 fallback）
+            store: 回補目標倉庫（建議 max_records=None，否則長歷史會被壓縮掉）
+            max_workers: 並行的 (symbol, timeframe) 數
+            page_limit: 每頁 bar 數
+            flush_bars: 累積多少根寫入倉庫一次（中斷時最多重抓這麼多）
+        """
+        self.provider = provider
+        self.store = store
+        self.max_workers = max_workers
+        self.page_limit = page_limit
+        self.flush_bars = flush_bars
+
+    @staticmethod
+    def window(timeframe: str, start_ms: int, end_ms: Optional[int] = None) -> Tuple[int, int]:
+        """對齊週期的回補區間 [start, end)；end 預設為形成中 bar 的開盤時間（只回補已收盤 bar）"""
+        tf_ms = timeframe_to_ms(timeframe)
+        end_ms = int(time.time() * 1000) if end_ms is None else end_ms
+        return start_ms - start_ms % tf_ms, end_ms - end_ms % tf_ms
+
+    def plan(self, symbol: str, timeframe: str, start_ms: int, end_ms: Optional[int] = None) -> List[Tuple[int, int]]:
+        """倉庫中缺少的區段 [(from_ms, to_ms), ...]"""
+        start_ms, end_ms = self.window(timeframe, start_ms, end_ms)
+        return self.store.gaps(symbol, timeframe, start_ms, end_ms)
+
+    def backfill(self, symbol: str, timeframe: str, start_ms: int, end_ms: Optional[int] = None) -> Dict:
+        """
+        回補單一 (symbol, timeframe)
+
+        Returns:
+            {'symbol', 'timeframe', 'pages', 'fetched', 'stored', 'missing', 'error'}
+            missing 為回補後仍缺少的 bar 數（交易所無資料或請求失敗）
+        """
+        start_ms, end_ms = self.window(timeframe, start_ms, end_ms)
+        tf_ms = timeframe_to_ms(timeframe)
+        report = {'symbol': symbol, 'timeframe': timeframe, 'pages': 0, 'fetched': 0, 'stored': 0,
+                  'missing': 0, 'error': None}
+        try:
+            for lo, hi in self.store.gaps(symbol, timeframe, start_ms, end_ms):
+                buffer: List[list] = []
+                for rows in self.provider.iter_ohlcv_range(symbol, timeframe, lo, hi, self.page_limit):
+                    report['pages'] += 1
+                    report['fetched'] += len(rows)
+                    buffer.extend(rows)
+                    if len(buffer) >= self.flush_bars:
+                        report['stored'] += self._flush(symbol, timeframe, buffer, end_ms)
+                        buffer = []
+                report['stored'] += self._flush(symbol, timeframe, buffer, end_ms)
+        except Exception as e:
+            logger.warning(f"{symbol} {timeframe} 回補中斷: {e}")
+            report['error'] = str(e)
+
+        report['missing'] = sum(
+            (hi - lo) // tf_ms for lo, hi in self.store.gaps(symbol, timeframe, start_ms, end_ms)
+        )
+        return report
+
+    def _flush(self, symbol: str, timeframe: str, rows: List[list], end_ms: int) -> int:
+        if not rows:
+            return 0
+        df = MarketDataProvider._to_frame(rows)
+        return self.store.merge(symbol, timeframe, df, now_ms=end_ms)
+
+    def run(
+        self,
+        symbols: Iterable[str],
+        timeframes: Iterable[str],
+        start_ms: int,
+        end_ms: Optional[int] = None,
+    ) -> List[Dict]:
+        """
+        並行回補 symbols × timeframes
+
+        Returns:
+            每個 (symbol, timeframe) 的回報（完成順序）
+        """
+        end_ms = int(time.time() * 1000) if end_ms is None else end_ms
+        jobs = [(symbol, timeframe) for symbol in symbols for timeframe in timeframes]
+        reports: List[Dict] = []
+        if not jobs:
+            return reports
+
+        t0 = time.monotonic()
+        workers = max(1, min(self.max_workers, len(jobs)))
+        pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='backfill')
+        try:
+            futures = {pool.submit(self.backfill, symbol, tf, start_ms, end_ms): (symbol, tf) for symbol, tf in jobs}
+            for future in as_completed(futures):
+                report = future.result()
+                reports.append(report)
+                logger.info(
+                    f"[{len(reports)}/{len(jobs)}] {report['symbol']} {report['timeframe']}: "
+                    f"+{report['stored']} bars / {report['pages']} pages"
+                    + (f", 缺 {report['missing']}" if report['missing'] else '')
+                )
+        finally:
+            # Ctrl+C：取消尚未開始的工作；已寫入倉庫的部分下次續跑
+            pool.shutdown(wait=True, cancel_futures=True)
+
+        elapsed = time.monotonic() - t0
+        logger.info(
+            f"回補完成：{len(reports)} 組、{sum(r['stored'] for r in reports)} bars、"
+            f"{sum(r['pages'] for r in reports)} pages，{elapsed:.1f}s"
+            f"（限流等待 {self.provider.rate_limiter.total_waited:.1f}s）"
+        )
+        return reports
+
+
+def top_symbols(exchange, n: int, quote: str = 'USDT') -> List[str]:
+    """24h 成交額前 n 名的 USDT 永續合約（'BTC/USDT' 格式）"""
+    exchange.load_markets()
+    tickers = exchange.fetch_tickers()
+    ranked = []
+    for symbol, ticker in tickers.items():
+        market = exchange.markets.get(symbol) or {}
+        if not market.get('swap') or not market.get('linear') or market.get('quote') != quote:
+            continue
+        ranked.append((float(ticker.get('quoteVolume') or 0), symbol.split(':')[0]))
+    ranked.sort(reverse=True)
+    return [symbol for _, symbol in ranked[:n]]
+
+
+def _parse_date_ms(value: str) -> int:
+    return int(pd.Timestamp(value, tz='UTC').value // 1_000_000)
+
+
+def main(argv: Optional[List[str]] = None):
+    import argparse
+
+    import ccxt
+
+    from trader.config import Config
+    from trader.infrastructure.rate_limiter import WeightRateLimiter
+
+    parser = argparse.ArgumentParser(description='歷史 K 線回補（寫入本地 K 線倉庫，可中斷續跑）')
+    parser.add_argument('--symbols', nargs='+', default=[], help='例如 BTC/USDT ETH/USDT')
+    parser.add_argument('--symbols-file', help='symbol 清單檔（每行一個）')
+    parser.add_argument('--top', type=int, default=0, help='另加 24h 成交額前 N 名 USDT 永續')
+    parser.add_argument('--timeframes', nargs='+', default=['1h'])
+    parser.add_argument('--days', type=float, default=365, help='回補最近幾天（未指定 --start 時）')
+    parser.add_argument('--start', help='起始日期（UTC），例如 2025-01-01')
+    parser.add_argument('--end', help='結束日期（UTC，不含）；預設到最新收盤 bar')
+    parser.add_argument('--store', default=Config.CANDLE_STORE_DIR, help='CandleStore 目錄')
+    parser.add_argument('--workers', type=int, default=Config.OHLCV_FETCH_WORKERS)
+    parser.add_argument('--page-limit', type=int, default=DEFAULT_PAGE_LIMIT)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+
+    # 回補一律使用正式網歷史（Demo 環境歷史不完整）
+    exchange = getattr(ccxt, Config.EXCHANGE)({
+        'enableRateLimit': False,       # 速率由 WeightRateLimiter 控制
+        'timeout': 30000,
+        'options': {'defaultType': Config.TRADING_MODE},
+    })
+
+    symbols = list(args.symbols)
+    if args.symbols_file:
+        with open(args.symbols_file, 'r', encoding='utf-8') as f:
+            symbols += [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    if args.top:
+        symbols += top_symbols(exchange, args.top)
+    symbols = list(dict.fromkeys(symbols))
+    if not symbols:
+        parser.error('需指定 --symbols / --symbols-file / --top')
+
+    end_ms = _parse_date_ms(args.end) if args.end else None
+    if args.start:
+        start_ms = _parse_date_ms(args.start)
+    else:
+        start_ms = int((end_ms or time.time() * 1000) - args.days * 86_400_000)
+
+    provider = MarketDataProvider(
+        exchange,
+        max_retry=Config.MAX_RETRY,
+        retry_delay=Config.RETRY_DELAY,
+        trading_mode=Config.TRADING_MODE,
+        cache_enabled=False,
+        rate_limiter=WeightRateLimiter(capacity=Config.API_WEIGHT_LIMIT),
+    )
+    backfiller = Backfiller(
+        provider, CandleStore(args.store), max_workers=args.workers, page_limit=args.page_limit,
+    )
+    logger.info(
+        f"回補 {len(symbols)} symbols × {args.timeframes} 自 {pd.to_datetime(start_ms, unit='ms')} → {args.store}"
+    )
+    try:
+        reports = backfiller.run(symbols, args.timeframes, start_ms, end_ms)
+    except KeyboardInterrupt:
+        logger.info("已中斷；已寫入的 bar 保留，重跑同一指令即可續傳")
+        return
+    failed = [r for r in reports if r['error']]
+    for r in failed:
+        logger.warning(f"{r['symbol']} {r['timeframe']} 失敗: {r['error']}")
+
+
+if __name__ == '__main__':
+    main()
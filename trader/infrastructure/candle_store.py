@@ -0,0 +1,378 @@
+"""
+本地 K 線倉庫 — 每個 (symbol, timeframe) 一個 append-only 定長記錄檔
+
+檔案佈局（<root>/<SYMBOLID>_<timeframe>.candles）：
+    無檔頭，連續的 48 bytes 記錄（little-endian）：
+        ts(int64, bar 開盤 ms) open high low close volume(float64)
+    可直接以 numpy.memmap 零拷貝讀取。
+
+旁邊的 .idx（JSON）記錄已提交的記錄數與首末 ts：
+    寫入順序為「資料 append → flush → 原子更新 index」，
+    讀取只看 index 內的記錄數，不會讀到寫一半的尾巴。
+
+只存已收盤 bar（形成中 bar 會變動，不適合 append-only）。
+開檔時做完整性檢查：截掉不足一筆的殘缺尾巴（torn write），
+並驗證 ts 嚴格遞增且對齊週期、價格有限且 high >= low，
+從第一筆不合法記錄起截斷。
+
+使用方式：
+    store = CandleStore(Config.CANDLE_STORE_DIR, max_records=Config.CANDLE_STORE_MAX_BARS)
+    store.append('BTC/USDT', '1h', df)             # 只追加已收盤且比檔尾新的 bar
+    store.merge('BTC/USDT', '1h', older_df)         # 任意區段（往前補歷史 / 補缺口），必要時重寫檔案
+    store.gaps('BTC/USDT', '1h')                    # 缺口區段 [(from_ms, to_ms), ...]
+    records = store.read('BTC/USDT', '1h', limit=500)   # np.memmap 結構化陣列
+    df = store.load_frame('BTC/USDT', '1h', limit=500)  # 尾端連續段 → DataFrame
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from trader.infrastructure.data_provider import OHLCV_COLUMNS, timeframe_to_ms
+
+logger = logging.getLogger(__name__)
+
+RECORD_DTYPE = np.dtype([
+    ('ts', '<i8'),
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('volume', '<f8'),
+])
+RECORD_SIZE = RECORD_DTYPE.itemsize
+STORE_VERSION = 1
+
+# 記錄數超過 max_records * COMPACT_SLACK 時自動壓縮回 max_records
+COMPACT_SLACK = 1.5
+
+
+class CandleStore:
+    """本地 K 線倉庫（執行緒安全；同一目錄只應由單一程序寫入）"""
+
+    def __init__(self, root: str, max_records: Optional[int] = None, fsync: bool = False):
+        """
+        Args:
+            root: 存放目錄（首次寫入時建立）
+            max_records: 每個檔案保留的記錄數上限（None 表示不限，完整保留歷史）
+            fsync: append 後是否 fsync（較慢，斷電時較不易遺失最後寫入的 bar）
+        """
+        self.root = Path(root)
+        self.max_records = max_records
+        self.fsync = fsync
+        self._lock = threading.RLock()
+        # (symbol, timeframe) → 已提交記錄數 / 最後 ts；首次存取時經完整性檢查載入
+        self._index: Dict[Tuple[str, str], dict] = {}
+        self.stats = {'appended': 0, 'merged': 0, 'repaired': 0, 'compacted': 0}
+
+    # ==================== 路徑 ====================
+
+    def path(self, symbol: str, timeframe: str) -> Path:
+        symbol_id = symbol.split(':')[0].replace('/', '')
+        return self.root / f"{symbol_id}_{timeframe}.candles"
+
+    @staticmethod
+    def _index_path(path: Path) -> Path:
+        return path.with_suffix('.idx')
+
+    # ==================== 讀取 ====================
+
+    def read(self, symbol: str, timeframe: str, limit: Optional[int] = None) -> np.ndarray:
+        """
+        讀取已提交的記錄（np.memmap 唯讀視圖，不複製）
+
+        Returns:
+            RECORD_DTYPE 結構化陣列；無資料時為長度 0 的陣列
+        """
+        with self._lock:
+            count = self._entry(symbol, timeframe)['count']
+            if count == 0:
+                return np.empty(0, dtype=RECORD_DTYPE)
+            records = np.memmap(self.path(symbol, timeframe), dtype=RECORD_DTYPE, mode='r', shape=(count,))
+        return records if limit is None else records[-limit:]
+
+    def last_ts(self, symbol: str, timeframe: str) -> Optional[int]:
+        with self._lock:
+            return self._entry(symbol, timeframe)['last_ts']
+
+    def load_frame(self, symbol: str, timeframe: str, limit: int) -> pd.DataFrame:
+        """
+        讀取最後 limit 根中「尾端連續」的一段（中間有缺口時只取缺口之後），
+        格式與 MarketDataProvider 的 OHLCV DataFrame 相同
+
+        Returns:
+            DataFrame；無資料時為空 DataFrame
+        """
+        records = self.read(symbol, timeframe, limit=limit)
+        if len(records) == 0:
+            return pd.DataFrame()
+        ts = records['ts']
+        gaps = np.flatnonzero(np.diff(ts) != timeframe_to_ms(timeframe))
+        if len(gaps):
+            records = records[gaps[-1] + 1:]
+        df = pd.DataFrame({name: np.array(records[name]) for name in RECORD_DTYPE.names})
+        df = df.rename(columns={'ts': 'timestamp'})[OHLCV_COLUMNS]
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+        return df
+
+    # ==================== 寫入 ====================
+
+    def append(self, symbol: str, timeframe: str, df: pd.DataFrame, now_ms: Optional[int] = None) -> int:
+        """
+        追加 df 中已收盤、且比檔尾新的 bar
+
+        Args:
+            df: OHLCV DataFrame（timestamp 升冪）
+            now_ms: 判定收盤用的現在時間（預設本地時鐘）
+
+        Returns:
+            實際追加的記錄數
+        """
+        if df is None or df.empty:
+            return 0
+        tf_ms = timeframe_to_ms(timeframe)
+        now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+        ts = pd.DatetimeIndex(df['timestamp']).as_unit('ms').asi8
+
+        with self._lock:
+            entry = self._entry(symbol, timeframe)
+            mask = ts + tf_ms <= now_ms
+            if entry['last_ts'] is not None:
+                mask &= ts > entry['last_ts']
+            if not mask.any():
+                return 0
+
+            new = _to_records(ts, df, mask)
+            new = new[:_valid_prefix(new, tf_ms, entry['last_ts'])]
+            if len(new) == 0:
+                return 0
+
+            path = self.path(symbol, timeframe)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, 'ab') as f:
+                f.write(new.tobytes())
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+            entry['count'] += len(new)
+            entry['first_ts'] = entry['first_ts'] if entry['first_ts'] is not None else int(new['ts'][0])
+            entry['last_ts'] = int(new['ts'][-1])
+            self._write_index(path, symbol, timeframe, entry)
+            self.stats['appended'] += len(new)
+
+            if self.max_records and entry['count'] > self.max_records * COMPACT_SLACK:
+                self.compact(symbol, timeframe)
+            return len(new)
+
+    def merge(self, symbol: str, timeframe: str, df: pd.DataFrame, now_ms: Optional[int] = None) -> int:
+        """
+        合併任意區段的已收盤 bar（往前補歷史 / 補中間缺口）
+
+        全部比檔尾新時等同 append；否則與既有記錄合併、依 ts 排序去重
+        （相同 ts 以 df 為準）後原子重寫整個檔案。
+
+        Returns:
+            檔案淨增加的記錄數
+        """
+        if df is None or df.empty:
+            return 0
+        tf_ms = timeframe_to_ms(timeframe)
+        now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+        ts = pd.DatetimeIndex(df['timestamp']).as_unit('ms').asi8
+
+        with self._lock:
+            entry = self._entry(symbol, timeframe)
+            if entry['last_ts'] is None or ts.min() > entry['last_ts']:
+                return self.append(symbol, timeframe, df, now_ms=now_ms)
+
+            new = _to_records(ts, df, ts + tf_ms <= now_ms)
+            new = new[_record_ok(new, tf_ms)]
+            if len(new) == 0:
+                return 0
+            before = entry['count']
+            # 既有記錄在前：stable 排序後保留同 ts 的最後一筆（df）
+            self._rewrite(symbol, timeframe, np.concatenate([np.array(self.read(symbol, timeframe)), new]))
+            added = self._index[(symbol, timeframe)]['count'] - before
+            self.stats['merged'] += max(added, 0)
+
+            if self.max_records and self._index[(symbol, timeframe)]['count'] > self.max_records * COMPACT_SLACK:
+                self.compact(symbol, timeframe)
+            return added
+
+    def compact(self, symbol: str, timeframe: str, keep: Optional[int] = None) -> int:
+        """
+        重寫檔案：依 ts 排序去重、移除不合法記錄、只保留最後 keep 筆
+        （預設 max_records），以暫存檔 + os.replace 原子替換
+
+        Returns:
+            移除的記錄數
+        """
+        keep = keep or self.max_records
+        with self._lock:
+            records = np.array(self.read(symbol, timeframe))
+            before = len(records)
+            if before == 0:
+                return 0
+            after = self._rewrite(symbol, timeframe, records, keep)
+            self.stats['compacted'] += 1
+            return before - after
+
+    def _rewrite(self, symbol: str, timeframe: str, records: np.ndarray, keep: Optional[int] = None) -> int:
+        """排序去重（同 ts 保留最後一筆）、過濾不合法記錄後原子替換檔案，回傳寫入筆數"""
+        tf_ms = timeframe_to_ms(timeframe)
+        records = records[np.argsort(records['ts'], kind='stable')]
+        last = np.r_[records['ts'][1:] != records['ts'][:-1], True]
+        records = records[last]
+        records = records[_record_ok(records, tf_ms)]
+        if keep:
+            records = records[-keep:]
+
+        path = self.path(symbol, timeframe)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'wb') as f:
+            f.write(records.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        entry = self._entry_for(records)
+        self._index[(symbol, timeframe)] = entry
+        self._write_index(path, symbol, timeframe, entry)
+        return len(records)
+
+    def gaps(
+        self, symbol: str, timeframe: str, start_ms: Optional[int] = None, end_ms: Optional[int] = None,
+    ) -> List[Tuple[int, int]]:
+        """
+        缺少的 bar 區段（半開區間 [from_ms, to_ms)，皆為 bar 開盤時間）
+
+        給定 start_ms / end_ms 時一併回報檔頭之前、檔尾之後的缺口；
+        檔案為空時整段 [start_ms, end_ms) 即為缺口。
+        """
+        tf_ms = timeframe_to_ms(timeframe)
+        ts = np.array(self.read(symbol, timeframe)['ts'])
+        if start_ms is not None:
+            ts = ts[ts >= start_ms]
+        if end_ms is not None:
+            ts = ts[ts < end_ms]
+        if len(ts) == 0:
+            if start_ms is not None and end_ms is not None and start_ms < end_ms:
+                return [(start_ms, end_ms)]
+            return []
+
+        out = []
+        if start_ms is not None and ts[0] > start_ms:
+            out.append((start_ms, int(ts[0])))
+        for i in np.flatnonzero(np.diff(ts) > tf_ms):
+            out.append((int(ts[i]) + tf_ms, int(ts[i + 1])))
+        if end_ms is not None and ts[-1] + tf_ms < end_ms:
+            out.append((int(ts[-1]) + tf_ms, end_ms))
+        return out
+
+    # ==================== 完整性 ====================
+
+    def check(self, symbol: str, timeframe: str) -> dict:
+        """
+        重新做完整性檢查並修復（截斷殘缺尾巴 / 不合法記錄、重建 index）
+
+        Returns:
+            {'records': 修復後記錄數, 'truncated': 截掉的記錄數, 'torn_bytes': 殘缺位元組數}
+        """
+        with self._lock:
+            self._index.pop((symbol, timeframe), None)
+            return self._recover(symbol, timeframe)
+
+    def _entry(self, symbol: str, timeframe: str) -> dict:
+        key = (symbol, timeframe)
+        if key not in self._index:
+            self._recover(symbol, timeframe)
+        return self._index[key]
+
+    def _recover(self, symbol: str, timeframe: str) -> dict:
+        path = self.path(symbol, timeframe)
+        report = {'records': 0, 'truncated': 0, 'torn_bytes': 0}
+        if not path.exists():
+            self._index[(symbol, timeframe)] = self._entry_for(np.empty(0, dtype=RECORD_DTYPE))
+            return report
+
+        size = path.stat().st_size
+        count = size // RECORD_SIZE
+        report['torn_bytes'] = size - count * RECORD_SIZE
+        records = (np.memmap(path, dtype=RECORD_DTYPE, mode='r', shape=(count,))
+                   if count else np.empty(0, dtype=RECORD_DTYPE))
+        valid = _valid_prefix(records, timeframe_to_ms(timeframe), None)
+        report['truncated'] = count - valid
+        report['records'] = valid
+        entry = self._entry_for(records[:valid])
+        del records
+
+        if report['torn_bytes'] or report['truncated']:
+            logger.warning(
+                f"K 線倉庫修復 {path.name}: 截掉 {report['truncated']} 筆不合法記錄、"
+                f"{report['torn_bytes']} bytes 殘缺尾巴"
+            )
+            with open(path, 'r+b') as f:
+                f.truncate(valid * RECORD_SIZE)
+            self.stats['repaired'] += 1
+
+        stored = self._read_index(path)
+        if report['torn_bytes'] or report['truncated'] or stored != {
+            'version': STORE_VERSION, 'symbol': symbol, 'timeframe': timeframe, **entry,
+        }:
+            self._write_index(path, symbol, timeframe, entry)
+        self._index[(symbol, timeframe)] = entry
+        return report
+
+    @staticmethod
+    def _entry_for(records: np.ndarray) -> dict:
+        if len(records) == 0:
+            return {'count': 0, 'first_ts': None, 'last_ts': None}
+        return {'count': len(records), 'first_ts': int(records['ts'][0]), 'last_ts': int(records['ts'][-1])}
+
+    def _read_index(self, path: Path) -> Optional[dict]:
+        try:
+            with open(self._index_path(path), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_index(self, path: Path, symbol: str, timeframe: str, entry: dict):
+        index_path = self._index_path(path)
+        tmp_path = index_path.with_suffix('.idx.tmp')
+        data = {'version': STORE_VERSION, 'symbol': symbol, 'timeframe': timeframe, **entry}
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(tmp_path, index_path)
+
+
+def _to_records(ts: np.ndarray, df: pd.DataFrame, mask: np.ndarray) -> np.ndarray:
+    """DataFrame 中 mask 選取的列 → RECORD_DTYPE 結構化陣列"""
+    new = np.empty(int(mask.sum()), dtype=RECORD_DTYPE)
+    new['ts'] = ts[mask]
+    for name in RECORD_DTYPE.names[1:]:
+        new[name] = df[name].to_numpy(dtype=float)[mask]
+    return new
+
+
+def _record_ok(records: np.ndarray, tf_ms: int) -> np.ndarray:
+    """逐筆檢查：ts 對齊週期、價格有限、high >= low"""
+    prices = np.column_stack([records[name] for name in RECORD_DTYPE.names[1:]])
+    return (records['ts'] % tf_ms == 0) & np.isfinite(prices).all(axis=1) & (records['high'] >= records['low'])
+
+
+def _valid_prefix(records: np.ndarray, tf_ms: int, after_ts: Optional[int]) -> int:
+    """最長合法前綴長度：逐筆合法且 ts 嚴格遞增（首筆須晚於 after_ts）"""
+    if len(records) == 0:
+        return 0
+    ts = records['ts']
+    ok = _record_ok(records, tf_ms)
+    ok &= np.r_[True if after_ts is None else ts[0] > after_ts, ts[1:] > ts[:-1]]
+    bad = np.flatnonzero(~ok)
+    return int(bad[0]) if len(bad) else len(records)
@@ -0,0 +1,249 @@
+"""
+Candles — 輕量 K 線容器（struct-of-arrays）
+
+熱路徑上只需要讀幾個數值（最新 close、最近 N 根 high/low）時，
+DataFrame 的 iloc / Series 存取會產生大量小物件。Candles 以連續的
+NumPy 陣列保存同一段 K 線：
+
+    ts                          int64，bar 開盤時間（ms，UTC）
+    open / high / low / close / volume   float64
+    extra                       指標欄位（{'atr': ndarray, ...}，長度同 K 線）
+
+五個價格欄位共用一塊 column-major（Fortran order）記憶體，
+每個欄位都是連續陣列；切片（candles[-50:]）回傳共用記憶體的視圖，不複製。
+
+相容性（consumer 不必區分 DataFrame / Candles）：
+    candles['close']         → 欄位陣列（'timestamp' 回傳 ts；指標欄位取自 extra）
+    candles['atr'] = values  → 寫入指標欄位（registry 的 compute_columns / ensure_indicators）
+    candles[-1]              → Bar（唯讀 row mapping，同 df.iloc[-1] 的 ['close'] / .get('atr', 0)）
+    candles.attrs            → {'symbol', 'timeframe', ...}（同 MarketDataProvider 的 df.attrs；
+                               延遲指標規格也記在這裡，切片一併帶著）
+    candles.to_frame()       → 舊介面 DataFrame（未遷移的策略 / 需要 pandas 運算時使用）
+
+    column(data, 'close') / bar(data, -1) 對 DataFrame 與 Candles 都回傳相同形式的值。
+
+使用方式：
+    candles = provider.fetch_candles('BTC/USDT', '1h', limit=100)
+    last_close = candles.close[-1]
+    swings = StructureAnalysis.find_swing_points(candles)
+"""
+
+from collections.abc import Mapping
+from typing import Iterator, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+PRICE_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+COLUMNS = ('timestamp',) + PRICE_FIELDS
+
+
+class Candles:
+    """OHLCV struct-of-arrays（__slots__，欄位為連續 float64 / int64 陣列）"""
+
+    __slots__ = ('ts', 'open', 'high', 'low', 'close', 'volume', 'extra', 'attrs', '__weakref__')
+
+    def __init__(
+        self,
+        ts: np.ndarray,
+        prices: np.ndarray,
+        symbol: Optional[str] = None,
+        timeframe: Optional[str] = None,
+    ):
+        """
+        Args:
+            ts: int64 開盤時間（ms）
+            prices: shape (n, 5) 的 float64 陣列（open/high/low/close/volume），
+                建議為 Fortran order（每欄連續）；否則會轉換一次
+            symbol / timeframe: 來源標記（寫入 attrs）
+        """
+        prices = np.asfortranarray(prices, dtype=np.float64)
+        self.ts = np.ascontiguousarray(ts, dtype=np.int64)
+        self.open, self.high, self.low, self.close, self.volume = (prices[:, i] for i in range(5))
+        self.extra = {}
+        self.attrs = {}
+        if symbol and timeframe:
+            self.attrs['symbol'] = symbol
+            self.attrs['timeframe'] = timeframe
+
+    # ==================== 建立 ====================
+
+    @classmethod
+    def blank(cls, symbol: Optional[str] = None, timeframe: Optional[str] = None) -> 'Candles':
+        return cls(np.empty(0, dtype=np.int64), np.empty((0, 5)), symbol, timeframe)
+
+    @classmethod
+    def from_ohlcv(
+        cls, ohlcv: Sequence[Sequence[float]], symbol: Optional[str] = None, timeframe: Optional[str] = None,
+    ) -> 'Candles':
+        """由交易所原始 [[ts, o, h, l, c, v], ...] 建立（一次轉換，無 DataFrame）"""
+        if ohlcv is None or len(ohlcv) == 0:
+            return cls.blank(symbol, timeframe)
+        raw = np.asarray(ohlcv, dtype=np.float64)
+        return cls(raw[:, 0].astype(np.int64), raw[:, 1:6], symbol, timeframe)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, symbol: Optional[str] = None, timeframe: Optional[str] = None) -> 'Candles':
+        """
+        由 OHLCV DataFrame 建立（symbol / timeframe 預設取自 df.attrs）
+
+        已計算的數值指標欄位複製到 extra；延遲規格不帶過來（由 Candles 自行宣告）。
+        """
+        symbol = symbol or (df.attrs.get('symbol') if df is not None else None)
+        timeframe = timeframe or (df.attrs.get('timeframe') if df is not None else None)
+        if df is None or df.empty:
+            return cls.blank(symbol, timeframe)
+        ts = pd.DatetimeIndex(df['timestamp']).as_unit('ms').asi8
+        prices = np.empty((len(df), 5), dtype=np.float64, order='F')
+        for i, name in enumerate(PRICE_FIELDS):
+            prices[:, i] = df[name].to_numpy(dtype=np.float64)
+        candles = cls(ts, prices, symbol, timeframe)
+        for name in df.columns:
+            if name not in COLUMNS and pd.api.types.is_numeric_dtype(df[name]):
+                candles.extra[name] = df[name].to_numpy(dtype=np.float64, copy=True)
+        return candles
+
+    def _view(self, index: slice) -> 'Candles':
+        out = object.__new__(Candles)
+        out.ts = self.ts[index]
+        for name in PRICE_FIELDS:
+            setattr(out, name, getattr(self, name)[index])
+        out.extra = {name: values[index] for name, values in self.extra.items()}
+        out.attrs = dict(self.attrs)
+        return out
+
+    # ==================== 存取 ====================
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def __getitem__(self, key):
+        """'close' → 欄位陣列；slice → 共用記憶體的 Candles 視圖；int → Bar"""
+        if isinstance(key, str):
+            if key == 'timestamp':
+                return self.ts
+            if key in PRICE_FIELDS:
+                return getattr(self, key)
+            return self.extra[key]
+        if isinstance(key, slice):
+            return self._view(key)
+        return Bar(self, key)
+
+    def __setitem__(self, name: str, values):
+        """寫入指標欄位（OHLCV 欄位唯讀）"""
+        if name in COLUMNS:
+            raise KeyError(f"Candles 欄位 {name!r} 唯讀")
+        values = np.asarray(values, dtype=np.float64)
+        if values.shape != self.ts.shape:
+            raise ValueError(f"欄位 {name!r} 長度 {len(values)} 與 K 線數 {len(self)} 不符")
+        self.extra[name] = values
+
+    def __contains__(self, name) -> bool:
+        return name in COLUMNS or name in self.extra
+
+    def __repr__(self) -> str:
+        span = f"{self.ts[0]}..{self.ts[-1]}" if len(self) else 'empty'
+        return f"Candles({self.symbol} {self.timeframe} n={len(self)} {span})"
+
+    @property
+    def symbol(self) -> Optional[str]:
+        return self.attrs.get('symbol')
+
+    @property
+    def timeframe(self) -> Optional[str]:
+        return self.attrs.get('timeframe')
+
+    @property
+    def empty(self) -> bool:
+        return len(self.ts) == 0
+
+    @property
+    def columns(self) -> Tuple[str, ...]:
+        return COLUMNS + tuple(self.extra)
+
+    def tail(self, n: int) -> 'Candles':
+        """最後 n 根（視圖）"""
+        return self._view(slice(max(len(self) - n, 0), None))
+
+    def timestamps(self) -> np.ndarray:
+        """開盤時間（datetime64[ms]）"""
+        return self.ts.astype('datetime64[ms]')
+
+    # ==================== 轉換 ====================
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        轉為舊介面 DataFrame（欄位 / dtype 與 fetch_ohlcv 相同，另含已計算的指標欄位）
+
+        attrs 原樣複製：延遲欄位在 frame 上 ensure_indicators 時仍由原 Candles 計算，
+        依 timestamp 對齊寫回，數值與直接讀 Candles 相同。
+        """
+        if len(self) == 0:
+            return pd.DataFrame()
+        df = pd.DataFrame({
+            'timestamp': pd.to_datetime(self.ts, unit='ms'),
+            **{name: getattr(self, name).copy() for name in PRICE_FIELDS},
+            **{name: values.copy() for name, values in self.extra.items()},
+        })
+        df.attrs.update(self.attrs)
+        return df
+
+
+# DataFrame 與 Candles 皆可的 K 線輸入（signals / structure / strategies）
+Frame = Union[pd.DataFrame, Candles]
+
+
+class Bar(Mapping):
+    """
+    單根 K 線的唯讀 mapping（取代 df.iloc[i] 的 row Series）
+
+    讀值時才由欄位陣列取單一元素，不建立 row 物件；
+    bar['close'] / bar.get('atr', 0) / 'vol_ma' in bar 與 pandas row 用法相同，
+    datetime 欄位（timestamp）回傳 pd.Timestamp。
+    """
+
+    __slots__ = ('_data', '_index')
+
+    def __init__(self, data: Frame, index: int):
+        self._data = data
+        self._index = index
+
+    def __getitem__(self, name: str):
+        if name == 'timestamp' and isinstance(self._data, Candles):
+            return pd.Timestamp(int(self._data.ts[self._index]), unit='ms')
+        value = column(self._data, name)[self._index]
+        if isinstance(value, np.datetime64):
+            return pd.Timestamp(value)
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._data.columns)
+
+    def __len__(self) -> int:
+        return len(self._data.columns)
+
+
+def column(data: Frame, name: str) -> np.ndarray:
+    """DataFrame / Candles 共用的欄位讀取（回傳 ndarray；DataFrame float 欄位不複製）"""
+    if isinstance(data, Candles):
+        return data[name]
+    return data[name].to_numpy()
+
+
+def bar(data: Frame, index: int) -> Bar:
+    """DataFrame / Candles 共用的單根 K 線讀取（bar(df, -1) 取代 df.iloc[-1]）"""
+    return Bar(data, index)
+
+
+def timestamps_ms(data: Frame) -> np.ndarray:
+    """開盤時間（int64 ms）"""
+    if isinstance(data, Candles):
+        return data.ts
+    return pd.DatetimeIndex(data['timestamp']).as_unit('ms').asi8
+
+
+def as_frame(data):
+    """Candles → DataFrame（to_frame）；DataFrame / None 原樣回傳。供尚未遷移的舊介面使用"""
+    if isinstance(data, Candles):
+        return data.to_frame()
+    return data
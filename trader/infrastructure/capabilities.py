@@ -0,0 +1,140 @@
+"""
+端點能力登錄 — 記住每個端點在各環境下可用的路徑，直接走可用路徑
+
+Demo Trading 上有些呼叫的第一選擇必定失敗（ccxt K 線 / ticker、
+/fapi/v1/algoOrder/openOrders 回 404），原本每次都先失敗再 fallback，
+白白多一次來回。CapabilityRegistry 依實際結果學習：
+
+    同一次呼叫中某路徑失敗、而後面的路徑成功 → 失敗路徑記入負快取，
+    ttl_seconds 內排到最後（仍保留為最後手段）；TTL 到期後恢復原本順序，
+    重新探測一次偏好路徑。
+    全部路徑都失敗（多半是網路 / 交易所整體異常）→ 不記負快取。
+
+使用方式：
+    registry = CapabilityRegistry(ttl_seconds=Config.CAPABILITY_TTL_SECONDS)
+    rows = registry.route('klines', [
+        ('ccxt', lambda: exchange.fetch_ohlcv(symbol, timeframe, limit=limit)),
+        ('demo-fapi', lambda: direct_klines(symbol, timeframe, limit)),
+    ], env='demo', ok=lambda rows: rows is not None)
+"""
+
+import time
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+class CapabilityRegistry:
+    """(env, endpoint) → 路徑負快取（執行緒安全）"""
+
+    def __init__(self, ttl_seconds: float = 3600.0, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            ttl_seconds: 失敗路徑略過的秒數，到期後重新探測
+            clock: 可注入，供測試使用
+        """
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._failed: Dict[Tuple[str, str, str], float] = {}
+        self._working: Dict[Tuple[str, str], str] = {}
+        self._lock = threading.Lock()
+        self.stats = {'demoted': 0, 'skipped': 0}   # 記入負快取次數 / 略過偏好路徑的呼叫數
+
+    def order(self, endpoint: str, paths: Sequence[str], env: str = 'live') -> List[str]:
+        """依負快取排序：未失敗（或已過 TTL）的路徑保持原順序在前，失敗路徑在後"""
+        now = self._clock()
+        with self._lock:
+            fresh, demoted = [], []
+            for path in paths:
+                failed_at = self._failed.get((env, endpoint, path))
+                if failed_at is not None and now - failed_at < self.ttl_seconds:
+                    demoted.append(path)
+                else:
+                    fresh.append(path)
+            return fresh + demoted
+
+    def route(
+        self,
+        endpoint: str,
+        attempts: Sequence[Tuple[str, Callable[[], T]]],
+        env: str = 'live',
+        ok: Callable[[T], bool] = lambda result: True,
+        demote_on_error: bool = True,
+    ) -> Optional[T]:
+        """
+        依學習到的順序嘗試各路徑，回傳第一個成功的結果
+
+        Args:
+            endpoint: 邏輯端點名稱（如 'klines' / 'stop_orders'）
+            attempts: [(path 名稱, 呼叫), ...]，依偏好排序
+            env: 環境（'demo' / 'live'），同一端點在不同環境分開記錄
+            ok: 判斷回傳值是否成功（例如 status_code == 200）；拋例外一律視為失敗
+            demote_on_error: 拋例外的路徑是否記入負快取（False：只有 ok 判定失敗的
+                明確回應才算「不支援」，例外視為暫時性錯誤）
+
+        Returns:
+            第一個成功路徑的結果；全部失敗時重新拋出最後一個例外，
+            沒有例外則回傳最後一個結果
+        """
+        if len(attempts) == 1:
+            return attempts[0][1]()
+
+        calls = dict(attempts)
+        paths = self.order(endpoint, [path for path, _ in attempts], env)
+        if paths[0] != attempts[0][0]:
+            with self._lock:
+                self.stats['skipped'] += 1
+
+        failed: List[str] = []
+        result, error = None, None
+        for path in paths:
+            try:
+                result, error = calls[path](), None
+            except Exception as e:
+                result, error = None, e
+                logger.debug(f"{endpoint}@{env} 經 {path} 失敗: {e}")
+                if demote_on_error:
+                    failed.append(path)
+                continue
+            if ok(result):
+                self._learn(endpoint, env, path, failed)
+                return result
+            failed.append(path)
+
+        if error is not None:
+            raise error
+        return result
+
+    def _learn(self, endpoint: str, env: str, path: str, failed: List[str]):
+        now = self._clock()
+        with self._lock:
+            self._failed.pop((env, endpoint, path), None)
+            previous = self._working.get((env, endpoint))
+            self._working[(env, endpoint)] = path
+            for bad in failed:
+                self._failed[(env, endpoint, bad)] = now
+            self.stats['demoted'] += len(failed)
+        if failed and previous != path:
+            logger.info(
+                f"capability: {endpoint}@{env} 改走 {path}"
+                f"（{', '.join(failed)} 失敗，{self.ttl_seconds:.0f}s 內略過）"
+            )
+
+    def working(self, endpoint: str, env: str = 'live') -> Optional[str]:
+        """最近一次成功的路徑"""
+        with self._lock:
+            return self._working.get((env, endpoint))
+
+    def snapshot(self) -> Dict[str, str]:
+        """{'endpoint@env': 可用路徑}（log / 除錯用）"""
+        with self._lock:
+            return {f"{endpoint}@{env}": path for (env, endpoint), path in self._working.items()}
+
+    def clear(self):
+        with self._lock:
+            self._failed.clear()
+            self._working.clear()
@@ -13,12 +13,61 @@
         trading_mode=Config.TRADING_MODE,
     )
     df = provider.fetch_ohlcv('BTC/USDT', '1h', limit=100)
+    candles = provider.fetch_candles('BTC/USDT', '1h', limit=100)   # struct-of-arrays，熱路徑用
+    frames = provider.fetch_ohlcv_many([('BTC/USDT', '1h', 100), ('ETH/USDT', '4h', 100)])
+    bars = provider.fetch_candles_many([('BTC/USDT', '1h', 50), ('BTC/USDT', '4h', 50)])
+    prices = provider.fetch_prices(['BTC/USDT', 'ETH/USDT'])
+    for rows in provider.iter_ohlcv_range('BTC/USDT', '1h', start_ms, end_ms):   # 歷史分頁（回補用）
+        ...
+
+K 線快取：
+    每個 (symbol, timeframe) 保留一份已下載的 K 線，下一次請求只抓
+    最後一根（可能仍在形成中）之後的 bar，合併去重後回傳。
+    快取以 LRU 淘汰，並限制單一條目的最大 bar 數，避免記憶體無限增長。
+
+本地 K 線倉庫（candle_store）：
+    記憶體快取未命中時先由磁碟倉庫暖機（重啟後第一輪只補最新的 bar），
+    每次請求後把已收盤 bar 追加回倉庫。
+
+請求合併（single-flight）：
+    同一 (symbol, timeframe) 的並行請求共用同一個進行中的 HTTP 請求與結果；
+    完成後 coalesce_seconds 內的相同請求（limit 不超過已取得的）直接共用，
+    不再重打交易所。每個呼叫方拿到各自的副本（下游會就地加指標欄位）。
+
+即時行情串流（attach_stream）：
+    串流健康且已補齊時，K 線與最新價直接由 MarketStream 的記憶體緩衝供應，
+    不發 REST 請求；串流不健康時自動回落 REST。
+
+端點能力（capabilities）：
+    Demo Trading 的 ccxt K 線 / 報價請求失敗、改走 demo-fapi 後，由 CapabilityRegistry
+    記住可用路徑，TTL 內直接走 demo-fapi，省去每次先失敗的一次來回。
+
+重試與斷路（retry）：
+    重試等待受本輪 retry.cycle_budget 限制，用完即放棄（該 symbol 本輪回傳空 DataFrame，下一輪再試）；
+    K 線端點連續失敗時斷路器直接擋下請求，冷卻後放行探測。
+
+高週期重採樣（resample_base='1h'）：
+    4h / 1d 等可整除一天的週期，在快取的 1h 歷史足夠時由 1h bar 在本地聚合
+    （UTC 對齊，含形成中 bar），不另外請求；歷史不足時才走原生 K 線請求。
 """
 
+
 import time
 import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
 import pandas as pd
 
+from trader.infrastructure import http_pool, retry
+from trader.infrastructure.candles import Candles
+from trader.infrastructure.capabilities import CapabilityRegistry
+from trader.infrastructure.rate_limiter import WeightRateLimiter, kline_weight
+from trader.infrastructure.retry import CircuitBreaker
+
 try:
     import ccxt
 except ImportError:
@@ -26,6 +75,99 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+OHLCV_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+# Binance Futures 測試網（demo 帳戶）REST base URL
+DEMO_FAPI_URL = 'https://demo-fapi.binance.com'
+
+# 全市場報價請求的 weight（不帶 symbol）
+PRICE_SNAPSHOT_WEIGHT = 2      # /fapi/v2/ticker/price
+TICKERS_SNAPSHOT_WEIGHT = 40   # /fapi/v1/ticker/24hr
+
+_TIMEFRAME_UNIT_MS = {
+    'm': 60_000,
+    'h': 3_600_000,
+    'd': 86_400_000,
+    'w': 604_800_000,
+    'M': 2_592_000_000,  # 30 天近似，僅用於估算缺口
+}
+
+
+def _is_transport_error(exc: Exception) -> bool:
+    """連線層錯誤（交易所 / 網路不可用）；symbol 層級的錯誤回傳 False"""
+    if ccxt is not None and isinstance(exc, ccxt.NetworkError):
+        return True
+    return isinstance(exc, OSError)     # ConnectionError / TimeoutError / requests 例外
+
+
+def timeframe_to_ms(timeframe: str) -> int:
+    """將 ccxt timeframe 字串（'1m' / '4h' / '1d' / '1w'）換算為毫秒"""
+    try:
+        amount = int(timeframe[:-1])
+        return amount * _TIMEFRAME_UNIT_MS[timeframe[-1]]
+    except (ValueError, KeyError, IndexError):
+        raise ValueError(f"Unsupported timeframe: {timeframe!r}")
+
+
+_DAY_MS = 86_400_000
+
+
+def resample_ohlcv(df: pd.DataFrame, timeframe: str, limit: Optional[int] = None) -> Optional[pd.DataFrame]:
+    """
+    將低週期 K 線聚合為高週期（bar 邊界以 UTC epoch 對齊，與交易所一致）
+
+    開頭不完整的高週期 bar 會丟棄；最後一根可不完整（形成中 bar）。
+
+    Args:
+        df: 低週期 OHLCV（timestamp 為 bar 開盤時間，升冪）
+        timeframe: 目標週期，須可整除一天（'2h' / '4h' / '12h' / '1d'）
+        limit: 只回傳最後 limit 根
+
+    Returns:
+        高週期 OHLCV DataFrame；完整 bar 數不足 limit 時回傳 None
+    """
+    if df is None or df.empty:
+        return None
+    tf_ms = timeframe_to_ms(timeframe)
+    ts = pd.DatetimeIndex(df['timestamp']).as_unit('ms').asi8
+    keys = ts - ts % tf_ms
+    starts = np.r_[0, np.flatnonzero(np.diff(keys)) + 1]
+    ends = np.r_[starts[1:], len(ts)]
+    if ts[0] != keys[0]:        # 開頭不完整
+        starts, ends = starts[1:], ends[1:]
+    if len(starts) == 0 or (limit is not None and len(starts) < limit):
+        return None
+    if limit is not None:
+        starts, ends = starts[-limit:], ends[-limit:]
+
+    first = starts[0]
+    high = df['high'].to_numpy(dtype=float)[first:]
+    low = df['low'].to_numpy(dtype=float)[first:]
+    volume = df['volume'].to_numpy(dtype=float)[first:]
+    offsets = starts - first
+    out = pd.DataFrame({
+        'timestamp': pd.to_datetime(keys[starts], unit='ms'),
+        'open': df['open'].to_numpy(dtype=float)[starts],
+        'high': np.maximum.reduceat(high, offsets),
+        'low': np.minimum.reduceat(low, offsets),
+        'close': df['close'].to_numpy(dtype=float)[ends - 1],
+        'volume': np.add.reduceat(volume, offsets),
+    })
+    return out
+
+
+class _Flight:
+    """一次進行中（或剛完成）的 K 線請求"""
+
+    __slots__ = ('limit', 'event', 'result', 'error', 'done_at')
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.event = threading.Event()
+        self.result: Optional[pd.DataFrame] = None
+        self.error: Optional[BaseException] = None
+        self.done_at: Optional[float] = None
+
 
 class MarketDataProvider:
     """統一市場數據提供者：封裝 ccxt exchange 與 OHLCV 獲取邏輯"""
@@ -37,6 +179,17 @@ class MarketDataProvider:
         retry_delay: float = 5.0,
         sandbox_mode: bool = False,
         trading_mode: str = 'spot',
+        cache_enabled: bool = True,
+        cache_max_entries: int = 200,
+        cache_max_bars: int = 1000,
+        rate_limiter: Optional[WeightRateLimiter] = None,
+        max_workers: int = 8,
+        resample_base: Optional[str] = None,
+        candle_store=None,
+        coalesce_seconds: float = 0.0,
+        capabilities: Optional[CapabilityRegistry] = None,
+        breaker_threshold: int = 5,
+        breaker_reset_seconds: float = 60.0,
     ):
         """
         Args:
@@ -45,6 +198,16 @@ class MarketDataProvider:
             retry_delay: 重試基礎間隔（秒），NetworkError 時會隨 attempt 線性增長
             sandbox_mode: 是否為沙盒/Demo 模式（啟用 demo-fapi 直連 fallback）
             trading_mode: 交易模式 'spot' 或 'future'
+            cache_enabled: 是否啟用增量 K 線快取
+            cache_max_entries: 快取最多保留的 (symbol, timeframe) 條目數（LRU 淘汰）
+            cache_max_bars: 單一條目最多保留的 bar 數；limit 超過此值的請求不進快取
+            rate_limiter: request weight 限流器（可與 BinanceFuturesClient 共用同一個）
+            max_workers: fetch_ohlcv_many 的並行執行緒數上限
+            resample_base: 高週期重採樣的來源週期（如 '1h'）；None 表示停用
+            candle_store: 本地 K 線倉庫（CandleStore），作為記憶體快取下的暖層
+            coalesce_seconds: 相同請求完成後可直接共用結果的秒數（0 = 只合併並行中的請求）
+            capabilities: 端點能力登錄（記住 ccxt / demo-fapi 哪條路徑可用，可與 bot 共用）
+            breaker_threshold / breaker_reset_seconds: K 線端點斷路器（連續失敗次數 / 斷路秒數）
         """
         self.exchange = exchange
         self.max_retry = max_retry
@@ -52,53 +215,599 @@ class MarketDataProvider:
         self.sandbox_mode = sandbox_mode
         self.trading_mode = trading_mode
 
+        self.cache_enabled = cache_enabled
+        self.cache_max_entries = cache_max_entries
+        self.cache_max_bars = cache_max_bars
+        self._cache: 'OrderedDict[Tuple[str, str], pd.DataFrame]' = OrderedDict()
+        self._cache_stats = {'full': 0, 'incremental': 0, 'evicted': 0, 'resampled': 0, 'warm': 0, 'stream': 0, 'coalesced': 0}
+        self._cache_lock = threading.Lock()
+
+        self.rate_limiter = rate_limiter or WeightRateLimiter()
+        self.max_workers = max_workers
+        self.resample_base = resample_base
+        self.candle_store = candle_store
+        self.stream = None
+
+        self.coalesce_seconds = coalesce_seconds
+        self._flights: Dict[Tuple[str, str], _Flight] = {}
+        self._flight_lock = threading.Lock()
+
+        self.capabilities = capabilities or CapabilityRegistry()
+        self.breaker = CircuitBreaker('klines', breaker_threshold, breaker_reset_seconds)
+
+    # ==================== 公開 API ====================
+
     def fetch_ohlcv(self, symbol: str, timeframe: str, limit: int = 100) -> pd.DataFrame:
         """
         獲取 OHLCV K 線數據（含重試與沙盒 fallback）
 
-        沙盒模式下，若 ccxt 失敗會自動切換為直連 demo-fapi.binance.com。
+        沙盒模式下，若 ccxt 失敗會自動切換為直連 demo-fapi.binance.com，
+        並由 capabilities 記住（TTL 內直接走 demo-fapi，不再先試 ccxt）。
+        啟用快取時，只向交易所請求最後快取 bar 之後的新 bar；
+        可重採樣的高週期在快取基礎週期足夠時由本地聚合。
+        相同 (symbol, timeframe) 的並行 / 近時請求合併為一次（single-flight）。
 
         Returns:
             pd.DataFrame with columns: timestamp, open, high, low, close, volume
+            （df.attrs 帶 symbol / timeframe）
             失敗時回傳空 DataFrame
         """
-        for attempt in range(self.max_retry):
+        df = self._shared_fetch(symbol, timeframe, limit)
+        if len(df) > limit:
+            return df.iloc[-limit:].reset_index(drop=True).copy()
+        return df.copy()
+
+    def fetch_candles(self, symbol: str, timeframe: str, limit: int = 100) -> Candles:
+        """
+        同 fetch_ohlcv，但回傳 Candles（struct-of-arrays）
+
+        直接由共用結果複製成一塊連續陣列，不建立 DataFrame 副本；
+        適合只讀價格 / 跑結構分析的熱路徑。失敗時回傳長度 0 的 Candles。
+        """
+        df = self._shared_fetch(symbol, timeframe, limit)
+        if len(df) > limit:
+            df = df.iloc[-limit:]
+        return Candles.from_frame(df, symbol, timeframe)
+
+    def _shared_fetch(self, symbol: str, timeframe: str, limit: int) -> pd.DataFrame:
+        """single-flight：回傳共用結果本身（呼叫方不可就地修改）"""
+        key = (symbol, timeframe)
+        now = time.monotonic()
+        with self._flight_lock:
+            flight = self._flights.get(key)
+            shared = (
+                flight is not None and flight.limit >= limit
+                and (flight.done_at is None or now - flight.done_at <= self.coalesce_seconds)
+            )
+            if not shared:
+                flight = _Flight(limit)
+                self._flights[key] = flight
+                if len(self._flights) > self.cache_max_entries:
+                    self._prune_flights(now)
+
+        if shared:
+            flight.event.wait()
+            with self._cache_lock:
+                self._cache_stats['coalesced'] += 1
+        else:
             try:
-                ohlcv = None
-
-                try:
-                    ohlcv = self.exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
-                except Exception:
-                    # Sandbox / Demo Trading fallback：直接呼叫 demo-fapi REST API
-                    if self.trading_mode == 'future' and self.sandbox_mode:
-                        import requests as req
-                        symbol_id = symbol.replace('/', '')
-                        base_url = 'https://demo-fapi.binance.com'
-                        resp = req.get(
-                            f'{base_url}/fapi/v1/klines',
-                            params={'symbol': symbol_id, 'interval': timeframe, 'limit': limit},
-                            timeout=30,
-                        )
-                        if resp.status_code == 200:
-                            ohlcv = [
-                                [int(c[0]), float(c[1]), float(c[2]), float(c[3]), float(c[4]), float(c[5])]
-                                for c in resp.json()
-                            ]
-
-                if ohlcv is None or len(ohlcv) == 0:
-                    return pd.DataFrame()
+                flight.result = self._fetch_ohlcv(symbol, timeframe, limit)
+            except BaseException as e:
+                flight.error = e
+                raise
+            finally:
+                self._finish_flight(key, flight)
+                flight.event.set()
+
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    def _finish_flight(self, key: Tuple[str, str], flight: _Flight):
+        """請求完成：成功且有資料時保留 coalesce_seconds 供後續共用，否則移除"""
+        with self._flight_lock:
+            flight.done_at = time.monotonic()
+            reusable = self.coalesce_seconds > 0 and flight.error is None and not flight.result.empty
+            if not reusable and self._flights.get(key) is flight:
+                del self._flights[key]
 
-                df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-                df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+    def _prune_flights(self, now: float):
+        expired = [
+            key for key, flight in self._flights.items()
+            if flight.done_at is not None and now - flight.done_at > self.coalesce_seconds
+        ]
+        for key in expired:
+            del self._flights[key]
+
+    def _fetch_ohlcv(self, symbol: str, timeframe: str, limit: int) -> pd.DataFrame:
+        if self.stream is not None:
+            df = self._from_stream(symbol, timeframe, limit)
+            if df is not None:
+                return df
+        if self._resample_need(timeframe, limit) is not None:
+            df = self._fetch_resampled(symbol, timeframe, limit)
+            if df is not None:
                 return df
+        return self._fetch_native(symbol, timeframe, limit)
+
+    def fetch_ohlcv_many(
+        self,
+        requests: Iterable[Tuple[str, str, int]],
+        max_workers: Optional[int] = None,
+    ) -> Dict[Tuple[str, str], pd.DataFrame]:
+        """
+        並行獲取多組 K 線（bounded thread pool + request weight 限流）
+
+        每個請求仍走 fetch_ohlcv（快取 / 重試 / 沙盒 fallback 不變），
+        並行度上限為 max_workers，實際速率由 rate_limiter 依 weight 控制，
+        取代固定 sleep。可重採樣的高週期併入同 symbol 的基礎週期請求，
+        由本地聚合產生。
+
+        Args:
+            requests: [(symbol, timeframe, limit), ...]；同一 (symbol, timeframe)
+                重複出現時以最大 limit 抓取一次
+            max_workers: 覆寫建構時的並行數
+
+        Returns:
+            {(symbol, timeframe): DataFrame}；單一請求失敗時為空 DataFrame
+        """
+        return self._fetch_many(requests, max_workers, candles=False)
+
+    def fetch_candles_many(
+        self,
+        requests: Iterable[Tuple[str, str, int]],
+        max_workers: Optional[int] = None,
+    ) -> Dict[Tuple[str, str], Candles]:
+        """
+        同 fetch_ohlcv_many，但每組回傳 Candles（監控熱路徑用）
+
+        Returns:
+            {(symbol, timeframe): Candles}；單一請求失敗時為長度 0 的 Candles
+        """
+        return self._fetch_many(requests, max_workers, candles=True)
+
+    def _fetch_many(self, requests, max_workers: Optional[int], candles: bool) -> dict:
+        """fetch_ohlcv_many / fetch_candles_many 共用（candles=True 時每組回傳 Candles）"""
+        fetch = self.fetch_candles if candles else self.fetch_ohlcv
+        blank = Candles.blank if candles else pd.DataFrame
+        limits: Dict[Tuple[str, str], int] = {}
+        for symbol, timeframe, limit in requests:
+            key = (symbol, timeframe)
+            limits[key] = max(limit, limits.get(key, 0))
+        if not limits:
+            return {}
+
+        # 可重採樣的高週期：併入同 symbol 的基礎週期請求（拉長 limit），不另外請求
+        fetch_limits = dict(limits)
+        derived: Dict[Tuple[str, str], int] = {}
+        for (symbol, timeframe), limit in limits.items():
+            need = self._resample_need(timeframe, limit)
+            if need is None or not self.cache_enabled or need > self.cache_max_bars:
+                continue
+            base_key = (symbol, self.resample_base)
+            fetch_limits[base_key] = max(need, fetch_limits.get(base_key, 0))
+            derived[(symbol, timeframe)] = limit
+            del fetch_limits[(symbol, timeframe)]
+
+        budget = retry.current_budget()
 
+        def _fetch(key):
+            try:
+                with retry.use_budget(budget):      # worker 沿用呼叫端的重試預算
+                    if key in derived:
+                        return fetch(key[0], key[1], limit=derived[key])
+                    return fetch(key[0], key[1], limit=fetch_limits[key])
             except Exception as e:
-                # ccxt.NetworkError 或其他異常：重試
+                logger.debug(f"{key[0]} {key[1]} K 線獲取失敗: {e}")
+                return blank()
+
+        workers = max(1, min(max_workers or self.max_workers, len(fetch_limits)))
+        if workers == 1:
+            fetched = {key: _fetch(key) for key in fetch_limits}
+        else:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ohlcv') as pool:
+                fetched = dict(zip(fetch_limits, pool.map(_fetch, fetch_limits)))
+
+        results = {}
+        for key, limit in limits.items():
+            if key in derived:
+                base = fetched.get((key[0], self.resample_base), pd.DataFrame())
+                if isinstance(base, Candles):
+                    base = base.to_frame()
+                df = self._resample_from(base, key[0], key[1], limit)
+                if df is None:
+                    # 基礎週期歷史不足 → 原生請求
+                    results[key] = _fetch(key)
+                elif candles:
+                    results[key] = Candles.from_frame(df, key[0], key[1])
+                else:
+                    results[key] = df
+            else:
+                data = fetched[key]
+                if len(data) > limit:
+                    data = data[-limit:] if candles else data.iloc[-limit:].reset_index(drop=True).copy()
+                results[key] = data
+        return results
+
+    def iter_ohlcv_range(
+        self, symbol: str, timeframe: str, start_ms: int, end_ms: int, page_limit: int = 1000,
+    ) -> Iterator[List[list]]:
+        """
+        依 startTime / endTime 分頁抓取 [start_ms, end_ms) 的原始 K 線（不經快取）
+
+        每頁一個請求（weight 限流、重試與沙盒 fallback 同 fetch_ohlcv），
+        逐頁 yield [[ts_ms, o, h, l, c, v], ...]；交易所沒有資料（尚未上市 /
+        停機缺口）時自然結束。請求重試後仍失敗時記 warning 並停止，
+        已 yield 的頁不受影響。
+        """
+        tf_ms = timeframe_to_ms(timeframe)
+        since = start_ms
+        while since < end_ms:
+            rows = self._request_ohlcv(symbol, timeframe, page_limit, since=since, until=end_ms - 1)
+            if rows is None:
+                logger.warning(f"{symbol} {timeframe} 分頁請求失敗，停在 {pd.to_datetime(since, unit='ms')}")
+                return
+            rows = [row for row in rows if since <= row[0] < end_ms]
+            if not rows:
+                return
+            yield rows
+            last = int(rows[-1][0])
+            if len(rows) < page_limit or last + tf_ms >= end_ms:
+                return
+            since = last + tf_ms
+
+    def fetch_prices(self, symbols: Iterable[str]) -> Dict[str, float]:
+        """
+        一次請求取得多個 symbol 的最新價（全市場報價快照）
+
+        優先走 ccxt fetch_last_prices（/fapi/v2/ticker/price，weight 2），
+        交易所不支援時退回 fetch_tickers（weight 40）；沙盒模式下 ccxt 失敗
+        會直連 demo-fapi 的 /fapi/v1/ticker/price（不帶 symbol）。
+        可用路徑由 capabilities 記住，之後直接走（見 CapabilityRegistry）。
+        請求次數與 symbols 數量無關；串流健康的 symbol 直接取串流最新價，
+        全部命中時不發請求。
+
+        Returns:
+            {symbol: last_price}；僅包含有報價的 symbol，失敗時回傳空 dict
+        """
+        symbols = list(symbols)
+        streamed: Dict[str, float] = {}
+        if self.stream is not None:
+            for symbol in symbols:
+                price = self.stream.last_price(symbol)
+                if price:
+                    streamed[symbol] = price
+        wanted = {self._symbol_id(s): s for s in symbols if s not in streamed}
+        if not wanted:
+            return streamed
+
+        def via_ccxt():
+            if self.exchange.has.get('fetchLastPrices') is True:
+                self.rate_limiter.acquire(PRICE_SNAPSHOT_WEIGHT)
+                data = self.exchange.fetch_last_prices()
+                field = 'price'
+            else:
+                self.rate_limiter.acquire(TICKERS_SNAPSHOT_WEIGHT)
+                data = self.exchange.fetch_tickers()
+                field = 'last'
+            self.rate_limiter.update_from_headers(getattr(self.exchange, 'last_response_headers', None))
+            return {
+                self._symbol_id(entry.get('symbol') or key): float(entry[field])
+                for key, entry in (data or {}).items() if entry and entry.get(field)
+            }
+
+        def via_demo_fapi():
+            # Sandbox / Demo Trading：直接呼叫 demo-fapi REST API
+            self.rate_limiter.acquire(PRICE_SNAPSHOT_WEIGHT)
+            resp = http_pool.get(f'{DEMO_FAPI_URL}/fapi/v1/ticker/price', timeout=30)
+            self.rate_limiter.update_from_headers(resp.headers)
+            if resp.status_code != 200:
+                return None
+            return {item['symbol']: float(item['price']) for item in resp.json()}
+
+        attempts = [('ccxt', via_ccxt)]
+        if self._demo_fallback:
+            attempts.append(('demo-fapi', via_demo_fapi))
+        try:
+            raw = self.capabilities.route('prices', attempts, env=self._env, ok=lambda data: data is not None)
+        except Exception as e:
+            logger.debug(f"報價快照獲取失敗: {e}")
+            return streamed
+        if raw is None:
+            return streamed
+
+        streamed.update({symbol: raw[symbol_id] for symbol_id, symbol in wanted.items() if symbol_id in raw})
+        return streamed
+
+    def attach_stream(self, stream):
+        """掛上即時行情串流（MarketStream），並以本 provider 的 REST 路徑作為補資料來源"""
+        self.stream = stream
+        if stream is not None and stream.backfill is None:
+            stream.backfill = self._fetch_native
+
+    def clear_cache(self, symbol: Optional[str] = None):
+        """清除快取（symbol=None 時全部清除；含已完成待共用的請求結果）"""
+        with self._flight_lock:
+            for key in [k for k, f in self._flights.items() if f.done_at is not None and symbol in (None, k[0])]:
+                del self._flights[key]
+        with self._cache_lock:
+            if symbol is None:
+                self._cache.clear()
+                return
+            for key in [k for k in self._cache if k[0] == symbol]:
+                del self._cache[key]
+
+    def cache_stats(self) -> dict:
+        """快取統計：full / incremental 請求次數、淘汰數、重採樣 / 磁碟暖機 / 串流供應次數、目前條目數"""
+        with self._cache_lock:
+            return {**self._cache_stats, 'entries': len(self._cache)}
+
+    # ==================== 即時串流 ====================
+
+    def _from_stream(self, symbol: str, timeframe: str, limit: int) -> Optional[pd.DataFrame]:
+        """串流健康時由記憶體 K 線供應（可重採樣的高週期由基礎週期聚合）"""
+        df = self.stream.candles(symbol, timeframe, limit)
+        if df is None:
+            need = self._resample_need(timeframe, limit)
+            if need is None:
+                return None
+            base_df = self.stream.candles(symbol, self.resample_base, need)
+            if base_df is None:
+                return None
+            self._persist(symbol, self.resample_base, base_df)
+            df = self._resample_from(base_df, symbol, timeframe, limit)
+            if df is None:
+                return None
+        else:
+            self._persist(symbol, timeframe, df)
+            df = self._tag(df, symbol, timeframe)
+        with self._cache_lock:
+            self._cache_stats['stream'] += 1
+        return df
+
+    # ==================== 高週期重採樣 ====================
+
+    def _resample_need(self, timeframe: str, limit: int) -> Optional[int]:
+        """
+        由基礎週期聚合 limit 根 timeframe bar 所需的基礎 bar 數；
+        不可重採樣（未啟用 / 非整數倍 / 無法整除一天）時回傳 None
+        """
+        if not self.resample_base or timeframe == self.resample_base:
+            return None
+        try:
+            tf_ms = timeframe_to_ms(timeframe)
+            base_ms = timeframe_to_ms(self.resample_base)
+        except ValueError:
+            return None
+        if tf_ms <= base_ms or tf_ms % base_ms or _DAY_MS % tf_ms:
+            return None
+        ratio = tf_ms // base_ms
+        # 開頭可能有不完整 bar 被丟棄，多留 ratio - 1 根
+        return limit * ratio + ratio - 1
+
+    def _fetch_resampled(self, symbol: str, timeframe: str, limit: int) -> Optional[pd.DataFrame]:
+        """快取的基礎週期歷史足夠時，增量更新後在本地聚合；不足時回傳 None"""
+        need = self._resample_need(timeframe, limit)
+        cached = self._cached(symbol, self.resample_base)
+        if cached is None or len(cached) + 1 < need:
+            return None
+        base_df = self._fetch_native(symbol, self.resample_base, need)
+        return self._resample_from(base_df, symbol, timeframe, limit)
+
+    def _resample_from(
+        self, base_df: pd.DataFrame, symbol: str, timeframe: str, limit: int
+    ) -> Optional[pd.DataFrame]:
+        df = resample_ohlcv(base_df, timeframe, limit)
+        if df is None:
+            return None
+        with self._cache_lock:
+            self._cache_stats['resampled'] += 1
+        return self._tag(df, symbol, timeframe)
+
+    # ==================== 快取 ====================
+
+    def _fetch_native(self, symbol: str, timeframe: str, limit: int) -> pd.DataFrame:
+        """向交易所請求該週期 K 線（經增量快取）"""
+        if not self.cache_enabled or limit > self.cache_max_bars:
+            df = self._to_frame(self._request_ohlcv(symbol, timeframe, limit))
+            self._persist(symbol, timeframe, df)
+            return self._tag(df, symbol, timeframe)
+
+        key = (symbol, timeframe)
+        cached = self._cached(symbol, timeframe)
+
+        # 磁碟暖機的快取只有已收盤 bar，增量請求至少會補上形成中的那一根
+        if cached is not None and len(cached) + 1 >= limit:
+            merged = self._fetch_incremental(symbol, timeframe, limit, cached)
+            if merged is not None and (merged.empty or len(merged) >= limit):
+                if merged.empty:
+                    return pd.DataFrame()
+                self._cache_put(key, merged, 'incremental')
+                self._persist(symbol, timeframe, merged)
+                df = merged.iloc[-limit:].reset_index(drop=True).copy()
+                return self._tag(df, symbol, timeframe)
+
+        df = self._to_frame(self._request_ohlcv(symbol, timeframe, limit))
+        if df.empty:
+            return df
+        self._cache_put(key, df, 'full')
+        self._persist(symbol, timeframe, df)
+        return self._tag(df.copy(), symbol, timeframe)
+
+    def _cached(self, symbol: str, timeframe: str) -> Optional[pd.DataFrame]:
+        """記憶體快取；未命中時由本地倉庫暖機"""
+        key = (symbol, timeframe)
+        with self._cache_lock:
+            cached = self._cache.get(key)
+        if cached is not None or self.candle_store is None:
+            return cached
+        try:
+            df = self.candle_store.load_frame(symbol, timeframe, self.cache_max_bars)
+        except Exception as e:
+            logger.warning(f"{symbol} {timeframe} 本地 K 線讀取失敗: {e}")
+            return None
+        if df.empty:
+            return None
+        self._cache_put(key, df, 'warm')
+        return df
+
+    def _persist(self, symbol: str, timeframe: str, df: pd.DataFrame):
+        """已收盤 bar 追加到本地倉庫（失敗不影響本次請求）"""
+        if self.candle_store is None or df.empty:
+            return
+        try:
+            self.candle_store.append(symbol, timeframe, df, now_ms=int(time.time() * 1000))
+        except Exception as e:
+            logger.warning(f"{symbol} {timeframe} 本地 K 線寫入失敗: {e}")
+
+    def _fetch_incremental(
+        self, symbol: str, timeframe: str, limit: int, cached: pd.DataFrame
+    ) -> Optional[pd.DataFrame]:
+        """
+        只抓最後快取 bar 之後的資料並合併
+
+        Returns:
+            合併後的 DataFrame；缺口過大需整段重抓時回傳 None；
+            請求失敗時回傳空 DataFrame（與未快取時的失敗語意一致）
+        """
+        try:
+            tf_ms = timeframe_to_ms(timeframe)
+        except ValueError:
+            return None
+
+        last_ms = int(pd.Timestamp(cached['timestamp'].iloc[-1]).value // 1_000_000)
+        now_ms = int(time.time() * 1000)
+        # 最後一根（可能未收盤）+ 之後新開的 bar，多抓一根容忍時鐘誤差
+        page = max(0, (now_ms - last_ms) // tf_ms) + 2
+        if page >= limit:
+            return None
+
+        rows = self._request_ohlcv(symbol, timeframe, page, since=last_ms)
+        if rows is None or len(rows) == 0:
+            return pd.DataFrame()
+        if len(rows) >= page:
+            # 一頁塞滿 → 可能還有未抓到的 bar，改整段重抓
+            return None
+
+        new = self._to_frame(rows)
+        merged = pd.concat([cached, new], ignore_index=True)
+        merged = merged.drop_duplicates(subset='timestamp', keep='last')
+        merged = merged.sort_values('timestamp').reset_index(drop=True)
+        if len(merged) > self.cache_max_bars:
+            merged = merged.iloc[-self.cache_max_bars:].reset_index(drop=True)
+        return merged
+
+    def _cache_put(self, key: Tuple[str, str], df: pd.DataFrame, kind: str):
+        with self._cache_lock:
+            self._cache[key] = df.copy()
+            self._cache.move_to_end(key)
+            self._cache_stats[kind] += 1
+            while len(self._cache) > self.cache_max_entries:
+                evicted, _ = self._cache.popitem(last=False)
+                self._cache_stats['evicted'] += 1
+                logger.debug(f"OHLCV cache evict: {evicted}")
+
+    # ==================== 交易所請求 ====================
+
+    def _request_ohlcv(
+        self, symbol: str, timeframe: str, limit: int, since: Optional[int] = None, until: Optional[int] = None
+    ) -> Optional[List[list]]:
+        """
+        向交易所請求原始 K 線（含重試、weight 限流與沙盒 fallback），失敗回傳 None
+
+        重試等待從本輪 retry 預算扣除（預算用完即放棄，不阻塞主循環）；
+        連續的連線層失敗（NetworkError / 連線錯誤 / 5xx）由 breaker 斷路，斷路期間直接回傳 None。
+        單一 symbol 的錯誤（BadSymbol、下架、4xx）不計入 breaker，不影響其他標的。
+        since / until 對應 Binance startTime / endTime（bar 開盤時間 ms，皆含）
+        """
+        extra = {} if until is None else {'until': until}
+        weight = kline_weight(limit)
+
+        def via_ccxt():
+            self.rate_limiter.acquire(weight)
+            if extra:
+                rows = self.exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=limit, params=extra)
+            elif since is None:
+                rows = self.exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
+            else:
+                rows = self.exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=limit)
+            self.rate_limiter.update_from_headers(getattr(self.exchange, 'last_response_headers', None))
+            return rows
+
+        def via_demo_fapi():
+            # Sandbox / Demo Trading：直接呼叫 demo-fapi REST API
+            params = {'symbol': self._symbol_id(symbol), 'interval': timeframe, 'limit': limit}
+            if since is not None:
+                params['startTime'] = since
+            if until is not None:
+                params['endTime'] = until
+            self.rate_limiter.acquire(weight)
+            resp = http_pool.get(f'{DEMO_FAPI_URL}/fapi/v1/klines', params=params, timeout=30)
+            self.rate_limiter.update_from_headers(resp.headers)
+            if resp.status_code >= 500 or resp.status_code == 429:
+                raise ConnectionError(f"demo-fapi HTTP {resp.status_code}")
+            if resp.status_code != 200:
+                return None
+            return [
+                [int(c[0]), float(c[1]), float(c[2]), float(c[3]), float(c[4]), float(c[5])]
+                for c in resp.json()
+            ]
+
+        attempts = [('ccxt', via_ccxt)]
+        if self._demo_fallback:
+            attempts.append(('demo-fapi', via_demo_fapi))
+
+        for attempt in range(self.max_retry):
+            if not self.breaker.allow():
+                retry.record('klines', 'rejected')
+                return None
+            try:
+                rows = self.capabilities.route('klines', attempts, env=self._env, ok=lambda rows: rows is not None)
+            except Exception as e:
+                if _is_transport_error(e):
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()      # 交易所有回應（symbol 層級錯誤）：連線正常
+                if len(attempts) == 1:
+                    return None     # 無 fallback 路徑：ccxt 失敗直接回報
+                # ccxt.NetworkError 或其他異常：在本輪重試預算內等待後重試，預算不足即放棄（本輪跳過）
                 is_network = ccxt is not None and isinstance(e, ccxt.NetworkError)
                 if attempt < self.max_retry - 1:
                     delay = self.retry_delay * (attempt + 1) if is_network else self.retry_delay
-                    time.sleep(delay)
-                else:
-                    break
+                    if retry.wait('klines', delay):
+                        continue
+                break
+            self.breaker.record_success()
+            return rows
+
+        return None
+
+    @property
+    def _demo_fallback(self) -> bool:
+        """是否有 demo-fapi 直連路徑（Demo Trading 期貨）"""
+        return self.trading_mode == 'future' and self.sandbox_mode
+
+    @property
+    def _env(self) -> str:
+        return 'demo' if self.sandbox_mode else 'live'
+
+    @staticmethod
+    def _symbol_id(symbol: str) -> str:
+        """'BTC/USDT' / 'BTC/USDT:USDT' / 'BTCUSDT' → 'BTCUSDT'"""
+        return symbol.split(':')[0].replace('/', '')
+
+    @staticmethod
+    def _tag(df: pd.DataFrame, symbol: str, timeframe: str) -> pd.DataFrame:
+        """在 df.attrs 標記來源（切片 / 加欄位後仍保留），供下游快取辨識 frame"""
+        if not df.empty:
+            df.attrs['symbol'] = symbol
+            df.attrs['timeframe'] = timeframe
+        return df
 
-        return pd.DataFrame()
+    @staticmethod
+    def _to_frame(ohlcv: Optional[List[list]]) -> pd.DataFrame:
+        if ohlcv is None or len(ohlcv) == 0:
+            return pd.DataFrame()
+        df = pd.DataFrame(ohlcv, columns=OHLCV_COLUMNS)
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+        return df
@@ -0,0 +1,186 @@
+"""
+共用 HTTP 連線池 — 每個 host 一個 requests.Session（keep-alive 重用 TCP+TLS 連線）
+
+模組層級的 requests.get / post 每次都新建連線，對 fapi 而言 TLS 握手是
+單次請求延遲的大宗。這裡讓所有 Binance / Telegram 請求走同一組 Session：
+
+    - 每個 scheme://host 一個 Session，HTTPAdapter 的 pool_maxsize 對齊並行執行緒數
+    - 連線錯誤（請求尚未送出）任何 method 都重試；502/503/504 只重試 GET
+      （下單 POST / DELETE 不自動重送，避免重複下單）
+    - 統計每個 host 的請求數與實際新建連線數（reuse = 1 - connections / requests）
+
+使用方式：
+    from trader.infrastructure import http_pool
+    resp = http_pool.get('https://fapi.binance.com/fapi/v1/time', timeout=10)
+    http_pool.stats()   # {'fapi.binance.com': {'requests': 12, 'connections': 1, 'reuse': 0.92}}
+"""
+
+import logging
+import threading
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = (502, 503, 504)
+
+
+class HttpPool:
+    """執行緒安全的 per-host Session 池"""
+
+    def __init__(self, pool_maxsize: int = 10, retries: int = 2, backoff_factor: float = 0.2):
+        """
+        Args:
+            pool_maxsize: 每個 host 保留的 keep-alive 連線數（應 >= 並行請求執行緒數）
+            retries: 連線錯誤 / GET 5xx 的自動重試次數
+            backoff_factor: 重試退避係數（urllib3 Retry）
+        """
+        self.pool_maxsize = pool_maxsize
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self._sessions: Dict[str, requests.Session] = {}
+        self._requests: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    # ==================== Session ====================
+
+    def session(self, url: str) -> requests.Session:
+        """取得 url 所屬 host 的 Session（首次使用時建立）"""
+        key = self._host_key(url)
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=self.pool_maxsize,
+                    max_retries=Retry(
+                        total=self.retries,
+                        connect=self.retries,
+                        read=0,
+                        status=self.retries,
+                        backoff_factor=self.backoff_factor,
+                        status_forcelist=RETRY_STATUSES,
+                        allowed_methods=frozenset({'GET'}),
+                        raise_on_status=False,
+                        respect_retry_after_header=True,
+                    ),
+                )
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                self._sessions[key] = session
+                self._requests[key] = 0
+            self._requests[key] += 1
+        return session
+
+    @staticmethod
+    def _host_key(url: str) -> str:
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}"
+
+    # ==================== 請求 ====================
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        return self.session(url).request(method.upper(), url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def delete(self, url: str, **kwargs) -> requests.Response:
+        return self.request('DELETE', url, **kwargs)
+
+    # ==================== 統計 / 生命週期 ====================
+
+    def stats(self) -> Dict[str, dict]:
+        """
+        每個 host 的連線重用統計
+
+        Returns:
+            {host: {'requests': 請求數, 'connections': 新建連線數, 'reuse': 重用比例}}
+        """
+        with self._lock:
+            items = list(self._sessions.items())
+            counts = dict(self._requests)
+        result = {}
+        for key, session in items:
+            connections = 0
+            for adapter in set(session.adapters.values()):
+                pools = adapter.poolmanager.pools
+                for pool_key in pools.keys():
+                    pool = pools.get(pool_key)
+                    connections += getattr(pool, 'num_connections', 0) if pool is not None else 0
+            total = counts.get(key, 0)
+            result[urlsplit(key).netloc] = {
+                'requests': total,
+                'connections': connections,
+                'reuse': round(1 - connections / total, 3) if total else 0.0,
+            }
+        return result
+
+    def close(self):
+        """關閉所有 Session（釋放 keep-alive 連線）"""
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+            self._requests.clear()
+        for session in sessions:
+            session.close()
+
+
+# ==================== 模組層級共用池 ====================
+
+_pool: Optional[HttpPool] = None
+_pool_lock = threading.Lock()
+
+
+def configure(pool_maxsize: int = 10, retries: int = 2, backoff_factor: float = 0.2) -> HttpPool:
+    """以新參數重建共用池（舊池的連線關閉）"""
+    global _pool
+    with _pool_lock:
+        old, _pool = _pool, HttpPool(pool_maxsize, retries, backoff_factor)
+    if old is not None:
+        old.close()
+    return _pool
+
+
+def pool() -> HttpPool:
+    """共用池（首次使用時以 Config 建立）"""
+    global _pool
+    if _pool is None:
+        from trader.config import Config
+        with _pool_lock:
+            if _pool is None:
+                _pool = HttpPool(pool_maxsize=Config.HTTP_POOL_MAXSIZE, retries=Config.HTTP_RETRIES)
+    return _pool
+
+
+def request(method: str, url: str, **kwargs) -> requests.Response:
+    return pool().request(method, url, **kwargs)
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return pool().get(url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    return pool().post(url, **kwargs)
+
+
+def delete(url: str, **kwargs) -> requests.Response:
+    return pool().delete(url, **kwargs)
+
+
+def stats() -> Dict[str, dict]:
+    return pool().stats()
+
+
+def close():
+    if _pool is not None:
+        _pool.close()
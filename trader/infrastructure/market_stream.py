@@ -0,0 +1,405 @@
+"""
+即時行情串流 — Binance Futures combined kline / markPrice WebSocket
+
+背景執行緒跑 asyncio 事件迴圈，訂閱：
+    <symbol>@kline_<timeframe>   K 線（形成中 bar 持續更新，x=True 為收盤）
+    <symbol>@markPrice@1s        標記價格（每秒推送，兼作心跳）
+
+於記憶體維護每個 (symbol, timeframe) 的 K 線與最新價，供 MarketDataProvider
+在串流健康時直接取用，取代每 cycle 的 REST 輪詢。
+
+可靠性：
+    - 斷線自動重連（指數退避），重連後以 REST 補齊斷線期間的 bar
+    - K 線出現跳號（漏掉 bar）時以 REST 補缺口
+    - 超過 stale_seconds 沒有任何訊息 → 視為停流，主動斷線重連；
+      個別 symbol 超時則該 symbol 不再由串流供應（回落 REST）
+
+依賴 aiohttp（ccxt 的相依套件）；未安裝時 start() 回傳 False，不影響 REST 路徑。
+
+使用方式：
+    stream = MarketStream(url=Config.MARKET_STREAM_URL, timeframes=['1h'])
+    provider.attach_stream(stream)      # 設定 REST 補資料來源
+    stream.set_symbols(['BTC/USDT', 'ETH/USDT'])
+    stream.start()
+"""
+
+import json
+import time
+import asyncio
+import logging
+import threading
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from trader.infrastructure.data_provider import OHLCV_COLUMNS, timeframe_to_ms
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+BINANCE_FUTURES_STREAM_URL = 'wss://fstream.binance.com'
+MAX_STREAMS_PER_CONNECTION = 200
+
+# backfill(symbol, timeframe, limit) → 最後 limit 根 OHLCV DataFrame（REST）
+Backfill = Callable[[str, str, int], pd.DataFrame]
+
+
+class _Series:
+    """單一 (symbol, timeframe) 的 K 線緩衝：ts → (open, high, low, close, volume)"""
+
+    __slots__ = ('bars', 'last_ts', 'synced')
+
+    def __init__(self):
+        self.bars: Dict[int, tuple] = {}
+        self.last_ts: Optional[int] = None
+        self.synced = False
+
+    def put(self, ts: int, row: tuple):
+        self.bars[ts] = row
+        if self.last_ts is None or ts > self.last_ts:
+            self.last_ts = ts
+
+    def trim(self, max_bars: int):
+        excess = len(self.bars) - max_bars
+        if excess > 0:
+            for ts in sorted(self.bars)[:excess]:
+                del self.bars[ts]
+
+
+class MarketStream:
+    """Binance combined stream 客戶端（執行緒安全的讀取介面）"""
+
+    def __init__(
+        self,
+        url: str = BINANCE_FUTURES_STREAM_URL,
+        timeframes: Iterable[str] = ('1h',),
+        backfill: Optional[Backfill] = None,
+        history_bars: int = 500,
+        max_bars: int = 1000,
+        stale_seconds: float = 30.0,
+        reconnect_min_delay: float = 1.0,
+        reconnect_max_delay: float = 60.0,
+        poll_seconds: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            url: stream base URL（正式網 wss://fstream.binance.com）
+            timeframes: 訂閱的 K 線週期
+            backfill: REST 補資料函式；None 時只能靠串流累積
+            history_bars: 新訂閱時以 REST 預載的 bar 數
+            max_bars: 每個序列保留的 bar 數上限
+            stale_seconds: 超過此秒數無訊息視為停流
+            reconnect_min_delay / reconnect_max_delay: 重連退避範圍（秒）
+            poll_seconds: 接收逾時輪詢間隔（檢查停流 / 訂閱變更）
+            clock: 健康檢查用時鐘（可注入，供測試使用）
+        """
+        self.url = url.rstrip('/')
+        self.timeframes = list(timeframes)
+        self.backfill = backfill
+        self.history_bars = history_bars
+        self.max_bars = max_bars
+        self.stale_seconds = stale_seconds
+        self.reconnect_min_delay = reconnect_min_delay
+        self.reconnect_max_delay = reconnect_max_delay
+        self.poll_seconds = poll_seconds
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, str], _Series] = {}
+        self._ids: Dict[str, str] = {}              # 'BTCUSDT' → 'BTC/USDT'
+        self._last_price: Dict[str, float] = {}
+        self._mark_price: Dict[str, float] = {}
+        self._symbol_event: Dict[str, float] = {}   # symbol → 最後訊息時間
+        self._last_message = 0.0
+        self._subscribed: Tuple[str, ...] = ()
+        self._pending_backfill: set = set()
+
+        self._connected = False
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {'messages': 0, 'reconnects': 0, 'backfills': 0, 'gaps': 0, 'stale': 0}
+
+    # ==================== 訂閱管理 ====================
+
+    def set_symbols(self, symbols: Iterable[str]) -> bool:
+        """
+        設定訂閱標的（變更時背景迴圈會重新連線訂閱）
+
+        Returns:
+            訂閱清單是否有變更
+        """
+        wanted = {s for s in symbols}
+        with self._lock:
+            current = set(self._ids.values())
+            if wanted == current:
+                return False
+            self._ids = {self._symbol_id(s): s for s in wanted}
+            self._series = {
+                (s, tf): self._series.get((s, tf)) or _Series()
+                for s in wanted for tf in self.timeframes
+            }
+            for s in current - wanted:
+                self._last_price.pop(s, None)
+                self._mark_price.pop(s, None)
+                self._symbol_event.pop(s, None)
+        return True
+
+    def stream_names(self) -> Tuple[str, ...]:
+        with self._lock:
+            ids = sorted(self._ids)
+        names = []
+        for symbol_id in ids:
+            lower = symbol_id.lower()
+            names.extend(f"{lower}@kline_{tf}" for tf in self.timeframes)
+            names.append(f"{lower}@markPrice@1s")
+        return tuple(names)
+
+    # ==================== 讀取 ====================
+
+    def is_healthy(self, symbol: Optional[str] = None) -> bool:
+        """連線中且近 stale_seconds 內有訊息（指定 symbol 時檢查該 symbol）"""
+        if not self._connected:
+            return False
+        now = self._clock()
+        if symbol is None:
+            return now - self._last_message <= self.stale_seconds
+        with self._lock:
+            last = self._symbol_event.get(symbol)
+        return last is not None and now - last <= self.stale_seconds
+
+    def candles(self, symbol: str, timeframe: str, limit: int) -> Optional[pd.DataFrame]:
+        """
+        最後 limit 根 K 線（含形成中 bar）
+
+        Returns:
+            DataFrame；串流不健康 / 尚未補齊 / 不足 limit 根 / 有缺口時回傳 None
+        """
+        if not self.is_healthy(symbol):
+            return None
+        tf_ms = timeframe_to_ms(timeframe)
+        with self._lock:
+            series = self._series.get((symbol, timeframe))
+            if series is None or not series.synced or len(series.bars) < limit:
+                return None
+            ts = np.array(sorted(series.bars)[-limit:], dtype=np.int64)
+            rows = [series.bars[t] for t in ts]
+        if len(ts) > 1 and (np.diff(ts) != tf_ms).any():
+            self._request_backfill((symbol, timeframe))
+            return None
+        df = pd.DataFrame(rows, columns=OHLCV_COLUMNS[1:])
+        df.insert(0, 'timestamp', pd.to_datetime(ts, unit='ms'))
+        return df
+
+    def last_price(self, symbol: str) -> Optional[float]:
+        """最新成交價（形成中 K 線的 close）；串流不健康時回傳 None"""
+        if not self.is_healthy(symbol):
+            return None
+        with self._lock:
+            return self._last_price.get(symbol)
+
+    def mark_price(self, symbol: str) -> Optional[float]:
+        if not self.is_healthy(symbol):
+            return None
+        with self._lock:
+            return self._mark_price.get(symbol)
+
+    # ==================== 生命週期 ====================
+
+    def start(self) -> bool:
+        """啟動背景串流執行緒；aiohttp 未安裝時回傳 False"""
+        if aiohttp is None:
+            logger.warning("aiohttp 未安裝，行情串流停用（使用 REST 輪詢）")
+            return False
+        if self._running:
+            return True
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='market-stream', daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self, timeout: float = 5.0):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self._connected = False
+
+    # ==================== 背景迴圈 ====================
+
+    def _run(self):
+        try:
+            asyncio.run(self._main())
+        except Exception as e:
+            logger.error(f"行情串流迴圈結束: {e}")
+        finally:
+            self._connected = False
+
+    async def _main(self):
+        delay = self.reconnect_min_delay
+        async with aiohttp.ClientSession() as session:
+            while self._running:
+                names = self.stream_names()
+                if not names:
+                    await asyncio.sleep(self.poll_seconds)
+                    continue
+                if len(names) > MAX_STREAMS_PER_CONNECTION:
+                    logger.warning(f"訂閱數 {len(names)} 超過單連線上限 {MAX_STREAMS_PER_CONNECTION}，只訂閱前段")
+                    names = names[:MAX_STREAMS_PER_CONNECTION]
+                try:
+                    async with session.ws_connect(f"{self.url}/stream?streams={'/'.join(names)}") as ws:
+                        self._subscribed = names
+                        self._connected = True
+                        self._last_message = self._clock()
+                        logger.info(f"行情串流已連線: {len(names)} streams")
+                        # 連線建立後才補資料，避免 REST 快照與串流之間漏 bar
+                        await self._backfill_all()
+                        delay = self.reconnect_min_delay
+                        await self._consume(ws)
+                except Exception as e:
+                    logger.warning(f"行情串流連線中斷: {e}")
+                finally:
+                    self._connected = False
+                if self._running:
+                    self.stats['reconnects'] += 1
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, self.reconnect_max_delay)
+
+    async def _consume(self, ws):
+        while self._running:
+            if self.stream_names()[:MAX_STREAMS_PER_CONNECTION] != self._subscribed:
+                logger.info("訂閱標的變更，重新連線")
+                return
+            try:
+                msg = await ws.receive(timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                if self._clock() - self._last_message > self.stale_seconds:
+                    self.stats['stale'] += 1
+                    logger.warning(f"行情串流 {self.stale_seconds:.0f}s 無訊息，重新連線")
+                    return
+                continue
+            if msg.type == aiohttp.WSMsgType.TEXT:
+                try:
+                    self._on_message(json.loads(msg.data))
+                except (ValueError, KeyError, TypeError) as e:
+                    logger.debug(f"行情串流訊息解析失敗: {e}")
+                if self._pending_backfill:
+                    await self._backfill_pending()
+            elif msg.type in (aiohttp.WSMsgType.CLOSE, aiohttp.WSMsgType.CLOSED,
+                              aiohttp.WSMsgType.CLOSING, aiohttp.WSMsgType.ERROR):
+                return
+
+    # ==================== 訊息處理 ====================
+
+    def _on_message(self, payload: dict):
+        """處理 combined stream 訊息：{'stream': ..., 'data': {...}}"""
+        data = payload.get('data', payload)
+        event = data.get('e')
+        now = self._clock()
+        self._last_message = now
+        self.stats['messages'] += 1
+        with self._lock:
+            symbol = self._ids.get(data.get('s', ''))
+            if symbol is None:
+                return
+            self._symbol_event[symbol] = now
+
+            if event == 'markPriceUpdate':
+                self._mark_price[symbol] = float(data['p'])
+                return
+            if event != 'kline':
+                return
+
+            k = data['k']
+            timeframe = k['i']
+            series = self._series.get((symbol, timeframe))
+            if series is None:
+                return
+            ts = int(k['t'])
+            if series.synced and series.last_ts is not None and ts > series.last_ts + timeframe_to_ms(timeframe):
+                self.stats['gaps'] += 1
+                self._pending_backfill.add((symbol, timeframe))
+            series.put(ts, (float(k['o']), float(k['h']), float(k['l']), float(k['c']), float(k['v'])))
+            series.trim(self.max_bars)
+            if timeframe == self.timeframes[0]:
+                self._last_price[symbol] = float(k['c'])
+
+    def _request_backfill(self, key: Tuple[str, str]):
+        with self._lock:
+            self._pending_backfill.add(key)
+
+    # ==================== REST 補資料 ====================
+
+    async def _backfill_all(self):
+        with self._lock:
+            keys = list(self._series)
+        loop = asyncio.get_running_loop()
+        for key in keys:
+            await loop.run_in_executor(None, self._backfill, key)
+
+    async def _backfill_pending(self):
+        with self._lock:
+            keys, self._pending_backfill = list(self._pending_backfill), set()
+        loop = asyncio.get_running_loop()
+        for key in keys:
+            await loop.run_in_executor(None, self._backfill, key)
+
+    def _backfill(self, key: Tuple[str, str]):
+        """以 REST 補齊序列：未同步 → 預載 history_bars；已同步 → 補最後 bar 之後的缺口"""
+        if self.backfill is None:
+            with self._lock:
+                if key in self._series:
+                    self._series[key].synced = True
+            return
+        symbol, timeframe = key
+        tf_ms = timeframe_to_ms(timeframe)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                return
+            if series.synced and series.bars:
+                # 從最早的缺口（無缺口時為最後一根）補到現在
+                keys = np.array(sorted(series.bars), dtype=np.int64)
+                gaps = np.flatnonzero(np.diff(keys) != tf_ms)
+                start = int(keys[gaps[0]] if len(gaps) else keys[-1])
+                missing = (int(time.time() * 1000) - start) // tf_ms + 2
+                limit = int(min(max(missing, 2), self.max_bars))
+            else:
+                limit = self.history_bars
+        try:
+            df = self.backfill(symbol, timeframe, limit)
+        except Exception as e:
+            logger.warning(f"{symbol} {timeframe} 串流補資料失敗: {e}")
+            return
+        if df is None or df.empty:
+            return
+        ts = pd.DatetimeIndex(df['timestamp']).as_unit('ms').asi8
+        values = df[OHLCV_COLUMNS[1:]].to_numpy(dtype=float)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                return
+            forming = series.last_ts
+            for t, row in zip(ts.tolist(), map(tuple, values.tolist())):
+                # 串流上的形成中 bar 比 REST 快照新，保留串流版本
+                if t != forming or t not in series.bars:
+                    series.put(t, row)
+            series.trim(self.max_bars)
+            # 補不到的舊缺口：只保留尾端連續段
+            keys = np.array(sorted(series.bars), dtype=np.int64)
+            gaps = np.flatnonzero(np.diff(keys) != tf_ms)
+            for t in keys[:gaps[-1] + 1].tolist() if len(gaps) else ():
+                del series.bars[t]
+            series.synced = True
+            if timeframe == self.timeframes[0] and symbol not in self._last_price:
+                self._last_price[symbol] = float(values[-1][3])
+        self.stats['backfills'] += 1
+
+    @staticmethod
+    def _symbol_id(symbol: str) -> str:
+        return symbol.split(':')[0].replace('/', '')
@@ -6,10 +6,10 @@ Telegram 通知器
 
 import html
 import logging
-import requests
 from typing import Dict
 
 from trader.config import Config
+from trader.infrastructure import http_pool
 
 logger = logging.getLogger(__name__)
 
@@ -29,7 +29,7 @@ class TelegramNotifier:
                 'text': message,
                 'parse_mode': 'HTML'
             }
-            resp = requests.post(url, data=payload, timeout=10)
+            resp = http_pool.post(url, data=payload, timeout=10)
             if not resp.ok:
                 logger.error(f"Telegram 發送失敗: {resp.status_code} {resp.text[:200]}")
         except Exception as e:
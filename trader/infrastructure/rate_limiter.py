@@ -0,0 +1,117 @@
+"""
+Binance request weight 限流器
+
+Binance 以「每分鐘 request weight」限流（Futures 2400/min，IP 共用）。
+WeightRateLimiter 以 token bucket 追蹤本地消耗，並以回應 header
+`X-MBX-USED-WEIGHT-1M` 校正（同 IP 的其他請求 / 其他程序也會消耗額度）。
+
+使用方式：
+    limiter = WeightRateLimiter(capacity=2000)
+    limiter.acquire(kline_weight(limit))     # 額度不足時阻塞等待
+    resp = ...
+    limiter.update_from_headers(resp.headers)
+"""
+
+import time
+import logging
+import threading
+from typing import Callable, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+USED_WEIGHT_HEADER = 'X-MBX-USED-WEIGHT-1M'
+
+
+def kline_weight(limit: int) -> int:
+    """Binance Futures /fapi/v1/klines 的 request weight（依 limit 分級）"""
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+
+class WeightRateLimiter:
+    """執行緒安全的 token bucket：容量 = 每分鐘可用 weight，線性回補"""
+
+    def __init__(
+        self,
+        capacity: int = 2000,
+        window_seconds: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        """
+        Args:
+            capacity: 每個 window 可用的 weight（Binance 上限 2400，保留安全邊際）
+            window_seconds: 回補週期（秒）
+            clock / sleep: 可注入，供測試使用
+        """
+        self.capacity = capacity
+        self.refill_rate = capacity / window_seconds
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = float(capacity)
+        self._updated = clock()
+        self._lock = threading.Lock()
+        self.total_waited = 0.0
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.refill_rate)
+        self._updated = now
+
+    def acquire(self, weight: int = 1) -> float:
+        """
+        取得 weight 額度，不足時阻塞至回補足夠
+
+        Returns:
+            實際等待秒數
+        """
+        weight = min(weight, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= weight:
+                    self._tokens -= weight
+                    self.total_waited += waited
+                    return waited
+                delay = (weight - self._tokens) / self.refill_rate
+            self._sleep(delay)
+            waited += delay
+
+    def sync_used_weight(self, used: int):
+        """以交易所回報的已用 weight 校正剩餘額度（只會往下修正）"""
+        with self._lock:
+            self._refill()
+            remaining = self.capacity - used
+            if remaining < self._tokens:
+                self._tokens = float(remaining)
+                if remaining <= 0:
+                    logger.warning(f"API weight {used} 已達上限 {self.capacity}，後續請求將等待回補")
+
+    def update_from_headers(self, headers: Optional[Mapping]):
+        """讀取 X-MBX-USED-WEIGHT-1M（大小寫不敏感）並校正"""
+        if not isinstance(headers, Mapping):
+            return
+        value = headers.get(USED_WEIGHT_HEADER)
+        if value is None:
+            for key, val in headers.items():
+                if isinstance(key, str) and key.lower() == USED_WEIGHT_HEADER.lower():
+                    value = val
+                    break
+        if value is None:
+            return
+        try:
+            self.sync_used_weight(int(value))
+        except (TypeError, ValueError):
+            pass
+
+    @property
+    def available(self) -> float:
+        with self._lock:
+            self._refill()
+            return self._tokens
@@ -0,0 +1,337 @@
+"""
+行情錄製 / 重播 — 以本地錄製檔取代交易所，做可重現的效能基準與回歸測試
+
+錄製（RecordingDataProvider）：
+    照常向交易所請求，並把每個回應連同時間戳寫入錄製檔：
+        ohlcv     fetch_ohlcv / fetch_candles（含 _many 批次版）的結果（key = symbol|timeframe|limit）
+        prices    fetch_prices 報價快照
+        ticker    exchange.fetch_ticker / fetch_tickers
+        account   exchange.fetch_balance / fetch_positions
+        order     exchange.create_order / cancel_order
+        signed    簽章請求（account / openOrders …，由 attach_client 掛上）
+
+重播（ReplayDataProvider）：
+    不連網。同一 (kind, key) 的回應依錄製順序逐一供應，用完後重複最後一筆；
+    各 key 的序列彼此獨立，並行抓取時順序不影響結果 → 同一錄製檔每次重播一致。
+    錄製檔沒有的請求：K 線回傳空 DataFrame、ccxt 呼叫拋 ExchangeError、簽章請求回 HTTP 404。
+
+錄製檔格式：gzip JSON Lines，每行 {"t": 錄製時間 ms, "k": kind, "key": key, "d": data}
+（K 線存 [[ts_ms, o, h, l, c, v], ...]）。程序中斷留下的殘缺尾巴在讀取時略過。
+
+使用方式：
+    python -m trader.bot --record .log/replay/day.rec.gz     # 錄製一天
+    python -m trader.bot --replay .log/replay/day.rec.gz     # 離線重播
+    python scanner/market_scanner.py --once --replay .log/replay/scan.rec.gz
+"""
+
+import copy
+import gzip
+import json
+import time
+import zlib
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import requests
+
+from trader.infrastructure.data_provider import MarketDataProvider
+
+try:
+    import ccxt
+    ReplayMiss = ccxt.ExchangeError
+except ImportError:
+    ccxt = None  # type: ignore
+    ReplayMiss = RuntimeError  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+# 錄製的 ccxt 方法 → kind
+EXCHANGE_KINDS = {
+    'fetch_ticker': 'ticker',
+    'fetch_tickers': 'ticker',
+    'fetch_balance': 'account',
+    'fetch_positions': 'account',
+    'create_order': 'order',
+    'cancel_order': 'order',
+}
+
+# 簽章請求 key 排除的參數（每次都不同）
+VOLATILE_PARAMS = ('timestamp', 'recvWindow', 'signature')
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, separators=(',', ':'), sort_keys=True, default=_json_default)
+
+
+def _call_key(name: str, args: tuple, kwargs: dict) -> str:
+    return f"{name}|{_dumps([list(args), kwargs])}"
+
+
+def _signed_key(method: str, endpoint: str, params: Optional[dict]) -> str:
+    stable = {k: v for k, v in (params or {}).items() if k not in VOLATILE_PARAMS}
+    return f"{method.upper()}|{endpoint}|{_dumps(stable)}"
+
+
+def _ohlcv_key(symbol: str, timeframe: str, limit: int) -> str:
+    return f"{symbol}|{timeframe}|{limit}"
+
+
+def _prices_key(symbols: Iterable[str]) -> str:
+    return ','.join(sorted(set(symbols)))
+
+
+def _rows(df: pd.DataFrame) -> List[list]:
+    if df is None or df.empty:
+        return []
+    ts = pd.DatetimeIndex(df['timestamp']).as_unit('ms').asi8.tolist()
+    values = df[['open', 'high', 'low', 'close', 'volume']].to_numpy(dtype=float).tolist()
+    return [[t] + v for t, v in zip(ts, values)]
+
+
+def _response(status: int, body: str) -> requests.Response:
+    resp = requests.Response()
+    resp.status_code = status
+    resp._content = body.encode('utf-8')
+    resp.encoding = 'utf-8'
+    return resp
+
+
+class DataArchive:
+    """錄製檔（mode='w' 追加寫入；mode='r' 載入後依 (kind, key) 序列供應）"""
+
+    def __init__(self, path: str, mode: str = 'r'):
+        if mode not in ('r', 'w'):
+            raise ValueError(f"mode 須為 'r' 或 'w': {mode}")
+        self.path = Path(path)
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, str], List[tuple]] = {}
+        self._cursor: Dict[Tuple[str, str], int] = {}
+        self._now_ms: Optional[int] = None
+        self._file = None
+        self.stats = {'records': 0, 'served': 0, 'misses': 0, 'repeats': 0}
+
+        if mode == 'w':
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = gzip.open(self.path, 'at', encoding='utf-8')
+        else:
+            self._load()
+
+    def _load(self):
+        try:
+            with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+                for line in f:
+                    record = json.loads(line)
+                    self._series.setdefault((record['k'], record['key']), []).append((record['t'], record['d']))
+                    self.stats['records'] += 1
+                    if self._now_ms is None or record['t'] < self._now_ms:
+                        self._now_ms = record['t']
+        except (EOFError, zlib.error, ValueError, KeyError) as e:
+            # 錄製中斷（未正常 close）：保留已完整讀出的記錄
+            logger.warning(f"錄製檔 {self.path.name} 尾端不完整，已載入 {self.stats['records']} 筆: {e}")
+
+    # ==================== 寫入 ====================
+
+    def write(self, kind: str, key: str, data, t_ms: Optional[int] = None):
+        t_ms = int(time.time() * 1000) if t_ms is None else t_ms
+        line = _dumps({'t': t_ms, 'k': kind, 'key': key, 'd': data})
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(line + '\n')
+            self.stats['records'] += 1
+
+    def flush(self):
+        """把已寫入的記錄推到磁碟（程序中斷時最多遺失上次 flush 之後的記錄）"""
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ==================== 重播 ====================
+
+    def next(self, kind: str, key: str):
+        """
+        依錄製順序取下一筆回應（用完後重複最後一筆）
+
+        Returns:
+            回應資料（副本）；沒有此 (kind, key) 的錄製時回傳 None
+        """
+        with self._lock:
+            series = self._series.get((kind, key))
+            if not series:
+                self.stats['misses'] += 1
+                return None
+            served = self._cursor.get((kind, key), 0)
+            self._cursor[(kind, key)] = served + 1
+            if served >= len(series):
+                self.stats['repeats'] += 1
+            self.stats['served'] += 1
+            t_ms, data = series[min(served, len(series) - 1)]
+            if self._now_ms is None or t_ms > self._now_ms:
+                self._now_ms = t_ms
+        return copy.deepcopy(data)
+
+    def now_ms(self) -> int:
+        """重播時間：已供應回應中最晚的錄製時間（尚未供應時為第一筆錄製時間；錄製模式為本地時間）"""
+        with self._lock:
+            if self.mode == 'r' and self._now_ms is not None:
+                return self._now_ms
+        return int(time.time() * 1000)
+
+    @property
+    def exhausted(self) -> bool:
+        """重播已超出錄製範圍（有 key 開始重複最後一筆）"""
+        return self.stats['repeats'] > 0
+
+    def keys(self, kind: Optional[str] = None) -> List[Tuple[str, str]]:
+        return [k for k in self._series if kind is None or k[0] == kind]
+
+    def rewind(self):
+        """重播游標歸零（同一錄製檔重複跑基準）"""
+        with self._lock:
+            self._cursor.clear()
+            self._now_ms = min((t for series in self._series.values() for t, _ in series[:1]), default=None)
+            self.stats.update(served=0, misses=0, repeats=0)
+
+
+# ==================== 交易所（ccxt）邊界 ====================
+
+class _RecordingExchange:
+    """ccxt exchange 代理：EXCHANGE_KINDS 內的呼叫結果寫入錄製檔，其餘原樣轉發"""
+
+    def __init__(self, exchange, archive: DataArchive):
+        object.__setattr__(self, '_exchange', exchange)
+        object.__setattr__(self, '_archive', archive)
+
+    def __getattr__(self, name):
+        attr = getattr(self._exchange, name)
+        kind = EXCHANGE_KINDS.get(name)
+        if kind is None or not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            self._archive.write(kind, _call_key(name, args, kwargs), result)
+            return result
+        return call
+
+    def __setattr__(self, name, value):
+        setattr(self._exchange, name, value)
+
+
+class ReplayExchange:
+    """離線 ccxt 替身：EXCHANGE_KINDS 內的呼叫由錄製檔供應，其他網路呼叫一律 ExchangeError"""
+
+    offline = True
+
+    def __init__(self, archive: DataArchive):
+        self._archive = archive
+        self.markets: dict = {}
+        self.has: dict = {}
+        self.options: dict = {}
+        self.urls: dict = {}
+        self.last_response_headers = None
+
+    def load_markets(self, *args, **kwargs) -> dict:
+        return self.markets
+
+    def set_leverage(self, *args, **kwargs):
+        return None
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        def call(*args, **kwargs):
+            kind = EXCHANGE_KINDS.get(name)
+            data = self._archive.next(kind, _call_key(name, args, kwargs)) if kind else None
+            if data is None:
+                raise ReplayMiss(f"replay: {name} 無錄製回應")
+            return data
+        return call
+
+
+# ==================== Provider ====================
+
+class RecordingDataProvider(MarketDataProvider):
+    """照常連交易所，並把 K 線 / 報價 / 帳戶回應寫入錄製檔"""
+
+    def __init__(self, exchange, archive: DataArchive, **kwargs):
+        super().__init__(_RecordingExchange(exchange, archive), **kwargs)
+        self.archive = archive
+
+    def _shared_fetch(self, symbol: str, timeframe: str, limit: int) -> pd.DataFrame:
+        df = super()._shared_fetch(symbol, timeframe, limit)
+        self.archive.write('ohlcv', _ohlcv_key(symbol, timeframe, limit), _rows(df.iloc[-limit:]))
+        return df
+
+    def fetch_prices(self, symbols: Iterable[str]) -> Dict[str, float]:
+        symbols = list(symbols)
+        prices = super().fetch_prices(symbols)
+        self.archive.write('prices', _prices_key(symbols), prices)
+        return prices
+
+    def attach_client(self, client):
+        """簽章請求（BinanceFuturesClient.signed_request）的回應一併錄製"""
+        request = client.signed_request
+
+        def signed_request(method: str, endpoint: str, params: dict = None, weight: int = 1):
+            key = _signed_key(method, endpoint, params)
+            response = request(method, endpoint, params, weight=weight)
+            self.archive.write('signed', key, {'status': response.status_code, 'body': response.text})
+            return response
+
+        client.signed_request = signed_request
+        return client
+
+
+class ReplayDataProvider(MarketDataProvider):
+    """由錄製檔供應所有資料（不連網、不寫 K 線倉庫）"""
+
+    def __init__(self, archive: DataArchive, **kwargs):
+        kwargs['candle_store'] = None
+        super().__init__(ReplayExchange(archive), **kwargs)
+        self.archive = archive
+
+    def _shared_fetch(self, symbol: str, timeframe: str, limit: int) -> pd.DataFrame:
+        rows = self.archive.next('ohlcv', _ohlcv_key(symbol, timeframe, limit))
+        return self._tag(self._to_frame(rows), symbol, timeframe)
+
+    def fetch_prices(self, symbols: Iterable[str]) -> Dict[str, float]:
+        return self.archive.next('prices', _prices_key(symbols)) or {}
+
+    def attach_stream(self, stream):
+        logger.info("重播模式不使用即時行情串流")
+
+    def attach_client(self, client):
+        """簽章請求改由錄製檔回應（未錄製的回 HTTP 404）"""
+        def signed_request(method: str, endpoint: str, params: dict = None, weight: int = 1):
+            data = self.archive.next('signed', _signed_key(method, endpoint, params))
+            if data is None:
+                return _response(404, _dumps({'code': -1, 'msg': f'replay: {endpoint} 無錄製回應'}))
+            return _response(data['status'], data['body'])
+
+        client.signed_request = signed_request
+        return client
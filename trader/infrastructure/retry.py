@@ -0,0 +1,217 @@
+"""
+重試控制 — 每輪重試等待預算、per-endpoint 斷路器、重試耗時統計
+
+原本 K 線 / 餘額請求失敗時就地 sleep 重試（retry_delay * (attempt + 1)），
+一個不穩的 symbol 可以讓整個主循環（包含出場監控）卡住十幾秒。
+
+RetryBudget：
+    一輪（一個 cycle 階段）內所有重試等待的總秒數上限。
+    預算用完後失敗一律立即放棄 → 該 symbol 本輪跳過，下一輪再試；
+    主循環不再被單一 symbol 的重試拖住。未設定預算時沿用原本的等待行為。
+    預算綁在執行緒上（掃描 / 監控可同時在不同執行緒各自計算）；
+    並行抓取的 worker 以 use_budget() 沿用呼叫端的預算。
+    預算帶 defer 時（排程任務），重試改交給排程器：wait() 不 sleep，
+    呼叫 defer(delay) 讓任務 delay 秒後重跑，本次立即放棄 → 失敗的請求
+    不會讓監控在持鎖狀態下卡住好幾秒。
+
+CircuitBreaker：
+    同一端點連續失敗 failure_threshold 次即斷路，reset_seconds 內請求直接失敗
+    （不打交易所、不等待）；之後放行一個探測請求，成功即恢復。
+
+統計（stats）：
+    每個端點的重試次數、重試等待秒數、因預算用完放棄的次數、被斷路器擋下的次數、
+    交給排程器延後重跑的次數。
+
+使用方式：
+    with retry.cycle_budget(Config.RETRY_BUDGET_SECONDS):
+        bot.scan_for_signals()
+
+    with retry.cycle_budget(Config.RETRY_BUDGET_SECONDS, defer=lambda d: scheduler.defer('monitor', d)):
+        bot.monitor_positions()
+
+    breaker = CircuitBreaker('klines', failure_threshold=5, reset_seconds=60)
+    if not breaker.allow():
+        retry.record('klines', 'rejected')
+        return None
+    ...
+    if not retry.wait('klines', delay):     # 預算不足 / 已交給排程器 → 不等待，放棄重試
+        break
+"""
+
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+_STAT_FIELDS = ('retries', 'waited', 'exhausted', 'rejected', 'deferred')
+
+
+class RetryBudget:
+    """一輪內可用於重試等待的總秒數（執行緒安全）；defer 不為 None 時重試交給排程器"""
+
+    def __init__(self, seconds: float, defer: Optional[Callable[[float], None]] = None):
+        self.seconds = seconds
+        self.defer = defer
+        self._left = float(seconds)
+        self._lock = threading.Lock()
+
+    def take(self, delay: float) -> bool:
+        """預扣 delay 秒；剩餘不足時回傳 False（不扣）"""
+        with self._lock:
+            if delay > self._left:
+                return False
+            self._left -= delay
+            return True
+
+    @property
+    def remaining(self) -> float:
+        with self._lock:
+            return self._left
+
+
+class CircuitBreaker:
+    """單一端點的斷路器：closed → 連續失敗達門檻 open → 冷卻後 half-open 探測"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_seconds: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            name: 端點名稱（log / 統計用）
+            failure_threshold: 連續失敗幾次斷路
+            reset_seconds: 斷路後多久放行探測請求
+            clock: 可注入，供測試使用
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self.opened = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def allow(self) -> bool:
+        """是否放行本次請求（half-open 時只放行一個探測請求）"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_seconds:
+                self._state = self.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info(f"斷路器 {self.name} 恢復")
+            self._state = self.CLOSED
+            self._failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or (
+                self._state == self.CLOSED and self._failures >= self.failure_threshold
+            ):
+                if self._state == self.CLOSED:
+                    self.opened += 1
+                    logger.warning(
+                        f"斷路器 {self.name} 斷開：連續失敗 {self._failures} 次，{self.reset_seconds:.0f}s 內直接略過"
+                    )
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+
+
+# ==================== 本輪預算（每執行緒） ====================
+
+_local = threading.local()
+_stats: Dict[str, Dict[str, float]] = {}
+_lock = threading.Lock()
+
+
+@contextmanager
+def use_budget(budget: Optional[RetryBudget]) -> Iterator[Optional[RetryBudget]]:
+    """在 with 區塊內於本執行緒沿用既有預算（並行 worker 共用呼叫端的預算）"""
+    previous = getattr(_local, 'budget', None)
+    _local.budget = budget
+    try:
+        yield budget
+    finally:
+        _local.budget = previous
+
+
+@contextmanager
+def cycle_budget(
+    seconds: Optional[float],
+    defer: Optional[Callable[[float], None]] = None,
+) -> Iterator[Optional[RetryBudget]]:
+    """
+    在 with 區塊內限制重試等待總秒數（None 表示不限，沿用原行為）
+
+    defer: 排程任務傳入 delay → 「delay 秒後重跑本任務」；設定後 wait() 一律不等待
+    """
+    if seconds is None and defer is not None:
+        seconds = float('inf')
+    with use_budget(RetryBudget(seconds, defer) if seconds is not None else None) as budget:
+        yield budget
+
+
+def current_budget() -> Optional[RetryBudget]:
+    return getattr(_local, 'budget', None)
+
+
+def record(endpoint: str, field: str, amount: float = 1):
+    with _lock:
+        stats = _stats.setdefault(endpoint, dict.fromkeys(_STAT_FIELDS, 0))
+        stats[field] += amount
+
+
+def wait(endpoint: str, delay: float) -> bool:
+    """
+    重試前等待 delay 秒（從本輪預算扣除）；預算帶 defer 時不等待，改由排程器 delay 秒後重跑
+
+    Returns:
+        True 已等待、可重試；False 預算不足或已交給排程器，呼叫方應放棄本次重試
+    """
+    budget = current_budget()
+    if budget is not None and budget.defer is not None:
+        budget.defer(delay)
+        record(endpoint, 'deferred')
+        logger.debug(f"{endpoint} 失敗，{delay:.1f}s 後由排程重跑")
+        return False
+    if budget is not None and not budget.take(delay):
+        record(endpoint, 'exhausted')
+        logger.debug(f"{endpoint} 本輪重試預算不足（剩 {budget.remaining:.1f}s），放棄重試")
+        return False
+    if delay > 0:
+        time.sleep(delay)
+    record(endpoint, 'retries')
+    record(endpoint, 'waited', delay)
+    return True
+
+
+def stats(reset: bool = False) -> Dict[str, Dict[str, float]]:
+    """{endpoint: {'retries', 'waited'（秒）, 'exhausted', 'rejected', 'deferred'}}"""
+    with _lock:
+        out = {endpoint: dict(values) for endpoint, values in _stats.items()}
+        if reset:
+            _stats.clear()
+    return out
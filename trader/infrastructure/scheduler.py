@@ -0,0 +1,308 @@
+"""
+多節奏排程 — 出場監控 / 信號掃描 / 倉位同步各自獨立週期，監控不排在掃描後面
+
+原本主循環依序執行 掃描 → 同步 → 監控 → Telegram，再 sleep CHECK_INTERVAL：
+40 個標的的慢掃描會讓持倉的止損檢查整整晚一個掃描時間。
+
+Scheduler：
+    每個 Task 有自己的 interval 與 priority，同時到期時 priority 小的先跑。
+    background=True 的任務（信號掃描）派發到專屬背景執行緒，主執行緒只負責派發，
+    因此主執行緒上的監控永遠不會等掃描；上一輪還沒跑完就再次到期時不重複派發
+    （記 overruns）。
+    下一次到期時間以「排定時間 + interval」推進（不累積漂移）；落後超過一個
+    interval 時直接對齊到現在，不補跑錯過的輪次。
+    設定 align 的任務（收盤對齊掃描）改由 align() 回傳距下次執行的秒數，
+    派發時與執行完後各計算一次（執行結果可影響下次時間，例如抓取失敗提早補掃）。
+    trigger(name) 讓任務立即到期並喚醒 sleep() 中的主循環（帳戶串流事件 → 立即同步）。
+    defer(name, delay) 讓任務 delay 秒後額外重跑一次（請求失敗的重試交給排程，任務本身不 sleep）；
+    重跑不推進原本的週期。背景任務執行中到期的重跑不會遺失，該輪結束後立即派發。
+
+延遲指標（stats）：
+    lateness = 實際開始時間 − 排定時間；每個任務記錄 runs / last / max / avg lateness、
+    平均執行時間、overruns、errors。
+
+使用方式：
+    scheduler = Scheduler()
+    scheduler.add('monitor', bot.monitor_positions, interval=5, priority=0)
+    scheduler.add('scan', bot.scan_for_signals, interval=60, priority=2, background=True)
+    while True:
+        scheduler.run_pending()
+        scheduler.sleep(scheduler.idle_seconds())
+"""
+
+import time
+import logging
+import threading
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Task:
+    """單一排程任務與其延遲統計"""
+
+    def __init__(
+        self,
+        name: str,
+        fn: Callable[[], None],
+        interval: float,
+        priority: int = 0,
+        background: bool = False,
+        next_run: float = 0.0,
+        align: Optional[Callable[[], float]] = None,
+    ):
+        self.name = name
+        self.fn = fn
+        self.interval = interval
+        self.priority = priority
+        self.background = background
+        self.next_run = next_run
+        self.align = align
+        self.retry_at: Optional[float] = None
+        self.running = False
+        self._thread: Optional[threading.Thread] = None
+        self._reset_stats()
+
+    @property
+    def due_at(self) -> float:
+        """下次執行時間：排定時間與重跑時間取早者"""
+        return self.next_run if self.retry_at is None else min(self.next_run, self.retry_at)
+
+    def _reset_stats(self):
+        self.runs = 0
+        self.errors = 0
+        self.overruns = 0
+        self.late_last = 0.0
+        self.late_max = 0.0
+        self.late_total = 0.0
+        self.duration_last = 0.0
+        self.duration_total = 0.0
+
+    def stats(self) -> Dict[str, float]:
+        runs = max(self.runs, 1)
+        return {
+            'runs': self.runs,
+            'late_last': self.late_last,
+            'late_max': self.late_max,
+            'late_avg': self.late_total / runs,
+            'duration_avg': self.duration_total / runs,
+            'overruns': self.overruns,
+            'errors': self.errors,
+        }
+
+
+class Scheduler:
+    """依各任務 interval / priority 執行；background 任務在獨立執行緒執行"""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            clock: 可注入，供測試使用
+        """
+        self._clock = clock
+        self._tasks: Dict[str, Task] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+
+    def add(
+        self,
+        name: str,
+        fn: Callable[[], None],
+        interval: float,
+        priority: int = 0,
+        background: bool = False,
+        delay: float = 0.0,
+        align: Optional[Callable[[], float]] = None,
+    ) -> Task:
+        """
+        登錄任務
+
+        Args:
+            name: 任務名稱（log / 統計用，不可重複）
+            fn: 無參數呼叫；拋出的例外記 error 後吞掉，不影響其他任務
+            interval: 週期（秒）
+            priority: 同時到期時數字小的先跑
+            background: True → 派發到背景執行緒，不佔用主執行緒
+            delay: 首次執行距今秒數（預設立即）
+            align: 回傳距下次執行秒數的函式，取代固定 interval（拋例外時退回 interval）
+        """
+        if name in self._tasks:
+            raise ValueError(f"任務 {name} 已存在")
+        task = Task(name, fn, interval, priority, background, next_run=self._clock() + delay, align=align)
+        self._tasks[name] = task
+        return task
+
+    @property
+    def tasks(self) -> List[Task]:
+        return list(self._tasks.values())
+
+    def due(self, now: Optional[float] = None) -> List[Task]:
+        """已到期的任務（priority、排定時間排序）"""
+        now = self._clock() if now is None else now
+        with self._lock:
+            due = [task for task in self._tasks.values() if task.due_at <= now]
+        return sorted(due, key=lambda task: (task.priority, task.due_at))
+
+    def run_pending(self) -> int:
+        """
+        執行所有已到期任務：前景任務依序在呼叫端執行緒執行，background 任務派發
+
+        每跑完一個前景任務都重新檢查到期清單，讓 priority 小的任務（監控）
+        能插在較慢的前景任務之間。
+
+        Returns:
+            本次執行 / 派發的任務數
+        """
+        count = 0
+        done = set()
+        while True:
+            pending = [task for task in self.due() if task.name not in done]
+            if not pending:
+                return count
+            task = pending[0]
+            done.add(task.name)
+            if task.background:
+                count += self._dispatch(task)
+            else:
+                self._run(task)
+                count += 1
+
+    def run_all(self):
+        """不看到期時間，依登錄順序在呼叫端執行緒各跑一次（重播 / 測試用，不開背景執行緒）"""
+        for task in self.tasks:
+            self._run(task)
+
+    def idle_seconds(self) -> float:
+        """距離最近一個任務到期的秒數（主循環 sleep 用）；執行中的背景任務不計"""
+        now = self._clock()
+        with self._lock:
+            upcoming = [task.due_at for task in self._tasks.values() if not task.running]
+        return max(0.0, min(upcoming) - now) if upcoming else 0.0
+
+    def trigger(self, name: str):
+        """讓任務立即到期並喚醒主循環（可從其他執行緒呼叫；未登錄的名稱忽略）"""
+        with self._lock:
+            task = self._tasks.get(name)
+            if task is None:
+                return
+            task.next_run = min(task.next_run, self._clock())
+        self._wake.set()
+
+    def defer(self, name: str, delay: float):
+        """任務 delay 秒後重跑一次（不改變原週期；可在任務執行中呼叫，未登錄的名稱忽略）"""
+        with self._lock:
+            task = self._tasks.get(name)
+            if task is None:
+                return
+            retry_at = self._clock() + max(0.0, delay)
+            task.retry_at = retry_at if task.retry_at is None else min(task.retry_at, retry_at)
+        self._wake.set()
+
+    def sleep(self, seconds: float) -> bool:
+        """等待 seconds 秒，期間有 trigger() 時提早返回；回傳是否被喚醒"""
+        woken = self._wake.wait(seconds)
+        self._wake.clear()
+        return woken
+
+    def _advance(self, task: Task, started: float):
+        if task.align is not None:
+            try:
+                delay = max(0.0, task.align())
+            except Exception as e:
+                logger.warning(f"排程任務 {task.name} 對齊失敗，改用固定週期: {e}")
+                delay = task.interval
+            with self._lock:
+                task.next_run = started + delay
+            return
+        with self._lock:
+            task.next_run += task.interval
+            if task.next_run <= started:
+                task.next_run = started + task.interval    # 落後一整個週期以上：不補跑
+
+    def _start(self, task: Task) -> float:
+        """開跑前：清掉已到期的重跑；排定時間已到才推進週期。回傳本輪排定時間"""
+        now = self._clock()
+        with self._lock:
+            scheduled = task.due_at
+            task.retry_at = None
+            periodic = task.next_run <= now
+        if periodic:
+            self._advance(task, now)
+        return scheduled
+
+    def _run(self, task: Task):
+        scheduled = self._start(task)
+        self._execute(task, scheduled)
+
+    def _execute(self, task: Task, scheduled: float):
+        started = self._clock()
+        try:
+            task.fn()
+        except Exception as e:
+            task.errors += 1
+            logger.error(f"排程任務 {task.name} 錯誤: {e}")
+        finally:
+            finished = self._clock()
+            self._record(task, started - scheduled, finished - started)
+            if task.align is not None:
+                self._advance(task, finished)
+
+    def _dispatch(self, task: Task) -> int:
+        with self._lock:
+            busy = task.running
+            task.running = True
+        if busy:
+            self._skip(task)
+            return 0
+        scheduled = self._start(task)
+
+        def work():
+            try:
+                self._execute(task, scheduled)
+            finally:
+                with self._lock:
+                    task.running = False
+                    retry_pending = task.retry_at is not None
+                if retry_pending:
+                    self._wake.set()                # 執行中到期的重跑：結束後立即派發
+
+        task._thread = threading.Thread(target=work, name=f'sched-{task.name}', daemon=True)
+        task._thread.start()
+        return 1
+
+    def _skip(self, task: Task):
+        """上一輪尚未完成：錯過的週期記 overrun 並推進；到期的重跑保留到本輪結束後再派發"""
+        now = self._clock()
+        with self._lock:
+            periodic = task.next_run <= now
+            if periodic:
+                task.overruns += 1
+        if periodic:
+            logger.debug(f"排程任務 {task.name} 上一輪尚未完成，略過本輪")
+            self._advance(task, now)
+
+    def _record(self, task: Task, lateness: float, duration: float):
+        lateness = max(0.0, lateness)
+        with self._lock:
+            task.runs += 1
+            task.late_last = lateness
+            task.late_max = max(task.late_max, lateness)
+            task.late_total += lateness
+            task.duration_last = duration
+            task.duration_total += duration
+
+    def join(self, timeout: Optional[float] = None):
+        """等待背景任務結束（關機 / 測試用）"""
+        for task in self.tasks:
+            thread = task._thread
+            if thread is not None:
+                thread.join(timeout)
+
+    def stats(self, reset: bool = False) -> Dict[str, Dict[str, float]]:
+        """{task: {'runs', 'late_last', 'late_max', 'late_avg', 'duration_avg'（秒）, 'overruns', 'errors'}}"""
+        with self._lock:
+            out = {task.name: task.stats() for task in self._tasks.values()}
+            if reset:
+                for task in self._tasks.values():
+                    task._reset_stats()
+        return out
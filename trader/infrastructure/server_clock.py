@@ -0,0 +1,98 @@
+"""
+交易所時間對齊 — 以伺服器時間推算 K 線收盤時刻
+
+K 線以交易所時間（UTC）切 bar。本地時鐘若快 / 慢幾秒，「收盤後 3 秒掃描」
+可能在收盤前就觸發（抓到的仍是形成中 bar）或白白多等。
+
+ServerClock：
+    offset = 伺服器時間 − 本地往返中點；sync() 量測，resync_seconds 內重複呼叫直接沿用。
+    量測失敗或往返過久（> max_rtt_ms，中點誤差大）時保留上次的 offset。
+    沒有 fetch_server_ms（重播 / 測試）時 offset 固定為 0，即本地時鐘；
+    重播另外傳入 local_ms=archive.now_ms，以錄製時間取代本地時鐘。
+
+使用方式：
+    clock = ServerClock(lambda: exchange.fetch_time())
+    clock.sync()
+    delay = clock.seconds_until_close('1h', after=3)      # 下一根 1h 收盤後 3 秒
+    closed = clock.last_closed_bar_ms('1h')               # 最後一根已收盤 bar 開盤時間
+"""
+
+import time
+import logging
+import threading
+from typing import Callable, Optional
+
+from trader.infrastructure.data_provider import timeframe_to_ms
+
+logger = logging.getLogger(__name__)
+
+
+class ServerClock:
+    """本地時鐘 + 交易所時間偏移（執行緒安全）"""
+
+    def __init__(
+        self,
+        fetch_server_ms: Optional[Callable[[], int]] = None,
+        resync_seconds: float = 3600.0,
+        max_rtt_ms: float = 2000.0,
+        local_ms: Optional[Callable[[], float]] = None,
+    ):
+        """
+        Args:
+            fetch_server_ms: 回傳交易所時間（ms）；None 表示不校正
+            resync_seconds: 校正有效期，過期後下一次 sync() 重新量測
+            max_rtt_ms: 往返超過此毫秒數的量測不採用
+            local_ms: 本地時間（ms）；None 表示 time.time()，重播時傳入錄製時間
+        """
+        self.fetch_server_ms = fetch_server_ms
+        self.resync_seconds = resync_seconds
+        self.max_rtt_ms = max_rtt_ms
+        self.local_ms = local_ms
+        self.offset_ms = 0.0
+        self._synced_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def sync(self, force: bool = False) -> float:
+        """量測交易所時間偏移（有效期內直接回傳上次結果）；回傳 offset_ms"""
+        if self.fetch_server_ms is None:
+            return self.offset_ms
+        with self._lock:
+            fresh = self._synced_at is not None and time.monotonic() - self._synced_at < self.resync_seconds
+            if fresh and not force:
+                return self.offset_ms
+            self._synced_at = time.monotonic()      # 失敗也算一次，避免每次呼叫都打 API
+
+        t0 = time.time() * 1000
+        try:
+            server_ms = self.fetch_server_ms()
+        except Exception as e:
+            logger.warning(f"交易所時間校正失敗，沿用 offset {self.offset_ms:+.0f}ms: {e}")
+            return self.offset_ms
+        t1 = time.time() * 1000
+        if not isinstance(server_ms, (int, float)) or t1 - t0 > self.max_rtt_ms:
+            logger.debug(f"交易所時間量測不採用（server={server_ms!r} rtt={t1 - t0:.0f}ms）")
+            return self.offset_ms
+
+        offset = server_ms - (t0 + t1) / 2
+        if abs(offset - self.offset_ms) >= 1000:
+            logger.info(f"交易所時間偏移 {offset:+.0f}ms（往返 {t1 - t0:.0f}ms）")
+        self.offset_ms = offset
+        return offset
+
+    def now_ms(self) -> int:
+        """交易所時間（ms）"""
+        local = self.local_ms() if self.local_ms is not None else time.time() * 1000
+        return int(local + self.offset_ms)
+
+    def last_closed_bar_ms(self, timeframe: str) -> int:
+        """最後一根已收盤 bar 的開盤時間（ms，UTC 對齊）"""
+        tf_ms = timeframe_to_ms(timeframe)
+        return (self.now_ms() // tf_ms) * tf_ms - tf_ms
+
+    def seconds_until_close(self, timeframe: str, after: float = 0.0) -> float:
+        """距離下一個「bar 收盤 + after 秒」的秒數（剛收盤未滿 after 秒時指向本次收盤）"""
+        tf_ms = timeframe_to_ms(timeframe)
+        after_ms = after * 1000
+        now = self.now_ms()
+        target = ((now - after_ms) // tf_ms + 1) * tf_ms + after_ms
+        return (target - now) / 1000
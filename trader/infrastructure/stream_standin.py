@@ -0,0 +1,286 @@
+"""
+本地行情串流替身 — 以錄製的 K 線重播 Binance Futures combined stream
+
+離線測試 / 開發用：MarketStream 連到這裡時，收到的訊息格式與
+wss://fstream.binance.com/stream?streams=... 相同（kline / markPriceUpdate）。
+
+重播模型：
+    伺服器維護一個「市場時間」，每 tick 前進 step（預設為最小週期）。
+    每個序列在市場時間所在的 bar 為形成中 bar（x=False）；bar 換根時先送出
+    上一根的收盤事件（x=True）。每 tick 對訂閱中的 symbol 送 markPrice。
+    klines() 提供同一時間點的 REST 等價資料，供串流補資料使用。
+
+測試控制：
+    advance(n)          手動前進 n tick（interval=None 時為手動模式）
+    drop_connections()  斷開所有連線（測重連 + 缺口補資料）
+    mute(True)          市場時間照走但不送訊息（測停流偵測）
+
+命令列（重播本地 K 線倉庫）：
+    python -m trader.infrastructure.stream_standin --store .log/candles \\
+        --symbols BTC/USDT ETH/USDT --timeframe 1h --interval 1.0 --port 8765
+"""
+
+import json
+import asyncio
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from trader.infrastructure.data_provider import OHLCV_COLUMNS, timeframe_to_ms
+
+try:
+    from aiohttp import web, WSMsgType
+except ImportError:
+    web = None  # type: ignore
+    WSMsgType = None  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+
+class StreamStandIn:
+    """以錄製 K 線重播 combined stream 的本地 WebSocket 伺服器（背景執行緒）"""
+
+    def __init__(
+        self,
+        candles: Dict[Tuple[str, str], pd.DataFrame],
+        start_ms: Optional[int] = None,
+        step_ms: Optional[int] = None,
+        interval: Optional[float] = None,
+        host: str = '127.0.0.1',
+        port: int = 0,
+    ):
+        """
+        Args:
+            candles: {(symbol, timeframe): OHLCV DataFrame}（錄製資料）
+            start_ms: 起始市場時間（預設為各序列第一根之後 200 根處）
+            step_ms: 每 tick 前進的毫秒數（預設為最小週期）
+            interval: 自動 tick 間隔秒數；None 為手動模式（呼叫 advance）
+            host / port: 監聽位址（port=0 自動選擇）
+        """
+        if web is None:
+            raise RuntimeError("stream stand-in 需要 aiohttp")
+        self._series: Dict[Tuple[str, str], Tuple[np.ndarray, np.ndarray]] = {}
+        for (symbol, timeframe), df in candles.items():
+            ts = pd.DatetimeIndex(df['timestamp']).as_unit('ms').asi8
+            self._series[(symbol, timeframe)] = (ts, df[OHLCV_COLUMNS[1:]].to_numpy(dtype=float))
+        self._ids = {symbol.split(':')[0].replace('/', '').lower(): symbol for symbol, _ in candles}
+
+        min_tf = min(timeframe_to_ms(tf) for _, tf in candles)
+        self.step_ms = step_ms or min_tf
+        first = max(ts[0] for ts, _ in self._series.values())
+        self.now_ms = start_ms if start_ms is not None else int(first + 200 * min_tf)
+        self.interval = interval
+        self.host = host
+        self.port = port
+
+        self._muted = False
+        self._clients: Dict[object, dict] = {}   # ws → {'series': [...], 'symbols': [...], 'forming': {}}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._runner = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self.connections = 0
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    # ==================== 生命週期 ====================
+
+    def start(self) -> 'StreamStandIn':
+        self._thread = threading.Thread(target=self._run, name='stream-standin', daemon=True)
+        self._thread.start()
+        self._ready.wait(5)
+        return self
+
+    def stop(self):
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result(5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(5)
+        self._loop = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_until_complete(self._serve())
+        if self.interval:
+            self._loop.create_task(self._auto_tick())
+        self._ready.set()
+        self._loop.run_forever()
+
+    async def _serve(self):
+        app = web.Application()
+        app.router.add_get('/stream', self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+
+    async def _shutdown(self):
+        for ws in list(self._clients):
+            await ws.close()
+        await self._runner.cleanup()
+
+    async def _auto_tick(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self._tick()
+
+    # ==================== 測試控制 ====================
+
+    def advance(self, n: int = 1):
+        """市場時間前進 n tick，並推送對應事件"""
+        for _ in range(n):
+            asyncio.run_coroutine_threadsafe(self._tick(), self._loop).result(5)
+
+    def drop_connections(self):
+        async def _drop():
+            for ws in list(self._clients):
+                await ws.close()
+        asyncio.run_coroutine_threadsafe(_drop(), self._loop).result(5)
+
+    def mute(self, muted: bool = True):
+        self._muted = muted
+
+    def klines(self, symbol: str, timeframe: str, limit: int) -> pd.DataFrame:
+        """REST 等價資料：截至目前市場時間的最後 limit 根（含形成中 bar）"""
+        ts, values = self._series[(symbol, timeframe)]
+        end = int(np.searchsorted(ts, self.now_ms, side='right'))
+        start = max(0, end - limit)
+        df = pd.DataFrame(values[start:end], columns=OHLCV_COLUMNS[1:])
+        df.insert(0, 'timestamp', pd.to_datetime(ts[start:end], unit='ms'))
+        return df
+
+    # ==================== 連線 / 推送 ====================
+
+    async def _handle(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        series, symbols = [], []
+        for name in request.query.get('streams', '').split('/'):
+            symbol_id, _, kind = name.partition('@')
+            symbol = self._ids.get(symbol_id)
+            if symbol is None:
+                continue
+            if kind.startswith('kline_') and (symbol, kind[6:]) in self._series:
+                series.append((symbol, kind[6:]))
+            elif kind.startswith('markPrice'):
+                symbols.append(symbol)
+        self._clients[ws] = {'series': series, 'symbols': symbols, 'forming': {}}
+        self.connections += 1
+        try:
+            await self._push(ws, self._clients[ws])
+            async for msg in ws:
+                if msg.type == WSMsgType.ERROR:
+                    break
+        finally:
+            self._clients.pop(ws, None)
+        return ws
+
+    async def _tick(self):
+        self.now_ms += self.step_ms
+        for ws, state in list(self._clients.items()):
+            try:
+                await self._push(ws, state)
+            except (ConnectionError, RuntimeError):
+                self._clients.pop(ws, None)
+
+    async def _push(self, ws, state: dict):
+        if self._muted or ws.closed:
+            return
+        for symbol, timeframe in state['series']:
+            ts, values = self._series[(symbol, timeframe)]
+            i = int(np.searchsorted(ts, self.now_ms, side='right')) - 1
+            if i < 0:
+                continue
+            prev = state['forming'].get((symbol, timeframe))
+            if prev is not None and prev < i:
+                await self._send_kline(ws, symbol, timeframe, prev, closed=True)
+            await self._send_kline(ws, symbol, timeframe, i, closed=False)
+            state['forming'][(symbol, timeframe)] = i
+        for symbol in state['symbols']:
+            closes = [self._close_at(symbol, tf) for s, tf in self._series if s == symbol]
+            closes = [c for c in closes if c is not None]
+            if closes:
+                await ws.send_str(json.dumps({
+                    'stream': f"{self._symbol_id(symbol).lower()}@markPrice@1s",
+                    'data': {'e': 'markPriceUpdate', 'E': self.now_ms,
+                             's': self._symbol_id(symbol), 'p': f"{closes[0]:.8f}"},
+                }))
+
+    async def _send_kline(self, ws, symbol: str, timeframe: str, i: int, closed: bool):
+        ts, values = self._series[(symbol, timeframe)]
+        o, h, l, c, v = values[i].tolist()
+        symbol_id = self._symbol_id(symbol)
+        await ws.send_str(json.dumps({
+            'stream': f"{symbol_id.lower()}@kline_{timeframe}",
+            'data': {
+                'e': 'kline', 'E': self.now_ms, 's': symbol_id,
+                'k': {
+                    't': int(ts[i]), 'T': int(ts[i]) + timeframe_to_ms(timeframe) - 1,
+                    's': symbol_id, 'i': timeframe,
+                    'o': repr(o), 'h': repr(h), 'l': repr(l), 'c': repr(c), 'v': repr(v),
+                    'x': closed,
+                },
+            },
+        }))
+
+    def _close_at(self, symbol: str, timeframe: str) -> Optional[float]:
+        ts, values = self._series[(symbol, timeframe)]
+        i = int(np.searchsorted(ts, self.now_ms, side='right')) - 1
+        return float(values[i][3]) if i >= 0 else None
+
+    @staticmethod
+    def _symbol_id(symbol: str) -> str:
+        return symbol.split(':')[0].replace('/', '')
+
+
+def main(argv: Optional[List[str]] = None):
+    import argparse
+    import time
+    from trader.infrastructure.candle_store import CandleStore
+
+    parser = argparse.ArgumentParser(description='本地行情串流替身（重播 K 線倉庫）')
+    parser.add_argument('--store', required=True, help='CandleStore 目錄')
+    parser.add_argument('--symbols', nargs='+', required=True)
+    parser.add_argument('--timeframe', default='1h')
+    parser.add_argument('--interval', type=float, default=1.0, help='每 tick 秒數')
+    parser.add_argument('--start-bars', type=int, default=500, help='從第幾根開始重播（之前的供 REST 補資料）')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args(argv)
+
+    store = CandleStore(args.store)
+    candles = {}
+    for symbol in args.symbols:
+        df = store.load_frame(symbol, args.timeframe, store.max_records or 10 ** 9)
+        if df.empty:
+            parser.error(f"{symbol} {args.timeframe} 無錄製資料")
+        candles[(symbol, args.timeframe)] = df
+    first = max(pd.Timestamp(df['timestamp'].iloc[0]).value // 1_000_000 for df in candles.values())
+    start_ms = int(first + args.start_bars * timeframe_to_ms(args.timeframe))
+
+    server = StreamStandIn(candles, start_ms=start_ms, interval=args.interval, host=args.host, port=args.port)
+    server.start()
+    print(f"stream stand-in: {server.url}/stream  (Ctrl+C 結束)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -10,9 +10,8 @@ import time
 from datetime import datetime, timezone
 from typing import Optional
 
-import requests
-
 from trader.config import Config
+from trader.infrastructure import http_pool
 
 logger = logging.getLogger(__name__)
 
@@ -30,7 +29,7 @@ class TelegramCommandHandler:
         self.base_url = f"https://api.telegram.org/bot{Config.TELEGRAM_BOT_TOKEN}"
 
     def poll(self):
-        """檢查新訊息並處理指令。主 loop 每 cycle 呼叫一次。"""
+        """檢查新訊息並處理指令。排程每 TELEGRAM_POLL_INTERVAL 秒呼叫一次。"""
         if not Config.TELEGRAM_ENABLED:
             return
 
@@ -49,7 +48,7 @@ class TelegramCommandHandler:
             'timeout': 0,
             'allowed_updates': '["message"]',
         }
-        resp = requests.get(url, params=params, timeout=5)
+        resp = http_pool.get(url, params=params, timeout=5)
         if not resp.ok:
             return []
 
@@ -102,7 +101,7 @@ class TelegramCommandHandler:
             'parse_mode': 'HTML',
         }
         try:
-            resp = requests.post(url, data=payload, timeout=10)
+            resp = http_pool.post(url, data=payload, timeout=10)
             if not resp.ok:
                 logger.error(f"Telegram 回覆失敗: {resp.status_code}")
         except Exception as e:
@@ -112,7 +111,7 @@ class TelegramCommandHandler:
 
     def _cmd_positions(self) -> str:
         """列出目前所有開倉部位"""
-        trades = self.bot.active_trades
+        trades = dict(self.bot.active_trades)     # 副本：監控 / 掃描執行緒可能同時增刪持倉
         if not trades:
             return "<b>目前無開倉部位</b>"
 
@@ -145,7 +144,7 @@ class TelegramCommandHandler:
 
     def _cmd_status(self) -> str:
         """Bot 運行狀態"""
-        trades = self.bot.active_trades
+        trades = dict(self.bot.active_trades)
         active_count = len(trades)
 
         # 啟動時間
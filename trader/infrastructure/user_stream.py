@@ -0,0 +1,194 @@
+"""
+帳戶串流 — Binance Futures listenKey user-data WebSocket
+
+原本倉位同步每 SYNC_INTERVAL 秒打一次簽章 REST 查持倉，只為了知道硬止損
+有沒有觸發；偵測延遲最長一個同步週期。這裡改由交易所主動推送：
+    ACCOUNT_UPDATE        餘額 / 持倉變動（成交、資金費、硬止損觸發）
+    ORDER_TRADE_UPDATE    訂單狀態（新單、成交、取消、過期）
+    listenKeyExpired      listenKey 失效 → 重新申請並重連
+
+收到的事件依序交給 listener（AccountState.apply_event、bot 的同步觸發），
+listener 在串流執行緒上執行，例外記 log 後吞掉。
+
+生命週期：
+    POST /fapi/v1/listenKey 取得 key → 連線 {url}/ws/{key}
+    每 keepalive_seconds PUT 延長（key 60 分鐘失效）；延長失敗視為 key 失效，重新申請
+    斷線自動重連（指數退避）；每次連線成功送出本地事件 {'e': 'streamConnected'}
+    （斷線期間的事件已遺失，listener 據此重新對帳）
+    user-data 串流閒置時沒有任何訊息，健康與否以連線狀態判斷（aiohttp heartbeat ping 偵測半開連線）
+
+依賴 aiohttp（ccxt 的相依套件）；未安裝時 start() 回傳 False，維持 REST 輪詢。
+
+使用方式：
+    stream = UserDataStream(bot._user_stream_key, url=Config.USER_STREAM_URL)
+    account.attach_stream(stream, reconcile_seconds=120)
+    stream.add_listener(on_event)
+    stream.start()
+"""
+
+import json
+import time
+import asyncio
+import logging
+import threading
+from typing import Callable, List, Optional
+
+from trader.infrastructure.market_stream import BINANCE_FUTURES_STREAM_URL
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+# listen_key(method) → 'POST' 回傳 listenKey；'PUT' / 'DELETE' 成功回傳字串（可為空）；失敗回 None
+ListenKey = Callable[[str], Optional[str]]
+
+
+class UserDataStream:
+    """listenKey user-data stream 客戶端（背景執行緒）"""
+
+    def __init__(
+        self,
+        listen_key: ListenKey,
+        url: str = BINANCE_FUTURES_STREAM_URL,
+        keepalive_seconds: float = 1800.0,
+        heartbeat_seconds: float = 30.0,
+        reconnect_min_delay: float = 1.0,
+        reconnect_max_delay: float = 60.0,
+        poll_seconds: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            listen_key: listenKey REST 呼叫（建立 / 延長 / 關閉）
+            url: stream base URL（正式網 wss://fstream.binance.com）
+            keepalive_seconds: listenKey 延長間隔（秒，須小於 60 分鐘）
+            heartbeat_seconds: WebSocket ping 間隔（秒），收不到 pong 即斷線重連
+            reconnect_min_delay / reconnect_max_delay: 重連退避範圍（秒）
+            poll_seconds: 接收逾時輪詢間隔（檢查 keepalive / 停止）
+            clock: keepalive 計時用時鐘（可注入，供測試使用）
+        """
+        self.listen_key = listen_key
+        self.url = url.rstrip('/')
+        self.keepalive_seconds = keepalive_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.reconnect_min_delay = reconnect_min_delay
+        self.reconnect_max_delay = reconnect_max_delay
+        self.poll_seconds = poll_seconds
+        self._clock = clock
+
+        self._listeners: List[Callable[[dict], None]] = []
+        self._key: Optional[str] = None
+        self._keepalive_at = 0.0
+        self._connected = False
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {'events': 0, 'reconnects': 0, 'keepalives': 0, 'expired': 0}
+
+    def add_listener(self, fn: Callable[[dict], None]):
+        """登錄事件處理函式（依登錄順序呼叫）"""
+        self._listeners.append(fn)
+
+    def is_healthy(self) -> bool:
+        """連線中（閒置帳戶本來就沒有訊息，不以訊息間隔判斷）"""
+        return self._connected
+
+    # ==================== 生命週期 ====================
+
+    def start(self) -> bool:
+        """啟動背景串流執行緒；aiohttp 未安裝時回傳 False"""
+        if aiohttp is None:
+            logger.warning("aiohttp 未安裝，帳戶串流停用（使用 REST 輪詢）")
+            return False
+        if self._running:
+            return True
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='user-stream', daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self, timeout: float = 5.0):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self._connected = False
+
+    # ==================== 背景迴圈 ====================
+
+    def _run(self):
+        try:
+            asyncio.run(self._main())
+        except Exception as e:
+            logger.error(f"帳戶串流迴圈結束: {e}")
+        finally:
+            self._connected = False
+
+    async def _main(self):
+        loop = asyncio.get_running_loop()
+        delay = self.reconnect_min_delay
+        async with aiohttp.ClientSession() as session:
+            while self._running:
+                key = await loop.run_in_executor(None, self.listen_key, 'POST')
+                if key:
+                    try:
+                        async with session.ws_connect(f"{self.url}/ws/{key}", heartbeat=self.heartbeat_seconds) as ws:
+                            self._key = key
+                            self._keepalive_at = self._clock()
+                            # 先讓 listener 重新對帳，再回報健康（避免讀到斷線前的快照）
+                            self._dispatch({'e': 'streamConnected'})
+                            self._connected = True
+                            logger.info("帳戶串流已連線")
+                            delay = self.reconnect_min_delay
+                            await self._consume(ws)
+                    except Exception as e:
+                        logger.warning(f"帳戶串流連線中斷: {e}")
+                    finally:
+                        self._connected = False
+                else:
+                    logger.warning("listenKey 申請失敗，稍後重試")
+                if self._running:
+                    self.stats['reconnects'] += 1
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, self.reconnect_max_delay)
+        if self._key:
+            await loop.run_in_executor(None, self.listen_key, 'DELETE')
+            self._key = None
+
+    async def _consume(self, ws):
+        loop = asyncio.get_running_loop()
+        while self._running:
+            if self._clock() - self._keepalive_at >= self.keepalive_seconds:
+                self._keepalive_at = self._clock()
+                if await loop.run_in_executor(None, self.listen_key, 'PUT') is None:
+                    logger.warning("listenKey 延長失敗，重新申請")
+                    return
+                self.stats['keepalives'] += 1
+            try:
+                msg = await ws.receive(timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                continue
+            if msg.type == aiohttp.WSMsgType.TEXT:
+                try:
+                    event = json.loads(msg.data)
+                except ValueError as e:
+                    logger.debug(f"帳戶串流訊息解析失敗: {e}")
+                    continue
+                if event.get('e') == 'listenKeyExpired':
+                    self.stats['expired'] += 1
+                    logger.warning("listenKey 已失效，重新申請")
+                    return
+                self.stats['events'] += 1
+                self._dispatch(event)
+            elif msg.type in (aiohttp.WSMsgType.CLOSE, aiohttp.WSMsgType.CLOSED,
+                              aiohttp.WSMsgType.CLOSING, aiohttp.WSMsgType.ERROR):
+                return
+
+    def _dispatch(self, event: dict):
+        for fn in self._listeners:
+            try:
+                fn(event)
+            except Exception as e:
+                logger.error(f"帳戶串流事件處理錯誤 ({event.get('e')}): {e}")
@@ -0,0 +1,254 @@
+"""
+本地帳戶串流替身 — listenKey REST + user-data WebSocket 的模擬交易所帳戶
+
+離線測試 / 開發用：UserDataStream 連到這裡時，收到的事件格式與
+wss://fstream.binance.com/ws/<listenKey> 相同（ACCOUNT_UPDATE / ORDER_TRADE_UPDATE /
+listenKeyExpired）；REST 端提供：
+    POST / PUT / DELETE /fapi/v1/listenKey    申請 / 延長 / 關閉 listenKey
+    GET /fapi/v2/account                      帳戶快照（輪詢對帳用，與正式 API 同欄位）
+
+帳戶模型：單一 USDT 錢包、單向持倉（positionAmt 正負表示方向），每個 symbol 至多一張止損單。
+
+測試控制：
+    open_position(symbol_id, amount, entry)   開倉 → ACCOUNT_UPDATE
+    place_stop(symbol_id, stop_price)         掛止損 → ORDER_TRADE_UPDATE NEW
+    trigger_stop(symbol_id)                   止損觸發 → ORDER_TRADE_UPDATE FILLED + ACCOUNT_UPDATE（倉位歸零、錢包結算）
+    expire_keys()                             所有 listenKey 失效並推送 listenKeyExpired
+    drop_connections()                        斷開所有連線（測重連）
+"""
+
+import json
+import time
+import asyncio
+import secrets
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+
+try:
+    from aiohttp import web, WSMsgType
+except ImportError:
+    web = None  # type: ignore
+    WSMsgType = None  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+
+class UserStreamStandIn:
+    """模擬帳戶 + listenKey REST + user-data WebSocket 的本地伺服器（背景執行緒）"""
+
+    def __init__(self, balance: float = 10000.0, host: str = '127.0.0.1', port: int = 0):
+        """
+        Args:
+            balance: 初始 USDT 錢包餘額
+            host / port: 監聽位址（port=0 自動選擇）
+        """
+        if web is None:
+            raise RuntimeError("user stream stand-in 需要 aiohttp")
+        self.balance = balance
+        self.host = host
+        self.port = port
+        self.positions: Dict[str, Tuple[float, float]] = {}     # symbol_id → (positionAmt, entryPrice)
+        self.stops: Dict[str, Tuple[int, float]] = {}           # symbol_id → (orderId, stopPrice)
+        self.listen_keys: set = set()
+
+        self._clients: Dict[object, str] = {}                   # ws → listenKey
+        self._order_id = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._runner = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self.connections = 0
+        self.keepalives = 0
+        self.account_requests = 0
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    @property
+    def http_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    # ==================== 生命週期 ====================
+
+    def start(self) -> 'UserStreamStandIn':
+        self._thread = threading.Thread(target=self._run, name='user-stream-standin', daemon=True)
+        self._thread.start()
+        self._ready.wait(5)
+        return self
+
+    def stop(self):
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result(5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(5)
+        self._loop = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_until_complete(self._serve())
+        self._ready.set()
+        self._loop.run_forever()
+
+    async def _serve(self):
+        app = web.Application()
+        app.router.add_route('*', '/fapi/v1/listenKey', self._handle_listen_key)
+        app.router.add_get('/fapi/v2/account', self._handle_account)
+        app.router.add_get('/ws/{key}', self._handle_ws)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+
+    async def _shutdown(self):
+        for ws in list(self._clients):
+            await ws.close()
+        await self._runner.cleanup()
+
+    def _call(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result(5)
+
+    # ==================== listenKey ====================
+
+    def listen_key(self, method: str) -> Optional[str]:
+        """listenKey REST 的同行程等價呼叫（語意同 bot._user_stream_key）"""
+        status, body = self._listen_key(method.upper())
+        return body.get('listenKey', '') if status == 200 else None
+
+    def _listen_key(self, method: str) -> Tuple[int, dict]:
+        if method == 'POST':
+            # 與交易所相同：已有有效 key 時回傳同一把
+            if not self.listen_keys:
+                self.listen_keys.add(secrets.token_hex(16))
+            return 200, {'listenKey': next(iter(self.listen_keys))}
+        if not self.listen_keys:
+            return 400, {'code': -1125, 'msg': 'This listenKey does not exist.'}
+        if method == 'PUT':
+            self.keepalives += 1
+            return 200, {'listenKey': next(iter(self.listen_keys))}
+        self.listen_keys.clear()
+        return 200, {}
+
+    async def _handle_listen_key(self, request):
+        status, body = self._listen_key(request.method)
+        return web.json_response(body, status=status)
+
+    # ==================== 帳戶快照 ====================
+
+    def account(self) -> dict:
+        """/fapi/v2/account 回應（只含本模型用到的欄位）"""
+        return {
+            'assets': [{'asset': 'USDT', 'walletBalance': f"{self.balance:.8f}",
+                        'availableBalance': f"{self.balance:.8f}"}],
+            'positions': [
+                {'symbol': symbol_id, 'positionAmt': repr(amount), 'entryPrice': repr(entry), 'positionSide': 'BOTH'}
+                for symbol_id, (amount, entry) in self.positions.items()
+            ],
+        }
+
+    async def _handle_account(self, request):
+        self.account_requests += 1
+        return web.json_response(self.account())
+
+    # ==================== 測試控制 ====================
+
+    def open_position(self, symbol_id: str, amount: float, entry_price: float):
+        self.positions[symbol_id] = (amount, entry_price)
+        self._call(self._broadcast(self._account_update('ORDER', symbol_id)))
+
+    def place_stop(self, symbol_id: str, stop_price: float):
+        self._order_id += 1
+        self.stops[symbol_id] = (self._order_id, stop_price)
+        self._call(self._broadcast(self._order_update(symbol_id, 'NEW', 0.0)))
+
+    def trigger_stop(self, symbol_id: str):
+        """止損以 stopPrice 成交：平掉整個倉位，損益結算進錢包"""
+        _, stop_price = self.stops[symbol_id]
+        amount, entry = self.positions.get(symbol_id, (0.0, 0.0))
+        fill = self._order_update(symbol_id, 'FILLED', abs(amount))
+        self.balance += (stop_price - entry) * amount
+        self.positions.pop(symbol_id, None)
+        self.stops.pop(symbol_id)
+
+        async def _push():
+            await self._broadcast(fill)
+            await self._broadcast(self._account_update('ORDER', symbol_id))
+        self._call(_push())
+
+    def expire_keys(self):
+        keys, self.listen_keys = set(self.listen_keys), set()
+        self._call(self._broadcast({'e': 'listenKeyExpired', 'E': self._now_ms(), 'listenKey': ','.join(keys)}))
+
+    def drop_connections(self):
+        async def _drop():
+            for ws in list(self._clients):
+                await ws.close()
+        self._call(_drop())
+
+    # ==================== 連線 / 推送 ====================
+
+    async def _handle_ws(self, request):
+        key = request.match_info['key']
+        if key not in self.listen_keys:
+            return web.json_response({'code': -1125, 'msg': 'This listenKey does not exist.'}, status=400)
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self._clients[ws] = key
+        self.connections += 1
+        try:
+            async for msg in ws:
+                if msg.type == WSMsgType.ERROR:
+                    break
+        finally:
+            self._clients.pop(ws, None)
+        return ws
+
+    async def _broadcast(self, event: dict):
+        for ws in list(self._clients):
+            if ws.closed:
+                continue
+            try:
+                await ws.send_str(json.dumps(event))
+            except (ConnectionError, RuntimeError):
+                self._clients.pop(ws, None)
+
+    def _account_update(self, reason: str, symbol_id: str) -> dict:
+        amount, entry = self.positions.get(symbol_id, (0.0, 0.0))
+        now = self._now_ms()
+        return {
+            'e': 'ACCOUNT_UPDATE', 'E': now, 'T': now,
+            'a': {
+                'm': reason,
+                'B': [{'a': 'USDT', 'wb': f"{self.balance:.8f}", 'cw': f"{self.balance:.8f}", 'bc': '0'}],
+                'P': [{'s': symbol_id, 'pa': repr(amount), 'ep': repr(entry), 'up': '0', 'mt': 'cross', 'ps': 'BOTH'}],
+            },
+        }
+
+    def _order_update(self, symbol_id: str, status: str, filled: float) -> dict:
+        order_id, stop_price = self.stops[symbol_id]
+        amount, _ = self.positions.get(symbol_id, (0.0, 0.0))
+        now = self._now_ms()
+        return {
+            'e': 'ORDER_TRADE_UPDATE', 'E': now, 'T': now,
+            'o': {
+                's': symbol_id, 'i': order_id, 'S': 'SELL' if amount > 0 else 'BUY',
+                'o': 'STOP_MARKET', 'ot': 'STOP_MARKET', 'q': repr(abs(amount)),
+                'sp': repr(stop_price), 'ap': repr(stop_price if filled else 0.0),
+                'x': 'TRADE' if status == 'FILLED' else status, 'X': status,
+                'z': repr(filled), 'R': True, 'ps': 'BOTH',
+            },
+        }
+
+    @staticmethod
+    def _now_ms() -> int:
+        return int(time.time() * 1000)
@@ -11,6 +11,9 @@ from datetime import datetime, timezone
 from typing import TYPE_CHECKING, Dict, List, Optional, Any
 from dataclasses import dataclass, field, asdict
 
+from trader.indicators.registry import ensure_indicators
+from trader.infrastructure.candles import as_frame, bar
+
 logger = logging.getLogger(__name__)
 
 if TYPE_CHECKING:
@@ -274,7 +277,7 @@ class PositionManager:
         4. 最新 K 線量 >= vol_ma * STAGE2_VOLUME_MULT
 
         Args:
-            df_1h: 1H OHLCV DataFrame（含 indicators）
+            df_1h: 1H OHLCV DataFrame 或 Candles（含 indicators）
 
         Returns:
             bool: 是否觸發
@@ -295,7 +298,7 @@ class PositionManager:
             log_fn(f"{prefix}: SKIP df_1h empty/None")
             return False
 
-        current = df_1h.iloc[-1]
+        current = bar(ensure_indicators(df_1h, 'vol_ma'), -1)
         close = current['close']
         volume = current.get('volume', 0)
         vol_ma = current.get('vol_ma', 0)
@@ -362,7 +365,7 @@ class PositionManager:
         4. 當前 K 線是反轉 K 線（收盤超越前根高/低點）
 
         Args:
-            df_1h: 1H OHLCV DataFrame（含 indicators）
+            df_1h: 1H OHLCV DataFrame 或 Candles（含 indicators）
 
         Returns:
             bool: 是否觸發
@@ -374,8 +377,9 @@ class PositionManager:
 
         from trader.config import ConfigV6 as Cfg
 
-        current = df_1h.iloc[-1]
-        prev = df_1h.iloc[-2]
+        ensure_indicators(df_1h, 'ema_slow', 'vol_ma')
+        current = bar(df_1h, -1)
+        prev = bar(df_1h, -2)
 
         # 計算 EMA 20
         ema_col = f'ema_{Cfg.STAGE3_EMA_PERIOD}'
@@ -543,6 +547,7 @@ class PositionManager:
         統一監控入口（V7 P2 起回傳 Dict）。
 
         委託 self.strategy.get_decision() 計算出場/加倉決策。
+        df_1h / df_4h 可為 Candles；策略未宣告 accepts_candles 時先轉為 DataFrame。
 
         Returns:
             dict: {
@@ -555,6 +560,8 @@ class PositionManager:
         """
         if self.is_closed:
             return {"action": "ACTIVE", "reason": "ALREADY_CLOSED", "new_sl": None, "close_pct": None}
+        if not getattr(self.strategy, 'accepts_candles', False):
+            df_1h, df_4h = as_frame(df_1h), as_frame(df_4h)
         return self.strategy.get_decision(self, current_price, df_1h, df_4h)
 
     # ==================== 序列化（for positions.json）====================
@@ -0,0 +1,201 @@
+"""
+帳戶快照快取 — 餘額 / 持倉 / 開放止損單在 TTL 內共用，成交與改止損後立即失效
+
+原本 get_balance（開倉、總風險檢查、監控週期摘要、Telegram /balance）、
+get_positions（倉位同步、幽靈倉位接管）與止損單查詢各自發簽章請求，
+失敗時還各自 sleep 重試；同一輪可能查好幾次相同的帳戶資料。
+
+AccountState：
+    account   一次請求取得 {'balance', 'positions'}（Binance Futures：/fapi/v2/account）
+    stop_map  開放中的止損單 {symbol_id: trigger_price}
+    兩者各自快取 ttl_seconds；同時有多個執行緒要資料時只發一次請求，其他等結果。
+    查詢失敗（None）不快取，下一次呼叫重新查詢。
+
+失效（invalidate）：
+    下單、平倉、設定 / 取消止損後呼叫，下一次讀取必定重新查詢。
+    失效前已發出、失效後才回來的查詢結果視為過期，不寫入快取。
+
+帳戶串流（attach_stream，見 trader.infrastructure.user_stream）：
+    ACCOUNT_UPDATE 的持倉、ORDER_TRADE_UPDATE 的止損單狀態直接改寫已快取的快照；
+    串流健康時快照有效期延長到 reconcile_seconds（低頻 REST 對帳），
+    串流斷線即回到 ttl_seconds，重連時整份失效（斷線期間的事件已遺失）。
+    事件只帶錢包餘額、沒有可用餘額：有餘額變動時標記餘額過期，
+    下一次 balance() 重新查詢，持倉讀取不受影響。
+
+使用方式：
+    account = AccountState(risk_manager.fetch_account, bot._query_exchange_stop_map, ttl_seconds=10)
+    balance = account.balance()
+    account.invalidate('order filled')
+"""
+
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+STOP_ORDER_TYPES = ('STOP_MARKET', 'STOP')
+CLOSED_ORDER_STATUSES = ('FILLED', 'CANCELED', 'EXPIRED', 'EXPIRED_IN_MATCH')
+
+
+class _Slot:
+    """單一快取項：值、取得時間、查詢鎖"""
+
+    def __init__(self, fetch: Callable[[], Any]):
+        self.fetch = fetch
+        self.value: Any = None
+        self.fetched_at: Optional[float] = None
+        self.lock = threading.Lock()
+
+
+class AccountState:
+    """帳戶快照 TTL 快取（執行緒安全）"""
+
+    def __init__(
+        self,
+        fetch_account: Callable[[], Optional[dict]],
+        fetch_stop_map: Optional[Callable[[], Optional[Dict[str, float]]]] = None,
+        ttl_seconds: float = 10.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            fetch_account: 回傳 {'balance': float, 'positions': list}，失敗回 None
+            fetch_stop_map: 回傳 {symbol_id: trigger_price}，失敗回 None；None 表示不查止損單
+            ttl_seconds: 快取有效秒數
+            clock: 可注入，供測試使用
+        """
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._account = _Slot(fetch_account)
+        self._stops = _Slot(fetch_stop_map or (lambda: {}))
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._balance_stale = False
+        self._stream = None
+        self.reconcile_seconds = ttl_seconds
+        self._stats = {'hits': 0, 'refreshes': 0, 'failures': 0, 'invalidations': 0, 'events': 0}
+
+    def attach_stream(self, stream, reconcile_seconds: float = 120.0):
+        """掛上帳戶串流（需有 add_listener / is_healthy）：事件即時套用，健康時以 reconcile_seconds 對帳"""
+        self._stream = stream
+        self.reconcile_seconds = reconcile_seconds
+        stream.add_listener(self.apply_event)
+
+    def _fresh(self, slot: _Slot, now: float, need_balance: bool = False) -> bool:
+        if slot.fetched_at is None or (need_balance and self._balance_stale):
+            return False
+        age = now - slot.fetched_at
+        if age < self.ttl_seconds:
+            return True
+        return self._stream is not None and self._stream.is_healthy() and age < self.reconcile_seconds
+
+    def _get(self, slot: _Slot, need_balance: bool = False):
+        with slot.lock:                         # 同時只有一個查詢，其餘等結果
+            now = self._clock()
+            with self._lock:
+                if self._fresh(slot, now, need_balance):
+                    self._stats['hits'] += 1
+                    return slot.value
+                generation = self._generation
+            value = slot.fetch()
+            with self._lock:
+                if value is None:
+                    self._stats['failures'] += 1
+                    return None
+                self._stats['refreshes'] += 1
+                if generation == self._generation:
+                    slot.value, slot.fetched_at = value, self._clock()
+                    if slot is self._account:
+                        self._balance_stale = False
+            return value
+
+    def account(self) -> Optional[dict]:
+        """{'balance': USDT 可用餘額, 'positions': 非零持倉}；查詢失敗回 None"""
+        return self._get(self._account)
+
+    def balance(self) -> Optional[float]:
+        account = self._get(self._account, need_balance=True)
+        return None if account is None else account['balance']
+
+    def positions(self) -> Optional[list]:
+        account = self.account()
+        return None if account is None else list(account['positions'])
+
+    def stop_map(self) -> Optional[Dict[str, float]]:
+        """開放中的止損單 {symbol_id: trigger_price}；查詢失敗回 None"""
+        stops = self._get(self._stops)
+        return None if stops is None else dict(stops)
+
+    def apply_event(self, event: dict):
+        """套用帳戶串流事件（串流執行緒呼叫）；未快取的部分略過，下一次查詢自然包含"""
+        kind = event.get('e')
+        if kind == 'streamConnected':
+            self.invalidate('user stream connected')
+            return
+        if kind not in ('ACCOUNT_UPDATE', 'ORDER_TRADE_UPDATE'):
+            return
+        with self._lock:
+            self._generation += 1               # 事件前發出的查詢結果可能較舊，不寫入快取
+            self._stats['events'] += 1
+            if kind == 'ACCOUNT_UPDATE':
+                update = event.get('a', {})
+                if update.get('B'):
+                    self._balance_stale = True
+                if update.get('P') and self._account.fetched_at is not None:
+                    self._account.value = {
+                        **self._account.value,
+                        'positions': _apply_positions(self._account.value['positions'], update['P']),
+                    }
+            else:
+                order = event.get('o', {})
+                if order.get('o') in STOP_ORDER_TYPES and self._stops.fetched_at is not None:
+                    self._stops.value = _apply_stop_order(self._stops.value, order)
+
+    def invalidate(self, reason: str = ''):
+        """清空快取（成交 / 止損單變更後呼叫）"""
+        with self._lock:
+            self._generation += 1
+            self._account.fetched_at = None
+            self._stops.fetched_at = None
+            self._stats['invalidations'] += 1
+        if reason:
+            logger.debug(f"帳戶快照失效: {reason}")
+
+    def stats(self, reset: bool = False) -> Dict[str, int]:
+        """{'hits', 'refreshes', 'failures', 'invalidations', 'events'}"""
+        with self._lock:
+            out = dict(self._stats)
+            if reset:
+                self._stats.update(dict.fromkeys(self._stats, 0))
+        return out
+
+
+def _apply_positions(positions: List[dict], updates: List[dict]) -> List[dict]:
+    """以 ACCOUNT_UPDATE 的 P 陣列改寫持倉清單（回傳新清單；歸零的移除）"""
+    changed = {u['s']: u for u in updates if u.get('s')}
+    kept = [
+        p for p in positions
+        if (p.get('symbol') or p.get('info', {}).get('symbol')) not in changed
+    ]
+    for symbol_id, u in changed.items():
+        if float(u.get('pa', 0)) != 0:
+            kept.append({
+                'symbol': symbol_id, 'positionAmt': u['pa'],
+                'entryPrice': u.get('ep', '0'), 'positionSide': u.get('ps', 'BOTH'),
+            })
+    return kept
+
+
+def _apply_stop_order(stops: Dict[str, float], order: dict) -> Dict[str, float]:
+    """以 ORDER_TRADE_UPDATE 改寫止損單表（回傳新 dict）"""
+    stops = dict(stops)
+    symbol_id, status = order.get('s', ''), order.get('X')
+    trigger = float(order.get('sp') or 0)
+    if status == 'NEW' and symbol_id and trigger:
+        stops[symbol_id] = trigger
+    elif status in CLOSED_ORDER_STATUSES and stops.get(symbol_id) == trigger:
+        # 只移除同價位那張：改止損時舊單的取消事件可能晚於新單
+        del stops[symbol_id]
+    return stops
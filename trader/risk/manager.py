@@ -17,7 +17,9 @@ from decimal import Decimal, ROUND_DOWN
 from typing import Dict, List, Optional, Tuple
 
 from trader.config import Config
+from trader.infrastructure import retry
 from trader.infrastructure.api_client import BinanceFuturesClient
+from trader.infrastructure.retry import CircuitBreaker
 from trader.indicators.technical import DynamicThresholdManager
 
 logger = logging.getLogger(__name__)
@@ -61,7 +63,9 @@ class PrecisionHandler:
 
     def _load_exchange_info(self):
         """啟動時從 Binance exchangeInfo 一次載入所有幣種精度"""
-        import requests
+        from trader.infrastructure import http_pool
+        if getattr(self.exchange, 'offline', False) is True:
+            return      # 重播模式不連網，依賴 DEFAULT_PRECISIONS
         if Config.SANDBOX_MODE and Config.TRADING_MODE == 'future':
             url = "https://demo-fapi.binance.com/fapi/v1/exchangeInfo"
         else:
@@ -69,7 +73,7 @@ class PrecisionHandler:
 
         for attempt in range(3):
             try:
-                resp = requests.get(url, timeout=15)
+                resp = http_pool.get(url, timeout=15)
                 if resp.status_code != 200:
                     logger.warning(f"exchangeInfo HTTP {resp.status_code} (attempt {attempt + 1}/3)")
                     time.sleep(2)
@@ -241,85 +245,127 @@ class RiskManager:
         self.exchange = exchange
         self.precision_handler = precision_handler
         self.futures_client = BinanceFuturesClient(Config.API_KEY, Config.API_SECRET, Config.SANDBOX_MODE)
+        self.balance_breaker = CircuitBreaker(
+            'balance', Config.CIRCUIT_BREAKER_THRESHOLD, Config.CIRCUIT_BREAKER_RESET_SECONDS
+        )
+        # AccountState（bot 建立後掛上）；None 時每次呼叫直接查詢
+        self.account = None
+        # 最近一次 fetch_account 只有持倉失敗時取得的餘額
+        self._partial_balance: Optional[float] = None
 
-    def _get_futures_balance(self) -> float:
-        """使用 /fapi/v2/balance 端點獲取 Futures 餘額"""
+    @staticmethod
+    def _direct_futures() -> bool:
+        """Binance Futures 測試網：直接打 fapi（ccxt 不支援 demo 帳戶端點）"""
+        return Config.SANDBOX_MODE and Config.TRADING_MODE == 'future' and Config.EXCHANGE == 'binance'
+
+    def _get_futures_account(self) -> Optional[dict]:
+        """使用 /fapi/v2/account 一次取得 USDT 可用餘額與持倉。回傳 None 表示 API 錯誤。"""
         try:
-            response = self.futures_client.signed_request('GET', '/fapi/v2/balance')
+            response = self.futures_client.signed_request('GET', '/fapi/v2/account', weight=5)
 
             if response.status_code == 200:
                 data = response.json()
-                for asset in data:
+                balance = 0.0
+                for asset in data.get('assets', []):
                     if asset.get('asset') == 'USDT':
-                        return float(asset.get('availableBalance', 0))
-                return 0
+                        balance = float(asset.get('availableBalance', 0))
+                        break
+                positions = [p for p in data.get('positions', []) if float(p.get('positionAmt', 0)) != 0]
+                return {'balance': balance, 'positions': positions}
             else:
-                logger.error(f"Futures API 錯誤: {response.status_code} - {response.text}")
-                return 0
+                logger.error(f"Futures 帳戶 API 錯誤: {response.status_code} - {response.text}")
+                return None
 
         except Exception as e:
-            logger.error(f"獲取 Futures 餘額失敗: {e}")
-            return 0
+            logger.error(f"獲取 Futures 帳戶失敗: {e}")
+            return None
 
-    def get_balance(self) -> float:
-        """獲取帳戶餘額"""
+    def fetch_account(self) -> Optional[dict]:
+        """
+        查詢帳戶快照 {'balance': USDT 可用餘額, 'positions': 非零持倉}（AccountState 的資料來源）
+
+        測試網一次 /fapi/v2/account（可用餘額為 0 時視為暫時性空回應，在重試預算內重查）；
+        其餘走 ccxt fetch_balance + fetch_positions，
+        兩者各自重試：餘額取得後重試只重查持倉。只有持倉查詢失敗時仍回傳 None
+        （持倉未知不能當成空倉），但保留本次餘額供 get_balance 使用，也不計入斷路器。
+        重試等待從本輪 retry 預算扣除，預算不足即放棄；連續失敗時斷路器
+        直接回傳 None，不阻塞主循環。
+
+        Returns:
+            dict  — 成功
+            None  — API 錯誤 / 斷路器開啟
+        """
+        self._partial_balance = None
+        if not self.balance_breaker.allow():
+            retry.record('balance', 'rejected')
+            return None
+        balance = None
+        reported = None
         for attempt in range(Config.MAX_RETRY):
             try:
-                if Config.SANDBOX_MODE and Config.TRADING_MODE == 'future' and Config.EXCHANGE == 'binance':
-                    balance = self._get_futures_balance()
-                    if balance > 0:
-                        return balance
-                    if attempt < Config.MAX_RETRY - 1:
-                        time.sleep(Config.RETRY_DELAY)
-                        continue
-                    return 0
+                if self._direct_futures():
+                    account = self._get_futures_account()
+                    if account is not None:
+                        self.balance_breaker.record_success()
+                        if account['balance'] > 0:
+                            return account
+                        # 測試網偶爾回傳暫時性的 0 餘額：預算內重查，用完才採用
+                        reported = account
                 else:
-                    balance = self.exchange.fetch_balance()
-                    return balance['USDT']['free']
+                    if balance is None:
+                        balance = self.exchange.fetch_balance()['USDT']['free']
+                        self.balance_breaker.record_success()
+                    positions = self.exchange.fetch_positions()
+                    return {
+                        'balance': balance,
+                        'positions': [p for p in positions if float(p.get('contracts', 0)) != 0],
+                    }
 
             except ccxt.NetworkError as e:
                 logger.warning(f"網絡錯誤，重試 {attempt+1}/{Config.MAX_RETRY}")
-                time.sleep(Config.RETRY_DELAY)
             except Exception as e:
-                logger.error(f"獲取餘額失敗: {e}")
-                if attempt < Config.MAX_RETRY - 1:
-                    time.sleep(Config.RETRY_DELAY)
-                else:
-                    return 0
-        return 0
+                logger.error(f"獲取帳戶失敗: {e}")
+
+            if attempt < Config.MAX_RETRY - 1 and retry.wait('balance', Config.RETRY_DELAY):
+                continue
+            break
+        if reported is not None:
+            return reported
+        if balance is not None:
+            logger.warning("持倉查詢失敗，餘額沿用本次查詢結果")
+            self._partial_balance = balance
+            return None
+        self.balance_breaker.record_failure()
+        return None
+
+    def get_balance(self) -> float:
+        """
+        獲取帳戶可用餘額（USDT）
+
+        有掛 AccountState 時讀快取，否則直接查詢；只有持倉查詢失敗時沿用同次查到的餘額，
+        查詢失敗時回傳 0（本輪不開新倉）。
+        """
+        if self.account is not None:
+            balance = self.account.balance()
+        else:
+            account = self.fetch_account()
+            balance = account['balance'] if account else None
+        if balance is None:
+            balance = self._partial_balance
+        return balance if balance is not None else 0
 
     def get_positions(self) -> Optional[list]:
         """
-        獲取現有持倉。
+        獲取現有持倉（有掛 AccountState 時讀快取）。
 
         Returns:
             list  — 成功，可能為 []（真的沒倉位）
             None  — API 錯誤，呼叫方應跳過同步
         """
-        try:
-            if Config.SANDBOX_MODE and Config.TRADING_MODE == 'future' and Config.EXCHANGE == 'binance':
-                return self._get_futures_positions()
-            else:
-                positions = self.exchange.fetch_positions()
-                return [p for p in positions if float(p.get('contracts', 0)) != 0]
-        except Exception as e:
-            logger.error(f"獲取持倉失敗: {e}")
-            return None
-
-    def _get_futures_positions(self) -> Optional[list]:
-        """使用 Binance Futures API 獲取持倉。回傳 None 表示 API 錯誤。"""
-        try:
-            response = self.futures_client.signed_request('GET', '/fapi/v2/positionRisk')
-
-            if response.status_code == 200:
-                data = response.json()
-                return [p for p in data if float(p.get('positionAmt', 0)) != 0]
-            else:
-                logger.error(f"獲取持倉 API 錯誤: {response.status_code} - {response.text}")
-                return None
-        except Exception as e:
-            logger.error(f"獲取 Futures 持倉失敗: {e}")
-            return None
+        if self.account is not None:
+            return self.account.positions()
+        account = self.fetch_account()
+        return None if account is None else list(account['positions'])
 
     def get_account_info(self) -> dict:
         """獲取完整帳戶資訊"""
@@ -3,20 +3,24 @@ V6.0 信號偵測模組
 
 升級版 2B 偵測：用真正的 Swing Point Pivot（左右側確認）取代 V5.3 的 rolling min/max。
 回傳含 neckline 的信號詳情，供 PositionManager Stage 2 觸發使用。
+
+偵測函式接受 OHLCV DataFrame 或 Candles，以 bar() / column() 直接讀欄位陣列，
+不建立 df.iloc row。
 """
 
 import logging
-import pandas as pd
 from typing import Tuple, Optional, Dict
 
 from trader.config import Config
+from trader.indicators.registry import ensure_indicators
+from trader.infrastructure.candles import Frame, bar, column
 from trader.structure import StructureAnalysis
 
 logger = logging.getLogger(__name__)
 
 
 def detect_2b_with_pivots(
-    df: pd.DataFrame,
+    df: Frame,
     left_bars: int = 5,
     right_bars: int = 2,
     vol_minimum_threshold: float = 0.7,
@@ -40,7 +44,7 @@ def detect_2b_with_pivots(
     - Bearish 2B: 價格突破 confirmed swing high 後放量收回
 
     Args:
-        df: 1H OHLCV DataFrame（需含 atr, vol_ma columns）
+        df: 1H OHLCV DataFrame 或 Candles（需含 atr, vol_ma columns）
         left_bars: Swing point 左側 lookback
         right_bars: Swing point 右側確認
         vol_minimum_threshold: 最低量比門檻
@@ -68,7 +72,8 @@ def detect_2b_with_pivots(
     if last_swing_low is None and last_swing_high is None:
         return False, None
 
-    current = df.iloc[-1]
+    ensure_indicators(df, 'atr', 'vol_ma')
+    current = bar(df, -1)
     close = current['close']
     low = current['low']
     high = current['high']
@@ -203,7 +208,8 @@ def detect_2b_with_pivots(
 
     # === 6c. ADX 上限過濾 ===
     # ADX>50 的 2B: 53% WR / avg R=-0.23（15 筆），趨勢過強時反轉容易失敗
-    adx = current.get('adx', 0)
+    ensure_indicators(df, 'adx')   # 延遲欄位：通過前面的過濾才需要 ADX
+    adx = column(df, 'adx')[-1] if 'adx' in df.columns else 0
     adx_max = getattr(Config, 'ADX_MAX_2B', 50)
     if adx and adx > adx_max:
         logger.debug(
@@ -235,7 +241,7 @@ def detect_2b_with_pivots(
 
 
 def detect_ema_pullback(
-    df: pd.DataFrame,
+    df: Frame,
     ema_pullback_threshold: float = 0.02,
 ) -> Tuple[bool, Optional[Dict]]:
     """
@@ -255,11 +261,12 @@ def detect_ema_pullback(
     if df is None or len(df) < 30:
         return False, None
 
+    ensure_indicators(df, 'ema_fast', 'ema_slow', 'atr', 'vol_ma')
     if 'ema_fast' not in df.columns or 'ema_slow' not in df.columns:
         return False, None
 
-    current = df.iloc[-1]
-    prev = df.iloc[-2]
+    current = bar(df, -1)
+    prev = bar(df, -2)
 
     ema_fast = current['ema_fast']
     ema_slow = current['ema_slow']
@@ -282,7 +289,7 @@ def detect_ema_pullback(
                 'entry_price': price,
                 'lowest_point': prev['low'],               # raw（給 _execute_trade 用）
                 'stop_level': min(prev['low'], ema_slow) - atr * Config.SL_ATR_BUFFER_SIGNAL,
-                'target_ref': df['high'].iloc[-20:].max(),
+                'target_ref': column(df, 'high')[-20:].max(),
                 'atr': atr,
                 'volume': volume,
                 'vol_ma': vol_ma,
@@ -302,7 +309,7 @@ def detect_ema_pullback(
                 'entry_price': price,
                 'highest_point': prev['high'],              # raw（給 _execute_trade 用）
                 'stop_level': max(prev['high'], ema_slow) + atr * Config.SL_ATR_BUFFER_SIGNAL,
-                'target_ref': df['low'].iloc[-20:].min(),
+                'target_ref': column(df, 'low')[-20:].min(),
                 'atr': atr,
                 'volume': volume,
                 'vol_ma': vol_ma,
@@ -330,7 +337,7 @@ def detect_ema_pullback(
 
 
 def detect_volume_breakout(
-    df: pd.DataFrame,
+    df: Frame,
     volume_breakout_mult: float = 2.0,
 ) -> Tuple[bool, Optional[Dict]]:
     """
@@ -350,7 +357,8 @@ def detect_volume_breakout(
     if df is None or len(df) < 30:
         return False, None
 
-    current = df.iloc[-1]
+    ensure_indicators(df, 'vol_ma', 'atr')
+    current = bar(df, -1)
     volume = current.get('volume', 0)
     vol_ma = current.get('vol_ma', 0)
     atr = current.get('atr', 0)
@@ -360,8 +368,8 @@ def detect_volume_breakout(
     if vol_ratio < volume_breakout_mult:
         return False, None
 
-    recent_high = df['high'].iloc[-10:-1].max()
-    recent_low = df['low'].iloc[-10:-1].min()
+    recent_high = column(df, 'high')[-10:-1].max()
+    recent_low = column(df, 'low')[-10:-1].min()
 
     price = current['close']
     signal_side = None
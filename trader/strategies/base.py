@@ -18,6 +18,9 @@ from typing import TYPE_CHECKING, Dict, Optional, Type, TypedDict
 
 import pandas as pd
 
+from trader.indicators.registry import ensure_indicators
+from trader.infrastructure.candles import column
+
 if TYPE_CHECKING:
     from trader.positions import PositionManager
 
@@ -61,8 +64,10 @@ def _apply_common_pre(pm: 'PositionManager', current_price: float, df_1h) -> Opt
     pm.lowest_price = min(pm.lowest_price, current_price)
 
     # 更新 ATR
+    if df_1h is not None:
+        ensure_indicators(df_1h, 'atr')
     if df_1h is not None and len(df_1h) > 0 and 'atr' in df_1h.columns:
-        pm.atr = df_1h['atr'].iloc[-1]
+        pm.atr = column(df_1h, 'atr')[-1]
 
     pm.monitor_count += 1
 
@@ -101,7 +106,15 @@ def _apply_common_pre(pm: 'PositionManager', current_price: float, df_1h) -> Opt
 
 
 class TradingStrategy(ABC):
-    """交易策略抽象基類"""
+    """
+    交易策略抽象基類
+
+    accepts_candles：get_decision 是否直接接受 Candles（以 bar() / column() 讀值）。
+    預設 False，PositionManager.monitor 會先以 Candles.to_frame() 轉成 DataFrame
+    （遷移期的相容層）；內建策略皆已遷移並設為 True。
+    """
+
+    accepts_candles: bool = False
 
     @abstractmethod
     def get_decision(
@@ -118,7 +131,7 @@ class TradingStrategy(ABC):
         Args:
             pm: PositionManager 實例（含倉位狀態）
             current_price: 當前最新價格
-            df_1h: 1H OHLCV DataFrame（含 indicators）
+            df_1h: 1H OHLCV DataFrame（含 indicators；accepts_candles 時可為 Candles）
             df_4h: 4H OHLCV DataFrame（可選，V6 路徑用於 EMA20 force exit）
 
         Returns:
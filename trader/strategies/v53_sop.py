@@ -22,6 +22,7 @@ if TYPE_CHECKING:
     import pandas as pd
     from trader.positions import PositionManager
 
+from trader.infrastructure.candles import column
 from trader.strategies.base import Action, TradingStrategy, DecisionDict, _apply_common_pre
 
 logger = logging.getLogger(__name__)
@@ -30,6 +31,8 @@ logger = logging.getLogger(__name__)
 class V53SopStrategy(TradingStrategy):
     """V5.3 統一出場 SOP 策略"""
 
+    accepts_candles = True
+
     def __init__(self):
         self.is_1r_protected = False
         self.is_first_partial = False
@@ -92,8 +95,9 @@ class V53SopStrategy(TradingStrategy):
             swings = StructureAnalysis.find_swing_points(
                 df_1h, left_bars=Cfg.SWING_LEFT_BARS, right_bars=Cfg.SWING_RIGHT_BARS
             )
-            close_curr = df_1h['close'].iloc[-1]
-            close_prev = df_1h['close'].iloc[-2]
+            closes = column(df_1h, 'close')
+            close_curr = closes[-1]
+            close_prev = closes[-2]
             if pm.side == 'LONG' and swings['last_swing_low'] is not None:
                 threshold = swings['last_swing_low'] * (1 - Cfg.STRUCTURE_BREAK_TOLERANCE)
                 if close_prev < threshold and close_curr < threshold:
@@ -23,6 +23,8 @@ if TYPE_CHECKING:
     import pandas as pd
     from trader.positions import PositionManager
 
+from trader.indicators.registry import ensure_indicators
+from trader.infrastructure.candles import bar, column
 from trader.strategies.base import Action, TradingStrategy, DecisionDict, _apply_common_pre
 
 logger = logging.getLogger(__name__)
@@ -31,6 +33,8 @@ logger = logging.getLogger(__name__)
 class V6PyramidStrategy(TradingStrategy):
     """V6.0 三段式金字塔滾倉策略"""
 
+    accepts_candles = True
+
     def get_decision(
         self,
         pm: 'PositionManager',
@@ -82,13 +86,14 @@ class V6PyramidStrategy(TradingStrategy):
         # === 4H EMA20 強制平倉 ===
         if Cfg.V6_4H_EMA20_FORCE_EXIT and df_4h is not None and len(df_4h) > 0:
             ema20_4h = None
+            ensure_indicators(df_4h, 'ema_fast', 'ema_slow')
             if 'ema_fast' in df_4h.columns:
-                ema20_4h = df_4h['ema_fast'].iloc[-1]
+                ema20_4h = column(df_4h, 'ema_fast')[-1]
             elif 'ema_slow' in df_4h.columns:
-                ema20_4h = df_4h['ema_slow'].iloc[-1]
+                ema20_4h = column(df_4h, 'ema_slow')[-1]
 
             if ema20_4h is not None:
-                close_4h = df_4h['close'].iloc[-1]
+                close_4h = column(df_4h, 'close')[-1]
                 if pm.side == 'LONG' and close_4h < ema20_4h:
                     logger.warning(
                         f"[V6] {pm.symbol} 4H EMA20 breakdown: "
@@ -109,8 +114,8 @@ class V6PyramidStrategy(TradingStrategy):
             swings = StructureAnalysis.find_swing_points(
                 df_1h, Cfg.SWING_LEFT_BARS, Cfg.SWING_RIGHT_BARS
             )
-            prev = df_1h.iloc[-2]   # 穿透 K 線
-            curr = df_1h.iloc[-1]   # 確認 K 線
+            prev = bar(df_1h, -2)   # 穿透 K 線
+            curr = bar(df_1h, -1)   # 確認 K 線
             atr = pm.atr if pm.atr and pm.atr > 0 else 0
             min_depth = atr * Cfg.REVERSE_2B_MIN_FAKEOUT_ATR if atr > 0 else 0
 
@@ -18,6 +18,8 @@ if TYPE_CHECKING:
     import pandas as pd
     from trader.positions import PositionManager
 
+from trader.indicators.registry import ensure_indicators
+from trader.infrastructure.candles import bar
 from trader.strategies.base import Action, TradingStrategy, DecisionDict, _apply_common_pre
 
 logger = logging.getLogger(__name__)
@@ -29,6 +31,8 @@ MIN_BODY_RATIO = 0.3
 class V7StructureStrategy(TradingStrategy):
     """V7 結構驅動三段加倉策略"""
 
+    accepts_candles = True
+
     def __init__(self):
         self.last_structure_swing: Optional[float] = None
         self.add_trigger_swings: List[float] = []
@@ -105,7 +109,7 @@ class V7StructureStrategy(TradingStrategy):
             df_1h, Cfg.SWING_LEFT_BARS, Cfg.SWING_RIGHT_BARS
         )
         stage_vol_mult = getattr(Cfg, 'V7_STAGE_VOLUME_MULT', 1.0)
-        curr = df_1h.iloc[-1]
+        curr = bar(ensure_indicators(df_1h, 'vol_ma'), -1)
         vol_ma = curr.get('vol_ma', 0)
 
         target_stage = pm.stage + 1
@@ -200,8 +204,8 @@ class V7StructureStrategy(TradingStrategy):
         swings = StructureAnalysis.find_swing_points(
             df_1h, Cfg.SWING_LEFT_BARS, Cfg.SWING_RIGHT_BARS
         )
-        prev = df_1h.iloc[-2]
-        curr = df_1h.iloc[-1]
+        prev = bar(df_1h, -2)
+        curr = bar(df_1h, -1)
         atr = pm.atr if pm.atr and pm.atr > 0 else 0
         min_depth = atr * Cfg.REVERSE_2B_MIN_FAKEOUT_ATR if atr > 0 else 0
 
@@ -5,15 +5,100 @@ Swing Point 結構分析模組
 實現真正的 Swing Point Pivot 偵測（左右側確認）+ Neckline 識別。
 """
 
-import pandas as pd
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 from typing import Dict, List, Tuple, Optional
 
+# 結構分析接受 OHLCV DataFrame 或 Candles（只讀 high / low / close / timestamp 欄位）
+from trader.infrastructure.candles import Frame, column
+
+# Swing point 快取上限（條目數，LRU 淘汰）
+SWING_CACHE_MAX_ENTRIES = 512
+
 
 class StructureAnalysis:
     """結構分析工具"""
 
+    # find_swing_points 結果快取：同一 frame 在一個 cycle 內只算一次
+    # 監控 worker 與掃描執行緒共用 → 讀取 / 寫入 / 淘汰 / 統計都在 _swing_cache_lock 內
+    _swing_cache: 'OrderedDict[tuple, Dict]' = OrderedDict()
+    _swing_cache_stats = {'hits': 0, 'misses': 0}
+    _swing_cache_lock = threading.Lock()
+
+    @staticmethod
+    def find_swing_points(df: Frame, left_bars: int = 5, right_bars: int = 2) -> Dict:
+        """
+        找出已確認的 Swing High/Low（Pivot Points），結果依 frame 身分快取
+
+        frame 身分 = (symbol, timeframe, 首/末根時間, 長度, 末根 high/low, left, right)，
+        symbol / timeframe 取自 df.attrs（MarketDataProvider 標記；Candles 同介面）。
+        缺少標記或 timestamp 欄位的 frame 不快取，每次重算。
+
+        Returns:
+            同 _compute_swing_points（回傳的 list 為副本，可安全修改）
+        """
+        key = StructureAnalysis._swing_cache_key(df, left_bars, right_bars)
+        if key is None:
+            return StructureAnalysis._compute_swing_points(df, left_bars, right_bars)
+
+        cache = StructureAnalysis._swing_cache
+        stats = StructureAnalysis._swing_cache_stats
+        with StructureAnalysis._swing_cache_lock:
+            cached = cache.get(key)
+            if cached is None:
+                stats['misses'] += 1
+            else:
+                stats['hits'] += 1
+                cache.move_to_end(key)
+        if cached is None:
+            # 計算不持鎖（純函數，同 key 並行重算結果相同）
+            cached = StructureAnalysis._compute_swing_points(df, left_bars, right_bars)
+            with StructureAnalysis._swing_cache_lock:
+                cache[key] = cached
+                while len(cache) > SWING_CACHE_MAX_ENTRIES:
+                    cache.popitem(last=False)
+
+        result = dict(cached)
+        result['swing_lows'] = list(cached['swing_lows'])
+        result['swing_highs'] = list(cached['swing_highs'])
+        return result
+
+    @staticmethod
+    def _swing_cache_key(df: Frame, left_bars: int, right_bars: int) -> Optional[tuple]:
+        attrs = df.attrs
+        symbol = attrs.get('symbol')
+        timeframe = attrs.get('timeframe')
+        if not symbol or not timeframe or 'timestamp' not in df.columns or len(df) == 0:
+            return None
+        ts = column(df, 'timestamp')
+        return (
+            symbol, timeframe,
+            ts[0], ts[-1], len(df),
+            float(column(df, 'high')[-1]), float(column(df, 'low')[-1]),
+            left_bars, right_bars,
+        )
+
     @staticmethod
-    def find_swing_points(df: pd.DataFrame, left_bars: int = 5, right_bars: int = 2) -> Dict:
+    def swing_cache_stats(reset: bool = False) -> Dict[str, int]:
+        """快取命中統計（reset=True 時讀取後歸零，供每 cycle 記錄）"""
+        with StructureAnalysis._swing_cache_lock:
+            stats = dict(StructureAnalysis._swing_cache_stats)
+            stats['entries'] = len(StructureAnalysis._swing_cache)
+            if reset:
+                StructureAnalysis._swing_cache_stats.update(hits=0, misses=0)
+        return stats
+
+    @staticmethod
+    def clear_swing_cache():
+        with StructureAnalysis._swing_cache_lock:
+            StructureAnalysis._swing_cache.clear()
+            StructureAnalysis._swing_cache_stats.update(hits=0, misses=0)
+
+    @staticmethod
+    def _compute_swing_points(df: Frame, left_bars: int = 5, right_bars: int = 2) -> Dict:
         """
         找出已確認的 Swing High/Low（Pivot Points）
 
@@ -23,8 +108,11 @@ class StructureAnalysis:
 
         重要：右側確認機制確保 pivot 是「已確認」的（right_bars 根 K 線已收盤完成）
 
+        實作：以 sliding window 一次算出每根 K 線左右鄰居的 min/max，
+        再與當根比較（向量化，無逐根 Python 迴圈）。
+
         Args:
-            df: OHLCV DataFrame
+            df: OHLCV DataFrame 或 Candles
             left_bars: 左側 lookback 範圍（預設 5）
             right_bars: 右側確認範圍（預設 2，V6.0 要求至少 2 根確認）
 
@@ -48,45 +136,31 @@ class StructureAnalysis:
                 'second_last_swing_high': None,
             }
 
-        swing_lows = []
-        swing_highs = []
-
-        # 遍歷可驗證範圍（排除頭尾無法確認的 K 線）
-        for i in range(left_bars, len(df) - right_bars):
-            current_low = df['low'].iloc[i]
-            current_high = df['high'].iloc[i]
-
-            # === Swing Low 檢查 ===
-            is_swing_low = True
-            # 左側驗證：左邊 left_bars 根 K 線都更高
-            for j in range(1, left_bars + 1):
-                if df['low'].iloc[i - j] <= current_low:
-                    is_swing_low = False
-                    break
-            # 右側驗證：右邊 right_bars 根 K 線都更高
-            if is_swing_low:
-                for j in range(1, right_bars + 1):
-                    if df['low'].iloc[i + j] <= current_low:
-                        is_swing_low = False
-                        break
-            if is_swing_low:
-                swing_lows.append((i, current_low))
-
-            # === Swing High 檢查 ===
-            is_swing_high = True
-            # 左側驗證：左邊 left_bars 根 K 線都更低
-            for j in range(1, left_bars + 1):
-                if df['high'].iloc[i - j] >= current_high:
-                    is_swing_high = False
-                    break
-            # 右側驗證：右邊 right_bars 根 K 線都更低
-            if is_swing_high:
-                for j in range(1, right_bars + 1):
-                    if df['high'].iloc[i + j] >= current_high:
-                        is_swing_high = False
-                        break
-            if is_swing_high:
-                swing_highs.append((i, current_high))
+        lows = column(df, 'low')
+        highs = column(df, 'high')
+        low_f = lows.astype(float, copy=False)
+        high_f = highs.astype(float, copy=False)
+
+        # 可驗證範圍（排除頭尾無法確認的 K 線）
+        center = slice(left_bars, len(df) - right_bars)
+        is_swing_low = np.ones(len(df) - left_bars - right_bars, dtype=bool)
+        is_swing_high = is_swing_low.copy()
+
+        # 鄰居任一根 low <= 當根 low → 不是 Swing Low（high 同理，>=）
+        # fmin/fmax 忽略 NaN，與逐根比較時 NaN 比較恆為 False 的語意一致
+        if left_bars > 0:
+            left_min, left_max = StructureAnalysis._window_extrema(low_f, high_f, left_bars, 0, left_bars, right_bars)
+            is_swing_low &= ~(left_min <= low_f[center])
+            is_swing_high &= ~(left_max >= high_f[center])
+        if right_bars > 0:
+            right_min, right_max = StructureAnalysis._window_extrema(
+                low_f, high_f, right_bars, left_bars + 1, left_bars, right_bars
+            )
+            is_swing_low &= ~(right_min <= low_f[center])
+            is_swing_high &= ~(right_max >= high_f[center])
+
+        swing_lows = [(int(i), lows[i]) for i in np.flatnonzero(is_swing_low) + left_bars]
+        swing_highs = [(int(i), highs[i]) for i in np.flatnonzero(is_swing_high) + left_bars]
 
         return {
             'swing_lows': swing_lows,
@@ -98,7 +172,20 @@ class StructureAnalysis:
         }
 
     @staticmethod
-    def get_confirmed_pivots(df: pd.DataFrame, left: int = 5, right: int = 2) -> Dict[str, List[Tuple[int, float]]]:
+    def _window_extrema(low: np.ndarray, high: np.ndarray, width: int, start: int,
+                        left_bars: int, right_bars: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        每個候選 K 線對應鄰居窗口（寬 width）的 low 最小值與 high 最大值
+
+        候選 K 線 i ∈ [left_bars, n - right_bars)，其窗口起點為 i - left_bars + start。
+        """
+        count = len(low) - left_bars - right_bars
+        low_win = sliding_window_view(low, width)[start:start + count]
+        high_win = sliding_window_view(high, width)[start:start + count]
+        return np.fmin.reduce(low_win, axis=1), np.fmax.reduce(high_win, axis=1)
+
+    @staticmethod
+    def get_confirmed_pivots(df: Frame, left: int = 5, right: int = 2) -> Dict[str, List[Tuple[int, float]]]:
         """
         只回傳「已確認」的 pivot points（右側 K 線已收盤完成）
 
@@ -106,7 +193,7 @@ class StructureAnalysis:
         V6.0 用於檢查最新的 confirmed swing point 來設定止損。
 
         Args:
-            df: OHLCV DataFrame
+            df: OHLCV DataFrame 或 Candles
             left: 左側 lookback
             right: 右側確認（至少 2）
 
@@ -124,7 +211,7 @@ class StructureAnalysis:
 
     @staticmethod
     def find_neckline(
-        df: pd.DataFrame,
+        df: Frame,
         signal_side: str,
         swing_points: Optional[Dict] = None,
         left_bars: int = 5,
@@ -142,7 +229,7 @@ class StructureAnalysis:
         fallback 到原本邏輯（last_swing_high/low）。
 
         Args:
-            df: OHLCV DataFrame
+            df: OHLCV DataFrame 或 Candles
             signal_side: 'LONG' 或 'SHORT'
             swing_points: 預先計算的 swing points（可選，傳入可省計算）
             left_bars: Swing point 左側範圍
@@ -175,7 +262,7 @@ class StructureAnalysis:
 
     @staticmethod
     def get_validated_trailing_swing(
-        df: pd.DataFrame,
+        df: Frame,
         side: str,
         current_sl: float,
         left_bars: int = 5,
@@ -203,7 +290,7 @@ class StructureAnalysis:
         if not lows or not highs:
             return None
 
-        current_close = df['close'].iloc[-1]
+        current_close = column(df, 'close')[-1]
 
         if side == 'LONG':
             last_low_idx, last_low_price = lows[-1]
@@ -251,7 +338,7 @@ class StructureAnalysis:
 
     @staticmethod
     def get_fast_trailing_swing(
-        df: pd.DataFrame,
+        df: Frame,
         side: str,
         current_sl: float,
         left_bars: int = 7,
@@ -290,7 +377,7 @@ class StructureAnalysis:
 
     @staticmethod
     def find_latest_confirmed_swing(
-        df: pd.DataFrame,
+        df: Frame,
         direction: str,
         left_bars: int = 5,
         right_bars: int = 2
@@ -299,7 +386,7 @@ class StructureAnalysis:
         找出最新的 confirmed swing point（用於 Stage 3 移損）
 
         Args:
-            df: OHLCV DataFrame
+            df: OHLCV DataFrame 或 Candles
             direction: 'low' 或 'high'
             left_bars: 左側範圍
             right_bars: 右側確認範圍
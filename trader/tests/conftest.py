@@ -10,6 +10,7 @@ from unittest.mock import MagicMock, patch
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
 from trader.bot import TradingBotV6
+from trader.infrastructure.candles import Candles
 from trader.positions import PositionManager
 from trader.risk.manager import PrecisionHandler
 
@@ -50,12 +51,16 @@ def mock_bot(tmp_path):
          patch.object(PrecisionHandler, '_load_exchange_info'), \
          patch.object(TradingBotV6, '_restore_positions'), \
          patch('trader.bot.Config.POSITIONS_JSON_PATH', str(tmp_path / 'positions.json')), \
-         patch('trader.bot.Config.DB_PATH', str(tmp_path / 'perf.db')):
+         patch('trader.bot.Config.DB_PATH', str(tmp_path / 'perf.db')), \
+         patch('trader.bot.Config.CANDLE_STORE_DIR', str(tmp_path / 'candles')):
         bot = TradingBotV6()
 
     # 覆蓋 perf_db 寫入（避免 SQLite 問題）
     bot.perf_db.record_trade = MagicMock()
 
+    # 報價快照 → 空（各 test 透過 exchange.fetch_ticker 設定價格）
+    bot.data_provider.fetch_prices = MagicMock(return_value={})
+
     yield bot
 
 
@@ -221,7 +226,8 @@ def integration_bot(tmp_path):
          patch.object(PrecisionHandler, '_load_exchange_info'), \
          patch.object(TradingBotV6, '_restore_positions'), \
          patch('trader.bot.Config.POSITIONS_JSON_PATH', pos_path), \
-         patch('trader.bot.Config.DB_PATH', db_path):
+         patch('trader.bot.Config.DB_PATH', db_path), \
+         patch('trader.bot.Config.CANDLE_STORE_DIR', str(tmp_path / 'candles')):
         bot = TradingBotV6()
 
     # 注入 StatefulMockEngine
@@ -235,6 +241,15 @@ def integration_bot(tmp_path):
     # data_provider.fetch_ohlcv → MagicMock（由各 test 自行設回傳值）
     bot.data_provider = MagicMock()
     bot.data_provider.fetch_ohlcv = MagicMock(return_value=pd.DataFrame())
+    # fetch_ohlcv_many / fetch_candles_many → 逐一委派給 fetch_ohlcv（test 只需設定 fetch_ohlcv）
+    bot.data_provider.fetch_ohlcv_many = MagicMock(side_effect=lambda reqs, **kw: {
+        (s, tf): bot.data_provider.fetch_ohlcv(s, tf, limit) for s, tf, limit in reqs
+    })
+    bot.data_provider.fetch_candles_many = MagicMock(side_effect=lambda reqs, **kw: {
+        (s, tf): Candles.from_frame(bot.data_provider.fetch_ohlcv(s, tf, limit)) for s, tf, limit in reqs
+    })
+    # fetch_prices → 空快照，逐一 fallback 到 fetch_ticker（test 只需設定 fetch_ticker）
+    bot.data_provider.fetch_prices = MagicMock(return_value={})
 
     # risk_manager.get_balance → 固定值（阻斷 Binance API）
     bot.risk_manager.get_balance = MagicMock(return_value=10000.0)
@@ -0,0 +1 @@
+"""測試 / benchmark 共用的資料與參考實作"""
@@ -0,0 +1,69 @@
+"""
+錄製指標基準數值 → indicator_baseline.json
+
+固定一段 OHLCV，存下 fixtures.reference 的 pandas 參考實作（ref_*，依 pandas_ta 0.3.14b
+原始碼的 ewm / rolling 寫法改寫）的輸出。這是回歸基準，不是 pandas_ta 套件本身的輸出：
+TestBaselineFixture 逐點比對，之後 kernel 或參考實作的任何改動都不能讓數值漂移。
+與 pandas_ta 套件的直接比對見 test_live_pandas_ta_matches_baseline（有安裝時執行）。
+
+使用方式：
+    python trader/tests/fixtures/record_indicator_baseline.py
+"""
+
+import sys
+import json
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent))
+
+import numpy as np
+import pandas as pd
+
+from trader.tests.fixtures.reference import ref_adx, ref_atr, ref_ema, ref_rsi
+
+FIXTURE = Path(__file__).parent / 'indicator_baseline.json'
+SOURCE = 'pandas reference transliteration of pandas_ta 0.3.14b (trader.tests.fixtures.reference.ref_*)'
+BARS = 80
+SEED = 7
+
+
+def make_input() -> pd.DataFrame:
+    """固定輸入（四捨五入到 0.01，JSON 可精確還原）"""
+    rng = np.random.default_rng(SEED)
+    close = 100 + np.cumsum(rng.normal(0, 1, BARS))
+    high = close + rng.uniform(0, 1, BARS)
+    low = close - rng.uniform(0, 1, BARS)
+    df = pd.DataFrame({'open': close, 'high': high, 'low': low, 'close': close})
+    return df.round(2)
+
+
+def record(df: pd.DataFrame) -> dict:
+    adx, dmp, dmn = ref_adx(df['high'], df['low'], df['close'], 14)
+    return {
+        'ema_9': ref_ema(df['close'], 9),
+        'ema_21': ref_ema(df['close'], 21),
+        'sma_20': df['close'].rolling(20).mean(),
+        'atr_14': ref_atr(df['high'], df['low'], df['close'], 14),
+        'adx_14': adx,
+        'dmp_14': dmp,
+        'dmn_14': dmn,
+        'rsi_14': ref_rsi(df['close'], 14),
+    }
+
+
+def _values(series) -> list:
+    return [None if np.isnan(v) else float(v) for v in np.asarray(series, dtype=float)]
+
+
+def main():
+    df = make_input()
+    out = {
+        'source': SOURCE,
+        'input': {col: df[col].tolist() for col in ('high', 'low', 'close')},
+        'expected': {name: _values(series) for name, series in record(df).items()},
+    }
+    FIXTURE.write_text(json.dumps(out, indent=1) + '\n', encoding='utf-8')
+    print(f"{FIXTURE.name}: {BARS} bars")
+
+
+if __name__ == '__main__':
+    main()
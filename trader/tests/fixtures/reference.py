@@ -0,0 +1,83 @@
+"""
+測試與 benchmark 共用的輸入資料與參考實作
+
+    make_ohlcv                           隨機漫步 OHLCV
+    ref_ema / ref_rma / ref_atr / ref_adx / ref_rsi
+                                         pandas_ta 0.3.14b 的 pandas 寫法（ewm / rolling），kernel 的對照基準
+    ref_swing_points                     向量化前的逐根迴圈 swing point 偵測，find_swing_points 的對照基準
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def make_ohlcv(n, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    return pd.DataFrame({
+        'open': close,
+        'high': close + rng.uniform(0, 1, n),
+        'low': close - rng.uniform(0, 1, n),
+        'close': close,
+        'volume': rng.uniform(1e3, 1e6, n),
+    })
+
+
+# ---------- pandas_ta 0.3.14b 的 pandas 參考實作 ----------
+
+def ref_ema(close, n):
+    c = close.copy()
+    sma = c[0:n].mean()
+    c[:n - 1] = np.nan
+    c.iloc[n - 1] = sma
+    return c.ewm(span=n, adjust=False).mean()
+
+
+def ref_rma(s, n):
+    return s.ewm(alpha=1 / n, min_periods=n).mean()
+
+
+def ref_atr(h, l, c, n):
+    pc = c.shift(1)
+    tr = pd.concat([h - l, h - pc, pc - l], axis=1).abs().max(axis=1)
+    tr.iloc[:1] = np.nan
+    return ref_rma(tr, n)
+
+
+def ref_adx(h, l, c, n):
+    atr = ref_atr(h, l, c, n)
+    up = h - h.shift(1)
+    dn = l.shift(1) - l
+    pos = ((up > dn) & (up > 0)) * up
+    neg = ((dn > up) & (dn > 0)) * dn
+    k = 100 / atr
+    dmp = k * ref_rma(pos, n)
+    dmn = k * ref_rma(neg, n)
+    return ref_rma(100 * (dmp - dmn).abs() / (dmp + dmn), n), dmp, dmn
+
+
+def ref_rsi(c, n):
+    negative = c.diff()
+    positive = negative.copy()
+    positive[positive < 0] = 0
+    negative[negative > 0] = 0
+    pos_avg = ref_rma(positive, n)
+    neg_avg = ref_rma(negative, n)
+    return 100 * pos_avg / (pos_avg + neg_avg.abs())
+
+
+# ---------- swing point 逐根迴圈 ----------
+
+def ref_swing_points(df, left_bars, right_bars):
+    """向量化前的逐根迴圈實作，作為 parity 基準"""
+    swing_lows, swing_highs = [], []
+    for i in range(left_bars, len(df) - right_bars):
+        cur_low = df['low'].iloc[i]
+        cur_high = df['high'].iloc[i]
+        if not any(df['low'].iloc[i + j] <= cur_low
+                   for j in list(range(-left_bars, 0)) + list(range(1, right_bars + 1))):
+            swing_lows.append((i, cur_low))
+        if not any(df['high'].iloc[i + j] >= cur_high
+                   for j in list(range(-left_bars, 0)) + list(range(1, right_bars + 1))):
+            swing_highs.append((i, cur_high))
+    return swing_lows, swing_highs
@@ -0,0 +1,205 @@
+"""Test: 帳戶快照快取（TTL、一次 /fapi/v2/account、失敗不快取、下單 / 改止損後失效）"""
+
+import sys
+import threading
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from trader.execution.order_engine import OrderExecutionEngine
+from trader.risk.account import AccountState
+from trader.risk.manager import RiskManager
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _response(status, body):
+    resp = MagicMock(status_code=status)
+    resp.json.return_value = body
+    return resp
+
+
+ACCOUNT_BODY = {
+    'assets': [
+        {'asset': 'BNB', 'availableBalance': '1.5'},
+        {'asset': 'USDT', 'availableBalance': '2500.5'},
+    ],
+    'positions': [
+        {'symbol': 'BTCUSDT', 'positionAmt': '0.010', 'entryPrice': '50000'},
+        {'symbol': 'ETHUSDT', 'positionAmt': '0', 'entryPrice': '0'},
+    ],
+}
+
+
+class TestAccountState:
+
+    def test_ttl_hit_then_refresh(self):
+        clock = Clock()
+        fetch = MagicMock(return_value={'balance': 100.0, 'positions': []})
+        account = AccountState(fetch, ttl_seconds=10, clock=clock)
+        assert account.balance() == 100.0
+        clock.now = 9
+        assert account.positions() == []
+        assert fetch.call_count == 1
+        clock.now = 10
+        account.balance()
+        assert fetch.call_count == 2
+        assert account.stats(reset=True) == {'hits': 1, 'refreshes': 2, 'failures': 0, 'invalidations': 0, 'events': 0}
+
+    def test_failure_not_cached(self):
+        fetch = MagicMock(side_effect=[None, {'balance': 5.0, 'positions': []}])
+        account = AccountState(fetch, clock=Clock())
+        assert account.balance() is None
+        assert account.balance() == 5.0
+        assert account.stats()['failures'] == 1
+
+    def test_invalidate_forces_refresh(self):
+        fetch = MagicMock(return_value={'balance': 1.0, 'positions': []})
+        stops = MagicMock(return_value={'BTCUSDT': 48000.0})
+        account = AccountState(fetch, stops, clock=Clock())
+        account.balance(), account.stop_map()
+        account.invalidate('fill')
+        account.balance(), account.stop_map()
+        assert fetch.call_count == 2 and stops.call_count == 2
+
+    def test_result_started_before_invalidate_not_cached(self):
+        account = None
+
+        def fetch():
+            account.invalidate('fill during request')     # 請求途中成交
+            return {'balance': 1.0, 'positions': []}
+
+        account = AccountState(fetch, clock=Clock())
+        assert account.balance() == 1.0
+        assert account.stats()['hits'] == 0
+        account.balance()
+        assert account.stats()['hits'] == 0 and account.stats()['refreshes'] == 2
+
+    def test_concurrent_callers_share_one_request(self):
+        release = threading.Event()
+        fetch = MagicMock(side_effect=lambda: release.wait(5) and {'balance': 1.0, 'positions': []})
+        account = AccountState(fetch, clock=Clock())
+        results = []
+        workers = [threading.Thread(target=lambda: results.append(account.balance())) for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        release.set()
+        for worker in workers:
+            worker.join(5)
+        assert results == [1.0] * 4 and fetch.call_count == 1
+
+    def test_stop_map_copy(self):
+        account = AccountState(MagicMock(), lambda: {'BTCUSDT': 48000.0}, clock=Clock())
+        account.stop_map()['BTCUSDT'] = 1.0
+        assert account.stop_map() == {'BTCUSDT': 48000.0}
+
+
+class TestRiskManagerAccount:
+
+    @pytest.fixture
+    def manager(self):
+        with patch('trader.risk.manager.Config.SANDBOX_MODE', True), \
+             patch('trader.risk.manager.Config.TRADING_MODE', 'future'), \
+             patch('trader.risk.manager.Config.EXCHANGE', 'binance'):
+            rm = RiskManager(MagicMock(), MagicMock())
+            rm.futures_client = MagicMock()
+            rm.futures_client.signed_request.return_value = _response(200, ACCOUNT_BODY)
+            yield rm
+
+    def test_single_account_request(self, manager):
+        manager.account = AccountState(manager.fetch_account, clock=Clock())
+        assert manager.get_balance() == 2500.5
+        positions = manager.get_positions()
+        assert [p['symbol'] for p in positions] == ['BTCUSDT']
+        manager.check_total_risk([MagicMock(is_closed=True)])
+        assert [c.args[:2] for c in manager.futures_client.signed_request.call_args_list] == [
+            ('GET', '/fapi/v2/account')
+        ]
+
+    def test_uncached_without_account_state(self, manager):
+        manager.get_balance()
+        manager.get_positions()
+        assert manager.futures_client.signed_request.call_count == 2
+
+    def test_zero_balance_requeried(self, manager):
+        """測試網暫時性 0 餘額：重查一次拿到正常值"""
+        empty = {**ACCOUNT_BODY, 'assets': [{'asset': 'USDT', 'availableBalance': '0'}]}
+        manager.futures_client.signed_request.side_effect = [_response(200, empty), _response(200, ACCOUNT_BODY)]
+        with patch('trader.risk.manager.Config.MAX_RETRY', 3), \
+             patch('trader.risk.manager.Config.RETRY_DELAY', 0):
+            assert manager.get_balance() == 2500.5
+        assert manager.futures_client.signed_request.call_count == 2
+
+    def test_zero_balance_kept_after_retries(self, manager):
+        """重試用完仍為 0：採用 0 餘額，持倉照常回傳"""
+        empty = {**ACCOUNT_BODY, 'assets': [{'asset': 'USDT', 'availableBalance': '0'}]}
+        manager.futures_client.signed_request.return_value = _response(200, empty)
+        with patch('trader.risk.manager.Config.MAX_RETRY', 3), \
+             patch('trader.risk.manager.Config.RETRY_DELAY', 0):
+            account = manager.fetch_account()
+        assert account['balance'] == 0 and [p['symbol'] for p in account['positions']] == ['BTCUSDT']
+        assert manager.futures_client.signed_request.call_count == 3
+
+    def test_api_error(self, manager):
+        manager.futures_client.signed_request.return_value = _response(500, {})
+        manager.account = AccountState(manager.fetch_account, clock=Clock())
+        with patch('trader.risk.manager.Config.MAX_RETRY', 1):
+            assert manager.get_balance() == 0
+            assert manager.get_positions() is None
+
+
+class TestEngineInvalidation:
+
+    @pytest.fixture
+    def engine(self):
+        client = MagicMock()
+        client.signed_request_json.return_value = {'orderId': 1}
+        client.signed_request.return_value = _response(200, {'algoId': 7})
+        precision = MagicMock()
+        precision.format_quantity.return_value = '0.010'
+        engine = OrderExecutionEngine(MagicMock(), client, precision)
+        engine.account = MagicMock()
+        return engine
+
+    def test_orders_invalidate(self, engine):
+        engine.create_order('BTC/USDT', 'BUY', 0.01)
+        engine.close_position('BTC/USDT', 'LONG', 0.01)
+        assert engine.account.invalidate.call_count == 2
+
+    def test_failed_order_still_invalidates(self, engine):
+        engine.futures_client.signed_request_json.side_effect = [{}, TimeoutError('timeout')]   # 槓桿 OK、下單逾時
+        with pytest.raises(TimeoutError):
+            engine.create_order('BTC/USDT', 'BUY', 0.01)
+        engine.account.invalidate.assert_called_once()
+
+    def test_stop_update_invalidates(self, engine):
+        pm = MagicMock(symbol='BTC/USDT', side='LONG', total_size=0.01, stop_order_id='5')
+        with patch('trader.execution.order_engine.Config.USE_HARD_STOP_LOSS', True), \
+             patch('trader.execution.order_engine.BinanceFuturesClient.is_enabled', return_value=True):
+            engine.update_hard_stop_loss(pm, 48000.0)
+        assert pm.stop_order_id == '7'
+        assert engine.account.invalidate.call_count == 2       # 取消 + 重設
+
+
+class TestBotAccountWiring:
+
+    def test_shared_instance(self, mock_bot):
+        assert mock_bot.risk_manager.account is mock_bot.account
+        assert mock_bot.execution_engine.account is mock_bot.account
+
+    def test_stop_map_cached(self, mock_bot):
+        mock_bot._query_exchange_stop_map = MagicMock(side_effect=[None, {'BTCUSDT': 48000.0}])
+        mock_bot.account = AccountState(MagicMock(), mock_bot._query_exchange_stop_map)
+        assert mock_bot._fetch_exchange_stop_map() == {}          # 失敗 → 空表，不快取
+        assert mock_bot._fetch_exchange_stop_map() == {'BTCUSDT': 48000.0}
+        assert mock_bot._fetch_exchange_stop_map() == {'BTCUSDT': 48000.0}
+        assert mock_bot._query_exchange_stop_map.call_count == 2
@@ -0,0 +1,153 @@
+"""Test: 歷史 K 線回補（分頁、並行、補缺口 / 往前補、中斷續跑、倉庫合併）"""
+
+import sys
+import threading
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+import ccxt
+import numpy as np
+import pytest
+
+from trader.infrastructure.backfill import Backfiller
+from trader.infrastructure.candle_store import CandleStore
+from trader.infrastructure.data_provider import MarketDataProvider
+from trader.tests.test_ohlcv_resample import H, T0
+
+DAY = 86_400_000
+NOW = T0 + 120 * DAY + 30 * 60_000          # 形成中 bar 開盤於 T0 + 120d
+
+
+class PagedExchange:
+    """依 since / until / limit 分頁回應的 1h K 線（可設上市時間、停機缺口、故障）"""
+
+    def __init__(self, listed=None, holes=(), fail_after=None):
+        self.listed = listed or {}
+        self.holes = holes
+        self.fail_after = fail_after
+        self.calls = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def price(symbol, ts):
+        return 100.0 + sum(map(ord, symbol)) % 13 + (ts // H) % 50
+
+    def fetch_ohlcv(self, symbol, timeframe, since=None, limit=100, params=None):
+        with self._lock:
+            self.calls.append((symbol, since, (params or {}).get('until')))
+            if self.fail_after is not None and len(self.calls) > self.fail_after:
+                raise ccxt.NetworkError('connection reset')
+        until = (params or {}).get('until', NOW)
+        ts = max(since, self.listed.get(symbol, T0))
+        rows = []
+        while ts <= until and ts < NOW + H and len(rows) < limit:
+            if not any(lo <= ts < hi for lo, hi in self.holes):
+                p = self.price(symbol, ts)
+                rows.append([ts, p, p + 1, p - 1, p, 10.0])
+            ts += H
+        return rows
+
+
+def _backfiller(exchange, tmp_path, **kwargs):
+    provider = MarketDataProvider(exchange, max_retry=1, retry_delay=0, cache_enabled=False)
+    return Backfiller(provider, CandleStore(str(tmp_path / 'candles')), page_limit=500, **kwargs)
+
+
+def _expected_ts(start, end=NOW - NOW % H):
+    return np.arange(start, end, H)
+
+
+class TestBackfill:
+
+    def test_paginates_full_range(self, tmp_path):
+        exchange = PagedExchange()
+        bf = _backfiller(exchange, tmp_path, max_workers=4)
+        symbols = ['BTC/USDT', 'ETH/USDT', 'SOL/USDT']
+        reports = bf.run(symbols, ['1h'], T0, NOW)
+
+        assert sorted(r['symbol'] for r in reports) == symbols
+        for symbol in symbols:
+            records = bf.store.read(symbol, '1h')
+            np.testing.assert_array_equal(records['ts'], _expected_ts(T0))
+            assert records['close'][5] == PagedExchange.price(symbol, T0 + 5 * H)
+        # 120 天 = 2880 bars → 每個 symbol 6 頁；最後一頁帶 endTime，不抓形成中 bar
+        assert all(r['pages'] == 6 and r['missing'] == 0 for r in reports)
+        assert len(exchange.calls) == 18
+        assert all(until == NOW - NOW % H - 1 for _, _, until in exchange.calls)
+
+    def test_resume_after_interruption(self, tmp_path):
+        bf = _backfiller(PagedExchange(fail_after=3), tmp_path, flush_bars=500)
+        report = bf.backfill('BTC/USDT', '1h', T0, NOW)
+        assert report['stored'] == 1500 and report['missing'] == 2880 - 1500
+
+        exchange = PagedExchange()
+        bf.provider.exchange = exchange
+        report = bf.backfill('BTC/USDT', '1h', T0, NOW)
+        assert exchange.calls[0][1] == T0 + 1500 * H           # 從已寫入處接續
+        assert report['stored'] == 1380 and report['missing'] == 0
+        np.testing.assert_array_equal(bf.store.read('BTC/USDT', '1h')['ts'], _expected_ts(T0))
+
+        # 已完整 → 不再發請求
+        assert bf.backfill('BTC/USDT', '1h', T0, NOW)['pages'] == 0
+        assert len(exchange.calls) == 3
+
+    def test_fills_gaps_and_extends_head(self, tmp_path):
+        exchange = PagedExchange()
+        bf = _backfiller(exchange, tmp_path)
+        bf.backfill('BTC/USDT', '1h', T0 + 60 * DAY, T0 + 80 * DAY)
+        bf.backfill('BTC/USDT', '1h', T0 + 90 * DAY, T0 + 100 * DAY)
+        assert bf.plan('BTC/USDT', '1h', T0, NOW) == [
+            (T0, T0 + 60 * DAY), (T0 + 80 * DAY, T0 + 90 * DAY), (T0 + 100 * DAY, NOW - NOW % H),
+        ]
+
+        exchange.calls.clear()
+        report = bf.backfill('BTC/USDT', '1h', T0, NOW)
+        assert [since for _, since, _ in exchange.calls][:2] == [T0, T0 + 500 * H]
+        assert report['stored'] == 2880 - 30 * 24
+        np.testing.assert_array_equal(bf.store.read('BTC/USDT', '1h')['ts'], _expected_ts(T0))
+
+    def test_exchange_holes_and_listing(self, tmp_path):
+        hole = (T0 + 10 * DAY, T0 + 10 * DAY + 5 * H)
+        listed = T0 + 30 * DAY
+        exchange = PagedExchange(listed={'NEW/USDT': listed}, holes=[hole])
+        bf = _backfiller(exchange, tmp_path)
+        reports = {r['symbol']: r for r in bf.run(['BTC/USDT', 'NEW/USDT'], ['1h'], T0, NOW)}
+
+        assert reports['BTC/USDT']['missing'] == 5
+        assert reports['NEW/USDT']['missing'] == 30 * 24
+        assert bf.store.read('NEW/USDT', '1h')['ts'][0] == listed
+
+        # 交易所本身沒有的區段：重跑每段只花一個請求，不會卡住
+        exchange.calls.clear()
+        bf.run(['BTC/USDT', 'NEW/USDT'], ['1h'], T0, NOW)
+        assert len(exchange.calls) == 2
+
+
+class TestStoreMerge:
+
+    @pytest.fixture
+    def store(self, tmp_path):
+        return CandleStore(str(tmp_path / 'candles'))
+
+    @staticmethod
+    def _frame(start, n):
+        rows = [[start + i * H, 1.0, 2.0, 0.5, 1.5, 1.0] for i in range(n)]
+        return MarketDataProvider._to_frame(rows)
+
+    def test_merge_older_and_gap(self, store):
+        assert store.merge('BTC/USDT', '1h', self._frame(T0 + 50 * H, 10), now_ms=NOW) == 10
+        assert store.merge('BTC/USDT', '1h', self._frame(T0, 20), now_ms=NOW) == 20
+        assert store.gaps('BTC/USDT', '1h') == [(T0 + 20 * H, T0 + 50 * H)]
+        assert store.merge('BTC/USDT', '1h', self._frame(T0 + 15 * H, 40), now_ms=NOW) == 30
+        assert store.gaps('BTC/USDT', '1h') == []
+        ts = store.read('BTC/USDT', '1h')['ts']
+        np.testing.assert_array_equal(ts, T0 + np.arange(60) * H)
+        assert not list(store.root.glob('*.tmp'))
+
+    def test_merge_skips_forming_bar(self, store):
+        assert store.merge('BTC/USDT', '1h', self._frame(NOW - NOW % H - 2 * H, 3), now_ms=NOW) == 2
+
+    def test_gaps_window(self, store):
+        assert store.gaps('BTC/USDT', '1h', T0, T0 + 10 * H) == [(T0, T0 + 10 * H)]
+        store.append('BTC/USDT', '1h', self._frame(T0 + 2 * H, 3), now_ms=NOW)
+        assert store.gaps('BTC/USDT', '1h', T0, T0 + 10 * H) == [(T0, T0 + 2 * H), (T0 + 5 * H, T0 + 10 * H)]
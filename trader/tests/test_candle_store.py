@@ -0,0 +1,137 @@
+"""Test: 本地 K 線倉庫（append-only 定長記錄、memmap 讀取、torn write 修復、壓縮、重啟暖機）"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from trader.infrastructure.candle_store import CandleStore, RECORD_DTYPE, RECORD_SIZE
+from trader.infrastructure.data_provider import MarketDataProvider
+from trader.tests.test_ohlcv_resample import H, M15, T0, TickExchange, _native
+
+NOW = T0 + 50 * 86_400_000 + 2 * M15
+
+
+def _hourly(limit=100):
+    return _native(TickExchange(NOW), '1h', limit)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return CandleStore(str(tmp_path / 'candles'))
+
+
+class TestAppendRead:
+
+    def test_closed_bars_only(self, store):
+        df = _hourly()
+        assert store.append('BTC/USDT', '1h', df, now_ms=NOW) == 99   # 最後一根形成中
+        assert store.append('BTC/USDT', '1h', df, now_ms=NOW) == 0    # 已存在不重複
+
+        records = store.read('BTC/USDT', '1h')
+        assert isinstance(records, np.memmap)
+        np.testing.assert_array_equal(records['close'], df['close'].iloc[:-1])
+        assert store.path('BTC/USDT', '1h').stat().st_size == 99 * RECORD_SIZE
+
+    def test_load_frame_round_trip(self, store):
+        df = _hourly()
+        store.append('BTC/USDT', '1h', df, now_ms=NOW)
+        pd.testing.assert_frame_equal(store.load_frame('BTC/USDT', '1h', 50), df.iloc[-51:-1].reset_index(drop=True))
+
+    def test_load_frame_trailing_contiguous(self, store):
+        df = _hourly()
+        store.append('BTC/USDT', '1h', df.iloc[:40], now_ms=NOW)
+        store.append('BTC/USDT', '1h', df.iloc[60:], now_ms=NOW)      # 缺口
+        frame = store.load_frame('BTC/USDT', '1h', 1000)
+        assert frame['timestamp'].iloc[0] == df['timestamp'].iloc[60]
+        assert len(store.read('BTC/USDT', '1h')) == 40 + 39
+
+    def test_missing(self, store):
+        assert len(store.read('ETH/USDT', '1h')) == 0
+        assert store.load_frame('ETH/USDT', '1h', 10).empty
+        assert store.last_ts('ETH/USDT', '1h') is None
+
+
+class TestIntegrity:
+
+    def test_torn_tail_truncated(self, tmp_path):
+        root = str(tmp_path / 'candles')
+        CandleStore(root).append('BTC/USDT', '1h', _hourly(), now_ms=NOW)
+        path = CandleStore(root).path('BTC/USDT', '1h')
+        with open(path, 'ab') as f:
+            f.write(b'\x01' * (RECORD_SIZE // 2))
+
+        reopened = CandleStore(root)
+        assert len(reopened.read('BTC/USDT', '1h')) == 99
+        assert path.stat().st_size == 99 * RECORD_SIZE
+        assert reopened.stats['repaired'] == 1
+
+    def test_uncommitted_tail_validated(self, tmp_path):
+        """資料已寫入但 index 未更新：合法記錄保留，之後的不合法記錄截斷"""
+        root = str(tmp_path / 'candles')
+        store = CandleStore(root)
+        store.append('BTC/USDT', '1h', _hourly(), now_ms=NOW)
+        last = store.read('BTC/USDT', '1h')[-1]
+
+        extra = np.zeros(2, dtype=RECORD_DTYPE)
+        extra[0] = (last['ts'] + H, 1.0, 2.0, 0.5, 1.5, 10.0)
+        extra[1] = (last['ts'] - H, 1.0, 2.0, 0.5, 1.5, 10.0)   # ts 倒退
+        with open(store.path('BTC/USDT', '1h'), 'ab') as f:
+            f.write(extra.tobytes())
+
+        report = CandleStore(root).check('BTC/USDT', '1h')
+        assert report == {'records': 100, 'truncated': 1, 'torn_bytes': 0}
+        assert CandleStore(root).last_ts('BTC/USDT', '1h') == last['ts'] + H
+
+    def test_rejects_invalid_rows(self, store):
+        df = _hourly()
+        df.loc[10, 'high'] = df.loc[10, 'low'] - 1
+        assert store.append('BTC/USDT', '1h', df, now_ms=NOW) == 10
+
+
+class TestCompaction:
+
+    def test_auto_compact(self, tmp_path):
+        store = CandleStore(str(tmp_path / 'candles'), max_records=40)
+        df = _hourly()
+        for end in range(20, 101, 10):
+            store.append('BTC/USDT', '1h', df.iloc[:end], now_ms=NOW)
+        records = store.read('BTC/USDT', '1h')
+        assert len(records) <= 60
+        assert records['ts'][-1] == pd.Timestamp(df['timestamp'].iloc[-2]).value // 1_000_000
+        assert store.stats['compacted'] >= 1
+
+    def test_compact_keep(self, store):
+        store.append('BTC/USDT', '1h', _hourly(), now_ms=NOW)
+        assert store.compact('BTC/USDT', '1h', keep=30) == 69
+        assert len(store.read('BTC/USDT', '1h')) == 30
+        assert not list(store.root.glob('*.tmp'))
+
+
+class TestProviderWarmStart:
+
+    def test_restart_tops_up_from_disk(self, tmp_path, monkeypatch):
+        now = {'ms': NOW}
+        monkeypatch.setattr('trader.infrastructure.data_provider.time.time', lambda: now['ms'] / 1000)
+        root = str(tmp_path / 'candles')
+        exchange = TickExchange(NOW)
+
+        MarketDataProvider(exchange, max_retry=1, retry_delay=0, candle_store=CandleStore(root)) \
+            .fetch_ohlcv('BTC/USDT', '1h', 200)
+
+        # 重啟：新 provider、空的記憶體快取，兩小時後
+        now['ms'] += 2 * H
+        exchange.now_ms = now['ms']
+        calls = []
+        original = exchange.fetch_ohlcv
+        exchange.fetch_ohlcv = lambda *a, **kw: calls.append(kw) or original(*a, **kw)
+        dp = MarketDataProvider(exchange, max_retry=1, retry_delay=0, candle_store=CandleStore(root))
+
+        df = dp.fetch_ohlcv('BTC/USDT', '1h', 200)
+
+        assert len(calls) == 1 and calls[0]['since'] is not None and calls[0]['limit'] < 10
+        assert dp.cache_stats()['warm'] == 1
+        pd.testing.assert_frame_equal(df, _native(exchange, '1h', 200), check_dtype=False)
@@ -0,0 +1,307 @@
+"""Test: Candles struct-of-arrays（連續陣列、零拷貝切片、指標欄位、provider / 信號 / 結構 / 策略原生支援）"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from trader.config import ConfigV6 as Config
+from trader.indicators.registry import ensure_indicators, lazy_stats
+from trader.indicators.technical import TechnicalAnalysis
+from trader.infrastructure.candles import Bar, Candles, as_frame, bar, column
+from trader.infrastructure.data_provider import MarketDataProvider
+from trader.signals import detect_2b_with_pivots, detect_ema_pullback, detect_volume_breakout
+from trader.strategies.base import TradingStrategy
+from trader.structure import StructureAnalysis
+from trader.tests.conftest import make_pm
+from trader.tests.test_integration import _inject_pm_into_bot, _make_ohlcv_df
+from trader.tests.test_ohlcv_resample import H, T0, TickExchange, _native, _provider
+
+
+@pytest.fixture
+def frame():
+    return _native(TickExchange(T0 + 300 * H), '1h', 200)
+
+
+@pytest.fixture(scope='module')
+def history():
+    """約 1900 根 1H K 線（信號 / 策略 parity 用的滑動視窗來源）"""
+    return _native(TickExchange(T0 + 80 * 24 * H), '1h', 2000)
+
+
+def _same(a, b) -> bool:
+    """信號 / 決策結果相等（NaN 視為相等）"""
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(_same(a[k], b[k]) for k in a)
+    if isinstance(a, (tuple, list)) and isinstance(b, (tuple, list)):
+        return len(a) == len(b) and all(_same(x, y) for x, y in zip(a, b))
+    if isinstance(a, float) and isinstance(b, float) and np.isnan(a) and np.isnan(b):
+        return True
+    return a == b
+
+
+class TestLayout:
+
+    def test_columns_contiguous(self, frame):
+        candles = Candles.from_frame(frame, 'BTC/USDT', '1h')
+        for name in ('open', 'high', 'low', 'close', 'volume'):
+            assert candles[name].dtype == np.float64
+            assert candles[name].flags['C_CONTIGUOUS']
+        assert candles.ts.dtype == np.int64
+        assert not hasattr(candles, '__dict__')
+
+    def test_slice_is_view(self, frame):
+        candles = Candles.from_frame(frame)
+        tail = candles[-50:]
+        assert len(tail) == 50
+        assert np.shares_memory(tail.close, candles.close)
+        assert tail.close[-1] == frame['close'].iloc[-1]
+        assert candles.tail(10).ts[0] == candles.ts[-10]
+        assert len(candles.tail(0)) == 0
+
+    def test_row_access(self, frame):
+        candles = Candles.from_frame(frame)
+        row = candles[-1]
+        assert isinstance(row, Bar)
+        assert row['timestamp'] == frame['timestamp'].iloc[-1]
+        for name in ('open', 'high', 'low', 'close', 'volume'):
+            assert row[name] == frame[name].iloc[-1]
+        assert row.get('atr', 0) == 0 and 'atr' not in row
+
+    def test_bar_matches_iloc(self, frame):
+        frame['atr'] = np.arange(len(frame), dtype=float)
+        for data in (frame, Candles.from_frame(frame)):
+            for i in (-1, -2):
+                expected = frame.iloc[i]
+                row = bar(data, i)
+                assert {k: row[k] for k in row} == expected.to_dict()
+                assert row.get('atr', 0) == expected.get('atr', 0)
+
+    def test_from_ohlcv(self):
+        raw = [[T0, 1, 2, 0.5, 1.5, 10], [T0 + H, 1.5, 3, 1, 2, 20]]
+        candles = Candles.from_ohlcv(raw, 'BTC/USDT', '1h')
+        assert candles.ts.tolist() == [T0, T0 + H]
+        assert candles.close.tolist() == [1.5, 2.0]
+        assert Candles.from_ohlcv([]).empty
+
+    def test_indicator_columns(self, frame):
+        candles = Candles.from_frame(frame)
+        candles['atr'] = np.ones(len(candles))
+        assert 'atr' in candles.columns
+        np.testing.assert_array_equal(column(candles, 'atr'), 1.0)
+        assert candles[-20:]['atr'].base is not None
+        with pytest.raises(KeyError):
+            candles['close'] = np.zeros(len(candles))
+        with pytest.raises(ValueError):
+            candles['vol_ma'] = np.zeros(3)
+        with pytest.raises(KeyError):
+            candles['ema_fast']
+
+
+class TestFrameRoundTrip:
+
+    def test_to_frame(self, frame):
+        frame.attrs.update(symbol='BTC/USDT', timeframe='1h')
+        out = Candles.from_frame(frame).to_frame()
+        pd.testing.assert_frame_equal(out, frame, check_dtype=False)
+        assert out.attrs == {'symbol': 'BTC/USDT', 'timeframe': '1h'}
+
+    def test_to_frame_does_not_alias(self, frame):
+        candles = Candles.from_frame(frame)
+        out = candles.to_frame()
+        out.loc[0, 'close'] = -1.0
+        assert candles.close[0] != -1.0
+
+    def test_indicator_columns_round_trip(self, frame):
+        df = TechnicalAnalysis.calculate_indicators(frame.copy())
+        out = Candles.from_frame(df).to_frame()
+        pd.testing.assert_frame_equal(out, df, check_dtype=False)
+
+    def test_as_frame(self, frame):
+        assert as_frame(frame) is frame and as_frame(None) is None
+        assert isinstance(as_frame(Candles.from_frame(frame)), pd.DataFrame)
+
+
+class TestIndicators:
+
+    def test_calculate_indicators_matches_frame(self, frame):
+        df = TechnicalAnalysis.calculate_indicators(frame.copy())
+        candles = TechnicalAnalysis.calculate_indicators(Candles.from_frame(frame))
+        assert isinstance(candles, Candles)
+        for name in TechnicalAnalysis.indicator_columns():
+            np.testing.assert_array_equal(candles[name], df[name].to_numpy())
+
+    def test_lazy_columns(self, frame):
+        eager = TechnicalAnalysis.calculate_indicators(Candles.from_frame(frame))
+        candles = TechnicalAnalysis.calculate_indicators(Candles.from_frame(frame), lazy=True)
+        assert 'atr' not in candles.columns
+        ensure_indicators(candles, 'atr')
+        np.testing.assert_array_equal(candles['atr'], eager['atr'])
+        assert 'vol_ma' not in candles.columns
+
+    def test_lazy_view_computed_on_origin(self, frame):
+        eager = TechnicalAnalysis.calculate_indicators(Candles.from_frame(frame))
+        candles = TechnicalAnalysis.calculate_indicators(Candles.from_frame(frame), lazy=True)
+        tail = candles[-30:]
+        ensure_indicators(tail, 'ema_slow')
+        # 在原始 Candles 上算（暖機與整段相同），切片取共用記憶體的視圖
+        np.testing.assert_array_equal(tail['ema_slow'], eager['ema_slow'][-30:])
+        assert 'ema_slow' in candles.columns
+        assert np.shares_memory(tail['ema_slow'], candles['ema_slow'])
+
+    def test_to_frame_keeps_lazy_origin(self, frame):
+        eager = TechnicalAnalysis.calculate_indicators(Candles.from_frame(frame))
+        candles = TechnicalAnalysis.calculate_indicators(Candles.from_frame(frame), lazy=True)
+        legacy = candles[-50:].to_frame()
+        lazy_stats(reset=True)
+        ensure_indicators(legacy, 'adx')
+        np.testing.assert_array_equal(legacy['adx'].to_numpy(), eager['adx'][-50:])
+        assert 'adx' in candles.columns
+        assert lazy_stats()['computed'] == 1
+
+
+class TestProvider:
+
+    def test_fetch_candles(self):
+        exchange = TickExchange(T0 + 300 * H)
+        provider = MarketDataProvider(exchange, max_retry=1, retry_delay=0)
+        candles = provider.fetch_candles('BTC/USDT', '1h', 120)
+        df = provider.fetch_ohlcv('BTC/USDT', '1h', 100)
+
+        assert isinstance(candles, Candles) and len(candles) == 120
+        assert candles.attrs == {'symbol': 'BTC/USDT', 'timeframe': '1h'}
+        np.testing.assert_array_equal(candles.close[-100:], df['close'].to_numpy())
+
+    def test_fetch_candles_many_matches_frames(self):
+        exchange = TickExchange(T0 + 60 * 86_400_000 + 6 * H + 5_000)
+        with patch('trader.infrastructure.data_provider.time.time', lambda: exchange.now_ms / 1000):
+            requests = [('X', '1h', 50), ('X', '4h', 50)]
+            frames = _provider(exchange).fetch_ohlcv_many(requests)
+            candles = _provider(exchange).fetch_candles_many(requests)
+
+        assert candles.keys() == frames.keys()
+        for key, df in frames.items():
+            assert isinstance(candles[key], Candles)
+            assert candles[key].attrs == {'symbol': key[0], 'timeframe': key[1]}
+            pd.testing.assert_frame_equal(candles[key].to_frame(), df, check_dtype=False)
+
+    def test_failed_request_is_blank(self):
+        exchange = MagicMock()
+        exchange.fetch_ohlcv.side_effect = RuntimeError('down')
+        provider = MarketDataProvider(exchange, max_retry=1, retry_delay=0)
+        result = provider.fetch_candles_many([('X', '1h', 50)])
+        assert isinstance(result[('X', '1h')], Candles) and result[('X', '1h')].empty
+
+
+class TestNativeConsumers:
+
+    def test_structure_accepts_candles(self, frame):
+        frame.attrs.update(symbol='BTC/USDT', timeframe='1h')
+        candles = Candles.from_frame(frame)
+        StructureAnalysis.clear_swing_cache()
+
+        assert StructureAnalysis.find_swing_points(candles, 5, 2) == StructureAnalysis.find_swing_points(frame, 5, 2)
+        for side, sl in (('LONG', 0.0), ('SHORT', 1e9)):
+            assert (StructureAnalysis.get_validated_trailing_swing(candles, side, sl)
+                    == StructureAnalysis.get_validated_trailing_swing(frame, side, sl))
+        StructureAnalysis.find_swing_points(candles, 5, 2)
+        assert StructureAnalysis.swing_cache_stats()['hits'] >= 1
+
+    def test_signals_match_frame(self, history):
+        detectors = (
+            lambda data: detect_2b_with_pivots(data, accept_weak_signals=True, min_fakeout_atr=0.0),
+            lambda data: detect_ema_pullback(data, ema_pullback_threshold=0.02),
+            lambda data: detect_volume_breakout(data, volume_breakout_mult=1.5),
+        )
+        found = 0
+        for end in range(100, len(history), 4):
+            window = history.iloc[end - 100:end].reset_index(drop=True)
+            df = TechnicalAnalysis.calculate_indicators(window.copy(), lazy=True)
+            candles = TechnicalAnalysis.calculate_indicators(Candles.from_frame(window), lazy=True)
+            for detect in detectors:
+                expected = detect(df)
+                assert _same(detect(candles), expected)
+                found += expected[0]
+        assert found > 0
+
+
+class _FrameOnlyStrategy(TradingStrategy):
+    """未遷移的第三方策略：只認得 DataFrame"""
+
+    def __init__(self):
+        self.seen = []
+
+    def get_decision(self, pm, current_price, df_1h, df_4h=None, **kwargs):
+        df_1h = ensure_indicators(df_1h, 'atr')
+        self.seen.append((type(df_1h), type(df_4h), df_1h['atr'].iloc[-1]))
+        return {"action": "HOLD", "reason": "NONE", "new_sl": None, "close_pct": None, "add_stage": None}
+
+
+class TestStrategies:
+
+    def test_legacy_strategy_gets_frame(self, frame):
+        candles = TechnicalAnalysis.calculate_indicators(Candles.from_frame(frame), lazy=True)
+        strategy = _FrameOnlyStrategy()
+        pm = make_pm(strategy=strategy)
+        pm.monitor(50000.0, candles, candles)
+        df_type, df4_type, atr = strategy.seen[0]
+        assert df_type is pd.DataFrame and df4_type is pd.DataFrame
+        ensure_indicators(candles, 'atr')
+        assert atr == candles['atr'][-1]
+
+    def test_builtin_strategies_accept_candles(self):
+        for name in ('v6_pyramid', 'v7_structure', 'v53_sop'):
+            assert make_pm(strategy_name=name).strategy.accepts_candles
+
+    @pytest.mark.parametrize('name', ['v6_pyramid', 'v7_structure', 'v53_sop'])
+    def test_decisions_match_frame(self, history, name):
+        """同一段行情逐根監控：Candles 與 DataFrame 的決策、止損軌跡完全相同"""
+        first = history['close'].iloc[99]
+        pms = [
+            make_pm(strategy_name=name, entry_price=first, stop_loss=first * 0.95, neckline=first * 1.01)
+            for _ in range(2)
+        ]
+        for pm in pms:
+            pm.highest_price = pm.lowest_price = first
+        for end in range(100, 400):
+            window = history.iloc[end - 100:end].reset_index(drop=True)
+            df = TechnicalAnalysis.calculate_indicators(window.copy(), lazy=True)
+            candles = TechnicalAnalysis.calculate_indicators(Candles.from_frame(window), lazy=True)
+            price = window['close'].iloc[-1]
+            decisions = [pm.monitor(price, data, data) for pm, data in zip(pms, (df, candles))]
+            assert _same(decisions[1], decisions[0])
+            assert pms[1].current_sl == pms[0].current_sl and pms[1].stage == pms[0].stage
+            if pms[0].is_closed or decisions[0]['action'] != 'HOLD':
+                break
+
+
+class TestMonitorPath:
+
+    def _recorded_frames(self, bot, enabled):
+        pm = _inject_pm_into_bot(bot)
+        seen = []
+        pm.monitor = MagicMock(side_effect=lambda price, df_1h, df_4h: seen.append(df_1h) or {
+            'action': 'HOLD', 'reason': 'HOLD', 'new_sl': None,
+        })
+        bot.data_provider.fetch_ohlcv = MagicMock(return_value=_make_ohlcv_df(50000.0))
+        bot.data_provider.fetch_prices = MagicMock(return_value={'BTC/USDT': 50500.0})
+        with patch.object(Config, 'MONITOR_CANDLES_ENABLED', enabled):
+            bot.monitor_positions()
+        return seen
+
+    def test_monitor_feeds_candles(self, integration_bot):
+        bot, _, _ = integration_bot
+        seen = self._recorded_frames(bot, True)
+        assert len(seen) == 1 and isinstance(seen[0], Candles)
+        bot.data_provider.fetch_ohlcv_many.assert_not_called()
+
+    def test_monitor_frames_when_disabled(self, integration_bot):
+        bot, _, _ = integration_bot
+        seen = self._recorded_frames(bot, False)
+        assert len(seen) == 1 and isinstance(seen[0], pd.DataFrame)
+        bot.data_provider.fetch_candles_many.assert_not_called()
@@ -0,0 +1,176 @@
+"""Test: 端點能力登錄（失敗路徑負快取、TTL 重新探測、provider / bot 直接走可用路徑）"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from trader.infrastructure.capabilities import CapabilityRegistry
+from trader.infrastructure.data_provider import MarketDataProvider
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _attempts(calls, results):
+    """results: {path: 回傳值或例外}"""
+    def make(path):
+        def call():
+            calls.append(path)
+            value = results[path]
+            if isinstance(value, Exception):
+                raise value
+            return value
+        return call
+    return [(path, make(path)) for path in results]
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+class TestRegistry:
+
+    def test_learns_working_path(self, clock):
+        registry = CapabilityRegistry(ttl_seconds=60, clock=clock)
+        calls = []
+        attempts = _attempts(calls, {'ccxt': Exception('not supported'), 'direct': 'ok'})
+
+        assert registry.route('klines', attempts, env='demo') == 'ok'
+        assert registry.route('klines', attempts, env='demo') == 'ok'
+        assert calls == ['ccxt', 'direct', 'direct']
+        assert registry.working('klines', env='demo') == 'direct'
+        assert registry.stats == {'demoted': 1, 'skipped': 1}
+
+    def test_ttl_reprobe(self, clock):
+        registry = CapabilityRegistry(ttl_seconds=60, clock=clock)
+        calls = []
+        results = {'ccxt': Exception('not supported'), 'direct': 'ok'}
+        attempts = _attempts(calls, results)
+        registry.route('klines', attempts, env='demo')
+
+        clock.now += 61
+        results['ccxt'] = 'ccxt ok'
+        assert registry.route('klines', attempts, env='demo') == 'ccxt ok'
+        assert calls == ['ccxt', 'direct', 'ccxt']
+        assert registry.working('klines', env='demo') == 'ccxt'
+
+    def test_env_and_endpoint_isolated(self, clock):
+        registry = CapabilityRegistry(clock=clock)
+        registry.route('klines', _attempts([], {'ccxt': Exception('x'), 'direct': 1}), env='demo')
+        assert registry.order('klines', ['ccxt', 'direct'], env='demo') == ['direct', 'ccxt']
+        assert registry.order('klines', ['ccxt', 'direct'], env='live') == ['ccxt', 'direct']
+        assert registry.order('ticker', ['ccxt', 'direct'], env='demo') == ['ccxt', 'direct']
+
+    def test_all_failing_not_cached(self, clock):
+        registry = CapabilityRegistry(clock=clock)
+        calls = []
+        attempts = _attempts(calls, {'a': Exception('down'), 'b': Exception('down too')})
+        with pytest.raises(Exception, match='down too'):
+            registry.route('klines', attempts)
+        assert registry.order('klines', ['a', 'b']) == ['a', 'b']
+
+    def test_demoted_path_still_last_resort(self, clock):
+        registry = CapabilityRegistry(clock=clock)
+        calls = []
+        results = {'a': None, 'b': 'ok'}
+        attempts = _attempts(calls, results)
+        registry.route('x', attempts, ok=lambda r: r is not None)
+        results.update(a='a ok', b=None)
+        assert registry.route('x', attempts, ok=lambda r: r is not None) == 'a ok'
+        assert calls == ['a', 'b', 'b', 'a']
+
+    def test_errors_not_demoted_when_disabled(self, clock):
+        registry = CapabilityRegistry(clock=clock)
+        attempts = _attempts([], {'algo': Exception('timeout'), 'plain': {}})
+        assert registry.route('stop_orders', attempts, ok=lambda r: r is not None, demote_on_error=False) == {}
+        assert registry.order('stop_orders', ['algo', 'plain']) == ['algo', 'plain']
+
+
+def _klines_response():
+    resp = MagicMock(status_code=200, headers={})
+    resp.json.return_value = [[1_700_000_000_000, '1', '2', '0.5', '1.5', '10']]
+    return resp
+
+
+class TestProviderRouting:
+
+    def test_demo_klines_skip_ccxt(self):
+        exchange = MagicMock()
+        exchange.fetch_ohlcv.side_effect = Exception('demo not supported')
+        provider = MarketDataProvider(
+            exchange, max_retry=1, retry_delay=0, sandbox_mode=True, trading_mode='future', cache_enabled=False,
+        )
+        with patch('trader.infrastructure.http_pool.get', return_value=_klines_response()) as get:
+            for _ in range(3):
+                assert len(provider.fetch_ohlcv('BTC/USDT', '1h', 10)) == 1
+        assert exchange.fetch_ohlcv.call_count == 1
+        assert get.call_count == 3
+        assert get.call_args.kwargs['params']['symbol'] == 'BTCUSDT'
+
+    def test_live_single_path_unchanged(self):
+        exchange = MagicMock()
+        exchange.fetch_ohlcv.side_effect = Exception('boom')
+        provider = MarketDataProvider(exchange, max_retry=1, retry_delay=0, cache_enabled=False)
+        with patch('trader.infrastructure.http_pool.get') as get:
+            assert provider.fetch_ohlcv('BTC/USDT', '1h', 10).empty
+        get.assert_not_called()
+
+    def test_shared_registry_prices(self):
+        registry = CapabilityRegistry()
+        exchange = MagicMock()
+        exchange.has = {'fetchLastPrices': True}
+        exchange.fetch_last_prices.side_effect = Exception('demo not supported')
+        resp = MagicMock(status_code=200, headers={})
+        resp.json.return_value = [{'symbol': 'BTCUSDT', 'price': '50000'}]
+        provider = MarketDataProvider(
+            exchange, max_retry=1, retry_delay=0, sandbox_mode=True, trading_mode='future', capabilities=registry,
+        )
+        with patch('trader.infrastructure.http_pool.get', return_value=resp):
+            provider.fetch_prices(['BTC/USDT'])
+            assert provider.fetch_prices(['BTC/USDT']) == {'BTC/USDT': 50000.0}
+        assert exchange.fetch_last_prices.call_count == 1
+        assert registry.snapshot() == {'prices@demo': 'demo-fapi'}
+
+
+class TestBotRouting:
+
+    @staticmethod
+    def _response(status, body):
+        resp = MagicMock(status_code=status)
+        resp.json.return_value = body
+        return resp
+
+    def test_stop_map_skips_algo_after_404(self, mock_bot):
+        client = MagicMock()
+        client.signed_request.side_effect = lambda method, endpoint, *a, **k: (
+            self._response(404, {}) if 'algoOrder' in endpoint
+            else self._response(200, [{'type': 'STOP_MARKET', 'symbol': 'BTCUSDT', 'stopPrice': '48000'}])
+        )
+        mock_bot.risk_manager.futures_client = client
+        with patch('trader.bot.Config.SANDBOX_MODE', True), \
+             patch('trader.bot.Config.TRADING_MODE', 'future'), \
+             patch('trader.bot.Config.EXCHANGE', 'binance'), \
+             patch('trader.infrastructure.api_client.Config.SANDBOX_MODE', True):
+            for _ in range(3):
+                assert mock_bot._query_exchange_stop_map() == {'BTCUSDT': 48000.0}
+        endpoints = [c.args[1] for c in client.signed_request.call_args_list]
+        assert endpoints == ['/fapi/v1/algoOrder/openOrders'] + ['/fapi/v1/openOrders'] * 3
+
+    def test_ticker_demo_fallback_remembered(self, mock_bot):
+        mock_bot.exchange.fetch_ticker = MagicMock(side_effect=Exception('demo not supported'))
+        with patch('trader.bot.Config.SANDBOX_MODE', True), \
+             patch('trader.bot.Config.TRADING_MODE', 'future'), \
+             patch('trader.infrastructure.http_pool.get', return_value=self._response(200, {'price': '50000'})):
+            for _ in range(2):
+                assert mock_bot.fetch_ticker('BTC/USDT')['last'] == 50000.0
+        assert mock_bot.exchange.fetch_ticker.call_count == 1
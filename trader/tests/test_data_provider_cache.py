@@ -0,0 +1,303 @@
+"""Test: MarketDataProvider 增量 K 線快取"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+import pytest
+
+from trader.infrastructure.data_provider import MarketDataProvider, timeframe_to_ms
+
+H = 3_600_000
+T0 = 1_700_000_000_000 - (1_700_000_000_000 % H)
+
+
+class FakeExchange:
+    """模擬交易所：每小時一根 bar，最後一根為形成中 bar（close 隨呼叫變動）"""
+
+    def __init__(self, now_ms):
+        self.now_ms = now_ms
+        self.calls = []
+        self.tick = 0
+
+    def _bar(self, ts):
+        base = (ts - T0) / H
+        close = base + 0.5 + (self.tick * 0.01 if ts + H > self.now_ms else 0)
+        return [ts, base, base + 1, base - 1, close, 100.0]
+
+    def fetch_ohlcv(self, symbol, timeframe, since=None, limit=100):
+        self.calls.append({'since': since, 'limit': limit})
+        self.tick += 1
+        last = self.now_ms - (self.now_ms % H)
+        if since is None:
+            start = last - (limit - 1) * H
+        else:
+            start = since
+        return [self._bar(ts) for ts in range(start, last + 1, H)][:limit]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    state = {'now': T0 + 500 * H + 10_000}
+    monkeypatch.setattr(
+        'trader.infrastructure.data_provider.time.time', lambda: state['now'] / 1000
+    )
+    return state
+
+
+def _provider(exchange, **kwargs):
+    return MarketDataProvider(exchange, max_retry=1, retry_delay=0, **kwargs)
+
+
+class TestTimeframeToMs:
+
+    def test_units(self):
+        assert timeframe_to_ms('1m') == 60_000
+        assert timeframe_to_ms('4h') == 4 * H
+        assert timeframe_to_ms('1d') == 24 * H
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            timeframe_to_ms('abc')
+
+
+class TestIncrementalCache:
+
+    def test_second_call_only_fetches_new_bars(self, clock):
+        ex = FakeExchange(clock['now'])
+        dp = _provider(ex)
+        first = dp.fetch_ohlcv('BTC/USDT', '1h', limit=100)
+        assert len(first) == 100
+        assert ex.calls[-1] == {'since': None, 'limit': 100}
+
+        # 同一根 bar 內再抓：只重抓形成中的最後一根
+        second = dp.fetch_ohlcv('BTC/USDT', '1h', limit=100)
+        assert ex.calls[-1]['since'] is not None
+        assert ex.calls[-1]['limit'] < 100
+        assert len(second) == 100
+        assert second['timestamp'].iloc[-1] == first['timestamp'].iloc[-1]
+        assert second['close'].iloc[-1] != first['close'].iloc[-1]
+
+    def test_new_bar_appended_and_deduplicated(self, clock):
+        ex = FakeExchange(clock['now'])
+        dp = _provider(ex)
+        first = dp.fetch_ohlcv('BTC/USDT', '1h', limit=100)
+
+        clock['now'] += 2 * H
+        ex.now_ms = clock['now']
+        df = dp.fetch_ohlcv('BTC/USDT', '1h', limit=100)
+
+        assert len(df) == 100
+        assert df['timestamp'].is_unique
+        assert df['timestamp'].is_monotonic_increasing
+        assert (df['timestamp'].iloc[-1] - first['timestamp'].iloc[-1]).total_seconds() == 2 * 3600
+        # 結果與整段重抓一致
+        fresh = _provider(FakeExchange(clock['now'])).fetch_ohlcv('BTC/USDT', '1h', limit=100)
+        assert list(df['timestamp']) == list(fresh['timestamp'])
+        assert list(df['open']) == list(fresh['open'])
+
+    def test_large_gap_falls_back_to_full_fetch(self, clock):
+        ex = FakeExchange(clock['now'])
+        dp = _provider(ex)
+        dp.fetch_ohlcv('BTC/USDT', '1h', limit=50)
+
+        clock['now'] += 80 * H
+        ex.now_ms = clock['now']
+        df = dp.fetch_ohlcv('BTC/USDT', '1h', limit=50)
+        assert ex.calls[-1] == {'since': None, 'limit': 50}
+        assert len(df) == 50
+
+    def test_smaller_limit_served_from_cache_slice(self, clock):
+        ex = FakeExchange(clock['now'])
+        dp = _provider(ex)
+        dp.fetch_ohlcv('BTC/USDT', '1d', limit=250)
+        df = dp.fetch_ohlcv('BTC/USDT', '1d', limit=60)
+        assert len(df) == 60
+        assert ex.calls[-1]['since'] is not None
+
+    def test_larger_limit_triggers_full_fetch(self, clock):
+        ex = FakeExchange(clock['now'])
+        dp = _provider(ex)
+        dp.fetch_ohlcv('BTC/USDT', '1h', limit=50)
+        df = dp.fetch_ohlcv('BTC/USDT', '1h', limit=100)
+        assert ex.calls[-1] == {'since': None, 'limit': 100}
+        assert len(df) == 100
+
+    def test_returned_frame_is_isolated_from_cache(self, clock):
+        dp = _provider(FakeExchange(clock['now']))
+        df = dp.fetch_ohlcv('BTC/USDT', '1h', limit=20)
+        df['close'] = 0.0
+        df2 = dp.fetch_ohlcv('BTC/USDT', '1h', limit=20)
+        assert (df2['close'] != 0.0).all()
+
+    def test_lru_eviction(self, clock):
+        dp = _provider(FakeExchange(clock['now']), cache_max_entries=2)
+        dp.fetch_ohlcv('A/USDT', '1h', limit=10)
+        dp.fetch_ohlcv('B/USDT', '1h', limit=10)
+        dp.fetch_ohlcv('A/USDT', '1h', limit=10)   # A 變最近使用
+        dp.fetch_ohlcv('C/USDT', '1h', limit=10)   # 淘汰 B
+        assert set(dp._cache) == {('A/USDT', '1h'), ('C/USDT', '1h')}
+        assert dp.cache_stats()['evicted'] == 1
+
+    def test_max_bars_bypasses_cache(self, clock):
+        ex = FakeExchange(clock['now'])
+        dp = _provider(ex, cache_max_bars=100)
+        dp.fetch_ohlcv('BTC/USDT', '1h', limit=200)
+        assert dp.cache_stats()['entries'] == 0
+
+    def test_failure_returns_empty(self, clock):
+        ex = FakeExchange(clock['now'])
+        dp = _provider(ex)
+        dp.fetch_ohlcv('BTC/USDT', '1h', limit=20)
+        ex.fetch_ohlcv = lambda *a, **k: (_ for _ in ()).throw(RuntimeError('down'))
+        assert dp.fetch_ohlcv('BTC/USDT', '1h', limit=20).empty
+
+    def test_cache_disabled(self, clock):
+        ex = FakeExchange(clock['now'])
+        dp = _provider(ex, cache_enabled=False)
+        dp.fetch_ohlcv('BTC/USDT', '1h', limit=20)
+        dp.fetch_ohlcv('BTC/USDT', '1h', limit=20)
+        assert all(c['since'] is None for c in ex.calls)
+        assert dp.cache_stats()['entries'] == 0
+
+    def test_frames_tagged_with_source(self, clock):
+        dp = _provider(FakeExchange(clock['now']))
+        for _ in range(2):
+            df = dp.fetch_ohlcv('BTC/USDT', '4h', limit=20)
+            assert df.attrs == {'symbol': 'BTC/USDT', 'timeframe': '4h'}
+
+
+class TestFetchMany:
+
+    def test_results_keyed_by_symbol_timeframe(self, clock):
+        ex = FakeExchange(clock['now'])
+        dp = _provider(ex)
+        frames = dp.fetch_ohlcv_many([
+            ('BTC/USDT', '1h', 50), ('ETH/USDT', '1h', 50), ('BTC/USDT', '1h', 80),
+        ])
+        assert set(frames) == {('BTC/USDT', '1h'), ('ETH/USDT', '1h')}
+        assert len(frames[('BTC/USDT', '1h')]) == 80   # 重複請求取最大 limit
+        assert len(ex.calls) == 2
+
+    def test_runs_concurrently(self, clock):
+        import threading
+        import time as _time
+
+        ex = FakeExchange(clock['now'])
+        active = {'now': 0, 'peak': 0}
+        lock = threading.Lock()
+        inner = ex.fetch_ohlcv
+
+        def slow_fetch(*args, **kwargs):
+            with lock:
+                active['now'] += 1
+                active['peak'] = max(active['peak'], active['now'])
+            _time.sleep(0.02)
+            with lock:
+                active['now'] -= 1
+            return inner(*args, **kwargs)
+
+        ex.fetch_ohlcv = slow_fetch
+        dp = _provider(ex, max_workers=4)
+        frames = dp.fetch_ohlcv_many([(f'S{i}/USDT', '1h', 20) for i in range(12)])
+        assert all(len(df) == 20 for df in frames.values())
+        assert 1 < active['peak'] <= 4
+
+    def test_failure_isolated_per_request(self, clock):
+        ex = FakeExchange(clock['now'])
+        inner = ex.fetch_ohlcv
+
+        def flaky(symbol, *args, **kwargs):
+            if symbol == 'BAD/USDT':
+                raise RuntimeError('boom')
+            return inner(symbol, *args, **kwargs)
+
+        ex.fetch_ohlcv = flaky
+        frames = _provider(ex).fetch_ohlcv_many([('BAD/USDT', '1h', 20), ('BTC/USDT', '1h', 20)])
+        assert frames[('BAD/USDT', '1h')].empty
+        assert len(frames[('BTC/USDT', '1h')]) == 20
+
+    def test_requests_consume_limiter_weight(self, clock):
+        from trader.infrastructure.rate_limiter import WeightRateLimiter
+        limiter = WeightRateLimiter(capacity=1000)
+        dp = _provider(FakeExchange(clock['now']), rate_limiter=limiter)
+        dp.fetch_ohlcv_many([('BTC/USDT', '1d', 250), ('ETH/USDT', '1h', 50)])
+        assert 996 <= limiter.available < 998
+
+
+class TestSingleFlight:
+
+    def _gated(self, ex):
+        """讓 exchange 請求卡在 gate 上，模擬慢速 HTTP"""
+        import threading
+        gate = threading.Event()
+        inner = ex.fetch_ohlcv
+
+        def slow(*args, **kwargs):
+            gate.wait(5)
+            return inner(*args, **kwargs)
+
+        ex.fetch_ohlcv = slow
+        return gate
+
+    def test_concurrent_identical_requests_share_one_call(self, clock):
+        from concurrent.futures import ThreadPoolExecutor
+        import time as _time
+        ex = FakeExchange(clock['now'])
+        gate = self._gated(ex)
+        dp = _provider(ex)
+
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            futures = [pool.submit(dp.fetch_ohlcv, 'BTC/USDT', '1h', 100)]
+            _time.sleep(0.02)                         # leader 先進場
+            futures += [pool.submit(dp.fetch_ohlcv, 'BTC/USDT', '1h', 50) for _ in range(5)]
+            _time.sleep(0.05)
+            gate.set()
+            frames = [f.result() for f in futures]
+
+        assert len(ex.calls) == 1
+        assert [len(df) for df in frames] == [100] + [50] * 5
+        frames[1]['close'] = 0.0                      # 每個呼叫方各自一份
+        assert (frames[2]['close'] != 0.0).all()
+        assert dp.cache_stats()['coalesced'] == 5
+
+    def test_freshness_window(self, clock, monkeypatch):
+        mono = {'t': 1000.0}
+        monkeypatch.setattr('trader.infrastructure.data_provider.time.monotonic', lambda: mono['t'])
+        ex = FakeExchange(clock['now'])
+        dp = _provider(ex, coalesce_seconds=5)
+
+        first = dp.fetch_ohlcv('BTC/USDT', '1h', limit=100)
+        mono['t'] += 3
+        assert dp.fetch_ohlcv('BTC/USDT', '1h', limit=60).equals(first.iloc[-60:].reset_index(drop=True))
+        assert len(ex.calls) == 1
+
+        dp.fetch_ohlcv('BTC/USDT', '1h', limit=120)  # 超過已取得的 limit → 重新請求
+        assert len(ex.calls) == 2
+
+        mono['t'] += 6
+        dp.fetch_ohlcv('BTC/USDT', '1h', limit=50)
+        assert len(ex.calls) == 3
+
+    def test_no_window_by_default(self, clock):
+        ex = FakeExchange(clock['now'])
+        dp = _provider(ex)
+        dp.fetch_ohlcv('BTC/USDT', '1h', limit=50)
+        dp.fetch_ohlcv('BTC/USDT', '1h', limit=50)
+        assert len(ex.calls) == 2
+
+    def test_failure_not_shared_afterwards(self, clock):
+        ex = FakeExchange(clock['now'])
+        inner = ex.fetch_ohlcv
+        state = {'fail': True}
+
+        def flaky(*args, **kwargs):
+            if state['fail']:
+                raise RuntimeError('boom')
+            return inner(*args, **kwargs)
+
+        ex.fetch_ohlcv = flaky
+        dp = _provider(ex, coalesce_seconds=60)
+        assert dp.fetch_ohlcv('BTC/USDT', '1h', limit=50).empty
+        state['fail'] = False
+        assert len(dp.fetch_ohlcv('BTC/USDT', '1h', limit=50)) == 50
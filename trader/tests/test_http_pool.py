@@ -0,0 +1,87 @@
+"""Test: 共用 HTTP 連線池（keep-alive 連線重用、per-host Session、GET 5xx 重試 / POST 不重送）"""
+
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+import pytest
+
+from trader.infrastructure.http_pool import HttpPool
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'      # keep-alive
+
+    def _reply(self):
+        server = self.server
+        server.hits.append((self.command, self.path))
+        status = server.statuses.pop(0) if server.statuses else 200
+        body = b'ok'
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._reply()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self._reply()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    srv = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    srv.hits, srv.statuses = [], []
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def _url(srv, path='/ping'):
+    return f"http://127.0.0.1:{srv.server_address[1]}{path}"
+
+
+class TestConnectionReuse:
+
+    def test_keep_alive_reuses_connection(self, server):
+        pool = HttpPool()
+        for _ in range(5):
+            assert pool.get(_url(server), timeout=5).status_code == 200
+        pool.post(_url(server), data={'a': 1}, timeout=5)
+
+        host = f"127.0.0.1:{server.server_address[1]}"
+        stats = pool.stats()[host]
+        assert stats['requests'] == 6
+        assert stats['connections'] == 1
+        assert stats['reuse'] == pytest.approx(5 / 6, abs=1e-3)
+        pool.close()
+
+    def test_session_per_host(self):
+        pool = HttpPool()
+        a = pool.session('https://fapi.binance.com/fapi/v1/time')
+        assert pool.session('https://fapi.binance.com/fapi/v1/klines') is a
+        assert pool.session('https://api.telegram.org/botX/sendMessage') is not a
+
+
+class TestRetry:
+
+    def test_get_retries_5xx(self, server):
+        server.statuses = [503, 502]
+        resp = HttpPool(backoff_factor=0).get(_url(server), timeout=5)
+        assert resp.status_code == 200
+        assert len(server.hits) == 3
+
+    def test_post_not_resent(self, server):
+        server.statuses = [503]
+        resp = HttpPool(backoff_factor=0).post(_url(server), data={'side': 'BUY'}, timeout=5)
+        assert resp.status_code == 503
+        assert server.hits == [('POST', '/ping')]
@@ -0,0 +1,273 @@
+"""Test: 增量指標引擎（與整段重算一致、形成中 bar 試算、持久化）"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+import numpy as np
+import pandas as pd
+import pytest
+from unittest.mock import patch
+
+from trader.config import Config
+from trader.indicators import incremental
+from trader.indicators.incremental import IndicatorEngine
+from trader.indicators.technical import TechnicalAnalysis
+
+H_MS = 3_600_000
+
+
+# ---------- pandas_ta 語意的整段參考實作 ----------
+
+def _ref_ema(close, n):
+    c = close.copy()
+    sma = c[0:n].mean()
+    c[:n - 1] = np.nan
+    c.iloc[n - 1] = sma
+    return c.ewm(span=n, adjust=False).mean()
+
+
+def _rma(s, n):
+    return s.ewm(alpha=1 / n, min_periods=n).mean()
+
+
+def _ref_atr(h, l, c, n):
+    pc = c.shift(1)
+    tr = pd.concat([h - l, h - pc, pc - l], axis=1).abs().max(axis=1)
+    tr.iloc[:1] = np.nan
+    return _rma(tr, n)
+
+
+def _ref_adx(h, l, c, n):
+    atr = _ref_atr(h, l, c, n)
+    up = h - h.shift(1)
+    dn = l.shift(1) - l
+    pos = ((up > dn) & (up > 0)) * up
+    neg = ((dn > up) & (dn > 0)) * dn
+    k = 100 / atr
+    dmp = k * _rma(pos, n)
+    dmn = k * _rma(neg, n)
+    return _rma(100 * (dmp - dmn).abs() / (dmp + dmn), n)
+
+
+def _make_df(n=600, seed=1):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    return pd.DataFrame({
+        'timestamp': pd.date_range('2026-01-01', periods=n, freq='h'),
+        'open': close,
+        'high': close + rng.uniform(0, 1, n),
+        'low': close - rng.uniform(0, 1, n),
+        'close': close,
+        'volume': rng.uniform(1, 10, n),
+    })
+
+
+def _tag(df, symbol='BTC/USDT', timeframe='1h'):
+    df = df.copy()
+    df.attrs.update(symbol=symbol, timeframe=timeframe)
+    return df
+
+
+def _engine(df, forming=False, history=1000, **kwargs):
+    """clock 設在最後一根收盤後（forming=True 則最後一根仍在形成中）"""
+    last_ms = df['timestamp'].iloc[-1].value // 1_000_000
+    now_ms = last_ms + (H_MS // 2 if forming else 2 * H_MS)
+    return IndicatorEngine(history=history, clock=lambda: now_ms / 1000, **kwargs)
+
+
+SPECS = [
+    (('ema', 'close', 50), lambda d: _ref_ema(d['close'], 50)),
+    (('sma', 'volume', 20), lambda d: d['volume'].rolling(20).mean()),
+    (('atr', None, 13), lambda d: _ref_atr(d['high'], d['low'], d['close'], 13)),
+    (('adx', None, 14), lambda d: _ref_adx(d['high'], d['low'], d['close'], 14)),
+]
+
+
+class TestIncrementalParity:
+
+    @pytest.mark.parametrize('spec,ref', SPECS)
+    def test_incremental_equals_full_history(self, spec, ref):
+        df = _make_df()
+        engine = _engine(df)
+        # 先餵一段，之後每次只給最近 100 根（模擬每 cycle 的 frame）
+        engine.series(_tag(df.iloc[:150]), spec)
+        for end in range(160, len(df) + 1, 10):
+            engine.series(_tag(df.iloc[end - 100:end]), spec)
+
+        got = engine.series(_tag(df), spec)
+        np.testing.assert_allclose(got.to_numpy(), ref(df).to_numpy(), rtol=1e-12, equal_nan=True)
+
+    @pytest.mark.parametrize('spec,ref', SPECS)
+    def test_forming_bar_peek(self, spec, ref):
+        df = _make_df(300)
+        engine = _engine(df, forming=True)
+        got = engine.series(_tag(df), spec)
+        np.testing.assert_allclose(got.to_numpy(), ref(df).to_numpy(), rtol=1e-12, equal_nan=True)
+        # 試算不寫入狀態：形成中 bar 數值變動後重算結果跟著變
+        df2 = df.copy()
+        df2.loc[df2.index[-1], ['high', 'close', 'volume']] += 5
+        got2 = engine.series(_tag(df2), spec)
+        np.testing.assert_allclose(got2.to_numpy(), ref(df2).to_numpy(), rtol=1e-12, equal_nan=True)
+
+    def test_frame_beyond_history_warm(self):
+        """frame 只有 250 根，EMA200 仍延續引擎看過的完整歷史"""
+        df = _make_df(800)
+        engine = _engine(df)
+        engine.series(_tag(df), ('ema', 'close', 200))
+        tail = engine.series(_tag(df.iloc[-250:]), ('ema', 'close', 200))
+        np.testing.assert_allclose(tail.to_numpy(), _ref_ema(df['close'], 200).iloc[-250:].to_numpy(), rtol=1e-12)
+
+
+class TestMixedLengthFrames:
+
+    @pytest.mark.parametrize('spec,ref', SPECS)
+    def test_short_frame_first_then_full_frame(self, spec, ref):
+        """監控的 50 根先建立狀態，掃描的 250 根後到：回補後與整段重算一致"""
+        df = _make_df(250)
+        engine = _engine(df, history=300)
+        engine.series(_tag(df.iloc[-50:]), spec)
+        got = engine.series(_tag(df), spec)
+        assert engine.stats['backfills'] == 1
+        np.testing.assert_allclose(got.to_numpy(), ref(df).to_numpy(), rtol=1e-12, equal_nan=True)
+        # 之後的短 frame 不再觸發回補
+        engine.series(_tag(df.iloc[-50:]), spec)
+        assert engine.stats['backfills'] == 1
+
+    def test_calculate_indicators_parity(self):
+        df = _make_df(250)
+        engine = _engine(df)
+        with patch('trader.indicators.incremental._engine', engine), \
+             patch.object(Config, 'INDICATOR_ENGINE_ENABLED', True):
+            TechnicalAnalysis.calculate_indicators(_tag(df.iloc[-50:]))
+            got = TechnicalAnalysis.calculate_indicators(_tag(df))
+        with patch.object(Config, 'INDICATOR_ENGINE_ENABLED', False):
+            full = TechnicalAnalysis.calculate_indicators(df.copy())
+        for col in ('ema_trend', 'atr', 'adx', 'vol_ma'):
+            np.testing.assert_allclose(got[col].to_numpy(), full[col].to_numpy(), rtol=1e-9, equal_nan=True)
+
+    def test_newer_state_tail_kept(self):
+        """回補的 frame 比狀態舊：狀態中更新且相接的 bar 保留"""
+        df = _make_df(300)
+        engine = _engine(df)
+        engine.series(_tag(df.iloc[-100:]), ('ema', 'close', 20))
+        engine.series(_tag(df.iloc[:-50]), ('ema', 'close', 20))
+        got = engine.series(_tag(df), ('ema', 'close', 20))
+        np.testing.assert_allclose(got.to_numpy(), _ref_ema(df['close'], 20).to_numpy(), rtol=1e-12, equal_nan=True)
+
+
+class TestEngineClock:
+
+    def test_set_clock_applies_to_shared_engine(self):
+        df = _make_df(100)
+        last_ms = df['timestamp'].iloc[-1].value // 1_000_000
+        engine = IndicatorEngine(history=300)
+        with patch('trader.indicators.incremental._engine', engine), \
+             patch('trader.indicators.incremental._clock', incremental._clock):
+            incremental.set_clock(lambda: (last_ms + H_MS // 2) / 1000)   # 最後一根仍在形成中
+            engine.series(_tag(df), ('ema', 'close', 20))
+        assert engine._series[('BTC/USDT', '1h')].last_ts == last_ms - H_MS
+
+    def test_bot_uses_replay_time(self, tmp_path):
+        """重播時以錄製時間判斷收盤：錄製當下形成中的 bar 不寫入狀態"""
+        from trader.infrastructure.replay import DataArchive
+        from trader.infrastructure.server_clock import ServerClock
+        df = _make_df(100)
+        last_ms = df['timestamp'].iloc[-1].value // 1_000_000
+        path = tmp_path / 'a.rec.gz'
+        with DataArchive(str(path), mode='w') as archive:
+            archive.write('ohlcv', 'k', [], t_ms=last_ms + 60_000)
+        archive = DataArchive(str(path))
+        clock = ServerClock(None, local_ms=archive.now_ms)
+        engine = IndicatorEngine(history=300, clock=lambda: clock.now_ms() / 1000)
+        archive.next('ohlcv', 'k')
+        engine.series(_tag(df), ('ema', 'close', 20))
+        assert engine._series[('BTC/USDT', '1h')].last_ts == last_ms - H_MS
+
+
+class TestEngineSync:
+
+    def test_untagged_frame_returns_none(self):
+        df = _make_df(100)
+        assert _engine(df).series(df, ('ema', 'close', 20)) is None
+
+    def test_gap_triggers_rebuild(self):
+        df = _make_df(400)
+        engine = _engine(df)
+        engine.series(_tag(df.iloc[:200]), ('ema', 'close', 20))
+        got = engine.series(_tag(df.iloc[300:]), ('ema', 'close', 20))
+        assert engine.stats['rebuilds'] == 1
+        np.testing.assert_allclose(got.to_numpy(), _ref_ema(df['close'].iloc[300:].reset_index(drop=True), 20),
+                                   rtol=1e-12, equal_nan=True)
+
+    def test_revised_data_triggers_rebuild(self):
+        df = _make_df(300)
+        engine = _engine(df)
+        engine.series(_tag(df.iloc[:200]), ('atr', None, 13))
+        revised = df.copy()
+        revised['close'] += 1.0
+        got = engine.series(_tag(revised), ('atr', None, 13))
+        assert engine.stats['rebuilds'] == 1
+        ref = _ref_atr(revised['high'], revised['low'], revised['close'], 13)
+        np.testing.assert_allclose(got.to_numpy(), ref.to_numpy(), rtol=1e-12, equal_nan=True)
+
+    def test_series_isolated_by_symbol_and_timeframe(self):
+        df = _make_df(200)
+        engine = _engine(df)
+        a = engine.series(_tag(df, 'BTC/USDT'), ('ema', 'close', 20))
+        b = engine.series(_tag(df.assign(close=df['close'] * 2), 'ETH/USDT'), ('ema', 'close', 20))
+        np.testing.assert_allclose(b.to_numpy(), a.to_numpy() * 2, rtol=1e-12, equal_nan=True)
+
+
+class TestEnginePersistence:
+
+    def test_state_survives_restart(self, tmp_path):
+        df = _make_df(500)
+        path = str(tmp_path / 'state.json')
+        first = _engine(df, state_path=path)
+        for spec, _ in SPECS:
+            first.series(_tag(df.iloc[:400]), spec)
+        assert first.save()
+
+        restarted = _engine(df, state_path=path)
+        assert restarted.load()
+        for spec, ref in SPECS:
+            got = restarted.series(_tag(df.iloc[-150:]), spec)
+            np.testing.assert_allclose(got.to_numpy(), ref(df).iloc[-150:].to_numpy(), rtol=1e-12, equal_nan=True)
+        assert restarted.stats['rebuilds'] == 0
+
+    def test_save_only_when_dirty(self, tmp_path):
+        df = _make_df(100)
+        engine = _engine(df, state_path=str(tmp_path / 'state.json'))
+        assert not engine.save()
+        engine.series(_tag(df), ('ema', 'close', 20))
+        assert engine.save()
+        assert not engine.save()
+
+    def test_corrupt_file_ignored(self, tmp_path):
+        path = tmp_path / 'state.json'
+        path.write_text('{not json')
+        assert not IndicatorEngine(state_path=str(path)).load()
+
+
+class TestTechnicalAnalysisIntegration:
+
+    def test_calculate_indicators_uses_engine_for_tagged_frames(self):
+        df = _make_df(600)
+        engine = _engine(df)
+        with patch('trader.indicators.incremental._engine', engine), \
+             patch.object(Config, 'INDICATOR_ENGINE_ENABLED', True):
+            TechnicalAnalysis.calculate_indicators(_tag(df))
+            out = TechnicalAnalysis.calculate_indicators(_tag(df.iloc[-250:]))
+        ema_ref = _ref_ema(df['close'], Config.EMA_TREND).iloc[-250:]
+        np.testing.assert_allclose(out['ema_trend'].to_numpy(), ema_ref.to_numpy(), rtol=1e-12)
+        adx_ref = _ref_adx(df['high'], df['low'], df['close'], 14).iloc[-250:]
+        np.testing.assert_allclose(out['adx'].to_numpy(), adx_ref.to_numpy(), rtol=1e-12)
+
+    def test_disabled_falls_back(self):
+        df = _make_df(100)
+        engine = _engine(df)
+        with patch('trader.indicators.incremental._engine', engine), \
+             patch.object(Config, 'INDICATOR_ENGINE_ENABLED', False):
+            TechnicalAnalysis.calculate_indicators(_tag(df))
+        assert engine.stats['updates'] == 0 and not engine._series
@@ -0,0 +1,136 @@
+"""Test: NumPy 指標 kernel 與 pandas_ta 語意的參考實作一致"""
+
+import sys
+import json
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from trader.config import Config
+from trader.indicators import kernels
+from trader.indicators.technical import TechnicalAnalysis, _adx, _atr, _ema, _sma
+from trader.tests.fixtures.reference import make_ohlcv, ref_adx, ref_atr, ref_ema, ref_rsi
+
+
+def _assert_same(got, ref, rtol=1e-9):
+    got = np.asarray(got, dtype=float)
+    ref = np.asarray(ref, dtype=float)
+    assert got.shape == ref.shape
+    np.testing.assert_array_equal(np.isnan(got), np.isnan(ref))
+    np.testing.assert_allclose(got, ref, rtol=rtol, equal_nan=True)
+
+
+class TestKernelParity:
+
+    @pytest.mark.parametrize('n', [60, 250, 20_000])
+    @pytest.mark.parametrize('length', [9, 50, 200])
+    def test_ema(self, n, length):
+        df = make_ohlcv(n)
+        if n < length:
+            assert np.isnan(kernels.ema(df['close'], length)).all()
+        else:
+            _assert_same(kernels.ema(df['close'], length), ref_ema(df['close'], length))
+
+    @pytest.mark.parametrize('n', [60, 250, 20_000])
+    def test_sma(self, n):
+        df = make_ohlcv(n)
+        _assert_same(kernels.sma(df['volume'], 20), df['volume'].rolling(20).mean())
+
+    @pytest.mark.parametrize('n', [60, 250, 20_000])
+    @pytest.mark.parametrize('length', [13, 14])
+    def test_atr(self, n, length):
+        df = make_ohlcv(n)
+        _assert_same(kernels.atr(df['high'], df['low'], df['close'], length),
+                     ref_atr(df['high'], df['low'], df['close'], length))
+
+    @pytest.mark.parametrize('n', [60, 250, 20_000])
+    def test_adx(self, n):
+        df = make_ohlcv(n)
+        got = kernels.adx(df['high'], df['low'], df['close'], 14)
+        for g, r in zip(got, ref_adx(df['high'], df['low'], df['close'], 14)):
+            _assert_same(g, r)
+
+    @pytest.mark.parametrize('n', [60, 250, 20_000])
+    def test_rsi(self, n):
+        df = make_ohlcv(n)
+        _assert_same(kernels.rsi(df['close'], 14), ref_rsi(df['close'], 14))
+
+    @pytest.mark.parametrize('adjust', [True, False])
+    def test_ewm_interior_nan_matches_pandas(self, adjust):
+        x = make_ohlcv(300)['close'].copy()
+        x.iloc[:5] = np.nan
+        x.iloc[[40, 41, 120]] = np.nan
+        ref = x.ewm(alpha=0.1, adjust=adjust, min_periods=10).mean()
+        _assert_same(kernels.ewm_mean(x, 0.1, adjust=adjust, min_periods=10), ref)
+
+    def test_flat_market_adx_matches_pandas(self):
+        """DM 全為 0 → DX 出現 0/0，走逐點路徑"""
+        df = make_ohlcv(120)
+        df.loc[50:70, ['high', 'low', 'close']] = 100.0
+        got = kernels.adx(df['high'], df['low'], df['close'], 14)[0]
+        _assert_same(got, ref_adx(df['high'], df['low'], df['close'], 14)[0])
+
+    def test_short_input_returns_nan(self):
+        close = np.arange(10, dtype=float)
+        for values in (kernels.ema(close, 20), kernels.sma(close, 20), kernels.rsi(close, 20),
+                       kernels.atr(close, close, close, 20), kernels.adx(close, close, close, 20)[0]):
+            assert len(values) == 10 and np.isnan(values).all()
+
+
+BASELINE = Path(__file__).parent / 'fixtures' / 'indicator_baseline.json'
+
+
+@pytest.fixture(scope='module')
+def baseline():
+    """固定輸入與參考實作的輸出（fixtures/record_indicator_baseline.py 產生）"""
+    data = json.loads(BASELINE.read_text(encoding='utf-8'))
+    df = pd.DataFrame(data['input'])
+    expected = {k: np.array([np.nan if v is None else v for v in vals]) for k, vals in data['expected'].items()}
+    return df, expected
+
+
+class TestBaselineFixture:
+    """凍結的基準數值：kernel 不得漂移（基準來自 pandas 參考實作，不是 pandas_ta 套件輸出）"""
+
+    def test_kernels_match_baseline(self, baseline):
+        df, expected = baseline
+        h, l, c = df['high'], df['low'], df['close']
+        adx, dmp, dmn = kernels.adx(h, l, c, 14)
+        got = {
+            'ema_9': kernels.ema(c, 9), 'ema_21': kernels.ema(c, 21), 'sma_20': kernels.sma(c, 20),
+            'atr_14': kernels.atr(h, l, c, 14), 'adx_14': adx, 'dmp_14': dmp, 'dmn_14': dmn,
+            'rsi_14': kernels.rsi(c, 14),
+        }
+        assert got.keys() == expected.keys()
+        for name in expected:
+            _assert_same(got[name], expected[name])
+
+    def test_live_pandas_ta_matches_baseline(self, baseline):
+        """有安裝 pandas_ta 時直接比對套件輸出"""
+        ta = pytest.importorskip('pandas_ta')
+        df, expected = baseline
+        _assert_same(ta.ema(df['close'], length=21), expected['ema_21'])
+        _assert_same(ta.atr(df['high'], df['low'], df['close'], length=14), expected['atr_14'])
+        _assert_same(ta.adx(df['high'], df['low'], df['close'], length=14)['ADX_14'], expected['adx_14'])
+        _assert_same(ta.rsi(df['close'], length=14), expected['rsi_14'])
+
+
+class TestSeriesWrappers:
+
+    def test_index_preserved(self):
+        df = make_ohlcv(100)
+        df.index = pd.RangeIndex(500, 600)
+        assert _ema(df['close'], 20).index.equals(df.index)
+        assert _sma(df['volume'], 20).index.equals(df.index)
+        assert _atr(df['high'], df['low'], df['close'], 14).index.equals(df.index)
+        assert list(_adx(df['high'], df['low'], df['close'], 14).columns) == ['ADX_14', 'DMP_14', 'DMN_14']
+
+    def test_calculate_indicators_matches_reference(self):
+        df = make_ohlcv(250)
+        out = TechnicalAnalysis.calculate_indicators(df.copy())
+        _assert_same(out['ema_trend'], ref_ema(df['close'], Config.EMA_TREND))
+        _assert_same(out['atr'], ref_atr(df['high'], df['low'], df['close'], Config.ATR_PERIOD))
+        _assert_same(out['adx'], ref_adx(df['high'], df['low'], df['close'], 14)[0])
@@ -0,0 +1,98 @@
+"""Test: 宣告式指標 registry（依賴解析、共用中間值、引擎接手）"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+import numpy as np
+import pandas as pd
+import pytest
+from unittest.mock import patch
+
+from trader.config import Config
+from trader.indicators import kernels, registry
+from trader.indicators.incremental import IndicatorEngine
+from trader.indicators.registry import IndicatorResolver, compute_columns
+from trader.indicators.technical import TechnicalAnalysis
+from trader.tests.fixtures.reference import make_ohlcv
+
+
+class TestResolver:
+
+    def test_true_range_shared_between_atr_and_adx(self):
+        df = make_ohlcv(200)
+        resolver = IndicatorResolver(df, use_engine=False)
+        with patch.object(kernels, 'true_range', wraps=kernels.true_range) as tr:
+            resolver.get(('atr', None, 13))
+            resolver.get(('atr', None, 14))
+            resolver.get(('adx', None, 14))
+        assert tr.call_count == 1
+        assert resolver.computed == 4   # true_range + 2×atr + adx
+
+    def test_atr_percent_reuses_atr(self):
+        df = make_ohlcv(200)
+        resolver = IndicatorResolver(df, use_engine=False)
+        atr = resolver.get(('atr', None, 14))
+        computed = resolver.computed
+        pct = resolver.get(('atr_percent', None, 14))
+        assert resolver.computed == computed + 1
+        np.testing.assert_allclose(pct, atr / df['close'].to_numpy() * 100)
+
+    def test_matches_kernels(self):
+        df = make_ohlcv(300)
+        out = compute_columns(df.copy(), {
+            'e': ('ema', 'close', 50), 's': ('sma', 'volume', 20),
+            'a': ('atr', None, 14), 'x': ('adx', None, 14), 'r': ('rsi', 'close', 14),
+        }, use_engine=False)
+        h, l, c = df['high'], df['low'], df['close']
+        np.testing.assert_array_equal(out['e'], kernels.ema(c, 50))
+        np.testing.assert_array_equal(out['s'], kernels.sma(df['volume'], 20))
+        np.testing.assert_allclose(out['a'], kernels.atr(h, l, c, 14), rtol=1e-12)
+        np.testing.assert_allclose(out['x'], kernels.adx(h, l, c, 14)[0], rtol=1e-12)
+        np.testing.assert_array_equal(out['r'], kernels.rsi(c, 14))
+
+    def test_unknown_kind(self):
+        with pytest.raises(ValueError):
+            IndicatorResolver(make_ohlcv(60)).get(('nope', None, 1))
+
+    def test_custom_registration(self):
+        registry.register('hl2', lambda spec: ('high', 'low'), lambda n, h, l: (h + l) / 2)
+        try:
+            df = make_ohlcv(60)
+            out = compute_columns(df.copy(), {'hl2': ('hl2', None, 0)})
+            np.testing.assert_allclose(out['hl2'], (df['high'] + df['low']) / 2)
+        finally:
+            registry.INDICATORS.pop('hl2')
+
+    def test_streamable_specs_served_by_engine(self):
+        df = make_ohlcv(300)
+        df['timestamp'] = pd.date_range('2026-01-01', periods=len(df), freq='h')
+        df.attrs.update(symbol='BTC/USDT', timeframe='1h')
+        now = (df['timestamp'].iloc[-1].value // 1_000_000 + 7_200_000) / 1000
+        engine = IndicatorEngine(clock=lambda: now)
+        with patch('trader.indicators.incremental._engine', engine), \
+             patch.object(Config, 'INDICATOR_ENGINE_ENABLED', True):
+            resolver = IndicatorResolver(df)
+            resolver.get(('atr', None, 14))
+            resolver.get(('rsi', 'close', 14))      # 不可串流 → kernel
+            assert resolver.computed == 1
+            plain = IndicatorResolver(df, use_engine=False)
+            plain.get(('atr', None, 14))
+            assert plain.computed == 2              # true_range + atr
+        assert ('BTC/USDT', '1h') in engine._series
+
+
+class TestSharedColumnSets:
+
+    def test_trader_columns(self):
+        out = TechnicalAnalysis.calculate_indicators(make_ohlcv(250))
+        assert set(TechnicalAnalysis.indicator_columns()) <= set(out.columns)
+
+    def test_scanner_and_trader_agree_on_shared_specs(self):
+        from scanner.market_scanner import SCANNER_INDICATORS
+        df = make_ohlcv(250)
+        with patch.object(Config, 'ATR_PERIOD', 14):
+            trader = TechnicalAnalysis.calculate_indicators(df.copy())
+        scanner = compute_columns(df.copy(), SCANNER_INDICATORS, use_engine=False)
+        for col in ('atr', 'vol_ma', 'adx'):
+            np.testing.assert_array_equal(trader[col], scanner[col])
@@ -0,0 +1,122 @@
+"""Test: 延遲指標欄位（登記後按需計算、切片對齊、省下計算數統計）"""
+
+import gc
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+import numpy as np
+import pytest
+
+from trader.indicators import registry
+from trader.indicators.registry import ensure_indicators, lazy_stats
+from trader.indicators.technical import TechnicalAnalysis
+from trader.signals import detect_volume_breakout
+from trader.tests.fixtures.reference import make_ohlcv
+
+COLUMNS = set(TechnicalAnalysis.indicator_columns())
+
+
+@pytest.fixture(autouse=True)
+def _reset_stats():
+    lazy_stats(reset=True)
+    yield
+    lazy_stats(reset=True)
+
+
+def _frames(n=250):
+    df = make_ohlcv(n)
+    eager = TechnicalAnalysis.calculate_indicators(df.copy())
+    lazy = TechnicalAnalysis.calculate_indicators(df.copy(), lazy=True)
+    return eager, lazy
+
+
+class TestLazyColumns:
+
+    def test_declare_computes_nothing(self):
+        _, lazy = _frames()
+        assert not COLUMNS & set(lazy.columns)
+        assert lazy_stats()['declared'] == len(COLUMNS)
+        assert lazy_stats()['computed'] == 0
+
+    def test_only_requested_columns_computed(self):
+        eager, lazy = _frames()
+        ensure_indicators(lazy, 'atr', 'vol_ma')
+        assert COLUMNS & set(lazy.columns) == {'atr', 'vol_ma'}
+        np.testing.assert_array_equal(lazy['atr'], eager['atr'])
+        np.testing.assert_array_equal(lazy['vol_ma'], eager['vol_ma'])
+
+        stats = lazy_stats()
+        assert stats['computed'] == 2
+        assert stats['avoided'] == len(COLUMNS) - 2
+
+    def test_memoized(self):
+        _, lazy = _frames()
+        ensure_indicators(lazy, 'adx')
+        ensure_indicators(lazy, 'adx')
+        assert lazy_stats()['computed'] == 1
+
+    @pytest.mark.parametrize('rows', [slice(None, -1), slice(-30, None)])
+    def test_slice_matches_eager(self, rows):
+        """切片上要求欄位 → 在原始 frame 上計算後對齊，與先算再切完全相同"""
+        eager, lazy = _frames()
+        part = lazy.iloc[rows]
+        ensure_indicators(part, 'ema_trend', 'atr')
+        np.testing.assert_array_equal(part['ema_trend'], eager['ema_trend'].iloc[rows])
+        np.testing.assert_array_equal(part['atr'], eager['atr'].iloc[rows])
+        assert 'ema_trend' in lazy.columns        # 原始 frame 同步記住
+
+    def test_detached_index_computed_locally(self):
+        _, lazy = _frames()
+        part = lazy.iloc[-100:].reset_index(drop=True)
+        part.index = part.index + 10_000
+        ensure_indicators(part, 'vol_ma')
+        expected = part['volume'].rolling(20).mean()
+        np.testing.assert_allclose(part['vol_ma'], expected, equal_nan=True)
+
+    def test_registry_does_not_keep_frames_alive(self):
+        """登記只持弱參照：frame 回收後即移除"""
+        gc.collect()                                # 先清掉其他測試留下的 frame
+        before = len(registry._lazy_frames)
+        frames = [TechnicalAnalysis.calculate_indicators(make_ohlcv(60), lazy=True) for _ in range(50)]
+        assert len(registry._lazy_frames) == before + 50
+        del frames
+        gc.collect()
+        assert len(registry._lazy_frames) == before
+
+    def test_slice_outlives_origin(self):
+        """原始 frame 已回收 → 切片上的欄位改在切片本身計算"""
+        eager, lazy = _frames()
+        part = lazy.iloc[-60:]
+        del lazy
+        gc.collect()
+        ensure_indicators(part, 'vol_ma')
+        np.testing.assert_allclose(part['vol_ma'], part['volume'].rolling(20).mean(), equal_nan=True)
+        assert lazy_stats()['computed'] == 1
+
+    def test_eager_and_plain_frames_untouched(self):
+        df = make_ohlcv(100)
+        ensure_indicators(df, 'atr')
+        assert 'atr' not in df.columns
+        eager, _ = _frames()
+        ensure_indicators(eager, 'atr', 'unknown')
+        assert lazy_stats()['computed'] == 0
+
+    def test_reset(self):
+        _, lazy = _frames()
+        ensure_indicators(lazy, 'atr')
+        assert lazy_stats(reset=True)['avoided'] == len(COLUMNS) - 1
+        assert lazy_stats() == {'declared': 0, 'computed': 0, 'avoided': 0}
+
+
+class TestConsumers:
+
+    def test_volume_breakout_pays_only_for_its_columns(self):
+        _, lazy = _frames()
+        detect_volume_breakout(lazy)
+        assert COLUMNS & set(lazy.columns) == {'atr', 'vol_ma'}
+
+    def test_check_trend_on_lazy_frame(self):
+        eager, lazy = _frames()
+        assert TechnicalAnalysis.check_trend(lazy, 'LONG') == TechnicalAnalysis.check_trend(eager, 'LONG')
+        assert COLUMNS & set(lazy.columns) == {'ema_trend'}
@@ -0,0 +1,192 @@
+"""Test: 即時行情串流（kline / markPrice、重連補缺口、停流偵測、provider 串流供應）"""
+
+import sys
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from unittest.mock import MagicMock
+
+import pandas as pd
+import pytest
+
+pytest.importorskip('aiohttp')
+
+from trader.infrastructure.data_provider import MarketDataProvider
+from trader.infrastructure.market_stream import MarketStream
+from trader.infrastructure.stream_standin import StreamStandIn
+from trader.tests.test_ohlcv_resample import H, T0, TickExchange, _native
+
+SYMBOLS = ['BTC/USDT', 'ETH/USDT']
+
+
+def _recorded():
+    """錄製資料：兩個 symbol 各 400 根 1h"""
+    now = T0 + 400 * H
+    return {
+        (symbol, '1h'): _native(TickExchange(now, days=20, seed=i), '1h', 400)
+        for i, symbol in enumerate(SYMBOLS)
+    }
+
+
+def _wait(cond, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if cond():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def _kline(symbol_id, ts, close, closed=False):
+    return {'stream': f'{symbol_id.lower()}@kline_1h', 'data': {
+        'e': 'kline', 's': symbol_id,
+        'k': {'t': ts, 'i': '1h', 'o': '1', 'h': str(close + 1), 'l': '0.5', 'c': str(close), 'v': '10', 'x': closed},
+    }}
+
+
+class TestMessageHandling:
+
+    def _stream(self, now):
+        stream = MarketStream(timeframes=['1h'], stale_seconds=10, clock=lambda: now['t'])
+        stream.set_symbols(['BTC/USDT'])
+        stream._connected = True
+        return stream
+
+    def test_kline_and_mark_price(self):
+        now = {'t': 100.0}
+        stream = self._stream(now)
+        stream._series[('BTC/USDT', '1h')].synced = True
+        stream._on_message(_kline('BTCUSDT', T0, 10.0))
+        stream._on_message(_kline('BTCUSDT', T0, 11.0))          # 同一根更新
+        stream._on_message(_kline('BTCUSDT', T0 + H, 12.0))
+        stream._on_message({'data': {'e': 'markPriceUpdate', 's': 'BTCUSDT', 'p': '12.5'}})
+
+        df = stream.candles('BTC/USDT', '1h', 2)
+        assert df['close'].tolist() == [11.0, 12.0]
+        assert stream.last_price('BTC/USDT') == 12.0
+        assert stream.mark_price('BTC/USDT') == 12.5
+
+    def test_unsynced_or_short_series_not_served(self):
+        now = {'t': 100.0}
+        stream = self._stream(now)
+        stream._on_message(_kline('BTCUSDT', T0, 10.0))
+        assert stream.candles('BTC/USDT', '1h', 1) is None       # 尚未 REST 補齊
+        stream._series[('BTC/USDT', '1h')].synced = True
+        assert stream.candles('BTC/USDT', '1h', 1) is not None
+        assert stream.candles('BTC/USDT', '1h', 5) is None
+
+    def test_gap_queues_backfill(self):
+        now = {'t': 100.0}
+        stream = self._stream(now)
+        stream._series[('BTC/USDT', '1h')].synced = True
+        stream._on_message(_kline('BTCUSDT', T0, 10.0))
+        stream._on_message(_kline('BTCUSDT', T0 + 3 * H, 10.0))
+        assert stream.stats['gaps'] == 1
+        assert ('BTC/USDT', '1h') in stream._pending_backfill
+        assert stream.candles('BTC/USDT', '1h', 2) is None
+
+    def test_stale_symbol(self):
+        now = {'t': 100.0}
+        stream = self._stream(now)
+        stream._series[('BTC/USDT', '1h')].synced = True
+        stream._on_message(_kline('BTCUSDT', T0, 10.0))
+        now['t'] += 11
+        assert not stream.is_healthy('BTC/USDT')
+        assert stream.candles('BTC/USDT', '1h', 1) is None
+        assert stream.last_price('BTC/USDT') is None
+
+    def test_set_symbols(self):
+        stream = MarketStream(timeframes=['1h', '4h'])
+        assert stream.set_symbols(['BTC/USDT'])
+        assert not stream.set_symbols(['BTC/USDT'])
+        assert stream.stream_names() == ('btcusdt@kline_1h', 'btcusdt@kline_4h', 'btcusdt@markPrice@1s')
+
+
+@pytest.fixture
+def server():
+    with StreamStandIn(_recorded()) as srv:
+        yield srv
+
+
+@pytest.fixture
+def stream(server):
+    s = MarketStream(
+        url=server.url, timeframes=['1h'], backfill=server.klines, history_bars=150,
+        stale_seconds=0.5, reconnect_min_delay=0.05, reconnect_max_delay=0.2, poll_seconds=0.05,
+    )
+    s.set_symbols(SYMBOLS)
+    assert s.start()
+    yield s
+    s.stop()
+
+
+def _in_sync(stream, server, limit=100):
+    def check():
+        for symbol in SYMBOLS:
+            df = stream.candles(symbol, '1h', limit)
+            if df is None or not df.equals(server.klines(symbol, '1h', limit)):
+                return False
+        return True
+    return check
+
+
+class TestStandInServer:
+
+    def test_streams_recorded_candles(self, server, stream):
+        assert _wait(_in_sync(stream, server))
+        server.advance(3)
+        assert _wait(_in_sync(stream, server))
+        assert stream.last_price('BTC/USDT') == server.klines('BTC/USDT', '1h', 1)['close'].iloc[-1]
+
+    def test_reconnect_backfills_gap(self, server, stream):
+        assert _wait(_in_sync(stream, server))
+        server.mute()
+        server.drop_connections()
+        server.advance(5)                      # 斷線期間市場繼續走
+        server.mute(False)
+        assert _wait(lambda: stream.stats['reconnects'] >= 1)
+        assert _wait(_in_sync(stream, server))
+        assert server.connections >= 2
+
+    def test_stale_stream_detected(self, server, stream):
+        assert _wait(_in_sync(stream, server))
+        server.mute()
+        assert _wait(lambda: not stream.is_healthy())
+        assert stream.candles('BTC/USDT', '1h', 10) is None
+        assert _wait(lambda: stream.stats['stale'] >= 1)
+        server.mute(False)
+        server.advance()
+        assert _wait(_in_sync(stream, server))
+
+
+class TestProviderStream:
+
+    def test_served_from_stream(self, server, stream):
+        exchange = MagicMock()
+        provider = MarketDataProvider(exchange, max_retry=1, retry_delay=0, resample_base='1h')
+        provider.attach_stream(stream)
+        assert _wait(_in_sync(stream, server))
+
+        df = provider.fetch_ohlcv('BTC/USDT', '1h', 100)
+        df_4h = provider.fetch_ohlcv('ETH/USDT', '4h', 20)
+        prices = provider.fetch_prices(SYMBOLS)
+
+        exchange.fetch_ohlcv.assert_not_called()
+        exchange.fetch_last_prices.assert_not_called()
+        pd.testing.assert_frame_equal(df, server.klines('BTC/USDT', '1h', 100))
+        assert df.attrs['symbol'] == 'BTC/USDT'
+        assert len(df_4h) == 20
+        assert set(prices) == set(SYMBOLS)
+        assert provider.cache_stats()['stream'] == 2
+
+    def test_unhealthy_falls_back_to_rest(self):
+        stream = MarketStream(timeframes=['1h'])
+        stream.set_symbols(['BTC/USDT'])
+        exchange = TickExchange(T0 + 300 * H)
+        provider = MarketDataProvider(exchange, max_retry=1, retry_delay=0)
+        provider.attach_stream(stream)
+
+        assert len(provider.fetch_ohlcv('BTC/USDT', '1h', 50)) == 50
+        assert exchange.calls == ['1h']
+        assert stream.backfill == provider._fetch_native
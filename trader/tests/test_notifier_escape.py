@@ -17,7 +17,7 @@ def enable_telegram():
 
 class TestNotifierEscape:
 
-    @patch('trader.infrastructure.notifier.requests.post')
+    @patch('trader.infrastructure.notifier.http_pool.post')
     def test_notify_warning_escapes_html(self, mock_post):
         mock_post.return_value = MagicMock(ok=True)
         msg = '<script>alert("xss")</script>&param=1'
@@ -27,7 +27,7 @@ class TestNotifierEscape:
         assert '&lt;script&gt;' in text
         assert '&amp;param=1' in text
 
-    @patch('trader.infrastructure.notifier.requests.post')
+    @patch('trader.infrastructure.notifier.http_pool.post')
     def test_notify_action_escapes_details(self, mock_post):
         mock_post.return_value = MagicMock(ok=True)
         TelegramNotifier.notify_action('BTCUSDT', 'test<action>', 100.0, '<b>hack</b>')
@@ -36,7 +36,7 @@ class TestNotifierEscape:
         assert '&lt;b&gt;hack&lt;/b&gt;' in text
         assert 'test&lt;action&gt;' in text
 
-    @patch('trader.infrastructure.notifier.requests.post')
+    @patch('trader.infrastructure.notifier.http_pool.post')
     def test_notify_signal_escapes_symbol(self, mock_post):
         mock_post.return_value = MagicMock(ok=True)
         details = {
@@ -62,7 +62,7 @@ class TestNotifierEscape:
         # 策略名稱
         assert 'V6 Pyramid' in text
 
-    @patch('trader.infrastructure.notifier.requests.post')
+    @patch('trader.infrastructure.notifier.http_pool.post')
     def test_notify_exit_escapes_reason(self, mock_post):
         mock_post.return_value = MagicMock(ok=True)
         details = {
@@ -78,7 +78,7 @@ class TestNotifierEscape:
         assert 'a&amp;b&lt;c&gt;' in text
 
     @patch('trader.infrastructure.notifier.logger')
-    @patch('trader.infrastructure.notifier.requests.post')
+    @patch('trader.infrastructure.notifier.http_pool.post')
     def test_send_message_logs_error_on_bad_status(self, mock_post, mock_logger):
         mock_resp = MagicMock()
         mock_resp.ok = False
@@ -0,0 +1,149 @@
+"""Test: 高週期重採樣（1h 快取聚合 4h / 1d，與交易所原生 K 線一致）"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from trader.infrastructure.data_provider import MarketDataProvider, resample_ohlcv, timeframe_to_ms
+
+M15 = 900_000
+H = 3_600_000
+T0 = 1_700_000_000_000 - (1_700_000_000_000 % 86_400_000)
+
+
+class TickExchange:
+    """
+    模擬交易所：以 15m 成交路徑為真值，任一週期 K 線都由此獨立聚合
+    （UTC epoch 對齊，最後一根為截至 now 的形成中 bar）
+    """
+
+    def __init__(self, now_ms, days=80, seed=1):
+        rng = np.random.default_rng(seed)
+        n = days * 96
+        close = 100 + np.cumsum(rng.normal(0, 0.5, n))
+        self.ticks = pd.DataFrame({
+            'ts': T0 + np.arange(n) * M15,
+            'open': np.r_[100.0, close[:-1]],
+            'high': np.maximum(np.r_[100.0, close[:-1]], close) + rng.uniform(0, 0.3, n),
+            'low': np.minimum(np.r_[100.0, close[:-1]], close) - rng.uniform(0, 0.3, n),
+            'close': close,
+            'volume': rng.uniform(10, 100, n),
+        })
+        self.now_ms = now_ms
+        self.calls = []
+
+    def fetch_ohlcv(self, symbol, timeframe, since=None, limit=100):
+        self.calls.append(timeframe)
+        tf_ms = timeframe_to_ms(timeframe)
+        live = self.ticks[self.ticks['ts'] <= self.now_ms - M15]
+        key = live['ts'] // tf_ms * tf_ms
+        bars = live.groupby(key).agg(
+            open=('open', 'first'), high=('high', 'max'), low=('low', 'min'),
+            close=('close', 'last'), volume=('volume', 'sum'),
+        )
+        if since is not None:
+            bars = bars[bars.index >= since]
+        bars = bars.iloc[-limit:] if since is None else bars.iloc[:limit]
+        return [[int(ts), *row] for ts, row in zip(bars.index, bars.to_numpy().tolist())]
+
+
+def _provider(exchange, **kwargs):
+    return MarketDataProvider(exchange, max_retry=1, retry_delay=0, resample_base='1h', **kwargs)
+
+
+def _native(exchange, timeframe, limit):
+    return MarketDataProvider._to_frame(exchange.fetch_ohlcv('X', timeframe, limit=limit))
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # 最後一根 4h / 1d 都在形成中
+    state = {'now': T0 + 60 * 86_400_000 + 6 * H + 2 * M15 + 5_000}
+    monkeypatch.setattr(
+        'trader.infrastructure.data_provider.time.time', lambda: state['now'] / 1000
+    )
+    return state
+
+
+class TestResampleOhlcv:
+
+    @pytest.mark.parametrize('timeframe,limit', [('4h', 50), ('12h', 20), ('1d', 30)])
+    def test_matches_exchange_bars(self, clock, timeframe, limit):
+        exchange = TickExchange(clock['now'])
+        hourly = _native(exchange, '1h', 1000)
+        expected = _native(exchange, timeframe, limit)
+
+        out = resample_ohlcv(hourly, timeframe, limit)
+
+        pd.testing.assert_frame_equal(out, expected, check_dtype=False)
+        bar_end = out['timestamp'].iloc[-1] + pd.Timedelta(timeframe_to_ms(timeframe), unit='ms')
+        assert bar_end > pd.Timestamp(clock['now'], unit='ms')   # 含形成中 bar
+
+    def test_leading_partial_bar_dropped(self, clock):
+        exchange = TickExchange(clock['now'])
+        hourly = _native(exchange, '1h', 1000).iloc[2:]   # 從 4h bar 中間開始
+        out = resample_ohlcv(hourly, '4h')
+        assert out['timestamp'].iloc[0] == hourly['timestamp'].iloc[0].ceil('4h')
+
+    def test_insufficient_history(self, clock):
+        hourly = _native(TickExchange(clock['now']), '1h', 40)
+        assert resample_ohlcv(hourly, '4h', limit=50) is None
+        assert resample_ohlcv(pd.DataFrame(), '4h') is None
+
+
+class TestProviderResample:
+
+    def test_many_single_request_per_symbol(self, clock):
+        exchange = TickExchange(clock['now'])
+        dp = _provider(exchange)
+
+        frames = dp.fetch_ohlcv_many([('X', '1h', 50), ('X', '4h', 50)])
+
+        assert exchange.calls == ['1h']
+        assert len(frames[('X', '1h')]) == 50
+        pd.testing.assert_frame_equal(
+            frames[('X', '4h')], _native(exchange, '4h', 50), check_dtype=False
+        )
+        assert frames[('X', '4h')].attrs['timeframe'] == '4h'
+        assert dp.cache_stats()['resampled'] == 1
+
+    def test_single_fetch_uses_cached_history(self, clock):
+        exchange = TickExchange(clock['now'])
+        dp = _provider(exchange)
+        dp.fetch_ohlcv('X', '1h', 300)
+        exchange.calls.clear()
+
+        clock['now'] += M15
+        exchange.now_ms = clock['now']
+        df = dp.fetch_ohlcv('X', '4h', 50)
+
+        assert '4h' not in exchange.calls            # 只有 1h 增量更新
+        pd.testing.assert_frame_equal(df, _native(exchange, '4h', 50), check_dtype=False)
+
+    def test_insufficient_history_falls_back_to_native(self, clock):
+        exchange = TickExchange(clock['now'])
+        dp = _provider(exchange)
+        dp.fetch_ohlcv('X', '1h', 100)
+        exchange.calls.clear()
+
+        df = dp.fetch_ohlcv('X', '1d', 60)            # 需 1463 根 1h > 快取
+
+        assert exchange.calls == ['1d']
+        assert len(df) == 60
+
+    def test_many_beyond_cache_bars_native(self, clock):
+        exchange = TickExchange(clock['now'])
+        frames = _provider(exchange).fetch_ohlcv_many([('X', '1h', 100), ('X', '1d', 250)])
+        assert sorted(exchange.calls) == ['1d', '1h']
+        assert len(frames[('X', '1h')]) == 100
+
+    def test_disabled_by_default(self, clock):
+        exchange = TickExchange(clock['now'])
+        MarketDataProvider(exchange, max_retry=1, retry_delay=0).fetch_ohlcv_many(
+            [('X', '1h', 50), ('X', '4h', 50)]
+        )
+        assert sorted(exchange.calls) == ['1h', '4h']
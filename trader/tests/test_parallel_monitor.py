@@ -0,0 +1,93 @@
+"""Test: 持倉並行監控（跨持倉並行、symbol 鎖、全部完成後才彙總、每持倉延遲）"""
+
+import sys
+import threading
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from unittest.mock import MagicMock, patch
+
+from trader.config import ConfigV6 as Config
+from trader.tests.test_integration import _inject_pm_into_bot, _make_ohlcv_df
+
+
+def _positions(bot, n, decide=None):
+    symbols = [f'C{i}/USDT' for i in range(n)]
+    for symbol in symbols:
+        pm = _inject_pm_into_bot(bot, symbol=symbol)
+        pm.monitor = MagicMock(side_effect=decide or (lambda *a: {'action': 'HOLD', 'reason': 'HOLD', 'new_sl': None}))
+    bot.data_provider.fetch_ohlcv = MagicMock(return_value=_make_ohlcv_df(50000.0))
+    bot.data_provider.fetch_prices = MagicMock(return_value={s: 50500.0 for s in symbols})
+    return symbols
+
+
+class TestParallelMonitor:
+
+    def test_positions_evaluated_concurrently(self, integration_bot):
+        bot, _, _ = integration_bot
+        barrier = threading.Barrier(4, timeout=5)
+
+        def decide(*args):
+            barrier.wait()                          # 4 個持倉必須同時在評估中才會通過
+            return {'action': 'HOLD', 'reason': 'HOLD', 'new_sl': None}
+
+        symbols = _positions(bot, 4, decide)
+        with patch.object(Config, 'MONITOR_WORKERS', 4):
+            bot.monitor_positions()
+        assert all(bot.active_trades[s].monitor.call_count == 1 for s in symbols)
+        assert set(bot._monitor_latency) == set(symbols)
+
+    def test_single_worker_serial(self, integration_bot):
+        bot, _, _ = integration_bot
+        threads = set()
+
+        def decide(*args):
+            threads.add(threading.current_thread())
+            return {'action': 'HOLD', 'reason': 'HOLD', 'new_sl': None}
+
+        _positions(bot, 3, decide)
+        with patch.object(Config, 'MONITOR_WORKERS', 1):
+            bot.monitor_positions()
+        assert threads == {threading.current_thread()}
+
+    def test_summary_after_all_positions(self, integration_bot):
+        bot, _, _ = integration_bot
+        _positions(bot, 3)
+        with patch.object(Config, 'MONITOR_WORKERS', 3), patch('trader.bot._trade_log') as trade_log:
+            bot.monitor_positions()
+        events = [c.args[0] for c in trade_log.call_args_list]
+        assert [e['event'] for e in events] == ['POSITION_UPDATE'] * 3 + ['CYCLE_SUMMARY']
+        assert all(isinstance(e['latency_ms'], int) for e in events[:3])
+        assert events[-1]['monitor_ms'] == max(e['latency_ms'] for e in events[:3])
+
+    def test_symbol_lock_held(self, integration_bot):
+        bot, _, _ = integration_bot
+        symbols = _positions(bot, 2)
+        held = {}
+
+        def decide_for(symbol):
+            def decide(*args):
+                held[symbol] = bot._symbol_lock(symbol)._is_owned()
+                return {'action': 'HOLD', 'reason': 'HOLD', 'new_sl': None}
+            return decide
+
+        for symbol in symbols:
+            bot.active_trades[symbol].monitor.side_effect = decide_for(symbol)
+        with patch.object(Config, 'MONITOR_WORKERS', 2):
+            bot.monitor_positions()
+        assert held == {symbol: True for symbol in symbols}
+        assert bot._symbol_lock(symbols[0]) is bot._symbol_lock(symbols[0])
+
+    def test_close_cleaned_up_once(self, integration_bot):
+        bot, _, _ = integration_bot
+        symbols = _positions(bot, 3)
+        bot._handle_close = MagicMock(return_value=True)
+        bot.active_trades[symbols[1]].monitor.side_effect = (
+            lambda *a: {'action': 'CLOSE', 'reason': 'SL', 'new_sl': None}
+        )
+        with patch.object(Config, 'MONITOR_WORKERS', 3), \
+             patch.object(bot, '_save_positions', wraps=bot._save_positions) as save:
+            bot.monitor_positions()
+        assert symbols[1] not in bot.active_trades and len(bot.active_trades) == 2
+        assert symbols[1] in bot.recently_exited
+        save.assert_called_once()
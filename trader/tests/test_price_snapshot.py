@@ -0,0 +1,128 @@
+"""Test: 監控週期報價快照（單次全市場請求，ticker 流量不隨持倉數增加）"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from trader.infrastructure.data_provider import (
+    MarketDataProvider, PRICE_SNAPSHOT_WEIGHT, TICKERS_SNAPSHOT_WEIGHT,
+)
+from trader.tests.test_integration import _inject_pm_into_bot, _make_ohlcv_df
+
+
+class FakeLimiter:
+    def __init__(self):
+        self.acquired = []
+
+    def acquire(self, weight=1):
+        self.acquired.append(weight)
+        return 0.0
+
+    def update_from_headers(self, headers):
+        pass
+
+
+def _provider(exchange, **kwargs):
+    return MarketDataProvider(exchange, max_retry=1, retry_delay=0, rate_limiter=FakeLimiter(), **kwargs)
+
+
+class TestFetchPrices:
+
+    def test_last_prices_single_request(self):
+        exchange = MagicMock()
+        exchange.has = {'fetchLastPrices': True}
+        exchange.fetch_last_prices.return_value = {
+            'BTC/USDT:USDT': {'symbol': 'BTC/USDT:USDT', 'price': 50000.0},
+            'ETH/USDT:USDT': {'symbol': 'ETH/USDT:USDT', 'price': 3000.0},
+            'SOL/USDT:USDT': {'symbol': 'SOL/USDT:USDT', 'price': 150.0},
+        }
+        provider = _provider(exchange)
+
+        prices = provider.fetch_prices(['BTC/USDT', 'ETH/USDT', 'DOGE/USDT'])
+
+        assert prices == {'BTC/USDT': 50000.0, 'ETH/USDT': 3000.0}
+        exchange.fetch_last_prices.assert_called_once_with()
+        exchange.fetch_tickers.assert_not_called()
+        assert provider.rate_limiter.acquired == [PRICE_SNAPSHOT_WEIGHT]
+
+    def test_falls_back_to_tickers(self):
+        exchange = MagicMock()
+        exchange.has = {'fetchLastPrices': False}
+        exchange.fetch_tickers.return_value = {
+            'BTC/USDT': {'symbol': 'BTC/USDT', 'last': 50000.0},
+            'ETH/USDT': {'symbol': 'ETH/USDT', 'last': None},
+        }
+        provider = _provider(exchange)
+
+        assert provider.fetch_prices(['BTC/USDT', 'ETH/USDT']) == {'BTC/USDT': 50000.0}
+        assert provider.rate_limiter.acquired == [TICKERS_SNAPSHOT_WEIGHT]
+
+    def test_empty_symbols_no_request(self):
+        exchange = MagicMock()
+        assert _provider(exchange).fetch_prices([]) == {}
+        exchange.fetch_last_prices.assert_not_called()
+        exchange.fetch_tickers.assert_not_called()
+
+    def test_demo_fallback(self):
+        exchange = MagicMock()
+        exchange.has = {'fetchLastPrices': True}
+        exchange.fetch_last_prices.side_effect = Exception('demo not supported')
+        resp = MagicMock(status_code=200, headers={})
+        resp.json.return_value = [
+            {'symbol': 'BTCUSDT', 'price': '50000.5'},
+            {'symbol': 'ETHUSDT', 'price': '3000.25'},
+        ]
+        provider = _provider(exchange, sandbox_mode=True, trading_mode='future')
+
+        with patch('trader.infrastructure.http_pool.get', return_value=resp) as get:
+            prices = provider.fetch_prices(['BTC/USDT', 'ETH/USDT'])
+
+        assert prices == {'BTC/USDT': 50000.5, 'ETH/USDT': 3000.25}
+        get.assert_called_once()
+        assert 'params' not in get.call_args.kwargs     # 不帶 symbol：全市場一次
+
+    def test_failure_without_sandbox_returns_empty(self):
+        exchange = MagicMock()
+        exchange.has = {'fetchLastPrices': True}
+        exchange.fetch_last_prices.side_effect = Exception('boom')
+        with patch('trader.infrastructure.http_pool.get') as get:
+            assert _provider(exchange).fetch_prices(['BTC/USDT']) == {}
+        get.assert_not_called()
+
+
+class TestMonitorSnapshot:
+
+    def _hold(self, bot, symbols):
+        for symbol in symbols:
+            pm = _inject_pm_into_bot(bot, symbol=symbol)
+            pm.monitor = MagicMock(return_value={'action': 'HOLD', 'reason': 'HOLD', 'new_sl': None})
+        bot.data_provider.fetch_ohlcv = MagicMock(return_value=_make_ohlcv_df(50000.0))
+
+    @pytest.mark.parametrize('n', [1, 5])
+    def test_ticker_traffic_constant(self, integration_bot, n):
+        bot, _, _ = integration_bot
+        symbols = [f'C{i}/USDT' for i in range(n)]
+        self._hold(bot, symbols)
+        bot.data_provider.fetch_prices = MagicMock(return_value={s: 50500.0 for s in symbols})
+
+        bot.monitor_positions()
+
+        bot.data_provider.fetch_prices.assert_called_once()
+        bot.exchange.fetch_ticker.assert_not_called()
+        for symbol in symbols:
+            assert bot.active_trades[symbol].monitor.call_args.args[0] == 50500.0
+        assert bot._price_snapshot == {}           # 週期結束後清空
+
+    def test_missing_symbol_falls_back_to_ticker(self, integration_bot):
+        bot, _, _ = integration_bot
+        self._hold(bot, ['BTC/USDT', 'ETH/USDT'])
+        bot.data_provider.fetch_prices = MagicMock(return_value={'BTC/USDT': 50500.0})
+
+        bot.monitor_positions()
+
+        fetched = {c.args[0] for c in bot.exchange.fetch_ticker.call_args_list}
+        assert fetched == {'ETH/USDT'}
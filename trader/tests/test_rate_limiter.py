@@ -0,0 +1,94 @@
+"""Test: Binance request weight 限流器"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from unittest.mock import MagicMock, patch
+
+from trader.infrastructure.rate_limiter import WeightRateLimiter, kline_weight
+from trader.infrastructure.api_client import BinanceFuturesClient
+
+
+class FakeClock:
+    """可手動推進的時鐘；sleep 直接推進時間"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+def _limiter(capacity=60, window=60.0):
+    clock = FakeClock()
+    return WeightRateLimiter(capacity, window, clock=clock, sleep=clock.sleep), clock
+
+
+class TestKlineWeight:
+
+    def test_tiers(self):
+        assert kline_weight(50) == 1
+        assert kline_weight(100) == 2
+        assert kline_weight(250) == 2
+        assert kline_weight(500) == 5
+        assert kline_weight(1500) == 10
+
+
+class TestWeightRateLimiter:
+
+    def test_acquire_within_capacity_no_wait(self):
+        limiter, clock = _limiter()
+        for _ in range(60):
+            assert limiter.acquire(1) == 0.0
+        assert clock.slept == []
+
+    def test_acquire_waits_for_refill(self):
+        limiter, clock = _limiter(capacity=60, window=60.0)   # 1 weight / 秒
+        limiter.acquire(60)
+        waited = limiter.acquire(5)
+        assert abs(waited - 5.0) < 1e-9
+        assert abs(clock.now - 5.0) < 1e-9
+
+    def test_refill_capped_at_capacity(self):
+        limiter, clock = _limiter()
+        clock.now += 1000
+        assert limiter.available == 60
+
+    def test_header_sync_lowers_tokens(self):
+        limiter, clock = _limiter(capacity=2000)
+        limiter.update_from_headers({'x-mbx-used-weight-1m': '1990'})
+        assert limiter.available == 10
+        # 回報值比本地估計低 → 不往上修正
+        limiter.update_from_headers({'X-MBX-USED-WEIGHT-1M': '0'})
+        assert limiter.available == 10
+
+    def test_header_sync_over_limit_blocks(self):
+        limiter, clock = _limiter(capacity=60)
+        limiter.update_from_headers({'X-MBX-USED-WEIGHT-1M': '70'})
+        limiter.acquire(1)
+        assert clock.now > 0
+
+    def test_invalid_headers_ignored(self):
+        limiter, _ = _limiter()
+        limiter.update_from_headers(None)
+        limiter.update_from_headers(MagicMock())
+        limiter.update_from_headers({'X-MBX-USED-WEIGHT-1M': 'abc'})
+        assert limiter.available == 60
+
+
+class TestFuturesClientLimiter:
+
+    def test_signed_request_uses_shared_limiter(self):
+        limiter, _ = _limiter(capacity=100)
+        client = BinanceFuturesClient('key', 'secret', sandbox=True, rate_limiter=limiter)
+        resp = MagicMock(status_code=200, headers={'X-MBX-USED-WEIGHT-1M': '40'})
+        with patch('trader.infrastructure.api_client.http_pool.get', return_value=resp):
+            client.signed_request('GET', '/fapi/v2/account', weight=5)
+        assert client._current_weight == 40
+        assert limiter.available == 60
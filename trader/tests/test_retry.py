@@ -0,0 +1,217 @@
+"""Test: 重試預算 / 斷路器（失敗不阻塞主循環、連續失敗斷路、重試耗時統計）"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from unittest.mock import MagicMock, patch
+
+import ccxt
+import pytest
+
+from trader.infrastructure import retry
+from trader.infrastructure.data_provider import MarketDataProvider
+from trader.infrastructure.retry import CircuitBreaker, RetryBudget
+from trader.risk.account import AccountState
+from trader.risk.manager import RiskManager
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(autouse=True)
+def fresh_stats():
+    retry.stats(reset=True)
+    yield
+    retry.stats(reset=True)
+
+
+@pytest.fixture
+def slept():
+    calls = []
+    with patch('trader.infrastructure.retry.time.sleep', side_effect=calls.append):
+        yield calls
+
+
+class TestBudget:
+
+    def test_take(self):
+        budget = RetryBudget(10)
+        assert budget.take(6) and not budget.take(5) and budget.take(4)
+        assert budget.remaining == 0
+
+    def test_wait_within_budget(self, slept):
+        with retry.cycle_budget(7):
+            assert retry.wait('klines', 5)
+            assert not retry.wait('klines', 5)
+        assert slept == [5]
+        assert retry.stats()['klines'] == {'retries': 1, 'waited': 5, 'exhausted': 1, 'rejected': 0, 'deferred': 0}
+
+    def test_no_budget_keeps_old_behaviour(self, slept):
+        assert retry.current_budget() is None
+        assert retry.wait('klines', 5) and retry.wait('klines', 10)
+        assert slept == [5, 10]
+
+    def test_nested_budget_restored(self):
+        with retry.cycle_budget(5) as outer:
+            with retry.cycle_budget(1):
+                pass
+            assert retry.current_budget() is outer
+        assert retry.current_budget() is None
+
+
+class TestCircuitBreaker:
+
+    def test_open_half_open_close(self):
+        clock = Clock()
+        breaker = CircuitBreaker('klines', failure_threshold=3, reset_seconds=30, clock=clock)
+        for _ in range(3):
+            assert breaker.allow()
+            breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN and not breaker.allow()
+
+        clock.now = 30
+        assert breaker.allow()                  # 探測
+        assert not breaker.allow()              # 探測進行中只放行一個
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+
+        clock.now = 60
+        assert breaker.allow()
+        breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED and breaker.allow()
+        assert breaker.opened == 1
+
+    def test_success_resets_count(self):
+        breaker = CircuitBreaker('klines', failure_threshold=2)
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.CLOSED
+
+
+def _flaky_provider(**kwargs):
+    exchange = MagicMock()
+    exchange.fetch_ohlcv.side_effect = ccxt.NetworkError('timeout')
+    provider = MarketDataProvider(
+        exchange, max_retry=3, retry_delay=5, sandbox_mode=True, trading_mode='future',
+        cache_enabled=False, **kwargs,
+    )
+    return provider, exchange
+
+
+class TestProviderRetry:
+
+    def test_budget_caps_wait(self, slept):
+        provider, exchange = _flaky_provider(breaker_threshold=100)
+        with patch('trader.infrastructure.http_pool.get', side_effect=ConnectionError('down')):
+            with retry.cycle_budget(12):
+                assert provider.fetch_ohlcv('BTC/USDT', '1h', 10).empty   # 3 次嘗試，等 5 + 5
+                assert provider.fetch_ohlcv('ETH/USDT', '1h', 10).empty   # 剩 2：不等，本輪跳過
+                assert provider.fetch_ohlcv('SOL/USDT', '1h', 10).empty
+        assert slept == [5, 5]
+        assert exchange.fetch_ohlcv.call_count == 3 + 1 + 1
+        stats = retry.stats()['klines']
+        assert stats == {'retries': 2, 'waited': 10, 'exhausted': 2, 'rejected': 0, 'deferred': 0}
+
+    def test_breaker_skips_requests(self):
+        provider, exchange = _flaky_provider(breaker_threshold=2, breaker_reset_seconds=60)
+        with patch('trader.infrastructure.http_pool.get', side_effect=ConnectionError('down')) as get:
+            with retry.cycle_budget(0):
+                for _ in range(4):
+                    assert provider.fetch_ohlcv('BTC/USDT', '1h', 10).empty
+        assert exchange.fetch_ohlcv.call_count + get.call_count == 4    # 2 次失敗後斷路
+        assert provider.breaker.state == CircuitBreaker.OPEN
+        assert retry.stats()['klines']['rejected'] == 2
+
+    def test_bad_symbol_does_not_trip_breaker(self):
+        """單一標的錯誤（BadSymbol / 下架）不計入共用斷路器，其他標的照常抓取"""
+        rows = [[1_700_000_000_000 + i * 3_600_000, 1.0, 2.0, 0.5, 1.5, 10.0] for i in range(10)]
+
+        def fetch_ohlcv(symbol, *args, **kwargs):
+            if symbol == 'BAD/USDT':
+                raise ccxt.BadSymbol(f'{symbol} delisted')
+            return rows
+
+        exchange = MagicMock()
+        exchange.fetch_ohlcv.side_effect = fetch_ohlcv
+        provider = MarketDataProvider(exchange, max_retry=1, breaker_threshold=2, cache_enabled=False)
+        for _ in range(5):
+            assert provider.fetch_ohlcv('BAD/USDT', '1h', 10).empty
+        assert provider.breaker.state == CircuitBreaker.CLOSED
+        assert len(provider.fetch_ohlcv('BTC/USDT', '1h', 10)) == 10
+
+    def test_demo_fapi_5xx_counts_as_failure(self):
+        provider, _ = _flaky_provider(breaker_threshold=1)
+        with patch('trader.infrastructure.http_pool.get', return_value=MagicMock(status_code=503, headers={})), \
+             retry.cycle_budget(0):
+            assert provider.fetch_ohlcv('BTC/USDT', '1h', 10).empty
+        assert provider.breaker.state == CircuitBreaker.OPEN
+
+
+class TestBalanceRetry:
+
+    @pytest.fixture
+    def manager(self):
+        exchange = MagicMock()
+        exchange.fetch_balance.side_effect = ccxt.NetworkError('timeout')
+        with patch('trader.risk.manager.Config.SANDBOX_MODE', False):
+            yield RiskManager(exchange, MagicMock()), exchange
+
+    def test_budget_and_breaker(self, manager, slept):
+        rm, exchange = manager
+        with patch('trader.risk.manager.Config.RETRY_DELAY', 5), \
+             patch('trader.risk.manager.Config.MAX_RETRY', 3), \
+             patch('trader.risk.manager.Config.SANDBOX_MODE', False):
+            with retry.cycle_budget(5):
+                assert rm.get_balance() == 0
+            assert exchange.fetch_balance.call_count == 2 and slept == [5]
+
+            rm.balance_breaker.failure_threshold = 2
+            with retry.cycle_budget(0):
+                assert rm.get_balance() == 0
+                exchange.fetch_balance.reset_mock()
+                assert rm.get_balance() == 0
+            exchange.fetch_balance.assert_not_called()
+        assert retry.stats()['balance']['rejected'] == 1
+
+    def test_positions_failure_keeps_balance(self, manager, slept):
+        """fetch_positions 失敗：餘額照用、只重查持倉、不計入斷路器"""
+        rm, exchange = manager
+        exchange.fetch_balance.side_effect = None
+        exchange.fetch_balance.return_value = {'USDT': {'free': 1234.5}}
+        exchange.fetch_positions.side_effect = ccxt.NetworkError('timeout')
+        rm.balance_breaker.failure_threshold = 1
+        with patch('trader.risk.manager.Config.RETRY_DELAY', 1), \
+             patch('trader.risk.manager.Config.MAX_RETRY', 3), \
+             patch('trader.risk.manager.Config.SANDBOX_MODE', False):
+            with retry.cycle_budget(10):
+                assert rm.get_balance() == 1234.5
+                assert rm.get_positions() is None
+        assert exchange.fetch_balance.call_count == 2           # 每次 fetch_account 只查一次餘額
+        assert exchange.fetch_positions.call_count == 6
+        assert rm.balance_breaker.state == CircuitBreaker.CLOSED
+
+    def test_positions_failure_with_account_state(self, manager):
+        rm, exchange = manager
+        exchange.fetch_balance.side_effect = None
+        exchange.fetch_balance.return_value = {'USDT': {'free': 50.0}}
+        exchange.fetch_positions.side_effect = [ccxt.NetworkError('timeout'), []]
+        rm.account = AccountState(rm.fetch_account)
+        with patch('trader.risk.manager.Config.MAX_RETRY', 1), \
+             patch('trader.risk.manager.Config.SANDBOX_MODE', False):
+            assert rm.get_balance() == 50.0
+            assert rm.get_positions() == []                     # 持倉未快取，下一次重新查詢
+
+    def test_success(self, manager):
+        rm, exchange = manager
+        exchange.fetch_balance.side_effect = None
+        exchange.fetch_balance.return_value = {'USDT': {'free': 1234.5}}
+        with patch('trader.risk.manager.Config.SANDBOX_MODE', False):
+            assert rm.get_balance() == 1234.5
+        assert rm.balance_breaker.state == CircuitBreaker.CLOSED
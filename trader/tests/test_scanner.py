@@ -97,6 +97,10 @@ def mock_scanner():
         mock_init.return_value = mock_exchange
 
         mock_dp = MagicMock()
+        # fetch_ohlcv_many 逐一委派給 fetch_ohlcv，讓各 test 只需設定 fetch_ohlcv
+        mock_dp.fetch_ohlcv_many.side_effect = lambda reqs, **kw: {
+            (s, tf): mock_dp.fetch_ohlcv(s, tf, limit) for s, tf, limit in reqs
+        }
         scanner = MarketScanner(data_provider=mock_dp)
         scanner.exchange = mock_exchange
         scanner._data_provider = mock_dp
@@ -128,6 +132,16 @@ class TestCalculateIndicators:
         assert pd.notna(last.get('ema_20')), "ema_20 is NaN"
         assert pd.notna(last.get('atr')), "atr is NaN"
 
+    def test_matches_pandas_ta_semantics(self, mock_scanner):
+        """NumPy kernel 與 pandas_ta 語意參考實作一致（Wilder ATR/RSI、SMA 種子 EMA）"""
+        from trader.tests.fixtures.reference import ref_atr, ref_ema, ref_rsi
+        df = make_ohlcv(rows=250)
+        result = mock_scanner.calculate_indicators(df.copy())
+        pd.testing.assert_series_equal(result['ema_50'], ref_ema(df['close'], 50), check_names=False)
+        pd.testing.assert_series_equal(result['atr'], ref_atr(df['high'], df['low'], df['close'], 14),
+                                       check_names=False)
+        pd.testing.assert_series_equal(result['rsi'], ref_rsi(df['close'], 14), check_names=False)
+
 
 class TestLayer1:
     """Layer 1: 流動性過濾"""
@@ -177,6 +191,19 @@ class TestLayer2:
         # 不 assert 具體數量（取決於 synthetic data），只確認不 crash
         assert isinstance(result, list)
 
+    def test_computes_only_l2_columns_eagerly(self, mock_scanner):
+        """L2 讀取的欄位直接計算，不再登記延遲欄位；未讀取的 EMA 20 / 200 不算"""
+        from scanner.market_scanner import L2_INDICATORS
+        from trader.indicators.registry import LAZY_ATTR
+
+        base = make_ohlcv(rows=100, trend='up')
+        mock_scanner._data_provider.fetch_ohlcv.side_effect = lambda *a, **kw: base.copy()
+        with patch.object(ScannerConfig, 'L2_MIN_CONDITIONS', 0):
+            result = mock_scanner.layer2_momentum_filter(['ETH/USDT'])
+        df = result[0][1]['df']
+        assert LAZY_ATTR not in df.attrs
+        assert set(df.columns) - set(base.columns) == set(L2_INDICATORS)
+
     def test_insufficient_data_skipped(self, mock_scanner):
         """< 50 根 → 跳過不 crash"""
         df = make_ohlcv(rows=10)
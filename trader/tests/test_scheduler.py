@@ -0,0 +1,367 @@
+"""Test: 多節奏排程（priority、不累積漂移、背景掃描不擋監控、延遲指標、每執行緒重試預算）"""
+
+import sys
+import threading
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from unittest.mock import MagicMock, patch
+
+import ccxt
+import pytest
+
+from trader.infrastructure import retry
+from trader.infrastructure.data_provider import MarketDataProvider
+from trader.infrastructure.scheduler import Scheduler
+from trader.tests.conftest import make_pm
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+class TestScheduler:
+
+    def test_priority_order(self, clock):
+        scheduler = Scheduler(clock=clock)
+        calls = []
+        scheduler.add('scan', lambda: calls.append('scan'), 60, priority=3)
+        scheduler.add('monitor', lambda: calls.append('monitor'), 5, priority=0)
+        scheduler.add('sync', lambda: calls.append('sync'), 30, priority=1)
+        assert scheduler.run_pending() == 3
+        assert calls == ['monitor', 'sync', 'scan']
+        assert scheduler.run_pending() == 0
+
+    def test_independent_cadence_no_drift(self, clock):
+        scheduler = Scheduler(clock=clock)
+        runs = {'monitor': 0, 'scan': 0}
+
+        def monitor():
+            runs['monitor'] += 1
+            clock.now += 1                      # 每次執行耗時 1s
+
+        scheduler.add('monitor', monitor, 5)
+        scheduler.add('scan', lambda: runs.__setitem__('scan', runs['scan'] + 1), 60, priority=1)
+        while clock.now < 60:
+            scheduler.run_pending()
+            clock.now += scheduler.idle_seconds()
+        assert runs == {'monitor': 12, 'scan': 1}
+        assert scheduler.tasks[0].next_run == 60
+        assert scheduler.stats()['monitor']['late_max'] == 0
+
+    def test_lateness_and_no_catch_up(self, clock):
+        scheduler = Scheduler(clock=clock)
+        calls = []
+        scheduler.add('monitor', lambda: calls.append(clock.now), 5)
+        scheduler.run_pending()
+        clock.now = 17                          # 錯過 5 / 10 / 15 三輪
+        scheduler.run_pending()
+        scheduler.run_pending()
+        assert calls == [0, 17]
+        assert scheduler.tasks[0].next_run == 22
+        stats = scheduler.stats(reset=True)['monitor']
+        assert stats['runs'] == 2 and stats['late_max'] == 12 and stats['late_avg'] == 6
+        assert scheduler.stats()['monitor']['runs'] == 0
+
+    def test_error_isolated(self, clock):
+        scheduler = Scheduler(clock=clock)
+        ran = []
+        scheduler.add('bad', lambda: 1 / 0, 5)
+        scheduler.add('good', lambda: ran.append(1), 5, priority=1)
+        scheduler.run_pending()
+        assert ran == [1] and scheduler.stats()['bad']['errors'] == 1
+
+    def test_duplicate_name(self, clock):
+        scheduler = Scheduler(clock=clock)
+        scheduler.add('scan', lambda: None, 60)
+        with pytest.raises(ValueError):
+            scheduler.add('scan', lambda: None, 60)
+
+    def test_background_does_not_block(self, clock):
+        scheduler = Scheduler(clock=clock)
+        release = threading.Event()
+        monitored = []
+        scheduler.add('scan', lambda: release.wait(5), 10, background=True)
+        scheduler.add('monitor', lambda: monitored.append(clock.now), 5, priority=1)
+        try:
+            for _ in range(5):                  # 掃描卡住 20s，監控照常每 5s
+                scheduler.run_pending()
+                clock.now += 5
+            assert monitored == [0, 5, 10, 15, 20]
+            assert scheduler.tasks[0].running
+            assert scheduler.stats()['scan']['overruns'] == 2
+        finally:
+            release.set()
+            scheduler.join(timeout=5)
+        assert not scheduler.tasks[0].running
+        assert scheduler.stats()['scan']['runs'] == 1
+
+    def test_run_all_in_registration_order(self, clock):
+        scheduler = Scheduler(clock=clock)
+        calls = []
+        scheduler.add('scan', lambda: calls.append(threading.current_thread()), 60, priority=3, background=True)
+        scheduler.add('monitor', lambda: calls.append('monitor'), 5)
+        scheduler.run_all()
+        assert calls == [threading.current_thread(), 'monitor']
+
+
+class TestThreadBudget:
+
+    def test_budget_per_thread(self):
+        seen = []
+        with retry.cycle_budget(5) as budget:
+            worker = threading.Thread(target=lambda: seen.append(retry.current_budget()))
+            worker.start()
+            worker.join()
+            assert retry.current_budget() is budget
+        assert seen == [None]
+
+    def test_parallel_fetch_shares_caller_budget(self):
+        retry.stats(reset=True)
+        exchange = MagicMock()
+        exchange.fetch_ohlcv.side_effect = ccxt.NetworkError('timeout')
+        provider = MarketDataProvider(
+            exchange, max_retry=3, retry_delay=1, sandbox_mode=True, trading_mode='future',
+            cache_enabled=False, max_workers=4, breaker_threshold=100,
+        )
+        slept = []
+        with patch('trader.infrastructure.retry.time.sleep', side_effect=slept.append), \
+             patch('trader.infrastructure.http_pool.get', side_effect=ConnectionError('down')):
+            with retry.cycle_budget(3):
+                frames = provider.fetch_ohlcv_many([(f'S{i}/USDT', '1h', 10) for i in range(8)])
+        assert all(df.empty for df in frames.values())
+        assert sum(slept) == 3                  # 8 個並行 worker 共用同一份 3s 預算
+        assert retry.stats(reset=True)['klines']['exhausted'] > 0
+
+
+class TestBotScheduler:
+
+    def test_tasks_registered(self, mock_bot):
+        tasks = {task.name: task for task in mock_bot.scheduler.tasks}
+        assert list(tasks) == ['scan', 'sync', 'monitor', 'telegram', 'housekeeping']
+        assert tasks['scan'].background and not tasks['monitor'].background
+        assert tasks['monitor'].priority < tasks['sync'].priority < tasks['scan'].priority
+
+    def test_monitor_runs_while_scan_busy(self, mock_bot):
+        started, release = threading.Event(), threading.Event()
+
+        def slow_scan():
+            started.set()
+            release.wait(5)
+
+        mock_bot.scan_for_signals = slow_scan
+        mock_bot.monitor_positions = MagicMock()
+        mock_bot._sync_exchange_positions = MagicMock()
+        mock_bot.telegram_handler.poll = MagicMock()
+        try:
+            mock_bot.scheduler.run_pending()
+            assert started.wait(5)
+            mock_bot.monitor_positions.assert_called_once()
+            mock_bot._sync_exchange_positions.assert_called_once()
+
+            monitor = next(t for t in mock_bot.scheduler.tasks if t.name == 'monitor')
+            monitor.next_run = 0                # 掃描仍在跑，監控再次到期
+            mock_bot.scheduler.run_pending()
+            assert mock_bot.monitor_positions.call_count == 2
+        finally:
+            release.set()
+            mock_bot.scheduler.join(timeout=5)
+
+    @staticmethod
+    def _lock_free(lock):
+        """另一條執行緒（掃描）此時能否取得鎖"""
+        got = []
+
+        def probe():
+            if lock.acquire(timeout=1):
+                got.append(True)
+                lock.release()
+        thread = threading.Thread(target=probe)
+        thread.start()
+        thread.join(5)
+        return got == [True]
+
+    def test_network_calls_outside_trades_lock(self, mock_bot):
+        """監控 / 同步的網路請求期間不持 _trades_lock（掃描不必等）"""
+        pm = make_pm(symbol='BTC/USDT')
+        mock_bot.active_trades['BTC/USDT'] = pm
+        free = []
+
+        def fetch_many(requests):
+            free.append(self._lock_free(mock_bot._trades_lock))
+            return {}
+
+        def positions():
+            free.append(self._lock_free(mock_bot._trades_lock))
+            return [{'symbol': 'BTCUSDT', 'positionAmt': str(pm.total_size)}]
+
+        mock_bot.fetch_ohlcv_many = mock_bot.fetch_candles_many = fetch_many
+        mock_bot.risk_manager.get_positions = positions
+        mock_bot.risk_manager.get_balance = MagicMock(return_value=1000.0)
+        mock_bot._current_price = MagicMock(return_value=50000.0)
+        mock_bot._save_positions = MagicMock()
+        with patch('trader.bot.Config.V6_DRY_RUN', False):
+            mock_bot._monitor_task()
+            mock_bot._sync_task()
+        assert free == [True, True]
+
+    def test_closed_position_removed_with_cooldown_atomically(self, mock_bot):
+        pm = make_pm(symbol='BTC/USDT')
+        pm.is_closed = True
+        mock_bot.active_trades['BTC/USDT'] = pm
+        mock_bot.fetch_ohlcv_many = MagicMock(return_value={})
+        mock_bot.risk_manager.get_balance = MagicMock(return_value=1000.0)
+        seen = []
+        original = mock_bot._trades_lock
+
+        class Spy:
+            def __enter__(self):
+                original.acquire()
+
+            def __exit__(self, *exc):
+                # 釋放前：已移除的持倉一定已在冷卻表
+                seen.append('BTC/USDT' in mock_bot.active_trades or 'BTC/USDT' in mock_bot.recently_exited)
+                original.release()
+
+        mock_bot._trades_lock = Spy()
+        mock_bot._monitor_positions_cycle()
+        assert 'BTC/USDT' not in mock_bot.active_trades and all(seen)
+
+    def test_skip_scan_reads_cooldowns_under_lock(self, mock_bot):
+        owned = []
+
+        class Cooldowns(dict):
+            def __contains__(self, key):
+                owned.append(mock_bot._trades_lock._is_owned())
+                return super().__contains__(key)
+
+        mock_bot.recently_exited = Cooldowns()
+        mock_bot.order_failed_symbols = Cooldowns()
+        mock_bot.early_exit_cooldown = Cooldowns()
+        with patch('trader.bot.Config.SYMBOL_LOSS_COOLDOWN_HOURS', 0):
+            assert not mock_bot._should_skip_scan('ETH/USDT')
+        assert owned == [True, True, True]
+
+
+class TestAlignedTask:
+
+    def test_align_replaces_interval(self, clock):
+        scheduler = Scheduler(clock=clock)
+        delays = iter([100.0, 40.0])
+        calls = []
+        scheduler.add('scan', lambda: calls.append(clock.now), 60, align=lambda: next(delays))
+        scheduler.run_pending()
+        assert calls == [0] and scheduler.tasks[0].next_run == 40     # 執行完後重新對齊
+
+    def test_align_error_falls_back(self, clock):
+        scheduler = Scheduler(clock=clock)
+        scheduler.add('scan', lambda: None, 60, align=lambda: 1 / 0)
+        scheduler.run_pending()
+        assert scheduler.tasks[0].next_run == 60
+
+
+class TestTrigger:
+
+    def test_trigger_makes_due_and_wakes(self, clock):
+        scheduler = Scheduler(clock=clock)
+        calls = []
+        scheduler.add('sync', lambda: calls.append(clock.now), 30, delay=30)
+        clock.now = 4
+        threading.Timer(0.05, scheduler.trigger, args=('sync',)).start()
+        assert scheduler.sleep(5)
+        scheduler.run_pending()
+        assert calls == [4] and scheduler.tasks[0].next_run == 34
+
+    def test_sleep_times_out_and_unknown_ignored(self, clock):
+        scheduler = Scheduler(clock=clock)
+        scheduler.trigger('missing')
+        assert not scheduler.sleep(0.01)
+
+
+class TestDefer:
+
+    def test_defer_during_run_reschedules(self, clock):
+        scheduler = Scheduler(clock=clock)
+        calls = []
+
+        def monitor():
+            calls.append(clock.now)
+            if len(calls) == 1:
+                scheduler.defer('monitor', 2)           # 請求失敗 → 2 秒後重跑，不等待
+        scheduler.add('monitor', monitor, 5)
+        scheduler.run_pending()
+        assert scheduler.idle_seconds() == 2
+        clock.now = 2
+        scheduler.run_pending()
+        assert calls == [0, 2] and scheduler.tasks[0].due_at == 5      # 重跑不推進原週期
+        clock.now = 5
+        scheduler.run_pending()
+        assert calls == [0, 2, 5]
+
+    def test_periodic_run_clears_pending_retry(self, clock):
+        scheduler = Scheduler(clock=clock)
+        scheduler.add('sync', lambda: None, 5, delay=5)
+        scheduler.defer('sync', 10)
+        clock.now = 5
+        scheduler.run_pending()
+        assert scheduler.tasks[0].retry_at is None and scheduler.tasks[0].due_at == 10
+
+    def test_defer_overrides_align(self, clock):
+        scheduler = Scheduler(clock=clock)
+        scheduler.add('scan', lambda: scheduler.defer('scan', 3), 60, align=lambda: 100.0)
+        scheduler.run_pending()
+        assert scheduler.tasks[0].due_at == 3 and scheduler.tasks[0].next_run == 100
+
+    def test_retry_due_while_background_running(self, clock):
+        """背景掃描執行中重跑到期：不記 overrun、不遺失，該輪結束後派發"""
+        scheduler = Scheduler(clock=clock)
+        release = threading.Event()
+        calls = []
+
+        def scan():
+            calls.append(clock.now)
+            if len(calls) == 1:
+                scheduler.defer('scan', 2)
+                release.wait(5)
+        task = scheduler.add('scan', scan, 60, background=True)
+        assert scheduler.run_pending() == 1
+        clock.now = 3                                   # 重跑到期，但上一輪仍在執行
+        assert scheduler.run_pending() == 0
+        assert task.retry_at == 2 and task.overruns == 0
+        scheduler.sleep(0)                              # 清掉 defer 的喚醒
+        release.set()
+        scheduler.join(5)
+        assert scheduler.sleep(0)                       # 結束時喚醒主循環
+        assert scheduler.run_pending() == 1
+        scheduler.join(5)
+        assert calls == [0, 3] and task.retry_at is None and task.next_run == 60
+
+    def test_wait_defers_instead_of_sleeping(self, clock):
+        scheduler = Scheduler(clock=clock)
+        scheduler.add('monitor', lambda: None, 5, delay=5)
+        with patch('trader.infrastructure.retry.time.sleep') as sleep, \
+             retry.cycle_budget(10, defer=lambda d: scheduler.defer('monitor', d)):
+            assert not retry.wait('klines', 4)
+        sleep.assert_not_called()
+        assert scheduler.tasks[0].due_at == 4
+        assert retry.stats(reset=True)['klines']['deferred'] == 1
+
+    def test_bot_monitor_failure_does_not_block(self, mock_bot):
+        waited = []
+        mock_bot.monitor_positions = lambda: waited.append(retry.wait('klines', 5))
+        monitor = next(t for t in mock_bot.scheduler.tasks if t.name == 'monitor')
+        with patch('trader.infrastructure.retry.time.sleep') as sleep:
+            mock_bot._monitor_task()
+        sleep.assert_not_called()
+        assert waited == [False]
+        assert monitor.retry_at <= mock_bot.scheduler._clock() + 5
+        retry.stats(reset=True)
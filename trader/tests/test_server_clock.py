@@ -0,0 +1,96 @@
+"""Test: 交易所時間對齊（偏移量測、校正有效期、收盤對齊掃描時間、抓取失敗補掃）"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from unittest.mock import MagicMock, patch
+
+import pandas as pd
+import pytest
+
+from trader.config import ConfigV6 as Config
+from trader.infrastructure.server_clock import ServerClock
+
+H_MS = 3_600_000
+HOUR = 1_780_000_000_000 - 1_780_000_000_000 % H_MS
+
+
+@pytest.fixture
+def local():
+    """本地時鐘（ms）；time.time 以此為準"""
+    now = {'ms': HOUR + 30 * 60_000}
+    with patch('trader.infrastructure.server_clock.time.time', lambda: now['ms'] / 1000):
+        yield now
+
+
+class TestServerClock:
+
+    def test_offset_applied(self, local):
+        clock = ServerClock(lambda: local['ms'] + 2500)
+        assert clock.sync() == 2500
+        assert clock.now_ms() == local['ms'] + 2500
+
+    def test_no_fetch_uses_local(self, local):
+        clock = ServerClock()
+        assert clock.sync() == 0 and clock.now_ms() == local['ms']
+
+    def test_failure_keeps_offset(self, local):
+        fetch = MagicMock(return_value=local['ms'] - 800)
+        clock = ServerClock(fetch)
+        clock.sync()
+        fetch.side_effect = Exception('timeout')
+        assert clock.sync(force=True) == -800
+        fetch.side_effect, fetch.return_value = None, 'garbage'
+        assert clock.sync(force=True) == -800
+
+    def test_resync_interval(self, local):
+        fetch = MagicMock(return_value=local['ms'])
+        clock = ServerClock(fetch, resync_seconds=60)
+        clock.sync()
+        clock.sync()
+        assert fetch.call_count == 1
+        with patch('trader.infrastructure.server_clock.time.monotonic', return_value=10 ** 9):
+            clock.sync()
+        assert fetch.call_count == 2
+
+    def test_close_alignment(self, local):
+        clock = ServerClock(lambda: local['ms'] + 1000)       # 交易所快 1 秒
+        clock.sync()
+        assert clock.last_closed_bar_ms('1h') == HOUR - H_MS
+        assert clock.seconds_until_close('1h', after=3) == 30 * 60 - 1 + 3
+
+        local['ms'] = HOUR + H_MS                             # 本地整點 = 交易所收盤後 1 秒
+        assert clock.last_closed_bar_ms('1h') == HOUR
+        assert clock.seconds_until_close('1h', after=3) == 2  # 指向剛過的收盤，不跳到下一小時
+        local['ms'] += 2000
+        assert clock.seconds_until_close('1h', after=3) == 3600
+
+
+class TestBotScanTiming:
+
+    def test_scan_task_aligned(self, mock_bot):
+        scan = next(t for t in mock_bot.scheduler.tasks if t.name == 'scan')
+        assert scan.align == mock_bot._next_scan_delay
+
+    def test_next_scan_delay(self, mock_bot):
+        mock_bot.server_clock = MagicMock()
+        mock_bot.server_clock.seconds_until_close.return_value = 1800.0
+        with patch.object(Config, 'SCAN_JITTER_SECONDS', 5), patch.object(Config, 'CHECK_INTERVAL', 60):
+            delay = mock_bot._next_scan_delay()
+            assert 1800 <= delay <= 1805
+            mock_bot.server_clock.seconds_until_close.assert_called_with(
+                Config.TIMEFRAME_SIGNAL, after=Config.SCAN_CLOSE_DELAY_SECONDS
+            )
+            mock_bot._scan_retry = True
+            assert mock_bot._next_scan_delay() == 60
+
+    def test_failed_fetch_marks_retry(self, mock_bot):
+        mock_bot._should_skip_scan = lambda symbol: False
+        mock_bot.fetch_ohlcv_many = lambda requests: {key[:2]: pd.DataFrame() for key in requests}
+        with patch.object(Config, 'USE_SCANNER_SYMBOLS', False), \
+             patch.object(Config, 'SYMBOLS', ['BTC/USDT']), \
+             patch.object(Config, 'SIGNAL_MEMO_ENABLED', False), \
+             patch.object(mock_bot, '_check_total_risk', return_value=True):
+            mock_bot.scan_for_signals()
+        assert mock_bot._scan_retry
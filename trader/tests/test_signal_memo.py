@@ -0,0 +1,83 @@
+"""Test: 已收盤信號 bar 未變時跳過重複評估（signal memo）"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+import numpy as np
+import pandas as pd
+import pytest
+from unittest.mock import patch
+
+from trader.config import ConfigV6 as Config
+
+H_MS = 3_600_000
+NOW_MS = 1_780_000_000_000 - (1_780_000_000_000 % H_MS) + 10 * 60_000   # 整點後 10 分鐘
+
+
+def _frame(n, freq_ms, end_ms):
+    """最後一根 bar 開盤於 end_ms（形成中）"""
+    ts = pd.to_datetime(np.arange(end_ms - (n - 1) * freq_ms, end_ms + 1, freq_ms), unit='ms')
+    close = 100 + np.sin(np.arange(n) / 5)
+    return pd.DataFrame({
+        'timestamp': ts, 'open': close, 'high': close + 1, 'low': close - 1,
+        'close': close, 'volume': np.full(n, 1000.0),
+    })
+
+
+@pytest.fixture
+def memo_bot(integration_bot):
+    bot, _, _ = integration_bot
+    forming_1h = NOW_MS - NOW_MS % H_MS
+
+    def fetch(symbol, timeframe, limit=100):
+        step = {'1h': H_MS, '4h': 4 * H_MS, '1d': 24 * H_MS}[timeframe]
+        return _frame(limit, step, forming_1h - forming_1h % step)
+
+    bot.data_provider.fetch_ohlcv.side_effect = fetch
+    bot.perf_db.get_last_loss_exit_time = lambda symbol: None
+    clock = {'now': NOW_MS}
+    with patch('trader.bot.time.time', lambda: clock['now'] / 1000), \
+         patch('trader.bot.MarketFilter.check_market_condition', return_value=(True, 'ok', False)), \
+         patch('trader.bot.detect_2b_with_pivots', return_value=(False, None)) as det_2b, \
+         patch('trader.bot.detect_ema_pullback', return_value=(False, None)), \
+         patch('trader.bot.detect_volume_breakout', return_value=(False, None)), \
+         patch.object(Config, 'SIGNAL_MEMO_ENABLED', True):
+        yield bot, det_2b, clock
+
+
+class TestSignalMemo:
+
+    def test_unchanged_closed_bar_skipped(self, memo_bot):
+        bot, det_2b, clock = memo_bot
+        bot.scan_for_signals()
+        assert det_2b.call_count == 1
+
+        fetches = bot.data_provider.fetch_ohlcv.call_count
+        clock['now'] += 60_000
+        bot.scan_for_signals()
+        assert det_2b.call_count == 1
+        assert bot.data_provider.fetch_ohlcv.call_count == fetches   # 連 K 線都不抓
+
+    def test_new_closed_bar_reevaluated(self, memo_bot):
+        bot, det_2b, clock = memo_bot
+        bot.scan_for_signals()
+        clock['now'] += H_MS
+        bot.scan_for_signals()
+        assert det_2b.call_count == 2
+
+    def test_memo_disabled(self, memo_bot):
+        bot, det_2b, _ = memo_bot
+        with patch.object(Config, 'SIGNAL_MEMO_ENABLED', False):
+            bot.scan_for_signals()
+            bot.scan_for_signals()
+        assert det_2b.call_count == 2
+
+    def test_saved_count_logged(self, memo_bot):
+        bot, _, _ = memo_bot
+        bot.scan_for_signals()
+        with patch('trader.bot._trade_log') as trade_log:
+            bot.scan_for_signals()
+        summary = trade_log.call_args[0][0]
+        assert summary['event'] == 'CYCLE_SUMMARY'
+        assert summary['memo_skipped'] == 1
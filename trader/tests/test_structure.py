@@ -5,8 +5,10 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
 import pytest
+import numpy as np
 import pandas as pd
 from trader.structure import StructureAnalysis
+from trader.tests.fixtures.reference import ref_swing_points
 
 
 def _make_df(highs, lows):
@@ -72,6 +74,47 @@ class TestSwingPoints:
         assert result['last_swing_low'] is not None
 
 
+class TestSwingPointsParity:
+    """向量化 find_swing_points 與逐根迴圈結果完全一致"""
+
+    @pytest.mark.parametrize('seed', range(20))
+    def test_random_walk_parity(self, seed):
+        rng = np.random.default_rng(seed)
+        n = int(rng.integers(5, 400))
+        # 取整 → 大量相等值，覆蓋 <= / >= 平手語意
+        close = np.round(100 + np.cumsum(rng.normal(0, 1, n)))
+        highs = close + np.round(rng.uniform(0, 2, n))
+        lows = close - np.round(rng.uniform(0, 2, n))
+        df = _make_df(list(highs), list(lows))
+        left, right = int(rng.integers(0, 9)), int(rng.integers(0, 5))
+
+        result = StructureAnalysis.find_swing_points(df, left_bars=left, right_bars=right)
+        ref_lows, ref_highs = ref_swing_points(df, left, right)
+        assert result['swing_lows'] == ref_lows
+        assert result['swing_highs'] == ref_highs
+
+    def test_nan_parity(self):
+        rng = np.random.default_rng(42)
+        highs = list(np.round(rng.uniform(100, 110, 120)))
+        lows = list(np.round(rng.uniform(90, 100, 120)))
+        for i in (3, 17, 18, 60, 119):
+            highs[i] = np.nan
+            lows[i] = np.nan
+        df = _make_df(highs, lows)
+
+        result = StructureAnalysis.find_swing_points(df, left_bars=5, right_bars=2)
+        ref_lows, ref_highs = ref_swing_points(df, 5, 2)
+        # NaN != NaN，以 index + 字串比對
+        assert [(i, str(p)) for i, p in result['swing_lows']] == [(i, str(p)) for i, p in ref_lows]
+        assert [(i, str(p)) for i, p in result['swing_highs']] == [(i, str(p)) for i, p in ref_highs]
+
+    def test_int_prices_keep_dtype(self):
+        df = _make_df([5, 6, 9, 6, 5, 4, 7], [1, 2, 3, 2, 1, 0, 4])
+        result = StructureAnalysis.find_swing_points(df, left_bars=2, right_bars=1)
+        assert result['swing_highs'] == [(2, 9)]
+        assert result['swing_lows'] == [(5, 0)]
+
+
 class TestNeckline:
     """Neckline 識別"""
 
@@ -128,3 +171,103 @@ class TestConfirmedPivots:
 
         val = StructureAnalysis.find_latest_confirmed_swing(df, 'low', 5, 2)
         assert val == 100.0
+
+
+class TestSwingCache:
+    """find_swing_points 依 frame 身分快取"""
+
+    @pytest.fixture(autouse=True)
+    def _clear(self):
+        StructureAnalysis.clear_swing_cache()
+        yield
+        StructureAnalysis.clear_swing_cache()
+
+    def _tagged_df(self, n=60, symbol='BTC/USDT', timeframe='1h'):
+        rng = np.random.default_rng(7)
+        close = 100 + np.cumsum(rng.normal(0, 1, n))
+        df = _make_df(list(close + 1), list(close - 1))
+        df['timestamp'] = pd.date_range('2026-01-01', periods=n, freq='h')
+        df.attrs['symbol'] = symbol
+        df.attrs['timeframe'] = timeframe
+        return df
+
+    def test_same_frame_computed_once(self):
+        df = self._tagged_df()
+        first = StructureAnalysis.find_swing_points(df, 7, 3)
+        for _ in range(3):
+            assert StructureAnalysis.find_swing_points(df, 7, 3) == first
+        stats = StructureAnalysis.swing_cache_stats()
+        assert stats['misses'] == 1
+        assert stats['hits'] == 3
+
+    def test_different_params_or_slice_miss(self):
+        df = self._tagged_df()
+        StructureAnalysis.find_swing_points(df, 7, 3)
+        StructureAnalysis.find_swing_points(df, 5, 2)
+        StructureAnalysis.find_swing_points(df.iloc[:-1], 7, 3)   # attrs 隨切片保留
+        StructureAnalysis.find_swing_points(self._tagged_df(symbol='ETH/USDT'), 7, 3)
+        assert StructureAnalysis.swing_cache_stats()['misses'] == 4
+
+    def test_forming_bar_update_misses(self):
+        df = self._tagged_df()
+        StructureAnalysis.find_swing_points(df, 7, 3)
+        df2 = df.copy()
+        df2.loc[df2.index[-1], 'low'] = df2['low'].min() - 10
+        result = StructureAnalysis.find_swing_points(df2, 7, 3)
+        assert StructureAnalysis.swing_cache_stats()['misses'] == 2
+        assert result == StructureAnalysis._compute_swing_points(df2, 7, 3)
+
+    def test_untagged_frame_not_cached(self):
+        df = self._tagged_df()
+        df.attrs.clear()
+        StructureAnalysis.find_swing_points(df, 7, 3)
+        StructureAnalysis.find_swing_points(df, 7, 3)
+        stats = StructureAnalysis.swing_cache_stats()
+        assert stats['hits'] == 0 and stats['entries'] == 0
+
+    def test_result_lists_are_copies(self):
+        df = self._tagged_df()
+        StructureAnalysis.find_swing_points(df, 7, 3)['swing_lows'].clear()
+        assert StructureAnalysis.find_swing_points(df, 7, 3)['swing_lows'] == \
+            StructureAnalysis._compute_swing_points(df, 7, 3)['swing_lows']
+
+    def test_reset_stats(self):
+        df = self._tagged_df()
+        StructureAnalysis.find_swing_points(df, 7, 3)
+        assert StructureAnalysis.swing_cache_stats(reset=True)['misses'] == 1
+        assert StructureAnalysis.swing_cache_stats()['misses'] == 0
+
+    def test_concurrent_access_with_eviction(self):
+        """監控 worker + 掃描執行緒同時讀寫：統計不遺失、淘汰不出錯、結果正確"""
+        import threading
+        from unittest.mock import patch
+        frames = [self._tagged_df(n=40 + i % 5, symbol=f'S{i}/USDT') for i in range(40)]
+        expected = [StructureAnalysis._compute_swing_points(df, 5, 2) for df in frames]
+        errors = []
+        calls_per_thread = 2000
+
+        def worker(seed):
+            rng = np.random.default_rng(seed)
+            try:
+                for _ in range(calls_per_thread):
+                    i = int(rng.integers(len(frames)))
+                    assert StructureAnalysis.find_swing_points(frames[i], 5, 2) == expected[i]
+            except Exception as e:          # noqa: BLE001 — 帶回主執行緒
+                errors.append(e)
+
+        switch = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            with patch('trader.structure.SWING_CACHE_MAX_ENTRIES', 8):
+                threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(8)]
+                for t in threads:
+                    t.start()
+                for t in threads:
+                    t.join()
+        finally:
+            sys.setswitchinterval(switch)
+
+        assert not errors
+        stats = StructureAnalysis.swing_cache_stats()
+        assert stats['hits'] + stats['misses'] == 8 * calls_per_thread
+        assert stats['entries'] <= 8
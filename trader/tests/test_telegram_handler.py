@@ -79,8 +79,8 @@ class TestTelegramCommands:
 
 class TestTelegramSecurity:
 
-    @patch('trader.infrastructure.telegram_handler.requests.get')
-    @patch('trader.infrastructure.telegram_handler.requests.post')
+    @patch('trader.infrastructure.telegram_handler.http_pool.get')
+    @patch('trader.infrastructure.telegram_handler.http_pool.post')
     def test_ignores_wrong_chat_id(self, mock_post, mock_get, handler):
         """只回應 Config.TELEGRAM_CHAT_ID"""
         mock_get.return_value = MagicMock(
@@ -100,8 +100,8 @@ class TestTelegramSecurity:
             handler.poll()
         mock_post.assert_not_called()
 
-    @patch('trader.infrastructure.telegram_handler.requests.get')
-    @patch('trader.infrastructure.telegram_handler.requests.post')
+    @patch('trader.infrastructure.telegram_handler.http_pool.get')
+    @patch('trader.infrastructure.telegram_handler.http_pool.post')
     def test_responds_correct_chat_id(self, mock_post, mock_get, handler):
         """正確 chat_id 會回覆"""
         mock_get.return_value = MagicMock(
@@ -122,7 +122,7 @@ class TestTelegramSecurity:
             handler.poll()
         mock_post.assert_called_once()
 
-    @patch('trader.infrastructure.telegram_handler.requests.get')
+    @patch('trader.infrastructure.telegram_handler.http_pool.get')
     def test_ignores_non_command(self, mock_get, handler):
         """非 / 開頭的訊息不處理"""
         mock_get.return_value = MagicMock(
@@ -145,7 +145,7 @@ class TestTelegramSecurity:
 
 class TestTelegramPolling:
 
-    @patch('trader.infrastructure.telegram_handler.requests.get')
+    @patch('trader.infrastructure.telegram_handler.http_pool.get')
     def test_updates_last_update_id(self, mock_get, handler):
         """update_id 會遞增，避免重複處理"""
         mock_get.return_value = MagicMock(
@@ -169,6 +169,6 @@ class TestTelegramPolling:
         """TELEGRAM_ENABLED=False 時不 poll"""
         with patch('trader.infrastructure.telegram_handler.Config') as mock_cfg:
             mock_cfg.TELEGRAM_ENABLED = False
-            with patch('trader.infrastructure.telegram_handler.requests.get') as mock_get:
+            with patch('trader.infrastructure.telegram_handler.http_pool.get') as mock_get:
                 handler.poll()
                 mock_get.assert_not_called()
@@ -0,0 +1,241 @@
+"""Test: 帳戶串流（事件套用到帳戶快照、keepalive / 失效重連、持倉事件立即觸發同步、本地替身）"""
+
+import sys
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from unittest.mock import MagicMock
+
+import pytest
+
+pytest.importorskip('aiohttp')
+
+from trader.infrastructure.api_client import BinanceFuturesClient
+from trader.infrastructure.user_stream import UserDataStream
+from trader.infrastructure.user_stream_standin import UserStreamStandIn
+from trader.risk.account import AccountState
+from trader.tests.conftest import make_pm
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _wait(cond, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if cond():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def _account_update(symbol_id, amount, balance_change=True):
+    return {'e': 'ACCOUNT_UPDATE', 'a': {
+        'm': 'ORDER',
+        'B': [{'a': 'USDT', 'wb': '9900', 'cw': '9900'}] if balance_change else [],
+        'P': [{'s': symbol_id, 'pa': str(amount), 'ep': '50000', 'ps': 'BOTH'}],
+    }}
+
+
+def _order_update(symbol_id, status, stop_price):
+    return {'e': 'ORDER_TRADE_UPDATE', 'o': {'s': symbol_id, 'o': 'STOP_MARKET', 'X': status, 'sp': str(stop_price)}}
+
+
+class FakeStream:
+    def __init__(self):
+        self.healthy = True
+        self.listeners = []
+
+    def add_listener(self, fn):
+        self.listeners.append(fn)
+
+    def is_healthy(self):
+        return self.healthy
+
+
+@pytest.fixture
+def account():
+    clock = Clock()
+    fetch = MagicMock(return_value={'balance': 100.0, 'positions': [
+        {'symbol': 'BTCUSDT', 'positionAmt': '0.01', 'entryPrice': '50000'},
+    ]})
+    stops = MagicMock(return_value={'BTCUSDT': 48000.0})
+    state = AccountState(fetch, stops, ttl_seconds=10, clock=clock)
+    stream = FakeStream()
+    state.attach_stream(stream, reconcile_seconds=120)
+    return state, fetch, stops, stream, clock
+
+
+class TestAccountEvents:
+
+    def test_position_closed_by_event(self, account):
+        state, fetch, _, stream, _ = account
+        assert len(state.positions()) == 1
+        stream.listeners[0](_account_update('BTCUSDT', 0))
+        assert state.positions() == []
+        assert fetch.call_count == 1
+
+    def test_balance_change_refetches_balance_only(self, account):
+        state, fetch, _, stream, _ = account
+        state.balance()
+        stream.listeners[0](_account_update('ETHUSDT', 1.5))
+        assert [p['symbol'] for p in state.positions()] == ['BTCUSDT', 'ETHUSDT']
+        assert fetch.call_count == 1
+        state.balance()                                 # 事件沒有可用餘額 → 重新查詢
+        assert fetch.call_count == 2
+        state.balance()
+        assert fetch.call_count == 2
+
+    def test_healthy_stream_extends_ttl(self, account):
+        state, fetch, _, stream, clock = account
+        state.positions()
+        clock.now = 60
+        state.positions()
+        assert fetch.call_count == 1
+        stream.healthy = False
+        state.positions()
+        assert fetch.call_count == 2
+        stream.healthy = True
+        clock.now = 60 + 120                            # 低頻對帳
+        state.positions()
+        assert fetch.call_count == 3
+
+    def test_stop_order_events(self, account):
+        state, _, stops, stream, _ = account
+        state.stop_map()
+        stream.listeners[0](_order_update('BTCUSDT', 'NEW', 49000))
+        stream.listeners[0](_order_update('BTCUSDT', 'CANCELED', 48000))   # 舊單取消晚到
+        assert state.stop_map() == {'BTCUSDT': 49000.0}
+        stream.listeners[0](_order_update('BTCUSDT', 'FILLED', 49000))
+        assert state.stop_map() == {}
+        assert stops.call_count == 1
+
+    def test_reconnect_invalidates(self, account):
+        state, fetch, _, stream, _ = account
+        state.positions()
+        stream.listeners[0]({'e': 'streamConnected'})
+        state.positions()
+        assert fetch.call_count == 2
+
+    def test_event_during_fetch_not_cached(self):
+        state = None
+
+        def fetch():
+            state.apply_event(_account_update('BTCUSDT', 0, balance_change=False))
+            return {'balance': 1.0, 'positions': [{'symbol': 'BTCUSDT', 'positionAmt': '0.01'}]}
+
+        state = AccountState(fetch, clock=Clock())
+        state.positions()
+        state.positions()
+        assert state.stats()['refreshes'] == 2 and state.stats()['hits'] == 0
+
+
+class TestUserDataStream:
+
+    @pytest.fixture
+    def server(self):
+        with UserStreamStandIn() as server:
+            yield server
+
+    def _stream(self, server, **kwargs):
+        stream = UserDataStream(server.listen_key, url=server.url, poll_seconds=0.05,
+                                reconnect_min_delay=0.05, **kwargs)
+        events = []
+        stream.add_listener(events.append)
+        return stream, events
+
+    def test_events_delivered(self, server):
+        stream, events = self._stream(server)
+        assert stream.start()
+        try:
+            assert _wait(stream.is_healthy)
+            server.open_position('BTCUSDT', 0.01, 50000.0)
+            server.place_stop('BTCUSDT', 48000.0)
+            server.trigger_stop('BTCUSDT')
+            assert _wait(lambda: len(events) == 5)
+        finally:
+            stream.stop()
+        kinds = [e['e'] for e in events]
+        assert kinds == ['streamConnected', 'ACCOUNT_UPDATE', 'ORDER_TRADE_UPDATE', 'ORDER_TRADE_UPDATE', 'ACCOUNT_UPDATE']
+        assert events[3]['o']['X'] == 'FILLED' and events[4]['a']['P'][0]['pa'] == '0.0'
+        assert server.balance == pytest.approx(10000.0 - 20.0)
+        assert not server.listen_keys                   # 停止時關閉 listenKey
+
+    def test_keepalive(self, server):
+        stream, _ = self._stream(server, keepalive_seconds=0.1)
+        stream.start()
+        try:
+            assert _wait(lambda: server.keepalives >= 2)
+            assert stream.is_healthy() and server.connections == 1
+        finally:
+            stream.stop()
+
+    def test_expired_key_reconnects(self, server):
+        stream, events = self._stream(server)
+        stream.start()
+        try:
+            assert _wait(stream.is_healthy)
+            server.expire_keys()
+            assert _wait(lambda: server.connections == 2 and stream.is_healthy())
+            assert stream.stats['expired'] == 1
+            server.drop_connections()
+            assert _wait(lambda: server.connections == 3 and stream.is_healthy())
+        finally:
+            stream.stop()
+        assert [e['e'] for e in events] == ['streamConnected'] * 3
+
+    def test_listen_key_rest(self, server):
+        client = BinanceFuturesClient('key', 'secret')
+        client.base_url = server.http_url
+        bot = MagicMock(futures_client=client)
+        from trader.bot import TradingBotV6
+        key = TradingBotV6._user_stream_key(bot, 'POST')
+        assert key in server.listen_keys
+        assert TradingBotV6._user_stream_key(bot, 'PUT') == key and server.keepalives == 1
+        assert TradingBotV6._user_stream_key(bot, 'DELETE') == ''
+        assert TradingBotV6._user_stream_key(bot, 'PUT') is None
+
+
+class TestBotHardStop:
+
+    def test_hard_stop_detected_subsecond(self, mock_bot):
+        with UserStreamStandIn() as server:
+            server.open_position('BTCUSDT', 0.01, 50000.0)
+            server.place_stop('BTCUSDT', 48000.0)
+            fetch = MagicMock(side_effect=lambda: {
+                'balance': server.balance, 'positions': server.account()['positions'],
+            })
+            mock_bot.account = AccountState(fetch, ttl_seconds=10)
+            mock_bot.risk_manager.account = mock_bot.account
+            stream = UserDataStream(server.listen_key, url=server.url, poll_seconds=0.05)
+            mock_bot.account.attach_stream(stream, reconcile_seconds=120)
+            stream.add_listener(mock_bot._on_user_event)
+
+            pm = make_pm(symbol='BTC/USDT')
+            pm.total_size = 0.01
+            mock_bot.active_trades['BTC/USDT'] = pm
+            mock_bot._save_positions = MagicMock()
+            sync = next(t for t in mock_bot.scheduler.tasks if t.name == 'sync')
+            stream.start()
+            try:
+                assert _wait(stream.is_healthy)
+                mock_bot._sync_exchange_positions()     # 快照由 REST 載入一次
+                assert not pm.is_closed
+                sync.next_run = float('inf')
+
+                started = time.monotonic()
+                server.trigger_stop('BTCUSDT')
+                assert mock_bot.scheduler.sleep(5)      # 主循環被喚醒
+                assert time.monotonic() - started < 1.0
+                assert sync in mock_bot.scheduler.due()
+                mock_bot._sync_exchange_positions()
+            finally:
+                stream.stop()
+        assert pm.is_closed and pm.exit_reason == 'hard_stop_hit'
+        assert fetch.call_count == 1                    # 偵測不需要再輪詢 REST